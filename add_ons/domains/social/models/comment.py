@@ -5,7 +5,7 @@ Social Comment Model
 from datetime import datetime
 from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
-from core.db.base import Base
+from core.db.base_class import Base
 
 
 class Comment(Base):
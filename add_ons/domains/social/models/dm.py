@@ -5,7 +5,7 @@ Social Direct Message Models
 from datetime import datetime
 from sqlalchemy import Column, Integer, DateTime, Text, UniqueConstraint, Index, ForeignKey
 from sqlalchemy.orm import relationship
-from core.db.base import Base
+from core.db.base_class import Base
 
 
 class Conversation(Base):
@@ -4,7 +4,7 @@ Social Follow Model
 
 from datetime import datetime
 from sqlalchemy import Column, Integer, DateTime, UniqueConstraint, Index
-from core.db.base import Base
+from core.db.base_class import Base
 
 
 class Follow(Base):
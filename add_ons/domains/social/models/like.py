@@ -5,7 +5,7 @@ Social Like Model
 from datetime import datetime
 from sqlalchemy import Column, Integer, DateTime, UniqueConstraint, Index, ForeignKey
 from sqlalchemy.orm import relationship
-from core.db.base import Base
+from core.db.base_class import Base
 
 
 class Like(Base):
@@ -5,7 +5,7 @@ Social Post Model
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
-from core.db.base import Base
+from core.db.base_class import Base
 
 
 class Post(Base):
@@ -17,6 +17,9 @@ class Post(Base):
     content = Column(Text, nullable=True)
     media_url = Column(String(1024), nullable=True)  # S3 or YouTube
     is_public = Column(Boolean, default=False)  # default private; visible to followers/mutuals only
+    # Denormalized counters, kept in step by SocialService
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -22,18 +22,19 @@ def create_social_routes():
     """Create and return social routes router"""
     
     @app.get("/social/feed")
-    async def feed(request, page: int = 1):
-        """Get user's social feed"""
+    async def feed(request, before: Optional[int] = None):
+        """Get user's social feed (cursor-paginated: ?before=<post id>)"""
         user_id = get_current_user_id(request)
         
         async with get_db() as db:
             service = SocialService(db, user_id)
-            posts = await service.get_feed(limit=20, offset=(page - 1) * 20)
+            posts, next_cursor = await service.get_feed_page(limit=20, before=before)
             
             # Simple render for now
             return Div(
                 H1("Social Feed"),
                 P(f"Found {len(posts)} posts"),
+                A("Older posts", href=f"/social/feed?before={next_cursor}") if next_cursor else None,
                 cls="p-4"
             )
     
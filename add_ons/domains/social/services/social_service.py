@@ -3,12 +3,20 @@ Social Service - Adapted for FastHTML
 Handles posts, comments, likes, and follows
 """
 
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, and_, or_, func, desc
 
 from add_ons.domains.social.models import Post, Comment, Follow, Like
+from add_ons.domains.social.services.timeline_service import (
+    FANOUT_BATCH,
+    PUBLIC_KEY,
+    TimelineService,
+    author_key,
+    order_by_ids,
+    timeline_key,
+)
+from core.services import get_db_service
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -17,9 +25,33 @@ logger = get_logger(__name__)
 class SocialService:
     """Social networking service"""
     
-    def __init__(self, db: AsyncSession, current_user_id: int):
+    def __init__(self, db: AsyncSession, current_user_id: int, timeline: Optional[TimelineService] = None):
         self.db = db
         self.user_id = current_user_id
+        self._timeline = timeline
+        self._timeline_checked = timeline is not None
+
+    async def _get_timeline(self) -> Optional[TimelineService]:
+        """Redis timeline store, or None to serve feeds straight from the database"""
+        if not self._timeline_checked:
+            self._timeline_checked = True
+            try:
+                redis = get_db_service().redis
+                if not getattr(redis, "client", None):
+                    await redis.connect()
+                self._timeline = TimelineService(redis.client)
+            except Exception as e:
+                logger.warning(f"Timeline cache unavailable, using database feed: {e}")
+        return self._timeline
+
+    def _visible_clause(self):
+        """Posts the current user may see: public, own, or from followed users"""
+        following_query = select(Follow.followee_id).where(Follow.follower_id == self.user_id)
+        return or_(
+            Post.is_public == True,
+            Post.user_id == self.user_id,
+            Post.user_id.in_(following_query)
+        )
 
     async def create_post(self, content: Optional[str] = None, media_url: Optional[str] = None, 
                          is_public: bool = False) -> Post:
@@ -33,44 +65,147 @@ class SocialService:
         self.db.add(post)
         await self.db.commit()
         await self.db.refresh(post)
+        await self._fan_out(post)
         
         logger.info(f"User {self.user_id} created post {post.id}")
         return post
 
-    async def get_feed(self, limit: int = 20, offset: int = 0) -> List[Post]:
-        """Get personalized feed for current user"""
-        # Get users that current user follows
-        following_query = select(Follow.followee_id).where(Follow.follower_id == self.user_id)
-        
-        # Posts from self OR users I follow OR public posts
-        stmt = (
-            select(Post)
-            .options(selectinload(Post.comments), selectinload(Post.likes))
-            .where(
-                or_(
-                    Post.is_public == True,
-                    Post.user_id == self.user_id,
-                    Post.user_id.in_(following_query)
+    async def _fan_out(self, post: Post) -> None:
+        """Push a new post into followers' cached timelines"""
+        timeline = await self._get_timeline()
+        if timeline is None:
+            return
+        try:
+            result = await self.db.execute(
+                select(func.count(Follow.id)).where(Follow.followee_id == post.user_id)
+            )
+            written = await timeline.add_post(
+                post.id,
+                post.user_id,
+                bool(post.is_public),
+                result.scalar() or 0,
+                lambda: self._follower_batches(post.user_id),
+            )
+            logger.debug(f"Post {post.id} fanned out to {written} timelines")
+        except Exception as e:
+            logger.warning(f"Timeline fan-out failed for post {post.id}: {e}")
+
+    async def _follower_batches(self, user_id: int) -> AsyncIterator[List[int]]:
+        """Follower ids in keyset-paginated batches"""
+        last_id = 0
+        while True:
+            result = await self.db.execute(
+                select(Follow.follower_id)
+                .where(and_(Follow.followee_id == user_id, Follow.follower_id > last_id))
+                .order_by(Follow.follower_id)
+                .limit(FANOUT_BATCH)
+            )
+            batch = list(result.scalars().all())
+            if not batch:
+                return
+            yield batch
+            if len(batch) < FANOUT_BATCH:
+                return
+            last_id = batch[-1]
+
+    async def get_feed(self, limit: int = 20, before: Optional[int] = None) -> List[Post]:
+        """Get personalized feed for current user (posts with id < before)"""
+        posts, _ = await self.get_feed_page(limit=limit, before=before)
+        return posts
+
+    async def get_feed_page(self, limit: int = 20, before: Optional[int] = None) -> Tuple[List[Post], Optional[int]]:
+        """
+        Get one page of the feed and the cursor for the next one.
+
+        Served from the cached timeline when Redis is available, otherwise
+        from a keyset query on the posts table.
+
+        Returns:
+            (posts newest first, next ``before`` cursor or None at the end)
+        """
+        page = None
+        timeline = await self._get_timeline()
+        if timeline is not None:
+            try:
+                page = await self._feed_from_timeline(timeline, limit, before)
+            except Exception as e:
+                logger.warning(f"Timeline read failed, using database feed: {e}")
+        if page is None:
+            posts = await self._feed_from_db(limit, before)
+            page = (posts, posts[-1].id if len(posts) >= limit else None)
+
+        logger.info(f"User {self.user_id} retrieved feed with {len(page[0])} posts")
+        return page
+
+    async def _feed_from_timeline(
+        self, timeline: TimelineService, limit: int, before: Optional[int]
+    ) -> Tuple[List[Post], Optional[int]]:
+        heavy_followees: List[int] = []
+        heavy = await timeline.heavy_users()
+        if heavy:
+            result = await self.db.execute(
+                select(Follow.followee_id).where(
+                    and_(Follow.follower_id == self.user_id, Follow.followee_id.in_(heavy))
                 )
             )
-            .order_by(desc(Post.created_at))
-            .limit(limit)
-            .offset(offset)
+            heavy_followees = list(result.scalars().all())
+
+        following_query = select(Follow.followee_id).where(Follow.follower_id == self.user_id)
+        loaders = {
+            timeline_key(self.user_id): lambda: self._recent_post_ids(
+                or_(Post.user_id == self.user_id, Post.user_id.in_(following_query)), timeline.max_length
+            ),
+            PUBLIC_KEY: lambda: self._recent_post_ids(Post.is_public == True, timeline.max_length),
+        }
+        for author_id in heavy_followees:
+            loaders[author_key(author_id)] = (
+                lambda author_id=author_id: self._recent_post_ids(Post.user_id == author_id, timeline.max_length)
+            )
+
+        page = await timeline.page(self.user_id, loaders, heavy_followees, cursor=before, limit=limit)
+
+        posts: List[Post] = []
+        if page.ids:
+            result = await self.db.execute(select(Post).where(Post.id.in_(page.ids)))
+            posts = [
+                p for p in order_by_ids(result.scalars().all(), page.ids)
+                # Deleted posts drop out here; visibility may have changed since caching
+                if p.is_public or p.user_id == self.user_id or p.id in page.personal
+            ]
+        if len(page.ids) >= limit:
+            return posts, page.next_cursor
+        if page.complete:
+            return posts, None
+
+        # Past the cached window: continue from the database
+        wanted = limit - len(posts)
+        older = await self._feed_from_db(wanted, page.ids[-1] if page.ids else before)
+        posts.extend(older)
+        return posts, (older[-1].id if len(older) >= wanted else None)
+
+    async def _feed_from_db(self, limit: int, before: Optional[int] = None) -> List[Post]:
+        stmt = select(Post).where(self._visible_clause())
+        if before:
+            stmt = stmt.where(Post.id < before)
+        result = await self.db.execute(stmt.order_by(desc(Post.id)).limit(limit))
+        return list(result.scalars().all())
+
+    async def _recent_post_ids(self, clause, limit: int) -> List[int]:
+        result = await self.db.execute(
+            select(Post.id).where(clause).order_by(desc(Post.id)).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def _update_counters(self, post_id: int, **values) -> None:
+        """Adjust denormalized counters in the current transaction"""
+        # Not an edit of the post, so leave updated_at alone
+        await self.db.execute(
+            update(Post).where(Post.id == post_id).values(updated_at=Post.updated_at, **values)
         )
-        
-        result = await self.db.execute(stmt)
-        posts = result.scalars().all()
-        
-        logger.info(f"User {self.user_id} retrieved feed with {len(posts)} posts")
-        return posts
 
     async def get_post(self, post_id: int) -> Optional[Post]:
         """Get specific post with visibility check"""
-        stmt = (
-            select(Post)
-            .options(selectinload(Post.comments), selectinload(Post.likes))
-            .where(Post.id == post_id)
-        )
+        stmt = select(Post).where(Post.id == post_id)
         
         result = await self.db.execute(stmt)
         post = result.scalar_one_or_none()
@@ -108,11 +243,19 @@ class SocialService:
             post.content = content
         if media_url is not None:
             post.media_url = media_url
+        visibility_changed = is_public is not None and bool(post.is_public) != is_public
         if is_public is not None:
             post.is_public = is_public
         
         await self.db.commit()
         await self.db.refresh(post)
+
+        timeline = await self._get_timeline()
+        if visibility_changed and timeline is not None:
+            try:
+                await timeline.set_public(post.id, is_public)
+            except Exception as e:
+                logger.warning(f"Timeline update failed for post {post_id}: {e}")
         
         logger.info(f"User {self.user_id} updated post {post_id}")
         return post
@@ -128,6 +271,13 @@ class SocialService:
         
         await self.db.delete(post)
         await self.db.commit()
+
+        timeline = await self._get_timeline()
+        if timeline is not None:
+            try:
+                await timeline.remove_post(post_id, self.user_id)
+            except Exception as e:
+                logger.warning(f"Timeline cleanup failed for post {post_id}: {e}")
         
         logger.info(f"User {self.user_id} deleted post {post_id}")
         return True
@@ -146,6 +296,7 @@ class SocialService:
             parent_id=parent_id
         )
         self.db.add(comment)
+        await self._update_counters(post_id, comment_count=Post.comment_count + 1)
         await self.db.commit()
         await self.db.refresh(comment)
         
@@ -212,6 +363,14 @@ class SocialService:
                 return False
         
         await self.db.delete(comment)
+        await self.db.flush()
+        # Replies go with the comment, so recount rather than decrement
+        await self._update_counters(
+            comment.post_id,
+            comment_count=select(func.count(Comment.id))
+            .where(Comment.post_id == comment.post_id)
+            .scalar_subquery(),
+        )
         await self.db.commit()
         
         logger.info(f"User {self.user_id} deleted comment {comment_id}")
@@ -232,6 +391,7 @@ class SocialService:
         
         like = Like(post_id=post_id, user_id=self.user_id)
         self.db.add(like)
+        await self._update_counters(post_id, like_count=Post.like_count + 1)
         await self.db.commit()
         
         logger.info(f"User {self.user_id} liked post {post_id}")
@@ -247,6 +407,7 @@ class SocialService:
             return False  # Not liked
         
         await self.db.delete(like)
+        await self._update_counters(post_id, like_count=Post.like_count - 1)
         await self.db.commit()
         
         logger.info(f"User {self.user_id} unliked post {post_id}")
@@ -254,7 +415,7 @@ class SocialService:
 
     async def get_like_count(self, post_id: int) -> int:
         """Get number of likes for a post"""
-        stmt = select(func.count(Like.id)).where(Like.post_id == post_id)
+        stmt = select(Post.like_count).where(Post.id == post_id)
         result = await self.db.execute(stmt)
         return result.scalar() or 0
 
@@ -282,6 +443,13 @@ class SocialService:
         follow = Follow(follower_id=self.user_id, followee_id=followee_id)
         self.db.add(follow)
         await self.db.commit()
+
+        timeline = await self._get_timeline()
+        if timeline is not None:
+            try:
+                await timeline.follow(self.user_id, followee_id)
+            except Exception as e:
+                logger.warning(f"Timeline backfill failed for follow {self.user_id}->{followee_id}: {e}")
         
         logger.info(f"User {self.user_id} followed user {followee_id}")
         return True
@@ -300,6 +468,13 @@ class SocialService:
         
         await self.db.delete(follow)
         await self.db.commit()
+
+        timeline = await self._get_timeline()
+        if timeline is not None:
+            try:
+                await timeline.unfollow(self.user_id, followee_id)
+            except Exception as e:
+                logger.warning(f"Timeline cleanup failed for unfollow {self.user_id}->{followee_id}: {e}")
         
         logger.info(f"User {self.user_id} unfollowed user {followee_id}")
         return True
@@ -356,22 +531,11 @@ class SocialService:
 
     async def get_user_posts(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Post]:
         """Get posts by specific user with visibility check"""
-        stmt = (
-            select(Post)
-            .options(selectinload(Post.comments), selectinload(Post.likes))
-            .where(Post.user_id == user_id)
-            .order_by(desc(Post.created_at))
-            .limit(limit)
-            .offset(offset)
-        )
+        stmt = select(Post).where(Post.user_id == user_id)
+        # Non-public posts of another user are visible only to followers
+        if user_id != self.user_id and not await self.is_following(user_id):
+            stmt = stmt.where(Post.is_public == True)
+        stmt = stmt.order_by(desc(Post.created_at)).limit(limit).offset(offset)
         
         result = await self.db.execute(stmt)
-        posts = result.scalars().all()
-        
-        # Filter visible posts
-        visible_posts = []
-        for post in posts:
-            if await self.is_post_visible(post):
-                visible_posts.append(post)
-        
-        return visible_posts
+        return result.scalars().all()
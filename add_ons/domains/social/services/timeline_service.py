@@ -0,0 +1,260 @@
+"""
+Timeline Service - precomputed social feeds in Redis
+
+Each user's home timeline is a sorted set of post ids (score = post id, so
+keyset pagination is a ZREVRANGEBYSCORE below the cursor). ``create_post``
+fans the new id out to every follower's timeline, unless the author has
+more than SOCIAL_FANOUT_LIMIT followers; such "heavy" authors are pulled
+at read time from their own post set instead. Public posts live in one
+shared set that every reader merges in.
+
+Sets are capped at SOCIAL_TIMELINE_LENGTH entries. A sentinel member "0"
+(score 0) marks a set that holds its source's complete history; trimming
+drops it first, which tells the reader that older pages must come from
+the database.
+"""
+
+import os
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FANOUT_LIMIT = int(os.getenv("SOCIAL_FANOUT_LIMIT", "10000"))
+TIMELINE_LENGTH = int(os.getenv("SOCIAL_TIMELINE_LENGTH", "800"))
+FANOUT_BATCH = 1000
+
+SENTINEL = "0"
+HEAVY_USERS_KEY = "social:heavy"
+PUBLIC_KEY = "social:public"
+
+IdLoader = Callable[[], Awaitable[List[int]]]
+
+
+def timeline_key(user_id: int) -> str:
+    return f"social:tl:{user_id}"
+
+
+def author_key(user_id: int) -> str:
+    return f"social:posts:{user_id}"
+
+
+class TimelinePage:
+    """One page of feed ids, newest first"""
+
+    def __init__(self, ids: List[int], personal: set, complete: bool, limit: int):
+        self.ids = ids
+        # Ids that came from the reader's own timeline or followed authors
+        self.personal = personal
+        # False if a trimmed source cut the page short; older posts are in the database
+        self.complete = complete
+        self.limit = limit
+
+    @property
+    def next_cursor(self) -> Optional[int]:
+        return self.ids[-1] if len(self.ids) >= self.limit else None
+
+
+class TimelineService:
+    """Redis sorted-set timelines with fan-out on write and pull for heavy authors"""
+
+    def __init__(self, redis, fanout_limit: int = FANOUT_LIMIT, max_length: int = TIMELINE_LENGTH):
+        self.redis = redis
+        self.fanout_limit = fanout_limit
+        self.max_length = max_length
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _push(self, pipe, key: str, post_id: int) -> None:
+        pipe.zadd(key, {str(post_id): post_id})
+        pipe.zremrangebyrank(key, 0, -(self.max_length + 1))
+
+    async def _push_existing(self, keys: List[str], post_id: int) -> int:
+        """Add a post to those of ``keys`` that exist; missing sets are built on first read"""
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.exists(key)
+        present = await pipe.execute()
+        pipe = self.redis.pipeline(transaction=False)
+        written = 0
+        for key, exists in zip(keys, present):
+            if exists:
+                self._push(pipe, key, post_id)
+                written += 1
+        if written:
+            await pipe.execute()
+        return written
+
+    async def add_post(
+        self,
+        post_id: int,
+        author_id: int,
+        is_public: bool,
+        follower_count: int,
+        follower_batches: Callable[[], AsyncIterable[List[int]]],
+    ) -> int:
+        """
+        Index a new post and fan it out.
+
+        Args:
+            post_id: New post id
+            author_id: Author user id
+            is_public: Whether the post goes to the public set
+            follower_count: Author's follower count
+            follower_batches: Callable yielding follower id batches; only
+                consumed when the author is under the fan-out limit
+
+        Returns:
+            Number of follower timelines written
+        """
+        heavy = follower_count > self.fanout_limit
+        if heavy:
+            await self.redis.sadd(HEAVY_USERS_KEY, author_id)
+        else:
+            await self.redis.srem(HEAVY_USERS_KEY, author_id)
+
+        own = [author_key(author_id), timeline_key(author_id)] + ([PUBLIC_KEY] if is_public else [])
+        await self._push_existing(own, post_id)
+        if heavy:
+            return 0
+
+        written = 0
+        async for batch in follower_batches():
+            if batch:
+                written += await self._push_existing([timeline_key(f) for f in batch], post_id)
+        return written
+
+    async def set_public(self, post_id: int, is_public: bool) -> None:
+        if is_public:
+            await self._push_existing([PUBLIC_KEY], post_id)
+        else:
+            await self.redis.zrem(PUBLIC_KEY, str(post_id))
+
+    async def remove_post(self, post_id: int, author_id: int) -> None:
+        """Drop a deleted post from shared sets; follower copies are filtered on read"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(author_key(author_id), str(post_id))
+        pipe.zrem(timeline_key(author_id), str(post_id))
+        pipe.zrem(PUBLIC_KEY, str(post_id))
+        await pipe.execute()
+
+    async def _author_posts(self, author_id: int) -> Optional[List[str]]:
+        """All of an author's post ids, or None if the set is missing or trimmed"""
+        key = author_key(author_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zscore(key, SENTINEL)
+        pipe.zrevrangebyscore(key, "+inf", f"({SENTINEL}")
+        sentinel, posts = await pipe.execute()
+        return posts if sentinel is not None else None
+
+    async def follow(self, follower_id: int, followee_id: int) -> None:
+        """Backfill a followee's posts into the follower's timeline"""
+        await self._merge_author(follower_id, followee_id, add=True)
+
+    async def unfollow(self, follower_id: int, followee_id: int) -> None:
+        """Remove a followee's posts from the follower's timeline"""
+        await self._merge_author(follower_id, followee_id, add=False)
+
+    async def _merge_author(self, follower_id: int, followee_id: int, add: bool) -> None:
+        key = timeline_key(follower_id)
+        if not await self.redis.exists(key):
+            return
+        posts = await self._author_posts(followee_id)
+        if posts is None:
+            # Not enough cached to patch the timeline: rebuild it on next read
+            await self.redis.delete(key)
+            return
+        if not posts:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        if add:
+            pipe.zadd(key, {member: int(member) for member in posts})
+            pipe.zremrangebyrank(key, 0, -(self.max_length + 1))
+        else:
+            pipe.zrem(key, *posts)
+        await pipe.execute()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def heavy_users(self) -> set:
+        return {int(u) for u in await self.redis.smembers(HEAVY_USERS_KEY)}
+
+    async def ensure(self, key: str, loader: IdLoader) -> None:
+        """Build a set from the database the first time it is read"""
+        if await self.redis.exists(key):
+            return
+        ids = await loader()
+        mapping: Dict[str, int] = {str(i): i for i in ids[:self.max_length]}
+        if len(ids) < self.max_length:
+            mapping[SENTINEL] = 0
+        await self.redis.zadd(key, mapping)
+
+    async def page(
+        self,
+        user_id: int,
+        loaders: Dict[str, IdLoader],
+        heavy_followees: Iterable[int] = (),
+        cursor: Optional[int] = None,
+        limit: int = 20,
+    ) -> TimelinePage:
+        """
+        Merge the user's timeline, the public set and heavy followees' posts.
+
+        Args:
+            user_id: Reader
+            loaders: Database loaders keyed by Redis key, used to build
+                missing sets (see ensure)
+            heavy_followees: Followed authors that are not fanned out
+            cursor: Return posts with ids below this one
+            limit: Page size
+        """
+        personal_keys = [timeline_key(user_id)] + [author_key(h) for h in heavy_followees]
+        keys = personal_keys + [PUBLIC_KEY]
+        for key in keys:
+            if key in loaders:
+                await self.ensure(key, loaders[key])
+
+        upper = f"({cursor}" if cursor else "+inf"
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrevrangebyscore(key, upper, f"({SENTINEL}", start=0, num=limit)
+            pipe.zscore(key, SENTINEL)
+        results = await pipe.execute()
+
+        merged: set = set()
+        personal: set = set()
+        # Lowest id the merge can vouch for. A trimmed set that ran short only
+        # covers ids down to its oldest entry; anything lower may be missing.
+        floor = 0
+        for i, key in enumerate(keys):
+            members, sentinel = results[2 * i], results[2 * i + 1]
+            ids = {int(m) for m in members}
+            merged |= ids
+            if key in personal_keys:
+                personal |= ids
+            if len(ids) < limit and sentinel is None:
+                floor = max(floor, min(ids) if ids else (cursor or float("inf")))
+
+        ids = [i for i in sorted(merged, reverse=True) if i >= floor][:limit]
+        return TimelinePage(ids, personal, floor == 0, limit)
+
+
+def order_by_ids(items: Iterable, ids: List[int], key: Callable = lambda item: item.id) -> List:
+    """Reorder loaded rows to match a list of ids, dropping missing ones"""
+    by_id = {key(item): item for item in items}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+__all__ = [
+    "TimelineService",
+    "TimelinePage",
+    "order_by_ids",
+    "timeline_key",
+    "author_key",
+    "PUBLIC_KEY",
+]
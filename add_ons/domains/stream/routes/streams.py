@@ -1,6 +1,8 @@
 """Stream Routes - Following FastHTML pattern"""
 from fasthtml.common import *
 import os
+from functools import lru_cache, wraps
+from types import SimpleNamespace
 from core.ui.layout import Layout
 from core.utils.logger import get_logger
 from core.services.auth import get_current_user_from_context
@@ -9,7 +11,7 @@ from add_ons.domains.stream.ui.pages import streams_list_page, watch_page, broad
 from add_ons.domains.stream.ui.components import StreamCard
 from add_ons.domains.stream.services.paywall_service import PaywallService
 from add_ons.domains.stream.services.purchase_service import PurchaseService
-from add_ons.domains.stream.services.signaling_service import SignalingService
+from add_ons.domains.stream.services.signaling_service import SignalingService, SignalingUnavailable
 from add_ons.domains.stream.services.chat_service import ChatService
 from add_ons.domains.stream.services.youtube_service import YouTubeService
 from add_ons.domains.stream.services.membership_service import MembershipService
@@ -58,6 +60,29 @@ def _require_stream_manager(user: dict):
     return role in {"stream_admin", "streamer", "admin", "super_admin"}
 
 
+def _wait_param(request: Request) -> float:
+    """Long-poll seconds from ?wait= (0 = answer immediately)."""
+    try:
+        return float(request.query_params.get("wait", "0"))
+    except ValueError:
+        return 0.0
+
+
+def _signaling_route(handler):
+    """Answer 503 when signaling state is unreachable, so clients back off and retry."""
+    @wraps(handler)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await handler(*args, **kwargs)
+        except SignalingUnavailable:
+            return JSONResponse(
+                {"error": "Signaling temporarily unavailable"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+    return wrapper
+
+
 @router_streams.get("/stream/webrtc/config")
 async def webrtc_config(request: Request):
     """Return ICE server configuration for WebRTC clients."""
@@ -65,6 +90,7 @@ async def webrtc_config(request: Request):
 
 
 @router_streams.post("/stream/webrtc/{room}/offer")
+@_signaling_route
 async def webrtc_post_offer(request: Request, room: str):
     payload = await request.json()
     svc = SignalingService()
@@ -73,6 +99,7 @@ async def webrtc_post_offer(request: Request, room: str):
 
 
 @router_streams.post("/stream/webrtc/{room}/offer/{viewer_id}")
+@_signaling_route
 async def webrtc_post_offer_viewer(request: Request, room: str, viewer_id: str):
     """Viewer posts an offer for broadcaster to answer (multi-viewer)."""
     payload = await request.json()
@@ -82,21 +109,24 @@ async def webrtc_post_offer_viewer(request: Request, room: str, viewer_id: str):
 
 
 @router_streams.get("/stream/webrtc/{room}/offers/next")
+@_signaling_route
 async def webrtc_next_offer(request: Request, room: str):
-    """Broadcaster pops next pending viewer offer (multi-viewer)."""
+    """Broadcaster pops next pending viewer offer (multi-viewer). Supports ?wait= long-poll."""
     svc = SignalingService()
-    nxt = await svc.pop_next_offer(room)
+    nxt = await svc.pop_next_offer(room, wait=_wait_param(request))
     return JSONResponse(nxt or {})
 
 
 @router_streams.get("/stream/webrtc/{room}/offer")
+@_signaling_route
 async def webrtc_get_offer(request: Request, room: str):
     svc = SignalingService()
-    offer = await svc.get_offer(room)
+    offer = await svc.get_offer(room, wait=_wait_param(request))
     return JSONResponse(offer or {})
 
 
 @router_streams.post("/stream/webrtc/{room}/answer")
+@_signaling_route
 async def webrtc_post_answer(request: Request, room: str):
     payload = await request.json()
     svc = SignalingService()
@@ -105,6 +135,7 @@ async def webrtc_post_answer(request: Request, room: str):
 
 
 @router_streams.post("/stream/webrtc/{room}/answer/{viewer_id}")
+@_signaling_route
 async def webrtc_post_answer_viewer(request: Request, room: str, viewer_id: str):
     """Broadcaster posts an answer for a specific viewer (multi-viewer)."""
     payload = await request.json()
@@ -114,21 +145,24 @@ async def webrtc_post_answer_viewer(request: Request, room: str, viewer_id: str)
 
 
 @router_streams.get("/stream/webrtc/{room}/answer")
+@_signaling_route
 async def webrtc_get_answer(request: Request, room: str):
     svc = SignalingService()
-    answer = await svc.get_answer(room)
+    answer = await svc.get_answer(room, wait=_wait_param(request))
     return JSONResponse(answer or {})
 
 
 @router_streams.get("/stream/webrtc/{room}/answer/{viewer_id}")
+@_signaling_route
 async def webrtc_get_answer_viewer(request: Request, room: str, viewer_id: str):
-    """Viewer polls for their answer (multi-viewer)."""
+    """Viewer polls for their answer (multi-viewer). Supports ?wait= long-poll."""
     svc = SignalingService()
-    answer = await svc.get_viewer_answer(room, viewer_id)
+    answer = await svc.get_viewer_answer(room, viewer_id, wait=_wait_param(request))
     return JSONResponse(answer or {})
 
 
 @router_streams.post("/stream/webrtc/{room}/candidates/from-viewer/{viewer_id}")
+@_signaling_route
 async def webrtc_post_candidate_from_viewer(request: Request, room: str, viewer_id: str):
     """Viewer trickles ICE candidates to broadcaster."""
     payload = await request.json()
@@ -138,15 +172,17 @@ async def webrtc_post_candidate_from_viewer(request: Request, room: str, viewer_
 
 
 @router_streams.get("/stream/webrtc/{room}/candidates/from-viewer/{viewer_id}")
+@_signaling_route
 async def webrtc_get_candidates_from_viewer(request: Request, room: str, viewer_id: str):
-    """Broadcaster polls ICE candidates from a specific viewer."""
+    """Broadcaster polls ICE candidates from a specific viewer. Supports ?wait= long-poll."""
     max_items = int(request.query_params.get("max", "50"))
     svc = SignalingService()
-    cands = await svc.pop_viewer_candidates(room, viewer_id, max_items=max_items)
+    cands = await svc.pop_viewer_candidates(room, viewer_id, max_items=max_items, wait=_wait_param(request))
     return JSONResponse({"candidates": cands})
 
 
 @router_streams.post("/stream/webrtc/{room}/candidates/from-broadcaster/{viewer_id}")
+@_signaling_route
 async def webrtc_post_candidate_from_broadcaster(request: Request, room: str, viewer_id: str):
     """Broadcaster trickles ICE candidates to a specific viewer."""
     payload = await request.json()
@@ -156,15 +192,17 @@ async def webrtc_post_candidate_from_broadcaster(request: Request, room: str, vi
 
 
 @router_streams.get("/stream/webrtc/{room}/candidates/from-broadcaster/{viewer_id}")
+@_signaling_route
 async def webrtc_get_candidates_from_broadcaster(request: Request, room: str, viewer_id: str):
-    """Viewer polls ICE candidates from broadcaster."""
+    """Viewer polls ICE candidates from broadcaster. Supports ?wait= long-poll."""
     max_items = int(request.query_params.get("max", "50"))
     svc = SignalingService()
-    cands = await svc.pop_broadcaster_candidates(room, viewer_id, max_items=max_items)
+    cands = await svc.pop_broadcaster_candidates(room, viewer_id, max_items=max_items, wait=_wait_param(request))
     return JSONResponse({"candidates": cands})
 
 
 @router_streams.post("/stream/webrtc/{room}/disconnect/{viewer_id}")
+@_signaling_route
 async def webrtc_disconnect(request: Request, room: str, viewer_id: str):
     """Cleanup viewer-specific signaling keys in Redis."""
     svc = SignalingService()
@@ -862,42 +900,83 @@ async def api_analytics(request: Request):
     return StreamAnalytics(metrics)
 
 
-@router_streams.get("/stream/chat/{stream_id}")
-async def get_chat_messages(request: Request, stream_id: int):
-    """Render recent chat messages for a stream (HTMX polling target)."""
+def _chat_message(m) -> Div:
+    return Div(
+        Div(
+            Strong(m.username, cls="text-primary"),
+            Span(": "),
+            Span(m.content),
+            cls="mb-1",
+        ),
+        Div(
+            m.created_at.strftime("%H:%M"),
+            cls="text-xs text-gray-500",
+        ),
+        cls="chat-message p-2 border-b",
+    )
+
+
+def _chat_sse_frame(m) -> str:
+    return _render_chat_frame(m.stream_id, m.id, m.username, m.content, m.created_at)
+
+
+@lru_cache(maxsize=1024)
+def _render_chat_frame(stream_id, msg_id, username, content, created_at) -> str:
+    # Rendered once per message per worker, however many viewers receive it
+    m = SimpleNamespace(username=username, content=content, created_at=created_at)
+    return f"id: {msg_id}\n" + sse_message(_chat_message(m), event="chat")
+
+
+async def _can_view_chat(request: Request, stream_id: int, user) -> bool:
     use_db = _use_db(request)
-    user = get_current_user_from_context()
-    stream_service = StreamService(use_db=use_db)
-    stream = await stream_service.get_stream(stream_id)
+    stream = await StreamService(use_db=use_db).get_stream(stream_id)
     if not stream:
-        return Div()
+        return False
     paywall = PaywallService(use_db=use_db)
     allowed, _reason, _data = await paywall.can_access_stream(user["id"] if user else None, stream)
-    if not allowed:
+    return allowed
+
+
+@router_streams.get("/stream/chat/{stream_id}")
+async def get_chat_messages(request: Request, stream_id: int):
+    """Render recent chat messages for a stream (initial backlog)."""
+    user = get_current_user_from_context()
+    if not await _can_view_chat(request, stream_id, user):
         return Div()
-    service = ChatService(use_db=use_db)
+    service = ChatService(use_db=_use_db(request))
     messages = await service.list_messages(stream_id=stream_id, limit=50)
+    last_id = messages[-1].id if messages else 0
 
+    # The event stream starts where this backlog ends, so nothing posted in between is lost
     return Div(
-        *[
-            Div(
-                Div(
-                    Strong(m.username, cls="text-primary"),
-                    Span(": "),
-                    Span(m.content),
-                    cls="mb-1",
-                ),
-                Div(
-                    m.created_at.strftime("%H:%M"),
-                    cls="text-xs text-gray-500",
-                ),
-                cls="chat-message p-2 border-b",
-            )
-            for m in messages
-        ]
+        *[_chat_message(m) for m in messages],
+        Div(sse_swap="chat", hx_swap="beforeend"),
+        sse_connect=f"/stream/chat/{stream_id}/events?after={last_id}",
     )
 
 
+@router_streams.get("/stream/chat/{stream_id}/events")
+async def chat_events(request: Request, stream_id: int):
+    """Server-sent events: push new chat messages as they are posted."""
+    user = get_current_user_from_context()
+    if not await _can_view_chat(request, stream_id, user):
+        return Response(status_code=403)
+    service = ChatService(use_db=_use_db(request))
+    # A reconnecting EventSource resumes after the last message it received
+    after = request.headers.get("last-event-id") or request.query_params.get("after")
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        after = None
+
+    async def events():
+        yield "retry: 3000\n\n"
+        async for m in service.subscribe(stream_id, heartbeat=15, after=after):
+            yield ": keepalive\n\n" if m is None else _chat_sse_frame(m)
+
+    return EventStream(events())
+
+
 @router_streams.post("/stream/chat/{stream_id}/send")
 async def api_send_chat(
     request: Request,
@@ -921,26 +1000,15 @@ async def api_send_chat(
         return JSONResponse({"error": "Access denied"}, status_code=403)
 
     service = ChatService(use_db=use_db)
-    msg = await service.add_message(
+    await service.add_message(
         stream_id=stream_id,
         user_id=int(user.get('id')),
         username=user.get('username', 'User'),
         content=message,
     )
 
-    return Div(
-        Div(
-            Strong(msg.username, cls="text-primary"),
-            Span(": "),
-            Span(msg.content),
-            cls="mb-1",
-        ),
-        Div(
-            msg.created_at.strftime("%H:%M"),
-            cls="text-xs text-gray-500",
-        ),
-        cls="chat-message p-2 border-b",
-    )
+    # The message reaches every viewer, the sender included, over the event stream
+    return Response(status_code=204)
 
 
 # ============================================================================
@@ -4,7 +4,11 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from core.services import get_db_service
+from pymongo.errors import DuplicateKeyError
+
+from core.services import get_db_service, get_sequence_service
+
+COLLECTION = "stream_attendees"
 
 
 @dataclass
@@ -15,54 +19,63 @@ class StreamAttendance:
     created_at: datetime
 
 
+# Demo/in-memory attendance, shared by every service instance:
+# stream_id -> user_id -> attendance
+_MEM: Dict[int, Dict[int, StreamAttendance]] = {}
+
+
 class AttendanceService:
     def __init__(self, use_db: bool = False):
         self.use_db = use_db
         self.db = get_db_service() if use_db else None
-        self._mem: Dict[int, List[StreamAttendance]] = {}
+        self._mem = _MEM
+
+    async def _ensure_indexes(self) -> None:
+        await self.db.ensure_index(COLLECTION, [("stream_id", 1), ("user_id", 1)], unique=True)
+        await self.db.ensure_index(COLLECTION, [("user_id", 1), ("created_at", -1)])
 
     async def is_attending(self, stream_id: int, user_id: int) -> bool:
         if self.use_db:
+            await self._ensure_indexes()
             doc = await self.db.find_document(
-                "stream_attendees",
+                COLLECTION,
                 {"stream_id": stream_id, "user_id": user_id},
             )
             return bool(doc)
 
-        return any(a.user_id == user_id for a in self._mem.get(stream_id, []))
+        return user_id in self._mem.get(stream_id, {})
 
     async def add_attendee(self, stream_id: int, user_id: int) -> StreamAttendance:
         if self.use_db:
-            existing = await self.db.find_document(
-                "stream_attendees",
-                {"stream_id": stream_id, "user_id": user_id},
-            )
+            await self._ensure_indexes()
+            key = {"stream_id": stream_id, "user_id": user_id}
+            existing = await self.db.find_document(COLLECTION, key)
             if existing:
                 return self._doc_to_attendance(existing)
 
-            all_docs = await self.db.find_documents("stream_attendees", {}, limit=5000)
-            new_id = (
-                max((int(d.get("id")) for d in all_docs if d.get("id") is not None), default=0) + 1
-            )
+            new_id = await get_sequence_service().next_id(COLLECTION, seed_collection=COLLECTION)
             now = datetime.utcnow()
-            doc = {"id": new_id, "stream_id": stream_id, "user_id": user_id, "created_at": now}
-            await self.db.insert_document("stream_attendees", doc)
+            doc = {"id": new_id, **key, "created_at": now}
+            try:
+                await self.db.insert_document(COLLECTION, doc)
+            except DuplicateKeyError:
+                # A concurrent request registered the same user first
+                return self._doc_to_attendance(await self.db.find_document(COLLECTION, key))
             return StreamAttendance(id=new_id, stream_id=stream_id, user_id=user_id, created_at=now)
 
-        now = datetime.utcnow()
-        if stream_id not in self._mem:
-            self._mem[stream_id] = []
-        for a in self._mem[stream_id]:
-            if a.user_id == user_id:
-                return a
-        att = StreamAttendance(id=len(self._mem[stream_id]) + 1, stream_id=stream_id, user_id=user_id, created_at=now)
-        self._mem[stream_id].append(att)
+        attendees = self._mem.setdefault(stream_id, {})
+        att = attendees.get(user_id)
+        if att is None:
+            att = attendees[user_id] = StreamAttendance(
+                id=len(attendees) + 1, stream_id=stream_id, user_id=user_id, created_at=datetime.utcnow()
+            )
         return att
 
     async def list_user_attendances(self, user_id: int, limit: int = 200) -> List[StreamAttendance]:
         if self.use_db:
+            await self._ensure_indexes()
             docs = await self.db.find_documents(
-                "stream_attendees",
+                COLLECTION,
                 {"user_id": user_id},
                 limit=limit,
                 sort=[("created_at", -1)],
@@ -70,10 +83,10 @@ class AttendanceService:
             return [self._doc_to_attendance(d) for d in docs]
 
         out: List[StreamAttendance] = []
-        for stream_id, items in self._mem.items():
-            for a in items:
-                if a.user_id == user_id:
-                    out.append(a)
+        for attendees in self._mem.values():
+            att = attendees.get(user_id)
+            if att is not None:
+                out.append(att)
         out.sort(key=lambda a: a.created_at, reverse=True)
         return out[:limit]
 
@@ -82,18 +95,17 @@ class AttendanceService:
             return {}
 
         if self.use_db:
-            docs = await self.db.find_documents(
-                "stream_attendees",
-                {"stream_id": {"$in": stream_ids}},
-                limit=10000,
+            await self._ensure_indexes()
+            rows = await self.db.aggregate_documents(
+                COLLECTION,
+                [
+                    {"$match": {"stream_id": {"$in": stream_ids}}},
+                    {"$group": {"_id": "$stream_id", "count": {"$sum": 1}}},
+                ],
             )
-            counts: Dict[int, int] = {}
-            for d in docs:
-                sid = int(d.get("stream_id") or 0)
-                counts[sid] = counts.get(sid, 0) + 1
-            return counts
+            return {int(r["_id"]): int(r["count"]) for r in rows}
 
-        return {sid: len(self._mem.get(sid, [])) for sid in stream_ids}
+        return {sid: len(self._mem.get(sid, {})) for sid in stream_ids}
 
     def _doc_to_attendance(self, doc: dict) -> StreamAttendance:
         created_at = doc.get("created_at")
@@ -1,14 +1,53 @@
+"""
+Live stream chat.
+
+Sending a message is a single Redis round trip: a Lua script INCRs the
+room's id counter and XADDs the message to the room's stream, which is
+capped to the most recent STREAM_CHAT_HISTORY entries (the backlog served
+to new viewers). Persistence to ``stream_messages`` happens behind the
+request in batches.
+
+Viewers subscribe through ChatHub. Each worker runs one blocking XREAD per
+active room and fans new messages out to local subscriber queues, so Redis
+load scales with rooms x workers rather than viewers. Without Redis (demo
+mode, or Redis down) the hub keeps the ring in memory and fans out
+in-process.
+"""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import itertools
+import os
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set
 
-from core.services import get_db_service
+from core.db.adapters.redis_adapter import RedisScript
+from core.services import SequenceService, get_db_service
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+CHAT_HISTORY_SIZE = int(os.getenv("STREAM_CHAT_HISTORY", "500"))
+
+# KEYS: id counter, room stream. ARGV: maxlen, then message fields.
+_ADD_MESSAGE_SCRIPT = RedisScript("""
+local id = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[1], '*',
+    'id', id, 'stream_id', ARGV[2], 'user_id', ARGV[3],
+    'username', ARGV[4], 'content', ARGV[5], 'created_at', ARGV[6])
+return id
+""")
+
+
+def _seq_key(stream_id: int) -> str:
+    return f"stream:chat:{stream_id}:seq"
+
+
+def _room_key(stream_id: int) -> str:
+    return f"stream:chat:{stream_id}"
+
 
 @dataclass
 class ChatMessage:
@@ -19,24 +58,340 @@ class ChatMessage:
     content: str
     created_at: datetime
 
+    def to_doc(self) -> dict:
+        return {
+            "id": self.id,
+            "stream_id": self.stream_id,
+            "user_id": self.user_id,
+            "username": self.username,
+            "content": self.content,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_fields(cls, fields: dict) -> "ChatMessage":
+        """Build from a Redis stream entry"""
+        return cls(
+            id=int(fields["id"]),
+            stream_id=int(fields["stream_id"]),
+            user_id=int(fields["user_id"]),
+            username=fields["username"],
+            content=fields["content"],
+            created_at=datetime.fromisoformat(fields["created_at"]),
+        )
+
+
+@dataclass
+class _Room:
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+    reader: Optional[asyncio.Task] = None
+    # Set once the reader has fixed the stream position it tails from
+    reader_ready: asyncio.Event = field(default_factory=asyncio.Event)
+    # In-memory fallback ring and id sequence
+    history: Deque[ChatMessage] = field(default_factory=lambda: deque(maxlen=CHAT_HISTORY_SIZE))
+    ids: itertools.count = field(default_factory=lambda: itertools.count(1))
+
+
+class ChatHub:
+    """
+    Per-worker chat fan-out and write-behind persistence.
+
+    Subscribers get a bounded queue. A viewer that falls ``queue_size``
+    messages behind is disconnected rather than buffered without limit;
+    its client reconnects and reloads the backlog.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 256,
+        block_ms: int = 5000,
+        flush_interval: float = 0.5,
+        flush_batch_size: int = 200,
+        max_pending: int = 10000,
+    ):
+        self.queue_size = queue_size
+        self.block_ms = block_ms
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.max_pending = max_pending
+        self._rooms: Dict[int, _Room] = {}
+        self._pending: List[dict] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_wakeup: Optional[asyncio.Event] = None
+        self.stats = {"delivered": 0, "dropped_subscribers": 0, "persisted": 0, "persist_errors": 0}
+
+    def room(self, stream_id: int) -> _Room:
+        room = self._rooms.get(stream_id)
+        if room is None:
+            room = self._rooms[stream_id] = _Room()
+        return room
+
+    def history(self, stream_id: int) -> List[ChatMessage]:
+        """In-memory backlog of a room (demo mode only)"""
+        room = self._rooms.get(stream_id)
+        return list(room.history) if room else []
+
+    def subscriber_count(self, stream_id: int) -> int:
+        room = self._rooms.get(stream_id)
+        return len(room.subscribers) if room else 0
+
+    # ------------------------------------------------------------------
+    # Fan-out
+    # ------------------------------------------------------------------
+
+    async def subscribe(
+        self,
+        stream_id: int,
+        redis=None,
+        heartbeat: Optional[float] = None,
+        after: Optional[int] = None,
+    ) -> AsyncIterator[Optional[ChatMessage]]:
+        """
+        Yield new messages for a room until the caller stops iterating.
+
+        Args:
+            stream_id: Room to follow
+            redis: Raw Redis client; when given, the room's reader task tails
+                the room's Redis stream. Otherwise only in-process publishes
+                are delivered.
+            heartbeat: If set, yield None after this many idle seconds so the
+                caller can write a keep-alive
+            after: Id of the last message the caller already has (the end of
+                the backlog it loaded, or the SSE Last-Event-ID). Newer
+                messages still in the room's backlog are replayed first, so
+                nothing sent in between is lost.
+        """
+        room = self.room(stream_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        room.subscribers.add(queue)
+        if redis is not None and (room.reader is None or room.reader.done()):
+            room.reader_ready = asyncio.Event()
+            room.reader = asyncio.get_running_loop().create_task(self._tail_room(stream_id, room, redis))
+        try:
+            last_seen = after
+            if after is not None:
+                # Anything past the reader's start position reaches the queue; replay the rest
+                if room.reader is not None:
+                    await room.reader_ready.wait()
+                for msg in await self._messages_after(stream_id, room, redis, after):
+                    last_seen = msg.id
+                    yield msg
+            while True:
+                try:
+                    msg = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if msg is None:
+                    return
+                if last_seen is not None and msg.id <= last_seen:
+                    continue  # already replayed
+                yield msg
+        finally:
+            room.subscribers.discard(queue)
+            if not room.subscribers:
+                if room.reader is not None:
+                    room.reader.cancel()
+                    room.reader = None
+                # Demo rooms keep the only copy of their history; others go with their last subscriber
+                if not room.history and self._rooms.get(stream_id) is room:
+                    del self._rooms[stream_id]
+
+    def publish_local(self, msg: ChatMessage) -> None:
+        """Deliver a message to this worker's subscribers of its room"""
+        room = self._rooms.get(msg.stream_id)
+        if room is None:
+            return
+        for queue in list(room.subscribers):
+            try:
+                queue.put_nowait(msg)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream and free the queue
+                room.subscribers.discard(queue)
+                self.stats["dropped_subscribers"] += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _messages_after(self, stream_id: int, room: _Room, redis, after: int) -> List[ChatMessage]:
+        """Backlog messages newer than ``after``, oldest first"""
+        if redis is None:
+            return [msg for msg in room.history if msg.id > after]
+        try:
+            entries = await redis.xrevrange(_room_key(stream_id), count=CHAT_HISTORY_SIZE)
+        except Exception as e:
+            logger.warning(f"Chat replay for stream {stream_id} failed: {e}")
+            return []
+        missed = []
+        for entry_id, fields in entries:
+            try:
+                msg = ChatMessage.from_fields(fields)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping malformed chat entry {entry_id}: {e}")
+                continue
+            if msg.id <= after:
+                break
+            missed.append(msg)
+        missed.reverse()
+        return missed
+
+    async def _tail_room(self, stream_id: int, room: _Room, redis) -> None:
+        key = _room_key(stream_id)
+        # Tail from the newest entry that exists now rather than "$" at the
+        # first XREAD, so subscribers can replay up to a fixed point
+        try:
+            newest = await redis.xrevrange(key, count=1)
+            last_id = newest[0][0] if newest else "0-0"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Chat reader for stream {stream_id} could not read its start position: {e}")
+            last_id = "$"
+        finally:
+            room.reader_ready.set()
+        backoff = 0.5
+        while room.subscribers:
+            try:
+                response = await redis.xread({key: last_id}, count=100, block=self.block_ms)
+                backoff = 0.5
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Chat reader for stream {stream_id} failed, retrying in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            for _key, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    try:
+                        self.publish_local(ChatMessage.from_fields(fields))
+                    except (KeyError, ValueError) as e:
+                        logger.warning(f"Skipping malformed chat entry {entry_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Write-behind persistence
+    # ------------------------------------------------------------------
+
+    def enqueue_persist(self, doc: dict) -> None:
+        if len(self._pending) >= self.max_pending:
+            logger.error("Chat persistence backlog full; dropping oldest message")
+            self._pending.pop(0)
+        self._pending.append(doc)
+        if self._flusher is None or self._flusher.done():
+            self._flush_wakeup = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+        if len(self._pending) >= self.flush_batch_size:
+            self._flush_wakeup.set()
+
+    async def flush(self) -> int:
+        """Persist everything pending now. Returns number of documents written."""
+        written = 0
+        while self._pending:
+            batch = self._pending[:self.flush_batch_size]
+            del self._pending[:len(batch)]
+            try:
+                await get_db_service().insert_documents("stream_messages", batch, audit=False)
+            except Exception as e:
+                self.stats["persist_errors"] += 1
+                logger.error(f"Failed to persist {len(batch)} chat messages: {e}")
+                # Keep them for the next attempt, within the backlog bound
+                self._pending[:0] = batch[:max(0, self.max_pending - len(self._pending))]
+                break
+            written += len(batch)
+            self.stats["persisted"] += len(batch)
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            if self._pending:
+                await self.flush()
+
+    async def close(self) -> None:
+        """Stop readers and the flusher, then persist what is left"""
+        for room in self._rooms.values():
+            if room.reader is not None:
+                room.reader.cancel()
+            for queue in list(room.subscribers):
+                queue.put_nowait(None)
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher = None
+        await self.flush()
+
+
+_chat_hub: Optional[ChatHub] = None
+_room_sequence: Optional[SequenceService] = None
+
+
+def get_chat_hub() -> ChatHub:
+    """Get the per-process chat hub"""
+    global _chat_hub
+    if _chat_hub is None:
+        _chat_hub = ChatHub()
+    return _chat_hub
+
+
+async def close_chat_hub() -> None:
+    """Persist queued messages and stop the hub, if this process started one"""
+    if _chat_hub is not None:
+        await _chat_hub.close()
+
 
 class ChatService:
-    def __init__(self, use_db: bool = False):
+    def __init__(self, use_db: bool = False, hub: Optional[ChatHub] = None):
         self.use_db = use_db
         self.db = get_db_service() if use_db else None
-        self._mem: Dict[int, List[ChatMessage]] = {}
+        self.hub = hub if hub is not None else get_chat_hub()
+
+    async def _get_redis(self, blocking: bool = False):
+        """Raw Redis client (on the blocking pool if ``blocking``), or None when running without Redis"""
+        if not self.use_db:
+            return None
+        adapter = getattr(self.db, "redis", None)
+        if adapter is None:
+            return None
+        try:
+            if blocking:
+                adapter = adapter.blocking()
+            if not getattr(adapter, "client", None):
+                await adapter.connect()
+            return adapter.client
+        except Exception as e:
+            logger.warning(f"Redis unavailable for chat, falling back to memory: {e}")
+            return None
 
     async def list_messages(self, stream_id: int, limit: int = 50) -> List[ChatMessage]:
+        """Most recent messages, oldest first"""
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                entries = await redis.xrevrange(_room_key(stream_id), count=limit)
+                if entries:
+                    return [ChatMessage.from_fields(fields) for _id, fields in reversed(entries)]
+            except Exception as e:
+                logger.warning(f"Chat backlog read from Redis failed: {e}")
+
         if self.use_db:
             docs = await self.db.find_documents(
                 "stream_messages",
                 {"stream_id": stream_id},
                 limit=limit,
-                sort=[("created_at", 1)],
+                sort=[("id", -1)],
             )
-            return [self._doc_to_message(d) for d in docs]
+            return [self._doc_to_message(d) for d in reversed(docs)]
 
-        return list(self._mem.get(stream_id, [])[-limit:])
+        return self.hub.history(stream_id)[-limit:]
 
     async def add_message(self, stream_id: int, user_id: int, username: str, content: str) -> ChatMessage:
         msg = ChatMessage(
@@ -48,30 +403,52 @@ class ChatService:
             created_at=datetime.utcnow(),
         )
 
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                msg.id = int(await _ADD_MESSAGE_SCRIPT(
+                    redis,
+                    keys=[_seq_key(stream_id), _room_key(stream_id)],
+                    args=[CHAT_HISTORY_SIZE, stream_id, user_id, username, content, msg.created_at.isoformat()],
+                ))
+                # The room readers deliver it, including to this worker
+                self.hub.enqueue_persist(msg.to_doc())
+                return msg
+            except Exception as e:
+                logger.warning(f"Redis chat publish failed, falling back: {e}")
+
         if self.use_db:
-            existing = await self.db.find_documents("stream_messages", {"stream_id": stream_id}, limit=5000)
-            new_id = (
-                max((int(m.get("id")) for m in existing if m.get("id") is not None), default=0) + 1
-            )
-            doc = {
-                "id": new_id,
-                "stream_id": stream_id,
-                "user_id": user_id,
-                "username": username,
-                "content": content,
-                "created_at": msg.created_at,
-            }
-            await self.db.insert_document("stream_messages", doc)
-            msg.id = new_id
-            return msg
-
-        # Demo/in-memory
-        if stream_id not in self._mem:
-            self._mem[stream_id] = []
-        msg.id = len(self._mem[stream_id]) + 1
-        self._mem[stream_id].append(msg)
+            msg.id = await self._next_id_from_db(stream_id)
+            await self.db.insert_document("stream_messages", msg.to_doc(), audit=False)
+        else:
+            # Demo/in-memory: the room holds the history and id sequence
+            room = self.hub.room(stream_id)
+            msg.id = next(room.ids)
+            room.history.append(msg)
+        self.hub.publish_local(msg)
         return msg
 
+    async def subscribe(
+        self, stream_id: int, heartbeat: Optional[float] = None, after: Optional[int] = None
+    ) -> AsyncIterator[Optional[ChatMessage]]:
+        """Follow new messages in a room (see ChatHub.subscribe)"""
+        # The room reader holds a connection in XREAD BLOCK, so it comes from the blocking pool
+        redis = await self._get_redis(blocking=True)
+        async for msg in self.hub.subscribe(stream_id, redis=redis, heartbeat=heartbeat, after=after):
+            yield msg
+
+    async def _next_id_from_db(self, stream_id: int) -> int:
+        """Atomic per-room counter in Mongo, used when Redis is unavailable.
+
+        This is a separate sequence from the Redis counter, so ids minted
+        during a Redis outage can repeat; created_at still orders them.
+        """
+        global _room_sequence
+        if _room_sequence is None:
+            # No block pre-allocation: chat ids must follow send order across workers
+            _room_sequence = SequenceService(db=self.db, backend="mongo", block_size=1)
+        return await _room_sequence.next_id(f"stream_messages:{stream_id}")
+
     def _doc_to_message(self, doc: dict) -> ChatMessage:
         created_at = doc.get("created_at")
         if not isinstance(created_at, datetime):
@@ -2,7 +2,7 @@
 from typing import List, Optional
 from datetime import datetime, timedelta
 from core.utils.logger import get_logger
-from core.services import get_db_service
+from core.services import get_db_service, get_sequence_service
 from add_ons.domains.stream.models.membership import (
     Membership, MembershipTier, ChannelMembership
 )
@@ -105,14 +105,7 @@ class MembershipService:
         }
         
         if self.use_db:
-            existing = await self.db.find_documents("memberships", {}, limit=1000)
-            new_id = (
-                max(
-                    (int(m.get("id")) for m in existing if m.get("id") is not None),
-                    default=0,
-                )
-                + 1
-            )
+            new_id = await get_sequence_service().next_id("memberships", seed_collection="memberships")
             result = await self.db.insert_document(
                 "memberships",
                 {"id": new_id, **membership_data},
@@ -2,7 +2,7 @@
 from typing import List, Optional
 from datetime import datetime, timedelta
 from core.utils.logger import get_logger
-from core.services import get_db_service
+from core.services import get_db_service, get_sequence_service
 from add_ons.domains.stream.models.purchase import StreamPurchase
 
 logger = get_logger(__name__)
@@ -68,14 +68,7 @@ class PurchaseService:
         }
         
         if self.use_db:
-            existing = await self.db.find_documents("stream_purchases", {}, limit=2000)
-            new_id = (
-                max(
-                    (int(p.get("id")) for p in existing if p.get("id") is not None),
-                    default=0,
-                )
-                + 1
-            )
+            new_id = await get_sequence_service().next_id("stream_purchases", seed_collection="stream_purchases")
             result = await self.db.insert_document(
                 "stream_purchases",
                 {"id": new_id, **purchase_data},
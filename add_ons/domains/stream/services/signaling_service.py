@@ -1,40 +1,193 @@
+"""
+WebRTC signaling rendezvous.
+
+State lives in Redis under ``webrtc:{room}:...`` keys, or in process memory
+when no Redis is configured. Every write is a single round trip: multi-key
+updates run as a Lua script or a non-transactional pipeline.
+
+Reads can long-poll. Pass ``wait`` (seconds, capped at SIGNALING_MAX_WAIT)
+and the call blocks on BLPOP until an offer, answer or candidate arrives,
+instead of the client re-polling on a timer. Each waiting request holds
+one connection from the blocking Redis pool for the duration of the wait,
+never one from the pool the rest of the request path uses.
+
+When Redis is configured but unreachable, or the blocking pool is full,
+calls raise SignalingUnavailable rather than falling back to memory: a
+room's state must not be split between Redis and one process.
+"""
+import asyncio
 import json
+import os
 import time
-from typing import Optional, Dict, Tuple
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
 
+from core.db.adapters.redis_adapter import RedisScript, pool_exhausted
 from core.services import get_db_service
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+MAX_WAIT = float(os.getenv("SIGNALING_MAX_WAIT", "25"))
+
+# KEYS: offer, pending set, pending queue. ARGV: offer json, viewer id, ttl.
+_ENQUEUE_OFFER_SCRIPT = RedisScript("""
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+if redis.call('SADD', KEYS[2], ARGV[2]) == 1 then
+    redis.call('RPUSH', KEYS[3], ARGV[2])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return 1
+""")
+
+# KEYS: pending queue, pending set. ARGV: offer key prefix.
+# Skips viewers whose offer has expired.
+_POP_OFFER_SCRIPT = RedisScript("""
+while true do
+    local viewer = redis.call('LPOP', KEYS[1])
+    if not viewer then
+        return nil
+    end
+    redis.call('SREM', KEYS[2], viewer)
+    local offer = redis.call('GET', ARGV[1] .. viewer)
+    if offer then
+        return {viewer, offer}
+    end
+end
+""")
+
+
+class SignalingUnavailable(Exception):
+    """Redis holds signaling state but cannot serve this call right now"""
+
+
+@contextmanager
+def _redis_errors():
+    """Surface Redis failures as SignalingUnavailable"""
+    try:
+        yield
+    except SignalingUnavailable:
+        raise
+    except Exception as e:
+        reason = "Redis connection pool exhausted" if pool_exhausted(e) else f"Redis error: {e}"
+        logger.warning(f"Signaling unavailable: {reason}")
+        raise SignalingUnavailable(reason) from e
+
+
+def _clamp_wait(wait: float) -> float:
+    return min(max(wait or 0.0, 0.0), MAX_WAIT)
+
+
+def _loads(raw) -> Optional[dict]:
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+class _MemoryStore:
+    """Process-wide store used when no Redis is configured"""
+
+    def __init__(self):
+        self.values: Dict[str, Tuple[str, float]] = {}
+        self.lists: Dict[str, Tuple[Deque[str], float]] = {}
+        self.sets: Dict[str, Set[str]] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def set(self, key: str, raw: str, ttl: int) -> None:
+        self.values[key] = (raw, time.time() + ttl)
+        self.notify(key)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self.values.get(key)
+        if item is None:
+            return None
+        if time.time() > item[1]:
+            self.values.pop(key, None)
+            return None
+        return item[0]
+
+    def rpush(self, key: str, raw: str, ttl: int) -> None:
+        items = self._live_list(key)
+        items.append(raw)
+        self.lists[key] = (items, time.time() + ttl)
+        self.notify(key)
+
+    def lpop(self, key: str, count: int = 1) -> list:
+        items = self._live_list(key)
+        return [items.popleft() for _ in range(min(count, len(items)))]
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.values.pop(key, None)
+            self.lists.pop(key, None)
+
+    def _live_list(self, key: str) -> Deque[str]:
+        item = self.lists.get(key)
+        if item is None or time.time() > item[1]:
+            return deque()
+        return item[0]
+
+    def notify(self, key: str) -> None:
+        event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def wait_for(self, key: str, fetch: Callable, wait: float):
+        """Return fetch() as soon as it is truthy, re-checking whenever ``key`` changes"""
+        deadline = time.monotonic() + wait
+        while True:
+            result = fetch()
+            remaining = deadline - time.monotonic()
+            if result or remaining <= 0:
+                return result
+            event = self._events.setdefault(key, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return fetch()
+
+
+_MEM = _MemoryStore()
+
 
 class SignalingService:
     def __init__(self):
         self._db = get_db_service()
-        self._mem: Dict[str, Tuple[str, float]] = {}
+        self._mem = _MEM
 
-        # In-memory structures for multi-viewer fallback
-        self._mem_pending: Dict[str, list[str]] = {}
-        self._mem_pending_set: Dict[str, set[str]] = {}
+    async def _redis(self, blocking: bool = False):
+        """
+        Raw Redis client, or None when there is no Redis adapter.
 
-    async def _ensure_redis(self) -> None:
-        redis = getattr(self._db, "redis", None)
-        if not redis:
-            return
-        if not getattr(redis, "client", None):
-            await redis.connect()
+        ``blocking`` selects the blocking pool's client, for BLPOP.
+        """
+        adapter = getattr(self._db, "redis", None)
+        if adapter is None:
+            return None
+        if blocking:
+            adapter = adapter.blocking()
+        if not getattr(adapter, "client", None):
+            await adapter.connect()
+        return adapter.client
+
+    # ---------------------------------------------------------------------
+    # Single-viewer signaling
+    # ---------------------------------------------------------------------
 
     async def set_offer(self, room: str, offer: dict, ttl_seconds: int = 600) -> None:
         await self._set_json(f"webrtc:{room}:offer", offer, ttl_seconds)
 
-    async def get_offer(self, room: str) -> Optional[dict]:
-        return await self._get_json(f"webrtc:{room}:offer")
+    async def get_offer(self, room: str, wait: float = 0) -> Optional[dict]:
+        return await self._get_json(f"webrtc:{room}:offer", wait)
 
     async def set_answer(self, room: str, answer: dict, ttl_seconds: int = 600) -> None:
         await self._set_json(f"webrtc:{room}:answer", answer, ttl_seconds)
 
-    async def get_answer(self, room: str) -> Optional[dict]:
-        return await self._get_json(f"webrtc:{room}:answer")
+    async def get_answer(self, room: str, wait: float = 0) -> Optional[dict]:
+        return await self._get_json(f"webrtc:{room}:answer", wait)
 
     # ---------------------------------------------------------------------
     # Multi-viewer signaling (viewer offers, broadcaster answers)
@@ -42,68 +195,77 @@ class SignalingService:
 
     async def set_viewer_offer(self, room: str, viewer_id: str, offer: dict, ttl_seconds: int = 600) -> None:
         """Viewer posts an offer. We enqueue viewer_id for broadcaster pickup."""
-        key = f"webrtc:{room}:offer:{viewer_id}"
-        await self._set_json(key, offer, ttl_seconds)
-
-        # Maintain a queue of pending offers without needing key scans
-        queue_key = f"webrtc:{room}:pending_queue"
+        offer_key = f"webrtc:{room}:offer:{viewer_id}"
         set_key = f"webrtc:{room}:pending_set"
-
-        try:
-            await self._ensure_redis()
-            redis = self._db.redis
-            already = await redis.sismember(set_key, viewer_id)
-            if not already:
-                await redis.sadd(set_key, viewer_id)
-                await redis.rpush(queue_key, viewer_id)
-                await redis.expire(set_key, ttl_seconds)
-                await redis.expire(queue_key, ttl_seconds)
-            return
-        except Exception as e:
-            logger.warning(f"Redis multi-viewer signaling unavailable, falling back to memory: {e}")
-
-        # In-memory fallback
-        if room not in self._mem_pending:
-            self._mem_pending[room] = []
-            self._mem_pending_set[room] = set()
-        if viewer_id not in self._mem_pending_set[room]:
-            self._mem_pending_set[room].add(viewer_id)
-            self._mem_pending[room].append(viewer_id)
-
-    async def pop_next_offer(self, room: str) -> Optional[dict]:
-        """Broadcaster pops next pending viewer offer."""
+        queue_key = f"webrtc:{room}:pending_queue"
+        raw = json.dumps(offer)
+
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                await _ENQUEUE_OFFER_SCRIPT(redis, keys=[offer_key, set_key, queue_key], args=[raw, viewer_id, ttl_seconds])
+                return
+
+        self._mem.set(offer_key, raw, ttl_seconds)
+        pending = self._mem.sets.setdefault(set_key, set())
+        if viewer_id not in pending:
+            pending.add(viewer_id)
+            self._mem.rpush(queue_key, viewer_id, ttl_seconds)
+
+    async def pop_next_offer(self, room: str, wait: float = 0) -> Optional[dict]:
+        """Broadcaster pops next pending viewer offer, waiting up to ``wait`` seconds for one."""
         queue_key = f"webrtc:{room}:pending_queue"
         set_key = f"webrtc:{room}:pending_set"
+        offer_prefix = f"webrtc:{room}:offer:"
+        wait = _clamp_wait(wait)
+
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                return await self._pop_offer_redis(redis, queue_key, set_key, offer_prefix, wait)
+
+        def pop():
+            while True:
+                popped = self._mem.lpop(queue_key)
+                if not popped:
+                    return None
+                viewer_id = popped[0]
+                self._mem.sets.get(set_key, set()).discard(viewer_id)
+                offer = _loads(self._mem.get(offer_prefix + viewer_id))
+                if offer:
+                    return {"viewer_id": viewer_id, "offer": offer}
+
+        return await self._mem.wait_for(queue_key, pop, wait)
+
+    async def _pop_offer_redis(self, redis, queue_key: str, set_key: str, offer_prefix: str, wait: float) -> Optional[dict]:
+        popped = await _POP_OFFER_SCRIPT(redis, keys=[queue_key, set_key], args=[offer_prefix])
+        deadline = time.monotonic() + wait
+        blocking = await self._redis(blocking=True) if not popped and wait > 0 else None
+        while not popped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            item = await blocking.blpop([queue_key], timeout=remaining)
+            if not item:
+                return None
+            viewer_id = item[1]
+            pipe = redis.pipeline(transaction=False)
+            pipe.srem(set_key, viewer_id)
+            pipe.get(offer_prefix + viewer_id)
+            _, raw = await pipe.execute()
+            if raw:
+                popped = [viewer_id, raw]
 
-        viewer_id: Optional[str] = None
-        try:
-            await self._ensure_redis()
-            viewer_id = await self._db.redis.lpop(queue_key)
-            if viewer_id:
-                await self._db.redis.srem(set_key, viewer_id)
-        except Exception:
-            viewer_id = None
-
-        if not viewer_id:
-            # In-memory fallback
-            q = self._mem_pending.get(room) or []
-            if q:
-                viewer_id = q.pop(0)
-                self._mem_pending_set.get(room, set()).discard(viewer_id)
-
-        if not viewer_id:
-            return None
-
-        offer = await self._get_json(f"webrtc:{room}:offer:{viewer_id}")
+        offer = _loads(popped[1])
         if not offer:
             return None
-        return {"viewer_id": viewer_id, "offer": offer}
+        return {"viewer_id": popped[0], "offer": offer}
 
     async def set_viewer_answer(self, room: str, viewer_id: str, answer: dict, ttl_seconds: int = 600) -> None:
         await self._set_json(f"webrtc:{room}:answer:{viewer_id}", answer, ttl_seconds)
 
-    async def get_viewer_answer(self, room: str, viewer_id: str) -> Optional[dict]:
-        return await self._get_json(f"webrtc:{room}:answer:{viewer_id}")
+    async def get_viewer_answer(self, room: str, viewer_id: str, wait: float = 0) -> Optional[dict]:
+        return await self._get_json(f"webrtc:{room}:answer:{viewer_id}", wait)
 
     # ---------------------------------------------------------------------
     # Trickle ICE candidates
@@ -114,128 +276,103 @@ class SignalingService:
         key = f"webrtc:{room}:cands_from_viewer:{viewer_id}"
         await self._push_list_item(key, candidate, ttl_seconds)
 
-    async def pop_viewer_candidates(self, room: str, viewer_id: str, max_items: int = 50) -> list[dict]:
+    async def pop_viewer_candidates(self, room: str, viewer_id: str, max_items: int = 50, wait: float = 0) -> list[dict]:
         key = f"webrtc:{room}:cands_from_viewer:{viewer_id}"
-        return await self._pop_list_items(key, max_items=max_items)
+        return await self._pop_list_items(key, max_items=max_items, wait=wait)
 
     async def push_broadcaster_candidate(self, room: str, viewer_id: str, candidate: dict, ttl_seconds: int = 600) -> None:
         """Broadcaster -> viewer candidate queue."""
         key = f"webrtc:{room}:cands_from_broadcaster:{viewer_id}"
         await self._push_list_item(key, candidate, ttl_seconds)
 
-    async def pop_broadcaster_candidates(self, room: str, viewer_id: str, max_items: int = 50) -> list[dict]:
+    async def pop_broadcaster_candidates(self, room: str, viewer_id: str, max_items: int = 50, wait: float = 0) -> list[dict]:
         key = f"webrtc:{room}:cands_from_broadcaster:{viewer_id}"
-        return await self._pop_list_items(key, max_items=max_items)
+        return await self._pop_list_items(key, max_items=max_items, wait=wait)
 
     async def cleanup_viewer(self, room: str, viewer_id: str) -> None:
         """Delete viewer-specific signaling keys and remove from pending set."""
         keys = [
             f"webrtc:{room}:offer:{viewer_id}",
             f"webrtc:{room}:answer:{viewer_id}",
+            f"webrtc:{room}:answer:{viewer_id}:ready",
             f"webrtc:{room}:cands_from_viewer:{viewer_id}",
             f"webrtc:{room}:cands_from_broadcaster:{viewer_id}",
         ]
-
         set_key = f"webrtc:{room}:pending_set"
 
-        try:
-            await self._ensure_redis()
-            await self._db.redis.delete(*keys)
-            await self._db.redis.srem(set_key, viewer_id)
-            return
-        except Exception as e:
-            logger.warning(f"Redis cleanup unavailable, falling back to memory: {e}")
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                pipe = redis.pipeline(transaction=False)
+                pipe.delete(*keys)
+                pipe.srem(set_key, viewer_id)
+                await pipe.execute()
+                return
 
-        for k in keys:
-            self._mem.pop(k, None)
+        self._mem.delete(*keys)
+        self._mem.sets.get(set_key, set()).discard(viewer_id)
+
+    # ---------------------------------------------------------------------
+    # Primitives
+    # ---------------------------------------------------------------------
 
     async def _push_list_item(self, key: str, payload: dict, ttl_seconds: int) -> None:
         raw = json.dumps(payload)
-        try:
-            await self._ensure_redis()
-            await self._db.redis.rpush(key, raw)
-            await self._db.redis.expire(key, ttl_seconds)
-            return
-        except Exception as e:
-            logger.warning(f"Redis list unavailable, falling back to memory: {e}")
-
-        # In-memory fallback: store as a JSON-lines list under a synthetic key
-        mem_key = f"list:{key}"
-        existing = self._mem.get(mem_key)
-        if not existing or time.time() > existing[1]:
-            self._mem[mem_key] = (json.dumps([raw]), time.time() + ttl_seconds)
-            return
-        try:
-            arr = json.loads(existing[0])
-        except Exception:
-            arr = []
-        arr.append(raw)
-        self._mem[mem_key] = (json.dumps(arr), existing[1])
-
-    async def _pop_list_items(self, key: str, max_items: int = 50) -> list[dict]:
-        items: list[dict] = []
-        try:
-            await self._ensure_redis()
-            for _ in range(max_items):
-                raw = await self._db.redis.lpop(key)
-                if not raw:
-                    break
-                try:
-                    items.append(json.loads(raw))
-                except Exception:
-                    continue
-            return items
-        except Exception:
-            pass
-
-        mem_key = f"list:{key}"
-        existing = self._mem.get(mem_key)
-        if not existing or time.time() > existing[1]:
-            self._mem.pop(mem_key, None)
-            return []
-        try:
-            arr = json.loads(existing[0])
-        except Exception:
-            arr = []
-        popped = arr[:max_items]
-        remaining = arr[max_items:]
-        self._mem[mem_key] = (json.dumps(remaining), existing[1])
-        out: list[dict] = []
-        for raw in popped:
-            try:
-                out.append(json.loads(raw))
-            except Exception:
-                continue
-        return out
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                pipe = redis.pipeline(transaction=False)
+                pipe.rpush(key, raw)
+                pipe.expire(key, ttl_seconds)
+                await pipe.execute()
+                return
+
+        self._mem.rpush(key, raw, ttl_seconds)
+
+    async def _pop_list_items(self, key: str, max_items: int = 50, wait: float = 0) -> list[dict]:
+        wait = _clamp_wait(wait)
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                raws = await redis.lpop(key, max_items) or []
+                if not raws and wait > 0:
+                    item = await (await self._redis(blocking=True)).blpop([key], timeout=wait)
+                    if item:
+                        raws = [item[1]]
+                        if max_items > 1:
+                            raws += await redis.lpop(key, max_items - 1) or []
+                return [c for c in map(_loads, raws) if c is not None]
+
+        raws = await self._mem.wait_for(key, lambda: self._mem.lpop(key, max_items), wait)
+        return [c for c in map(_loads, raws) if c is not None]
 
     async def _set_json(self, key: str, payload: dict, ttl_seconds: int) -> None:
+        """Store a value and wake anyone long-polling for it (via ``{key}:ready``)"""
         raw = json.dumps(payload)
-        try:
-            await self._db.cache_set(key, raw, ttl=ttl_seconds)
-            return
-        except Exception as e:
-            logger.warning(f"Redis signaling unavailable, falling back to memory: {e}")
-
-        self._mem[key] = (raw, time.time() + ttl_seconds)
-
-    async def _get_json(self, key: str) -> Optional[dict]:
-        try:
-            raw = await self._db.cache_get(key)
-            if raw:
-                return json.loads(raw)
-        except Exception:
-            pass
-
-        item = self._mem.get(key)
-        if not item:
-            return None
-
-        raw, expires_at = item
-        if time.time() > expires_at:
-            self._mem.pop(key, None)
-            return None
-
-        try:
-            return json.loads(raw)
-        except Exception:
-            return None
\ No newline at end of file
+        ready_key = f"{key}:ready"
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                pipe = redis.pipeline(transaction=False)
+                pipe.set(key, raw, ex=ttl_seconds)
+                pipe.delete(ready_key)
+                pipe.rpush(ready_key, 1)
+                pipe.expire(ready_key, ttl_seconds)
+                await pipe.execute()
+                return
+
+        self._mem.set(key, raw, ttl_seconds)
+
+    async def _get_json(self, key: str, wait: float = 0) -> Optional[dict]:
+        wait = _clamp_wait(wait)
+        with _redis_errors():
+            redis = await self._redis()
+            if redis is not None:
+                raw = await redis.get(key)
+                if raw is None and wait > 0:
+                    if await (await self._redis(blocking=True)).blpop([f"{key}:ready"], timeout=wait):
+                        raw = await redis.get(key)
+                return _loads(raw) if raw else None
+
+        raw = await self._mem.wait_for(key, lambda: self._mem.get(key), wait)
+        return _loads(raw) if raw else None
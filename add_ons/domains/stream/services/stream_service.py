@@ -2,7 +2,7 @@
 from typing import List, Optional
 from datetime import datetime
 from core.utils.logger import get_logger
-from core.services import get_db_service
+from core.services import get_db_service, get_sequence_service
 from .video_streaming_service import video_streaming_service
 
 logger = get_logger(__name__)
@@ -94,8 +94,7 @@ class StreamService:
         }
         
         if self.use_db:
-            existing = await self.db.find_documents("streams", {}, limit=1000)
-            new_id = (max((int(s.get("id")) for s in existing if s.get("id") is not None), default=0) + 1)
+            new_id = await get_sequence_service().next_id("streams", seed_collection="streams")
             stream = await self.db.insert_document("streams", {"id": new_id, **stream_data})
             logger.info(f"Created stream {new_id} in database")
             return stream
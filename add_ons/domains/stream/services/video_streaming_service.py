@@ -2,25 +2,37 @@
 Optimized Video Streaming Service with FastHTML
 
 Features:
-- Range header parsing for efficient video streaming
-- Async generators for yielding video chunks
-- aiofiles for async file reads
+- Range header parsing for efficient video streaming (single and multi-range)
+- Zero-copy file serving via the ASGI sendfile extension, mmap otherwise
+- Adaptive chunk sizing, ETag / If-Range validation
 - Thread-safe camera access
 - Proper resource management
 """
 import asyncio
 import cv2
+import mimetypes
+import mmap
 import threading
-import aiofiles
 import os
-from typing import AsyncGenerator, Optional, Union, Tuple
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncGenerator, Iterator, List, Optional, Union, Tuple
 from contextlib import asynccontextmanager
 from fasthtml.common import Request, Response
 from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from core.exceptions import RangeNotSatisfiableError
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Chunks start small so players get the first bytes quickly, then double up to the max
+DEFAULT_MIN_CHUNK = int(os.getenv('VIDEO_STREAM_MIN_CHUNK', str(64 * 1024)))
+DEFAULT_MAX_CHUNK = int(os.getenv('VIDEO_STREAM_MAX_CHUNK', str(1024 * 1024)))
+# 'auto' uses the server's zero-copy send when offered, 'mmap' never does
+STREAM_MODE = os.getenv('VIDEO_STREAM_MODE', 'auto')
+ZEROCOPY_EXTENSION = 'http.response.zerocopysend'
+
 
 class RangeHeaderParser:
     """Parse HTTP Range headers for byte range requests."""
@@ -49,6 +61,60 @@ class RangeHeaderParser:
         
         return start, end
 
+    @staticmethod
+    def parse_ranges(range_header: Optional[str], file_size: int, max_ranges: int = 16) -> Optional[List[Tuple[int, int]]]:
+        """
+        Parse a (possibly multi-range) Range header into inclusive byte ranges.
+
+        Overlapping and adjacent ranges are coalesced. Returns None when the
+        header should be ignored and the whole file served (absent, malformed,
+        non-byte unit or more than ``max_ranges`` ranges).
+
+        Raises:
+            RangeNotSatisfiableError: If no range overlaps the file
+        """
+        if not range_header:
+            return None
+        unit, _, spec = range_header.strip().partition('=')
+        if unit.strip().lower() != 'bytes' or not spec:
+            return None
+
+        ranges = []
+        for part in spec.split(','):
+            start_str, sep, end_str = part.strip().partition('-')
+            if not sep:
+                return None
+            try:
+                if not start_str:
+                    suffix = int(end_str)
+                    if suffix <= 0:
+                        continue
+                    start, end = max(0, file_size - suffix), file_size - 1
+                else:
+                    start = int(start_str)
+                    end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+            except ValueError:
+                return None
+            if start < 0 or (end_str and start_str and int(end_str) < start):
+                return None
+            if start < file_size and start <= end:
+                ranges.append((start, end))
+
+        if not ranges:
+            raise RangeNotSatisfiableError(range_header, file_size)
+
+        ranges.sort()
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            last_start, last_end = merged[-1]
+            if start <= last_end + 1:
+                merged[-1] = (last_start, max(last_end, end))
+            else:
+                merged.append((start, end))
+        if len(merged) > max_ranges:
+            return None
+        return merged
+
 
 class Camera:
     """Thread-safe camera capture with optimized frame generation."""
@@ -80,29 +146,223 @@ class Camera:
 
 
 class VideoFileStreamer:
-    """Async video file streamer with range header support."""
+    """
+    Video file streamer with range, multi-range and If-Range support.
+
+    Chunks are sliced from an mmap of the file rather than read through a
+    thread pool, so there is no executor hop per chunk. The kernel is asked
+    to read ahead the next chunk while the current one is sent. When the
+    ASGI server offers the zero-copy extension, ``response()`` hands it the
+    file descriptor and byte ranges and the server uses sendfile.
+    """
     
-    def __init__(self, file_path: str, chunk_size: int = 8192):
+    def __init__(self, file_path: str, chunk_size: int = DEFAULT_MIN_CHUNK, max_chunk_size: int = DEFAULT_MAX_CHUNK):
         self.file_path = file_path
         self.chunk_size = chunk_size
+        self.max_chunk_size = max(chunk_size, max_chunk_size)
+        self._stat: Optional[os.stat_result] = None
+
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            self._stat = os.stat(self.file_path)
+        return self._stat
         
     async def get_file_size(self) -> int:
         """Get file size asynchronously."""
-        return os.path.getsize(self.file_path)
+        return self.stat().st_size
+
+    @property
+    def etag(self) -> str:
+        """Strong validator from mtime and size"""
+        st = self.stat()
+        return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.stat().st_mtime, usegmt=True)
+
+    def if_range_matches(self, if_range: Optional[str]) -> bool:
+        """Whether a Range request conditioned on If-Range may be honoured"""
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            # Strong comparison: weak tags never match
+            return if_range == self.etag
+        try:
+            return int(parsedate_to_datetime(if_range).timestamp()) == int(self.stat().st_mtime)
+        except (TypeError, ValueError):
+            return False
+
+    def chunk_sizes(self) -> Iterator[int]:
+        size = self.chunk_size
+        while True:
+            yield size
+            size = min(size * 2, self.max_chunk_size)
     
     async def stream_range(self, start: int, end: int) -> AsyncGenerator[bytes, None]:
         """Stream file content in the specified byte range."""
-        async with aiofiles.open(self.file_path, 'rb') as file:
-            await file.seek(start)
-            remaining = end - start + 1
-            
-            while remaining > 0:
-                chunk_size = min(self.chunk_size, remaining)
-                chunk = await file.read(chunk_size)
-                if not chunk:
+        if end < start or self.stat().st_size == 0:
+            return
+        with open(self.file_path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            _madvise(mapped, getattr(mmap, 'MADV_SEQUENTIAL', None))
+            position = start
+            for size in self.chunk_sizes():
+                if position > end:
                     break
-                yield chunk
-                remaining -= len(chunk)
+                stop = min(position + size, end + 1)
+                # Let the kernel fault in the next chunk while this one is sent
+                _madvise(mapped, getattr(mmap, 'MADV_WILLNEED', None), stop, min(size * 2, end + 1 - stop))
+                yield mapped[position:stop]
+                position = stop
+
+    def response(
+        self,
+        range_header: Optional[str] = None,
+        if_range: Optional[str] = None,
+        media_type: Optional[str] = None
+    ) -> Response:
+        """
+        Build a 200, 206 (single or multipart/byteranges) or 416 response.
+
+        A Range header is ignored if If-Range doesn't match the current file.
+        """
+        file_size = self.stat().st_size
+        media_type = media_type or mimetypes.guess_type(self.file_path)[0] or 'video/mp4'
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'ETag': self.etag,
+            'Last-Modified': self.last_modified,
+        }
+
+        ranges = None
+        if range_header and self.if_range_matches(if_range):
+            try:
+                ranges = RangeHeaderParser.parse_ranges(range_header, file_size)
+            except RangeNotSatisfiableError:
+                return Response(status_code=416, headers={**headers, 'Content-Range': f'bytes */{file_size}'})
+
+        return VideoFileResponse(self, ranges or [], media_type, headers)
+
+
+def _madvise(mapped: mmap.mmap, advice: Optional[int], start: Optional[int] = None, length: int = 0) -> None:
+    """Best-effort madvise over the whole map or a page-aligned region"""
+    if advice is None or not hasattr(mapped, 'madvise'):
+        return
+    try:
+        if start is None:
+            mapped.madvise(advice)
+        elif length > 0:
+            aligned = start - start % mmap.PAGESIZE
+            mapped.madvise(advice, aligned, length + start - aligned)
+    except (OSError, ValueError):
+        pass
+
+
+class VideoFileResponse(Response):
+    """
+    ASGI response serving a file, a byte range or multipart/byteranges.
+
+    ``ranges`` empty means the whole file with status 200.
+    """
+
+    def __init__(self, streamer: VideoFileStreamer, ranges: List[Tuple[int, int]], media_type: str, headers: dict):
+        self.streamer = streamer
+        self.ranges = ranges
+        self.file_size = streamer.stat().st_size
+        self.media_type = media_type
+        self.background = None
+        self.status_code = 206 if ranges else 200
+        self.boundary = secrets.token_hex(12) if len(ranges) > 1 else None
+
+        headers = dict(headers)
+        if self.boundary is not None:
+            self._parts = [
+                (self._part_header(start, end, first=i == 0), start, end)
+                for i, (start, end) in enumerate(ranges)
+            ]
+            self._closing = f'\r\n--{self.boundary}--\r\n'.encode()
+            headers['Content-Length'] = str(
+                sum(len(head) + end - start + 1 for head, start, end in self._parts) + len(self._closing)
+            )
+            self.init_headers(headers)
+            self.headers['content-type'] = f'multipart/byteranges; boundary={self.boundary}'
+            return
+
+        if ranges:
+            start, end = ranges[0]
+            headers['Content-Range'] = f'bytes {start}-{end}/{self.file_size}'
+            headers['Content-Length'] = str(end - start + 1)
+        else:
+            headers['Content-Length'] = str(self.file_size)
+        self.init_headers(headers)
+
+    def _part_header(self, start: int, end: int, first: bool) -> bytes:
+        # Every delimiter after the first also ends the previous part's body
+        prefix = '' if first else '\r\n'
+        return (
+            f'{prefix}--{self.boundary}\r\n'
+            f'Content-Type: {self.media_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n'
+        ).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        if scope.get('method', 'GET').upper() == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+
+        zerocopy = STREAM_MODE == 'auto' and ZEROCOPY_EXTENSION in scope.get('extensions', {})
+        spec_version = tuple(map(int, scope.get('asgi', {}).get('spec_version', '2.0').split('.')))
+        if spec_version >= (2, 4):
+            # The server raises on send() once the client has gone
+            await self._send_body(send, zerocopy)
+            return
+
+        body = asyncio.ensure_future(self._send_body(send, zerocopy))
+        disconnect = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            await asyncio.wait({body, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (body, disconnect):
+                task.cancel()
+            await asyncio.gather(body, disconnect, return_exceptions=True)
+        if body.done() and not body.cancelled() and body.exception() is not None:
+            raise body.exception()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive: Receive) -> None:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _send_body(self, send: Send, zerocopy: bool) -> None:
+        if self.boundary is not None:
+            parts = self._parts
+        elif self.ranges:
+            parts = [(b'', *self.ranges[0])]
+        else:
+            parts = [(b'', 0, self.file_size - 1)]
+
+        with open(self.streamer.file_path, 'rb') as file:
+            for head, start, end in parts:
+                if head:
+                    await send({'type': 'http.response.body', 'body': head, 'more_body': True})
+                if end < start:
+                    continue
+                if zerocopy:
+                    await send({
+                        'type': ZEROCOPY_EXTENSION,
+                        'file': file,
+                        'offset': start,
+                        'count': end - start + 1,
+                        'more_body': True,
+                    })
+                else:
+                    async for chunk in self.streamer.stream_range(start, end):
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        closing = self._closing if self.boundary is not None else b''
+        await send({'type': 'http.response.body', 'body': closing, 'more_body': False})
 
 
 class VideoStreamingService:
@@ -149,35 +409,18 @@ class VideoStreamingService:
     async def stream_video_file(
         self, 
         file_path: str, 
-        range_header: Optional[str] = None
-    ) -> Tuple[StreamingResponse, dict]:
-        """Stream video file with range header support."""
-        if not os.path.exists(file_path):
+        range_header: Optional[str] = None,
+        if_range: Optional[str] = None
+    ) -> Tuple[Response, dict]:
+        """Stream video file with range, multi-range and If-Range support."""
+        if not os.path.isfile(file_path):
             raise FileNotFoundError(f"Video file not found: {file_path}")
             
         streamer = VideoFileStreamer(file_path)
-        file_size = await streamer.get_file_size()
-        
-        # Parse range header
-        start, end = RangeHeaderParser.parse_range_header(range_header, file_size)
-        content_length = end - start + 1
-        
-        # Prepare headers
-        headers = {
-            'Content-Length': str(content_length),
-            'Accept-Ranges': 'bytes',
-            'Content-Range': f'bytes {start}-{end}/{file_size}'
-        }
-        
-        # Create streaming response
-        response = StreamingResponse(
-            streamer.stream_range(start, end),
-            status_code=206 if range_header else 200,
-            headers=headers,
-            media_type='video/mp4'
-        )
+        response = streamer.response(range_header, if_range)
+        headers = dict(response.headers)
         
-        logger.info(f"Streaming video file: {file_path} (bytes {start}-{end}/{file_size})")
+        logger.info(f"Streaming video file: {file_path} ({response.status_code}, range={range_header})")
         return response, headers
     
     async def get_camera_snapshot(self) -> Response:
@@ -226,6 +469,6 @@ async def get_video_file_stream(file_path: str, request: Request):
     """Get video file stream with range support for FastHTML route."""
     range_header = request.headers.get('range')
     response, headers = await video_streaming_service.stream_video_file(
-        file_path, range_header
+        file_path, range_header, request.headers.get('if-range')
     )
     return response
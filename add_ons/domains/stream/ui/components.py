@@ -193,13 +193,17 @@ def ChatWidget(stream_id: int):
             cls="flex items-center justify-between mb-4 pb-2 border-b"
         ),
         
-        # Chat messages container
+        # Chat messages container: the backlog, which connects the SSE stream from its last message
+        Script(src="https://cdn.jsdelivr.net/npm/htmx-ext-sse@2.2.2/sse.js"),
         Div(
+            Div(
+                hx_get=f"/stream/chat/{stream_id}",
+                hx_trigger="load",
+                hx_swap="outerHTML",
+            ),
             id=f"chat-{stream_id}",
             cls="h-96 overflow-y-auto mb-4 p-2 bg-base-200 rounded",
-            hx_get=f"/stream/chat/{stream_id}",
-            hx_trigger="load, every 2s",
-            hx_swap="innerHTML",
+            hx_ext="sse",
         ),
         
         # Chat input
@@ -217,8 +221,8 @@ def ChatWidget(stream_id: int):
                 cls="btn btn-primary mt-2"
             ),
             hx_post=f"/stream/chat/{stream_id}/send",
-            hx_target=f"#chat-{stream_id}",
-            hx_swap="beforeend",
+            hx_swap="none",
+            hx_on__after_request="if (event.detail.successful) this.reset()",
             cls="flex flex-col gap-2"
         ),
         
@@ -163,16 +163,19 @@ def watch_page(stream: dict, ice_servers: List[dict], user: dict = None, access_
         const pollBroadcasterCandidates = async () => {
           while (!candPollStop) {
             try {
-              const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/candidates/from-broadcaster/${encodeURIComponent(viewerId)}?max=50`, {
+              const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/candidates/from-broadcaster/${encodeURIComponent(viewerId)}?max=50&wait=20`, {
                 credentials: 'same-origin',
               });
+              // 503 while signaling is unavailable: back off below
+              if (!resp.ok) throw new Error(`candidate poll failed: ${resp.status}`);
               const data = await resp.json();
               const cands = (data && data.candidates) ? data.candidates : [];
               for (const c of cands) {
                 try { await pc.addIceCandidate(c); } catch (_) {}
               }
-            } catch (_) {}
-            await new Promise((r) => setTimeout(r, 500));
+            } catch (_) {
+              await new Promise((r) => setTimeout(r, 1000));
+            }
           }
         };
 
@@ -188,17 +191,18 @@ def watch_page(stream: dict, ice_servers: List[dict], user: dict = None, access_
         });
 
         const pollAnswer = async () => {
-          const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/answer/${encodeURIComponent(viewerId)}`, { credentials: 'same-origin' });
+          const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/answer/${encodeURIComponent(viewerId)}?wait=20`, { credentials: 'same-origin' });
+          if (!resp.ok) throw new Error(`answer poll failed: ${resp.status}`);
           const answer = await resp.json();
           if (answer && answer.type && answer.sdp) return answer;
           return null;
         };
 
+        // Each request waits server-side for the answer; give up after ~1 minute
         let answer = null;
-        for (let i = 0; i < 60; i++) {
-          answer = await pollAnswer();
+        for (let i = 0; i < 3; i++) {
+          try { answer = await pollAnswer(); } catch (_) { await new Promise((r) => setTimeout(r, 1000)); }
           if (answer) break;
-          await new Promise((r) => setTimeout(r, 1000));
         }
 
         if (!answer) return;
@@ -320,16 +324,18 @@ def broadcast_page(stream: dict, ice_servers: List[dict]):
           const pollViewerCandidates = async () => {
             while (!candPollStop) {
               try {
-                const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/candidates/from-viewer/${encodeURIComponent(viewerId)}?max=50`, {
+                const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/candidates/from-viewer/${encodeURIComponent(viewerId)}?max=50&wait=20`, {
                   credentials: 'same-origin',
                 });
+                if (!resp.ok) throw new Error(`candidate poll failed: ${resp.status}`);
                 const data = await resp.json();
                 const cands = (data && data.candidates) ? data.candidates : [];
                 for (const c of cands) {
                   try { await pc.addIceCandidate(c); } catch (_) {}
                 }
-              } catch (_) {}
-              await new Promise((r) => setTimeout(r, 300));
+              } catch (_) {
+                await new Promise((r) => setTimeout(r, 1000));
+              }
             }
           };
 
@@ -366,15 +372,17 @@ def broadcast_page(stream: dict, ice_servers: List[dict]):
         async function pollLoop() {
           while (true) {
             try {
-              const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/offers/next`, { credentials: 'same-origin' });
+              const resp = await fetch(`/stream/webrtc/${encodeURIComponent(room)}/offers/next?wait=20`, { credentials: 'same-origin' });
+              if (!resp.ok) throw new Error(`offer poll failed: ${resp.status}`);
               const data = await resp.json();
               if (data && data.viewer_id && data.offer) {
-                await answerViewer(data.viewer_id, data.offer);
+                // Answer in the background so the next viewer is picked up immediately
+                answerViewer(data.viewer_id, data.offer).catch((e) => console.warn('Answer error', e));
               }
             } catch (e) {
               console.warn('Offer poll error', e);
+              await new Promise((r) => setTimeout(r, 1000));
             }
-            await new Promise((r) => setTimeout(r, 500));
           }
         }
 
@@ -6,6 +6,7 @@ from core.utils.logger import get_logger
 
 # Use redis-py asyncio client
 import redis.asyncio as redis
+from core.db.adapters.redis_adapter import get_redis_adapter
 
 logger = get_logger(__name__)
 
@@ -22,13 +23,11 @@ class EventBus:
 
     def __init__(self, url: str = REDIS_URL):
         self.url = url
-        self._r: Optional[redis.Redis] = None
 
     @property
     def client(self) -> redis.Redis:
-        if not self._r:
-            self._r = redis.from_url(self.url, decode_responses=True)
-        return self._r
+        # Shared pooled client for publishing
+        return get_redis_adapter(self.url).get_client()
 
     async def publish(self, channel: str, payload: Any) -> int:
         message = json.dumps({"channel": channel, "data": payload})
@@ -37,7 +36,8 @@ class EventBus:
 
     async def subscribe(self, pattern: str, handler: Callable[[str, Any], Awaitable[None]]):
         """Pattern-subscribe (supports wildcards). Calls handler(channel, data)."""
-        psub = self.client.pubsub()
+        # Held for as long as we listen, so it comes from the blocking pool
+        psub = get_redis_adapter(self.url, purpose="blocking").get_client().pubsub()
         await psub.psubscribe(pattern)
         logger.info(f"Subscribed to pattern: {pattern}")
         async for raw in psub.listen():
@@ -12,7 +12,7 @@ from typing import Optional, Callable
 from dotenv import load_dotenv
 
 from core.utils.logger import get_logger
-from core.db.adapters import PostgresAdapter, MongoDBAdapter, RedisAdapter
+from core.db.adapters import PostgresAdapter, MongoDBAdapter, get_redis_adapter
 from core.services.auth import AuthService, UserService
 from core.services.auth.providers.jwt import JWTProvider
 from core.db.repositories import UserRepository
@@ -94,9 +94,7 @@ def create_app(
         database=os.getenv("MONGO_DB", "app_db")
     )
     
-    redis = RedisAdapter(
-        connection_string=redis_url
-    )
+    redis = get_redis_adapter(redis_url)
     
     logger.info("✓ Database adapters initialized")
     
@@ -8,9 +8,18 @@ from core.db.adapters.postgres_adapter import PostgresAdapter
 from core.utils.security import initialize_encryption
 from core.utils.logger import get_logger
 
-from core.db.adapters import PostgresAdapter, MongoDBAdapter, RedisAdapter
+from core.db.adapters import PostgresAdapter, MongoDBAdapter, get_redis_adapter
+from core.db.adapters.redis_adapter import close_redis_adapters
 from core.db.repositories import UserRepository
 from core.db import initialize_session_manager, get_pool_manager
+from core.db.connection_pool import (
+    ADAPTIVE_SIZING,
+    DEFAULT_MONGODB_CONFIG,
+    DEFAULT_REDIS_CONFIG,
+    PoolConfig,
+    PoolType,
+)
+from core.db.replication import ReadReplicaRouter, ReplicaInfo, ReplicaType, configure_read_router
 from dotenv import load_dotenv
 from core.db.config import configure_database
 
@@ -68,14 +77,48 @@ def create_app(*, demo: bool) -> tuple[FastHTML, dict]:
     
     # Initialize read replica adapter if configured
     postgres_readonly = None
+    read_router = None
     if db_config.read_replica_host:
         postgres_readonly = PostgresAdapter(read_only=True)
+        read_router = ReadReplicaRouter(db_config, primary_adapter=postgres)
+        read_router.add_replica(ReplicaInfo(
+            id="replica-1",
+            host=db_config.read_replica_host,
+            port=db_config.read_replica_port,
+            database=db_config.read_replica_database,
+            username=db_config.username,
+            password=db_config.password,
+            replica_type=ReplicaType.READ_ONLY,
+            connection_pool=postgres_readonly,
+        ))
         logger.info("✓ Read replica adapter configured")
     
     mongodb = MongoDBAdapter(connection_string=mongo_url, database=mongo_db)
-    redis = RedisAdapter(connection_string=redis_url)
+    redis = get_redis_adapter(redis_url)
 
+    # Instrument pools before they open so startup connections are counted
     pool_manager = get_pool_manager()
+    postgres_pool_config = PoolConfig(
+        min_size=postgres.min_size,
+        max_size=postgres.max_size,
+        max_idle_seconds=int(db_config.max_inactive_connection_lifetime),
+        command_timeout_seconds=db_config.command_timeout,
+    )
+    postgres.attach_pool_metrics(
+        pool_manager.instrument("postgres", PoolType.POSTGRES, postgres_pool_config)
+    )
+    if postgres_readonly:
+        postgres_readonly.attach_pool_metrics(
+            pool_manager.instrument("postgres_replica", PoolType.POSTGRES, postgres_pool_config)
+        )
+    mongodb.attach_pool_metrics(pool_manager.instrument("mongodb", PoolType.MONGODB, DEFAULT_MONGODB_CONFIG))
+    redis_pool_config = PoolConfig(
+        min_size=DEFAULT_REDIS_CONFIG.min_size,
+        max_size=redis.max_connections,
+        connect_timeout_seconds=DEFAULT_REDIS_CONFIG.connect_timeout_seconds,
+        command_timeout_seconds=DEFAULT_REDIS_CONFIG.command_timeout_seconds,
+    )
+    redis.attach_pool_metrics(pool_manager.instrument("redis", PoolType.REDIS, redis_pool_config))
 
     logger.info("✓ Database adapters initialized")
 
@@ -125,6 +168,8 @@ def create_app(*, demo: bool) -> tuple[FastHTML, dict]:
         ],
         live=environment == "development",
         static_path="app/core/static",
+        # Sessions come from the Redis/cookie session middleware below
+        sess_cls=None,
     )
 
     app.static_route(ext='.js', prefix='/static/js/', static_path='app/core/static/js')
@@ -156,13 +201,13 @@ def create_app(*, demo: bool) -> tuple[FastHTML, dict]:
     logger.info("Applying security middleware...")
 
     try:
-        from core.middleware.auth_context import AuthContextMiddleware
         from core.middleware.security import SecurityMiddleware
 
-        app.add_middleware(AuthContextMiddleware)
-        app.add_middleware(SecurityMiddleware)
+        # One raw ASGI pass for security checks and the auth user context
+        app.add_middleware(SecurityMiddleware, auth_context=True)
 
         logger.info("✓ Security middleware applied")
+        logger.info("  → Auth user context: resolved in the same pass")
         logger.info("  → Auth endpoint rate limiting: enabled")
         logger.info("  → Smart input sanitization: enabled")
         logger.info("  → CSS/MonsterUI: preserved")
@@ -215,6 +260,11 @@ def create_app(*, demo: bool) -> tuple[FastHTML, dict]:
             await postgres.connect()
             logger.info("✓ PostgreSQL connected")
 
+            if read_router:
+                await read_router.initialize()
+                configure_read_router(read_router)
+                logger.info("✓ Read replica routing enabled")
+
             await mongodb.connect()
             logger.info("✓ MongoDB connected")
 
@@ -224,14 +274,35 @@ def create_app(*, demo: bool) -> tuple[FastHTML, dict]:
             initialize_session_manager(postgres, mongodb, redis)
             logger.info("✓ Session manager initialized")
 
+            if jwt_provider.use_blacklist:
+                from core.services.auth.jwt_blacklist import get_blacklist_service
+                await get_blacklist_service().start_sync()
+                logger.info("✓ JWT blacklist filter sync started")
+
+            from core.services.settings import hybrid_settings, optimized_settings
+            await hybrid_settings.start_sync(redis)
+            await optimized_settings.start_sync(redis)
+            logger.info("✓ Settings cache invalidation sync started")
+
             if hasattr(postgres, 'pool') and postgres.pool:
-                pool_manager.register_pool("postgres", postgres.pool, None)
+                pool_manager.register_pool("postgres", postgres.pool, resize=postgres.resize_pool)
+            if postgres_readonly:
+                # Opens lazily on first routed read, so its sizes come from the metrics
+                pool_manager.register_pool(
+                    "postgres_replica", postgres_readonly.pool, resize=postgres_readonly.resize_pool
+                )
             if hasattr(mongodb, 'client') and mongodb.client:
-                pool_manager.register_pool("mongodb", mongodb.client, None)
+                pool_manager.register_pool("mongodb", mongodb.client)
             if hasattr(redis, 'client') and redis.client:
-                pool_manager.register_pool("redis", redis.client, None)
+                pool_manager.register_pool(
+                    "redis", redis.client, resize=redis.resize_pool if redis.pool_is_resizable else None
+                )
 
             logger.info("✓ Connection pools registered")
+
+            if ADAPTIVE_SIZING:
+                pool_manager.enable_adaptive_sizing()
+                logger.info("✓ Adaptive pool sizing enabled")
             logger.info("=" * 60)
             logger.info("Application startup complete")
         except Exception as e:
@@ -243,16 +314,36 @@ def create_app(*, demo: bool) -> tuple[FastHTML, dict]:
         logger.info("Shutting down application...")
 
         try:
+            from core.services.auth.jwt_blacklist import get_blacklist_service
+            await get_blacklist_service().close()
+
+            from core.services.settings import hybrid_settings, optimized_settings
+            await hybrid_settings.close()
+            await optimized_settings.close()
+
+            # Write out pending write-behind file cache entries before exit
+            from core.utils.cache import cache as file_cache
+            await file_cache.close()
+            logger.info("✓ File cache flushed")
+
+            # Chat messages still queued for write-behind to MongoDB
+            from add_ons.domains.stream.services.chat_service import close_chat_hub
+            await close_chat_hub()
+
             await pool_manager.close_all()
             logger.info("✓ Connection pools closed")
 
+            if read_router:
+                configure_read_router(None)
+                await read_router.close()
+
             await postgres.disconnect()
             logger.info("✓ PostgreSQL disconnected")
 
             await mongodb.disconnect()
             logger.info("✓ MongoDB disconnected")
 
-            await redis.disconnect()
+            await close_redis_adapters()
             logger.info("✓ Redis disconnected")
 
             logger.info("=" * 60)
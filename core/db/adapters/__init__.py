@@ -5,7 +5,7 @@ Provides adapters for different database systems.
 """
 from core.db.adapters.postgres_adapter import PostgresAdapter
 from core.db.adapters.mongodb_adapter import MongoDBAdapter
-from core.db.adapters.redis_adapter import RedisAdapter
+from core.db.adapters.redis_adapter import RedisAdapter, RedisScript, get_redis_adapter
 from core.db.adapters.duckdb_adapter import DuckDBAdapter
 from core.db.adapters.minio_adapter import MinioAdapter
 
@@ -13,6 +13,8 @@ __all__ = [
     'PostgresAdapter',
     'MongoDBAdapter',
     'RedisAdapter',
+    'RedisScript',
+    'get_redis_adapter',
     'DuckDBAdapter',
     'MinioAdapter',
 ]
\ No newline at end of file
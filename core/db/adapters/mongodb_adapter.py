@@ -1,11 +1,71 @@
 """MongoDB Adapter - Handles document/unstructured data"""
-from typing import Any, Dict, List, Optional
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import WriteConcern
+from pymongo import ReturnDocument, WriteConcern, monitoring
+from core.db.connection_pool import PoolMetrics
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Documents per getMore round trip for stream()
+CURSOR_BATCH_SIZE = int(os.getenv("MONGO_CURSOR_BATCH_SIZE", "500"))
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Feeds pymongo connection pool events into a PoolMetrics.
+    
+    pymongo's pool is internal to the driver, so this listener stands in
+    for a wrapped acquire(). Events arrive on driver threads; checkout
+    start and finish happen on the same one. Per-caller attribution is
+    not available here since the calling coroutine is not on that stack.
+    """
+    
+    def __init__(self, metrics: PoolMetrics):
+        self.metrics = metrics
+        self._local = threading.local()
+        self._checked_out: Dict[Tuple[Any, int], float] = {}
+    
+    def connection_check_out_started(self, event):
+        self._local.started = self.metrics.wait_started()
+    
+    def connection_checked_out(self, event):
+        acquired_at = self.metrics.acquired(self._local.started)
+        self._checked_out[(event.address, event.connection_id)] = acquired_at
+    
+    def connection_check_out_failed(self, event):
+        self.metrics.acquire_failed(
+            timed_out=event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT
+        )
+    
+    def connection_checked_in(self, event):
+        acquired_at = self._checked_out.pop((event.address, event.connection_id), None)
+        if acquired_at is not None:
+            self.metrics.released(acquired_at)
+    
+    def connection_created(self, event):
+        self.metrics.connection_created()
+    
+    def connection_closed(self, event):
+        self.metrics.connection_closed()
+    
+    def connection_ready(self, event):
+        pass
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+
 
 class MongoDBAdapter:
     """
@@ -20,11 +80,17 @@ class MongoDBAdapter:
         self.client: Optional[AsyncIOMotorClient] = None
         self.db: Optional[AsyncIOMotorDatabase] = None
         self._sessions: Dict[str, Any] = {}
+        self.pool_metrics: Optional[PoolMetrics] = None
+        
+    def attach_pool_metrics(self, metrics: PoolMetrics):
+        """Report driver pool events to ``metrics`` (call before connect)"""
+        self.pool_metrics = metrics
         
     async def connect(self):
         """Connect to MongoDB"""
         if not self.client:
-            self.client = AsyncIOMotorClient(self.connection_string)
+            listeners = [PoolMetricsListener(self.pool_metrics)] if self.pool_metrics else []
+            self.client = AsyncIOMotorClient(self.connection_string, event_listeners=listeners)
             self.db = self.client[self.database_name]
             logger.info(f"MongoDB connected to database: {self.database_name}")
             
@@ -36,14 +102,24 @@ class MongoDBAdapter:
             self.db = None
             
     # Transaction support (requires replica set)
-    async def prepare_transaction(self, transaction_id: str):
-        """Start MongoDB transaction session"""
+    #
+    # The session opens when the TransactionManager enrolls this adapter, so
+    # every write passing the same transaction_id runs inside it and is
+    # committed or aborted with the rest of the transaction.
+    async def begin_transaction(self, transaction_id: str):
+        """Start a session and open a transaction on it"""
+        if transaction_id in self._sessions:
+            return
         session = await self.client.start_session()
         session.start_transaction(
             write_concern=WriteConcern("majority")
         )
         self._sessions[transaction_id] = session
         
+    async def prepare_transaction(self, transaction_id: str):
+        """MongoDB has no prepare phase; only make sure the session is open"""
+        await self.begin_transaction(transaction_id)
+        
     async def commit_transaction(self, transaction_id: str):
         """Commit MongoDB transaction"""
         session = self._sessions.get(transaction_id)
@@ -120,6 +196,27 @@ class MongoDBAdapter:
                 doc['_id'] = str(doc['_id'])
         return docs
         
+    async def stream(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        projection: Optional[Dict[str, int]] = None,
+        sort: Optional[List[tuple]] = None,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """Iterate matching documents one server batch at a time"""
+        coll = self.db[collection]
+        cursor = coll.find(filter, projection).batch_size(batch_size or CURSOR_BATCH_SIZE)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            async for doc in cursor:
+                if '_id' in doc:
+                    doc['_id'] = str(doc['_id'])
+                yield doc
+        finally:
+            await cursor.close()
+        
     async def update_one(
         self,
         collection: str,
@@ -149,4 +246,51 @@ class MongoDBAdapter:
         session = self._sessions.get(transaction_id) if transaction_id else None
         coll = self.db[collection]
         result = await coll.delete_one(filter, session=session)
-        return result.deleted_count
\ No newline at end of file
+        return result.deleted_count
+
+    async def find_one_and_update(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        upsert: bool = False,
+        return_new: bool = True,
+        transaction_id: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Atomically update a single document and return it (findAndModify)"""
+        session = self._sessions.get(transaction_id) if transaction_id else None
+        coll = self.db[collection]
+        doc = await coll.find_one_and_update(
+            filter,
+            update,
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER if return_new else ReturnDocument.BEFORE,
+            session=session,
+        )
+        if doc and '_id' in doc:
+            doc['_id'] = str(doc['_id'])
+        return doc
+
+    async def aggregate(
+        self,
+        collection: str,
+        pipeline: List[Dict[str, Any]],
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Run an aggregation pipeline"""
+        coll = self.db[collection]
+        return await coll.aggregate(pipeline).to_list(length=limit)
+
+    async def create_index(
+        self,
+        collection: str,
+        keys: List[tuple],
+        unique: bool = False,
+        name: Optional[str] = None
+    ) -> str:
+        """Create an index if it does not exist. Returns the index name."""
+        coll = self.db[collection]
+        kwargs = {"unique": unique}
+        if name:
+            kwargs["name"] = name
+        return await coll.create_index(keys, **kwargs)
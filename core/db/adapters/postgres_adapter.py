@@ -1,12 +1,73 @@
 """PostgreSQL Adapter - Handles structured relational data"""
-from typing import Any, Dict, List, Optional
+import asyncio
+import os
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple
 import asyncpg
 from contextlib import asynccontextmanager
 from core.utils.logger import get_logger
 from core.db.config import get_database_config
+from core.db.connection_pool import CheckoutLimiter, PoolMetrics, caller_site
+from core.db.optimization.query_registry import QUERY_STATS_ENABLED, QueryRegistry, get_query_registry
 
 logger = get_logger(__name__)
 
+# Rows per COPY / executemany / array round trip in the bulk methods
+BULK_BATCH_SIZE = int(os.getenv("POSTGRES_BULK_BATCH_SIZE", "5000"))
+# Rows fetched per round trip by stream()'s server-side cursor
+CURSOR_PREFETCH = int(os.getenv("POSTGRES_CURSOR_PREFETCH", "500"))
+
+
+def _batches(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _affected(status: Optional[str]) -> int:
+    """Row count from a command tag like "UPDATE 5" """
+    return int(status.split()[-1]) if status else 0
+
+
+def _row_count(method: str, result: Any) -> int:
+    """Rows returned (or, for execute, affected) by an asyncpg call"""
+    if method == "fetch":
+        return len(result)
+    if method == "execute":
+        try:
+            return _affected(result)
+        except ValueError:
+            return 0
+    return 0 if result is None else 1
+
+
+# Generated SQL, memoized per (table, columns). Identical text also lets
+# asyncpg reuse the statement it already prepared on the connection (see
+# DatabaseConfig.statement_cache_size) instead of parsing it again.
+@lru_cache(maxsize=1024)
+def insert_sql(table: str, columns: Tuple[str, ...], returning: str = "id") -> str:
+    placeholders = ', '.join(f'${i+1}' for i in range(len(columns)))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) RETURNING {returning}"
+
+
+@lru_cache(maxsize=1024)
+def update_sql(table: str, columns: Tuple[str, ...], where: Tuple[str, ...]) -> str:
+    set_clause = ', '.join(f"{k} = ${i+1}" for i, k in enumerate(columns))
+    where_clause = ' AND '.join(f"{k} = ${i+len(columns)+1}" for i, k in enumerate(where))
+    return f"UPDATE {table} SET {set_clause} WHERE {where_clause}"
+
+
+@lru_cache(maxsize=1024)
+def delete_sql(table: str, where: Tuple[str, ...]) -> str:
+    where_clause = ' AND '.join(f"{k} = ${i+1}" for i, k in enumerate(where))
+    return f"DELETE FROM {table} WHERE {where_clause}"
+
+
+@lru_cache(maxsize=1024)
+def select_sql(table: str, where: Tuple[str, ...], columns: str = "*") -> str:
+    where_clause = ' AND '.join(f"{k} = ${i+1}" for i, k in enumerate(where))
+    return f"SELECT {columns} FROM {table} WHERE {where_clause}"
+
 
 class PostgresAdapter:
     """
@@ -15,6 +76,9 @@ class PostgresAdapter:
     Use for: Structured data, ACID transactions, complex queries, referential integrity
     """
     
+    # Votes in the TransactionManager prepare phase (PREPARE TRANSACTION)
+    supports_two_phase = True
+    
     def __init__(self, connection_string: str = None, min_size: int = None, max_size: int = None, read_only: bool = False):
         # Get configuration
         config = get_database_config()
@@ -24,6 +88,7 @@ class PostgresAdapter:
         self.min_size = min_size or config.min_size
         self.max_size = max_size or config.max_size
         self.read_only = read_only
+        self.acquire_timeout = config.pool_acquire_timeout
         
         # For read replicas, use read replica connection string
         if read_only and config.get_read_replica_string():
@@ -31,6 +96,26 @@ class PostgresAdapter:
         
         self.pool: Optional[asyncpg.Pool] = None
         self._transaction_sessions: Dict[str, asyncpg.Connection] = {}
+        self._prepared: Set[str] = set()
+        self._column_types: Dict[str, Dict[str, str]] = {}
+        # Called after each committed write (e.g. ReadReplicaRouter.note_write)
+        self.write_listeners: List[Callable[[], None]] = []
+        # Set by attach_pool_metrics(); checkouts are timed and attributed
+        self.pool_metrics: Optional[PoolMetrics] = None
+        self._limiter: Optional[CheckoutLimiter] = None
+        self._checkouts: Dict[int, Tuple[float, str, CheckoutLimiter]] = {}
+        # Per-fingerprint query statistics and slow-query capture (None disables)
+        self.query_registry: Optional[QueryRegistry] = get_query_registry() if QUERY_STATS_ENABLED else None
+        
+    def attach_pool_metrics(self, metrics: PoolMetrics):
+        """Report checkouts to ``metrics`` and make the pool resizable (call before connect)"""
+        self.pool_metrics = metrics
+        self._limiter = CheckoutLimiter(self.max_size)
+        
+    def resize_pool(self, size: int):
+        """Cap concurrent checkouts at ``size`` (never above max_size, the pool's hard limit)"""
+        if self._limiter is not None:
+            self._limiter.resize(max(1, min(size, self.max_size)))
         
     async def connect(self):
         """Initialize connection pool with optimized settings"""
@@ -53,6 +138,7 @@ class PostgresAdapter:
             
             self.pool = await asyncpg.create_pool(
                 self.connection_string,
+                init=self._on_new_connection,
                 **pool_config
             )
             
@@ -66,85 +152,444 @@ class PostgresAdapter:
             self.pool = None
             logger.info("PostgreSQL pool closed")
             
+    async def _on_new_connection(self, conn: asyncpg.Connection):
+        if self.pool_metrics is not None:
+            self.pool_metrics.connection_created()
+            
     @asynccontextmanager
-    async def acquire(self):
-        """Acquire connection from pool"""
+    async def acquire(self, caller: Optional[str] = None):
+        """
+        Acquire connection from pool
+        
+        ``caller`` labels the checkout in pool metrics; by default it is
+        the first calling frame outside the database layer.
+        """
+        conn = await self._checkout(caller)
+        try:
+            yield conn
+        finally:
+            await self._checkin(conn)
+            
+    async def _checkout(self, caller: Optional[str] = None) -> asyncpg.Connection:
         if not self.pool:
             await self.connect()
-        async with self.pool.acquire() as conn:
-            yield conn
+        metrics = self.pool_metrics
+        if metrics is None:
+            return await self.pool.acquire(timeout=self.acquire_timeout)
+        
+        started = metrics.wait_started()
+        limiter = self._limiter
+        try:
+            await limiter.acquire(self.acquire_timeout)
+            try:
+                conn = await self.pool.acquire(timeout=self.acquire_timeout)
+            except BaseException:
+                limiter.release()
+                raise
+        except BaseException as e:
+            metrics.acquire_failed(timed_out=isinstance(e, asyncio.TimeoutError))
+            raise
+        caller = caller or caller_site()
+        self._checkouts[id(conn)] = (metrics.acquired(started, caller), caller, limiter)
+        return conn
+        
+    async def _checkin(self, conn: asyncpg.Connection):
+        entry = self._checkouts.pop(id(conn), None)
+        try:
+            await self.pool.release(conn)
+        finally:
+            if entry is not None:
+                acquired_at, caller, limiter = entry
+                limiter.release()
+                self.pool_metrics.released(acquired_at, caller)
             
     # Transaction support
+    #
+    # A transaction pins one pool connection from begin_transaction() until
+    # commit/rollback, and every CRUD call that passes the same
+    # transaction_id runs on it. With a single durable participant the
+    # TransactionManager commits it directly (one phase); PREPARE
+    # TRANSACTION is only issued when another two-phase store takes part.
+    async def begin_transaction(self, transaction_id: str):
+        """Pin a connection and open a transaction on it"""
+        if transaction_id in self._transaction_sessions:
+            return
+        conn = await self._checkout()
+        try:
+            await conn.execute("BEGIN")
+        except Exception:
+            await self._checkin(conn)
+            raise
+        self._transaction_sessions[transaction_id] = conn
+
     async def prepare_transaction(self, transaction_id: str):
         """Phase 1: Prepare transaction (2PC)"""
-        async with self.acquire() as conn:
-            self._transaction_sessions[transaction_id] = conn
-            await conn.execute(f"PREPARE TRANSACTION '{transaction_id}'")
-            
-    async def commit_transaction(self, transaction_id: str):
-        """Phase 2: Commit prepared transaction"""
         conn = self._transaction_sessions.get(transaction_id)
         if conn:
-            await conn.execute(f"COMMIT PREPARED '{transaction_id}'")
-            del self._transaction_sessions[transaction_id]
-            
+            await conn.execute(f"PREPARE TRANSACTION '{transaction_id}'")
+            self._prepared.add(transaction_id)
+
+    async def commit_transaction(self, transaction_id: str):
+        """Commit the pinned transaction, or COMMIT PREPARED after phase 1"""
+        await self._finish_transaction(transaction_id, "COMMIT")
+
     async def rollback_transaction(self, transaction_id: str):
-        """Rollback prepared transaction"""
-        conn = self._transaction_sessions.get(transaction_id)
-        if conn:
-            await conn.execute(f"ROLLBACK PREPARED '{transaction_id}'")
-            del self._transaction_sessions[transaction_id]
-            
+        """Roll back the pinned transaction, or ROLLBACK PREPARED after phase 1"""
+        await self._finish_transaction(transaction_id, "ROLLBACK")
+
+    async def _finish_transaction(self, transaction_id: str, verb: str):
+        conn = self._transaction_sessions.pop(transaction_id, None)
+        if conn is None:
+            return
+        try:
+            if transaction_id in self._prepared:
+                self._prepared.discard(transaction_id)
+                await conn.execute(f"{verb} PREPARED '{transaction_id}'")
+            else:
+                await conn.execute(verb)
+        finally:
+            await self._checkin(conn)
+        if verb == "COMMIT":
+            self._notify_write()
+
+    def _notify_write(self):
+        for listener in self.write_listeners:
+            listener()
+
+    @asynccontextmanager
+    async def _connection(
+        self,
+        transaction_id: Optional[str] = None,
+        write: bool = False,
+        caller: Optional[str] = None
+    ):
+        """
+        Pinned transaction connection if there is one, else a pooled one.
+        
+        ``write`` notifies write_listeners once an autocommitted statement
+        has run; pinned writes are reported when their transaction commits.
+        """
+        conn = self._transaction_sessions.get(transaction_id) if transaction_id else None
+        if conn is not None:
+            yield conn
+        else:
+            async with self.acquire(caller) as conn:
+                yield conn
+            if write:
+                self._notify_write()
+
+    async def _run(
+        self,
+        method: str,
+        query: str,
+        args: Sequence[Any],
+        transaction_id: Optional[str] = None,
+        write: bool = False
+    ):
+        """
+        Run ``conn.<method>(query, *args)`` on the right connection.
+        
+        With a query_registry the statement is timed (execution only, not
+        the pool wait) and recorded under its fingerprint and caller.
+        """
+        registry = self.query_registry
+        if registry is None:
+            async with self._connection(transaction_id, write) as conn:
+                return await getattr(conn, method)(query, *args)
+        
+        caller = caller_site()
+        async with self._connection(transaction_id, write, caller) as conn:
+            started = time.perf_counter()
+            try:
+                result = await getattr(conn, method)(query, *args)
+            except Exception:
+                registry.record(query, (time.perf_counter() - started) * 1000, 0, caller, error=True)
+                raise
+        registry.record(
+            query,
+            (time.perf_counter() - started) * 1000,
+            _row_count(method, result),
+            caller,
+            adapter=self,
+            args=args
+        )
+        return result
+
     # CRUD operations
     async def execute(self, query: str, *args, transaction_id: Optional[str] = None):
         """Execute query"""
-        if transaction_id and transaction_id in self._transaction_sessions:
-            conn = self._transaction_sessions[transaction_id]
-            return await conn.execute(query, *args)
-        else:
-            async with self.acquire() as conn:
-                return await conn.execute(query, *args)
+        return await self._run("execute", query, args, transaction_id, write=True)
                 
-    async def fetch_one(self, query: str, *args) -> Optional[Dict]:
+    async def fetch_one(self, query: str, *args, transaction_id: Optional[str] = None) -> Optional[Dict]:
         """Fetch single row"""
-        async with self.acquire() as conn:
-            row = await conn.fetchrow(query, *args)
-            return dict(row) if row else None
+        row = await self._run("fetchrow", query, args, transaction_id)
+        return dict(row) if row else None
             
-    async def fetch_many(self, query: str, *args) -> List[Dict]:
+    async def fetch_many(self, query: str, *args, transaction_id: Optional[str] = None) -> List[Dict]:
         """Fetch multiple rows"""
-        async with self.acquire() as conn:
-            rows = await conn.fetch(query, *args)
-            return [dict(row) for row in rows]
+        rows = await self._run("fetch", query, args, transaction_id)
+        return [dict(row) for row in rows]
             
-    async def insert(self, table: str, data: Dict[str, Any], returning: str = "id") -> Any:
-        """Insert row and return specified column"""
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(f'${i+1}' for i in range(len(data)))
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) RETURNING {returning}"
+    async def fetch_record(self, query: str, *args, transaction_id: Optional[str] = None) -> Optional[asyncpg.Record]:
+        """Fetch single row as an asyncpg Record, without copying it into a dict"""
+        return await self._run("fetchrow", query, args, transaction_id)
+            
+    async def fetch_records(self, query: str, *args, transaction_id: Optional[str] = None) -> List[asyncpg.Record]:
+        """
+        Fetch rows as asyncpg Records.
         
+        Records are tuple-backed and support row["col"], row.get("col")
+        and row[0], so read paths that only look fields up can skip the
+        per-row dict copy that fetch_many makes. Call dict(row) where a
+        real dict is needed (JSON, mutation).
+        """
+        return await self._run("fetch", query, args, transaction_id)
+            
+    async def stream(
+        self,
+        query: str,
+        *args,
+        prefetch: Optional[int] = None,
+        transaction_id: Optional[str] = None
+    ) -> AsyncIterator[asyncpg.Record]:
+        """
+        Iterate a large result set through a server-side cursor.
+        
+        Only ``prefetch`` rows are held in memory at a time. The cursor
+        needs a transaction, so a pooled connection is held (inside its own
+        transaction, or the pinned one for ``transaction_id``) until the
+        iteration finishes; wrap early exits in contextlib.aclosing.
+        
+        Usage:
+            async for row in postgres.stream("SELECT * FROM audit_log"):
+                ...
+        """
+        prefetch = prefetch or CURSOR_PREFETCH
+        conn = self._transaction_sessions.get(transaction_id) if transaction_id else None
+        if conn is not None:
+            async for record in conn.cursor(query, *args, prefetch=prefetch):
+                yield record
+            return
         async with self.acquire() as conn:
-            result = await conn.fetchval(query, *data.values())
-            return result
+            async with conn.transaction():
+                async for record in conn.cursor(query, *args, prefetch=prefetch):
+                    yield record
             
-    async def update(self, table: str, data: Dict[str, Any], where: Dict[str, Any]) -> int:
+    async def insert(
+        self,
+        table: str,
+        data: Dict[str, Any],
+        returning: str = "id",
+        transaction_id: Optional[str] = None
+    ) -> Any:
+        """Insert row and return specified column"""
+        query = insert_sql(table, tuple(data), returning)
+        return await self._run("fetchval", query, tuple(data.values()), transaction_id, write=True)
+            
+    async def update(
+        self,
+        table: str,
+        data: Dict[str, Any],
+        where: Dict[str, Any],
+        transaction_id: Optional[str] = None
+    ) -> int:
         """Update rows"""
-        set_clause = ', '.join(f"{k} = ${i+1}" for i, k in enumerate(data.keys()))
-        where_clause = ' AND '.join(
-            f"{k} = ${i+len(data)+1}" for i, k in enumerate(where.keys())
+        query = update_sql(table, tuple(data), tuple(where))
+        result = await self._run("execute", query, (*data.values(), *where.values()), transaction_id, write=True)
+        return _affected(result)
+            
+    async def delete(self, table: str, where: Dict[str, Any], transaction_id: Optional[str] = None) -> int:
+        """Delete rows"""
+        query = delete_sql(table, tuple(where))
+        result = await self._run("execute", query, tuple(where.values()), transaction_id, write=True)
+        return _affected(result)
+            
+    # Bulk operations
+    #
+    # Each call runs as one transaction (or inside the caller's, when a
+    # transaction_id is given) and sends rows in batches of batch_size, so
+    # a thousand rows cost a handful of round trips instead of a thousand
+    # pool acquisitions.
+    @asynccontextmanager
+    async def _bulk_connection(self, transaction_id: Optional[str] = None):
+        conn = self._transaction_sessions.get(transaction_id) if transaction_id else None
+        if conn is not None:
+            yield conn
+            return
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+        self._notify_write()
+
+    @staticmethod
+    def _columns_for(rows: Sequence[Dict[str, Any]], columns: Optional[Sequence[str]]) -> List[str]:
+        return list(columns) if columns else list(rows[0].keys())
+
+    async def _table_column_types(self, conn, table: str) -> Dict[str, str]:
+        """Column name -> SQL type, used to cast array parameters (cached per table)"""
+        types = self._column_types.get(table)
+        if types is None:
+            rows = await conn.fetch(
+                "SELECT attname, format_type(atttypid, atttypmod) AS type "
+                "FROM pg_attribute WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped",
+                table,
+            )
+            types = {row["attname"]: row["type"] for row in rows}
+            self._column_types[table] = types
+        return types
+
+    async def insert_many(
+        self,
+        table: str,
+        rows: Sequence[Dict[str, Any]],
+        columns: Optional[Sequence[str]] = None,
+        batch_size: Optional[int] = None,
+        transaction_id: Optional[str] = None
+    ) -> int:
+        """
+        Insert rows with COPY.
+        
+        Args:
+            table: Table name, optionally schema-qualified
+            rows: Row dicts; missing columns are inserted as NULL
+            columns: Columns to copy (default: keys of the first row)
+            batch_size: Rows per COPY (default POSTGRES_BULK_BATCH_SIZE)
+            transaction_id: Run inside this pinned transaction
+            
+        Returns:
+            Number of rows inserted
+        """
+        if not rows:
+            return 0
+        columns = self._columns_for(rows, columns)
+        records = [tuple(row.get(c) for c in columns) for row in rows]
+        schema, _, name = table.rpartition(".")
+        
+        async with self._bulk_connection(transaction_id) as conn:
+            for batch in _batches(records, batch_size or BULK_BATCH_SIZE):
+                await conn.copy_records_to_table(
+                    name, records=batch, columns=columns, schema_name=schema or None
+                )
+        return len(records)
+        
+    async def upsert_many(
+        self,
+        table: str,
+        rows: Sequence[Dict[str, Any]],
+        conflict_columns: Sequence[str] = ("id",),
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: Optional[int] = None,
+        transaction_id: Optional[str] = None
+    ) -> int:
+        """
+        INSERT ... ON CONFLICT for many rows via executemany.
+        
+        Args:
+            table: Table name
+            rows: Row dicts, all with the same keys
+            conflict_columns: Unique key the conflict is detected on
+            update_columns: Columns overwritten on conflict (default: all
+                non-key columns); pass an empty list for DO NOTHING
+            batch_size: Rows per executemany (default POSTGRES_BULK_BATCH_SIZE)
+            transaction_id: Run inside this pinned transaction
+            
+        Returns:
+            Number of rows sent
+        """
+        if not rows:
+            return 0
+        columns = self._columns_for(rows, None)
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in conflict_columns]
+        placeholders = ', '.join(f'${i+1}' for i in range(len(columns)))
+        if update_columns:
+            action = "DO UPDATE SET " + ', '.join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+        else:
+            action = "DO NOTHING"
+        query = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) {action}"
         )
-        query = f"UPDATE {table} SET {set_clause} WHERE {where_clause}"
+        records = [tuple(row[c] for c in columns) for row in rows]
         
-        async with self.acquire() as conn:
-            result = await conn.execute(query, *data.values(), *where.values())
-            # Parse affected rows from result string like "UPDATE 5"
-            return int(result.split()[-1]) if result else 0
+        async with self._bulk_connection(transaction_id) as conn:
+            for batch in _batches(records, batch_size or BULK_BATCH_SIZE):
+                await conn.executemany(query, batch)
+        return len(records)
+        
+    async def update_many(
+        self,
+        table: str,
+        rows: Sequence[Dict[str, Any]],
+        key: str = "id",
+        batch_size: Optional[int] = None,
+        transaction_id: Optional[str] = None
+    ) -> int:
+        """
+        Update many rows with one statement per batch.
+        
+        Each column is sent as one array parameter and joined back with
+        unnest(), so a batch is a single UPDATE ... FROM.
+        
+        Args:
+            table: Table name
+            rows: Row dicts, all with the same keys, each including ``key``
+            key: Column identifying the row
+            batch_size: Rows per statement (default POSTGRES_BULK_BATCH_SIZE)
+            transaction_id: Run inside this pinned transaction
             
-    async def delete(self, table: str, where: Dict[str, Any]) -> int:
-        """Delete rows"""
-        where_clause = ' AND '.join(f"{k} = ${i+1}" for i, k in enumerate(where.keys()))
-        query = f"DELETE FROM {table} WHERE {where_clause}"
+        Returns:
+            Number of rows updated
+        """
+        if not rows:
+            return 0
+        columns = [key] + [c for c in self._columns_for(rows, None) if c != key]
+        updated = 0
         
-        async with self.acquire() as conn:
-            result = await conn.execute(query, *where.values())
-            return int(result.split()[-1]) if result else 0
\ No newline at end of file
+        async with self._bulk_connection(transaction_id) as conn:
+            types = await self._table_column_types(conn, table)
+            unknown = [c for c in columns if c not in types]
+            if unknown:
+                raise ValueError(f"Unknown columns for {table}: {unknown}")
+            arrays = ', '.join(f"${i+1}::{types[c]}[]" for i, c in enumerate(columns))
+            set_clause = ', '.join(f"{c} = v.{c}" for c in columns[1:])
+            query = (
+                f"UPDATE {table} AS t SET {set_clause} "
+                f"FROM unnest({arrays}) AS v({', '.join(columns)}) "
+                f"WHERE t.{key} = v.{key}"
+            )
+            for batch in _batches(rows, batch_size or BULK_BATCH_SIZE):
+                params = [[row[c] for row in batch] for c in columns]
+                updated += _affected(await conn.execute(query, *params))
+        return updated
+        
+    async def delete_where_in(
+        self,
+        table: str,
+        column: str,
+        values: Sequence[Any],
+        batch_size: Optional[int] = None,
+        transaction_id: Optional[str] = None
+    ) -> int:
+        """
+        DELETE ... WHERE column = ANY($1) in batches.
+        
+        Args:
+            table: Table name
+            column: Column to match
+            values: Values to delete
+            batch_size: Values per statement (default POSTGRES_BULK_BATCH_SIZE)
+            transaction_id: Run inside this pinned transaction
+            
+        Returns:
+            Number of rows deleted
+        """
+        if not values:
+            return 0
+        query = f"DELETE FROM {table} WHERE {column} = ANY($1)"
+        deleted = 0
+        
+        async with self._bulk_connection(transaction_id) as conn:
+            for batch in _batches(list(values), batch_size or BULK_BATCH_SIZE):
+                deleted += _affected(await conn.execute(query, batch))
+        return deleted
@@ -1,10 +1,76 @@
 """Redis Adapter - Handles caching and session data"""
-from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import redis as sync_redis
 import redis.asyncio as redis
+from redis.exceptions import MaxConnectionsError, NoScriptError
+from core.db.connection_pool import PoolMetrics, caller_site
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Connections in each shared pool, and seconds to wait for one when all are busy.
+# The default pool serves request-path commands, which hold a connection for
+# one round trip: size it for the commands one process has in flight at peak.
+REDIS_POOL_MAX = int(os.getenv("REDIS_POOL_MAX", "100"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+# Separate pool for commands that hold a connection for seconds or for good:
+# BLPOP/XREAD BLOCK long-polls and pub/sub listeners. Size it for the most a
+# process runs at once (open long-polls + tailed chat rooms + listeners), so
+# they can never starve the default pool. It gives up quickly when full.
+# Redis needs maxclients >= processes * (REDIS_POOL_MAX + REDIS_BLOCKING_POOL_MAX).
+REDIS_BLOCKING_POOL_MAX = int(os.getenv("REDIS_BLOCKING_POOL_MAX", "50"))
+REDIS_BLOCKING_POOL_TIMEOUT = float(os.getenv("REDIS_BLOCKING_POOL_TIMEOUT", "1"))
+
+# Pool (max connections, checkout timeout) per get_redis_adapter() purpose
+POOL_PURPOSES: Dict[str, Tuple[int, float]] = {
+    "default": (REDIS_POOL_MAX, REDIS_POOL_TIMEOUT),
+    "blocking": (REDIS_BLOCKING_POOL_MAX, REDIS_BLOCKING_POOL_TIMEOUT),
+}
+# Keys per SCAN page / UNLINK call in delete_pattern()
+SCAN_BATCH_SIZE = int(os.getenv("REDIS_SCAN_BATCH_SIZE", "500"))
+
+# Drop every key in a tag set, then the set itself, in one round trip
+_INVALIDATE_TAG_SCRIPT = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+for i = 1, #keys, 500 do
+    redis.call('UNLINK', unpack(keys, i, math.min(i + 499, #keys)))
+end
+redis.call('UNLINK', KEYS[1])
+return #keys
+"""
+
+
+def pool_exhausted(error: BaseException) -> bool:
+    """Whether ``error`` means no pooled connection was free in time"""
+    return isinstance(error, MaxConnectionsError) or isinstance(error.__cause__, asyncio.TimeoutError)
+
+
+class RedisScript:
+    """
+    A Lua script run by SHA.
+    
+    EVALSHA saves shipping the script body on every call; when Redis has
+    not seen it yet (first call, restart, SCRIPT FLUSH) the call falls back
+    to EVAL, which also caches it server-side.
+    """
+    
+    def __init__(self, source: str):
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+    
+    async def __call__(self, client, keys: Sequence = (), args: Sequence = ()) -> Any:
+        """Run on ``client`` (a raw client or a RedisAdapter)"""
+        if isinstance(client, RedisAdapter):
+            client = client.get_client()
+        try:
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            return await client.eval(self.source, len(keys), *keys, *args)
+
 
 class RedisAdapter:
     """
@@ -13,27 +79,197 @@ class RedisAdapter:
     Use for: Caching, session storage, pub/sub, rate limiting, temporary data
     """
     
-    def __init__(self, connection_string: str, decode_responses: bool = True):
+    def __init__(
+        self,
+        connection_string: str,
+        decode_responses: bool = True,
+        max_connections: int = REDIS_POOL_MAX,
+        pool_timeout: float = REDIS_POOL_TIMEOUT,
+        purpose: str = "default"
+    ):
         self.connection_string = connection_string
         self.decode_responses = decode_responses
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.purpose = purpose
         self.client: Optional[redis.Redis] = None
+        self._blocking: Optional["RedisAdapter"] = None
+        self.pool_metrics: Optional[PoolMetrics] = None
+        self._invalidate_tag = RedisScript(_INVALIDATE_TAG_SCRIPT)
         
-    async def connect(self):
-        """Connect to Redis"""
-        if not self.client:
-            self.client = await redis.from_url(
+    def attach_pool_metrics(self, metrics: PoolMetrics):
+        """Report pool checkouts to ``metrics``"""
+        self.pool_metrics = metrics
+        if self.client is not None:
+            self._instrument_pool(self.client.connection_pool, metrics)
+        
+    def get_client(self) -> redis.Redis:
+        """
+        The client, created on first use.
+        
+        Creating it does no I/O; connections are opened by the pool as
+        commands need them, so sync code (middleware constructors,
+        properties) can call this too.
+        """
+        if self.client is None:
+            pool = redis.BlockingConnectionPool.from_url(
                 self.connection_string,
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
                 decode_responses=self.decode_responses,
                 encoding="utf-8"
             )
+            if self.pool_metrics:
+                self._instrument_pool(pool, self.pool_metrics)
+            self.client = redis.Redis.from_pool(pool)
+        return self.client
+        
+    def blocking(self) -> "RedisAdapter":
+        """
+        The same Redis on the blocking pool.
+        
+        Use it for BLPOP/XREAD BLOCK and pub/sub, never the adapter itself,
+        so long-held connections can't exhaust the request-path pool.
+        """
+        if self.purpose == "blocking":
+            return self
+        if self._blocking is None:
+            self._blocking = get_redis_adapter(self.connection_string, self.decode_responses, purpose="blocking")
+        return self._blocking
+        
+    async def connect(self):
+        """Connect to Redis"""
+        if not self.client:
+            self.get_client()
             logger.info(f"Redis connected: {self.connection_string}")
             
+    @property
+    def pool_is_resizable(self) -> bool:
+        """Only a blocking pool queues callers at its limit; the default one raises instead"""
+        return isinstance(getattr(self.client, "connection_pool", None), redis.BlockingConnectionPool)
+        
+    def resize_pool(self, size: int):
+        """Change the connection limit of a blocking pool"""
+        if self.pool_is_resizable:
+            self.client.connection_pool.max_connections = size
+            
+    @staticmethod
+    def _instrument_pool(pool: redis.ConnectionPool, metrics: PoolMetrics):
+        """Time and attribute checkouts by wrapping the pool's own methods"""
+        get_connection, release, make_connection = pool.get_connection, pool.release, pool.make_connection
+        checked_out: Dict[int, Tuple[float, str]] = {}
+        
+        async def timed_get_connection(*args, **kwargs):
+            started = metrics.wait_started()
+            try:
+                conn = await get_connection(*args, **kwargs)
+            except BaseException as e:
+                metrics.acquire_failed(timed_out=pool_exhausted(e))
+                raise
+            caller = caller_site()
+            checked_out[id(conn)] = (metrics.acquired(started, caller), caller)
+            return conn
+        
+        async def timed_release(conn):
+            entry = checked_out.pop(id(conn), None)
+            try:
+                await release(conn)
+            finally:
+                if entry is not None:
+                    metrics.released(*entry)
+        
+        def counted_make_connection():
+            metrics.connection_created()
+            return make_connection()
+        
+        pool.get_connection = timed_get_connection
+        pool.release = timed_release
+        pool.make_connection = counted_make_connection
+            
     async def disconnect(self):
         """Close Redis connection"""
         if self.client:
             await self.client.close()
             self.client = None
             
+    # Batching
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[Any]:
+        """
+        Queue commands on the yielded pipeline; they go out in one round trip.
+        
+        Commands still queued when the block exits are executed then. Call
+        ``await pipe.execute()`` inside the block to get their results.
+        """
+        async with self.get_client().pipeline(transaction=transaction) as pipe:
+            yield pipe
+            if len(pipe):
+                await pipe.execute()
+                
+    def transaction(self) -> Any:
+        """Like pipeline(), but the queued commands run atomically (MULTI/EXEC)"""
+        return self.pipeline(transaction=True)
+        
+    def register_script(self, source: str) -> RedisScript:
+        """Wrap a Lua script for EVALSHA; call it as ``await script(adapter, keys, args)``"""
+        return RedisScript(source)
+        
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        """Get several values in one command; missing keys come back as None"""
+        if not keys:
+            return []
+        return await self.get_client().mget(keys)
+        
+    async def mset_with_ttl(self, mapping: Dict[str, Any], ttl_seconds: int) -> None:
+        """Set several keys, each expiring after ``ttl_seconds``, in one round trip"""
+        if not mapping:
+            return
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ttl_seconds)
+                
+    async def unlink(self, *keys: str) -> int:
+        """Delete keys, reclaiming their memory off the main Redis thread"""
+        if not keys:
+            return 0
+        return await self.get_client().unlink(*keys)
+        
+    async def delete_pattern(self, pattern: str, batch_size: int = SCAN_BATCH_SIZE) -> int:
+        """
+        Delete every key matching ``pattern``.
+        
+        Walks the keyspace with SCAN rather than KEYS, so Redis keeps
+        serving other clients while this runs.
+        """
+        client = self.get_client()
+        deleted = 0
+        batch: List[str] = []
+        async for key in client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += await client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await client.unlink(*batch)
+        return deleted
+        
+    async def tag(self, tag: str, *keys: str, ttl_seconds: Optional[int] = None) -> None:
+        """Add keys to a tag set so invalidate_tags() can drop them together"""
+        if not keys:
+            return
+        tag_key = f"tag:{tag}"
+        async with self.pipeline() as pipe:
+            pipe.sadd(tag_key, *keys)
+            if ttl_seconds:
+                pipe.expire(tag_key, ttl_seconds)
+                
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key recorded under the given tags; returns how many"""
+        deleted = 0
+        for tag in tags:
+            deleted += int(await self._invalidate_tag(self, keys=[f"tag:{tag}"]))
+        return deleted
+        
     # Key-Value operations
     async def get(self, key: str) -> Optional[str]:
         """Get value by key"""
@@ -176,4 +412,66 @@ class RedisAdapter:
         
     async def flushdb(self) -> bool:
         """Clear current database"""
-        return await self.client.flushdb()
\ No newline at end of file
+        return await self.client.flushdb()
+
+
+# ============================================================================
+# Shared adapters
+# ============================================================================
+
+_shared: Dict[Tuple[str, bool, str], RedisAdapter] = {}
+_sync_clients: Dict[str, sync_redis.Redis] = {}
+
+
+def get_redis_adapter(
+    connection_string: Optional[str] = None,
+    decode_responses: bool = True,
+    purpose: str = "default"
+) -> RedisAdapter:
+    """
+    Process-wide adapter for a Redis URL.
+    
+    Everything that talks to the same Redis shares one connection pool per
+    purpose instead of opening its own.
+    
+    Args:
+        connection_string: Redis URL (defaults to REDIS_URL)
+        decode_responses: Return str instead of bytes
+        purpose: "default" for request-path commands, "blocking" for
+            blocking commands and pub/sub listeners (see POOL_PURPOSES)
+    """
+    url = connection_string or os.getenv("REDIS_URL", "redis://localhost:6379")
+    key = (url, decode_responses, purpose)
+    adapter = _shared.get(key)
+    if adapter is None:
+        max_connections, pool_timeout = POOL_PURPOSES[purpose]
+        adapter = _shared[key] = RedisAdapter(
+            url,
+            decode_responses=decode_responses,
+            max_connections=max_connections,
+            pool_timeout=pool_timeout,
+            purpose=purpose,
+        )
+    return adapter
+
+
+def get_sync_redis_client(connection_string: Optional[str] = None) -> sync_redis.Redis:
+    """Process-wide blocking client (one pool per URL) for code that cannot await"""
+    url = connection_string or os.getenv("REDIS_URL", "redis://localhost:6379")
+    client = _sync_clients.get(url)
+    if client is None:
+        pool = sync_redis.BlockingConnectionPool.from_url(
+            url, max_connections=REDIS_POOL_MAX, timeout=REDIS_POOL_TIMEOUT, decode_responses=True
+        )
+        client = _sync_clients[url] = sync_redis.Redis(connection_pool=pool)
+    return client
+
+
+async def close_redis_adapters():
+    """Close every shared adapter's pool"""
+    while _shared:
+        _, adapter = _shared.popitem()
+        await adapter.disconnect()
+    while _sync_clients:
+        _, client = _sync_clients.popitem()
+        client.connection_pool.disconnect()
@@ -28,6 +28,11 @@ class DatabaseConfig:
     max_size: int = 20
     max_queries: int = 50000
     max_inactive_connection_lifetime: float = 300.0  # 5 minutes
+    pool_acquire_timeout: Optional[float] = None  # seconds to wait for a free connection, None = forever
+    
+    # Prepared statements kept per connection (asyncpg LRU, keyed by SQL text)
+    statement_cache_size: int = 256
+    max_cached_statement_lifetime: int = 3600  # seconds, 0 = no limit
     
     # Connection settings
     command_timeout: int = 60
@@ -91,6 +96,13 @@ class DatabaseConfig:
         self.max_inactive_connection_lifetime = float(
             os.getenv("DB_MAX_INACTIVE_LIFETIME", self.max_inactive_connection_lifetime)
         )
+        acquire_timeout = os.getenv("DB_POOL_ACQUIRE_TIMEOUT")
+        if acquire_timeout:
+            self.pool_acquire_timeout = float(acquire_timeout)
+        self.statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", self.statement_cache_size))
+        self.max_cached_statement_lifetime = int(
+            os.getenv("DB_STATEMENT_CACHE_LIFETIME", self.max_cached_statement_lifetime)
+        )
         
         # Timeouts
         self.command_timeout = int(os.getenv("DB_COMMAND_TIMEOUT", self.command_timeout))
@@ -156,6 +168,8 @@ class DatabaseConfig:
             "max_queries": self.max_queries,
             "max_inactive_connection_lifetime": self.max_inactive_connection_lifetime,
             "command_timeout": self.command_timeout,
+            "statement_cache_size": self.statement_cache_size,
+            "max_cached_statement_lifetime": self.max_cached_statement_lifetime,
             "server_settings": self.server_settings
         }
     
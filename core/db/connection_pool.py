@@ -2,14 +2,76 @@
 Connection Pool Management
 
 Provides connection pool configuration and monitoring.
+
+Adapters report every checkout to a PoolMetrics (see
+ConnectionPoolManager.instrument): how long callers waited for a
+connection, how long they held it, timeouts, and which code path took it.
+render_metrics() exposes the lot in Prometheus text format for /metrics,
+and the optional AdaptivePoolController moves each resizable pool's
+checkout limit within its PoolConfig bounds based on observed waits.
 """
-from typing import Dict, Any, Optional
+import asyncio
+import inspect
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Adaptive sizing: off unless DB_POOL_ADAPTIVE is set
+ADAPTIVE_SIZING = os.getenv("DB_POOL_ADAPTIVE", "false").lower() in ("1", "true", "yes")
+ADAPTIVE_INTERVAL_SECONDS = float(os.getenv("DB_POOL_ADAPTIVE_INTERVAL", "15"))
+# p95 acquire wait above which a pool grows, and below which it may shrink
+ADAPTIVE_GROW_WAIT_MS = float(os.getenv("DB_POOL_GROW_WAIT_MS", "50"))
+ADAPTIVE_SHRINK_WAIT_MS = float(os.getenv("DB_POOL_SHRINK_WAIT_MS", "5"))
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+# Distinct caller labels kept per pool; later ones are counted as "other"
+MAX_TRACKED_CALLERS = 200
+
+# Frames from these modules are plumbing, not the caller worth naming
+CALLER_SKIP_MODULES: Tuple[str, ...] = (
+    "core.db.adapters",
+    "core.db.connection_pool",
+    "core.db.replication",
+    "core.db.transaction_manager",
+    "core.db.repositories.base_repository",
+    "core.services.db_service",
+    "contextlib",
+    "asyncio",
+    "asyncpg",
+    "redis",
+)
+
+
+def caller_site(skip: Sequence[str] = CALLER_SKIP_MODULES, max_depth: int = 32) -> str:
+    """
+    Name the first frame outside the database plumbing as "module:function".
+    
+    Walks the live stack, so under asyncio it follows the chain of awaiting
+    coroutines back to the code that asked for a connection.
+    """
+    frame = sys._getframe(1)
+    for _ in range(max_depth):
+        if frame is None:
+            break
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(skip):
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
 
 class PoolType(Enum):
     """Database pool types."""
@@ -39,6 +101,203 @@ class PoolStats:
     waiting_count: int
     total_connections_created: int
     total_connections_closed: int
+    max_size: int = 0
+    target_size: Optional[int] = None
+    saturation: float = 0.0
+    acquire_count: int = 0
+    timeout_count: int = 0
+    wait_p50_ms: float = 0.0
+    wait_p95_ms: float = 0.0
+    wait_p99_ms: float = 0.0
+    avg_checkout_ms: float = 0.0
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+    
+    def observe(self, value_ms: float):
+        self.counts[bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+    
+    def snapshot(self) -> List[int]:
+        return list(self.counts)
+    
+    def quantile(self, q: float, since: Optional[List[int]] = None) -> float:
+        """
+        Upper bound of the bucket holding the q-th observation.
+        
+        With ``since`` (an earlier snapshot()) only observations made after
+        it are considered.
+        """
+        counts = self.counts if since is None else [a - b for a, b in zip(self.counts, since)]
+        n = sum(counts)
+        if not n:
+            return 0.0
+        rank = q * n
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                break
+        return float(self.buckets[min(i, len(self.buckets) - 1)])
+
+
+class PoolMetrics:
+    """
+    Checkout telemetry for one pool.
+    
+    Adapters call wait_started() before asking the pool for a connection,
+    then acquired() or acquire_failed(), and released() when it goes back.
+    The pymongo listener calls these from driver threads, hence the lock.
+    """
+    
+    def __init__(self, name: str, pool_type: PoolType, config: PoolConfig):
+        self.name = name
+        self.pool_type = pool_type
+        self.config = config
+        self.acquire_wait = Histogram()
+        self.checkout_time = Histogram()
+        self.acquires = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.created = 0
+        self.closed = 0
+        self.waiting = 0
+        self.in_use = 0
+        self.target_size: Optional[int] = None  # set by AdaptivePoolController
+        # caller -> [acquires, total wait ms, total held ms]
+        self.callers: Dict[str, List[float]] = {}
+        self._peak_in_use = 0
+        self._lock = threading.Lock()
+    
+    def wait_started(self) -> float:
+        with self._lock:
+            self.waiting += 1
+        return time.perf_counter()
+    
+    def acquired(self, started: float, caller: Optional[str] = None) -> float:
+        """Record a successful checkout; returns the checkout timestamp for released()"""
+        now = time.perf_counter()
+        wait_ms = (now - started) * 1000
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.acquires += 1
+            if self.in_use > self._peak_in_use:
+                self._peak_in_use = self.in_use
+            self.acquire_wait.observe(wait_ms)
+            if caller:
+                entry = self._caller_entry(caller)
+                entry[0] += 1
+                entry[1] += wait_ms
+        return now
+    
+    def acquire_failed(self, timed_out: bool = False):
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.failures += 1
+    
+    def released(self, acquired_at: float, caller: Optional[str] = None):
+        held_ms = (time.perf_counter() - acquired_at) * 1000
+        with self._lock:
+            self.in_use -= 1
+            self.checkout_time.observe(held_ms)
+            if caller:
+                self._caller_entry(caller)[2] += held_ms
+    
+    def connection_created(self):
+        with self._lock:
+            self.created += 1
+    
+    def connection_closed(self):
+        with self._lock:
+            self.closed += 1
+    
+    def take_peak(self) -> int:
+        """Highest in-use count since the last call"""
+        with self._lock:
+            peak, self._peak_in_use = self._peak_in_use, self.in_use
+        return peak
+    
+    def _caller_entry(self, caller: str) -> List[float]:
+        entry = self.callers.get(caller)
+        if entry is None:
+            if len(self.callers) >= MAX_TRACKED_CALLERS:
+                caller = "other"
+                entry = self.callers.get(caller)
+            if entry is None:
+                entry = self.callers[caller] = [0, 0.0, 0.0]
+        return entry
+
+
+class CheckoutLimiter:
+    """
+    Caps concurrent checkouts below a pool's hard maximum.
+    
+    Lets the adaptive controller resize pools that cannot be resized in
+    place (asyncpg fixes max_size at creation): the pool is created at its
+    PoolConfig maximum and the limit moves underneath it. Waiters are
+    served in arrival order.
+    """
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+    
+    async def acquire(self, timeout: Optional[float] = None):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we gave up: pass it on
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+    
+    def release(self):
+        self.active -= 1
+        self._wake()
+    
+    def resize(self, limit: int):
+        self.limit = limit
+        self._wake()
+    
+    def _wake(self):
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+
+def _detect_pool_type(pool: Any) -> Optional[PoolType]:
+    if hasattr(pool, "get_idle_size"):
+        return PoolType.POSTGRES
+    if hasattr(pool, "connection_pool"):
+        return PoolType.REDIS
+    if type(pool).__module__.startswith(("motor", "pymongo")):
+        return PoolType.MONGODB
+    return None
 
 
 class ConnectionPoolManager:
@@ -52,12 +311,41 @@ class ConnectionPoolManager:
         """Initialize pool manager."""
         self.pools: Dict[str, Any] = {}
         self.configs: Dict[str, PoolConfig] = {}
+        self.metrics: Dict[str, PoolMetrics] = {}
+        self.resizers: Dict[str, Callable[[int], Any]] = {}
+        self.controller: Optional["AdaptivePoolController"] = None
+    
+    def instrument(
+        self,
+        name: str,
+        pool_type: PoolType,
+        config: Optional[PoolConfig] = None
+    ) -> PoolMetrics:
+        """
+        Get (or create) the metrics for a pool.
         
+        Call before the adapter connects so connections opened at startup
+        are counted; register_pool() later binds the live pool to them.
+        
+        Args:
+            name: Pool name/identifier
+            pool_type: Kind of pool
+            config: Pool configuration (defaults per pool type)
+        """
+        metrics = self.metrics.get(name)
+        if metrics is None:
+            config = config or self.configs.get(name) or DEFAULT_CONFIGS[pool_type]
+            metrics = PoolMetrics(name, pool_type, config)
+            self.metrics[name] = metrics
+            self.configs.setdefault(name, config)
+        return metrics
+    
     def register_pool(
         self,
         name: str,
         pool: Any,
-        config: PoolConfig
+        config: Optional[PoolConfig] = None,
+        resize: Optional[Callable[[int], Any]] = None
     ):
         """
         Register a connection pool.
@@ -66,9 +354,16 @@ class ConnectionPoolManager:
             name: Pool name/identifier
             pool: Pool instance
             config: Pool configuration
+            resize: Callable applying a new size (may be async); pools
+                without one are left alone by the adaptive controller
         """
         self.pools[name] = pool
-        self.configs[name] = config
+        if config is not None:
+            self.configs[name] = config
+            if name in self.metrics:
+                self.metrics[name].config = config
+        if resize is not None:
+            self.resizers[name] = resize
         logger.info(f"Registered connection pool: {name}")
     
     async def get_pool_stats(self, name: str) -> Optional[PoolStats]:
@@ -81,32 +376,75 @@ class ConnectionPoolManager:
         Returns:
             PoolStats or None if pool not found
         """
+        return self._collect(name)
+    
+    def _collect(self, name: str) -> Optional[PoolStats]:
         pool = self.pools.get(name)
-        if not pool:
+        metrics = self.metrics.get(name)
+        if pool is None and metrics is None:
             return None
         
-        # Extract stats based on pool type
-        if hasattr(pool, 'get_size'):
-            # asyncpg pool (Postgres)
+        config = self.configs.get(name) or (metrics.config if metrics else PoolConfig())
+        pool_type = metrics.pool_type if metrics else _detect_pool_type(pool)
+        max_size = config.max_size
+        size = idle = active = None
+        
+        # Extract sizes based on pool type
+        if pool_type is PoolType.POSTGRES and hasattr(pool, "get_size"):
+            size = pool.get_size()
+            idle = pool.get_idle_size()
+            max_size = pool.get_max_size()
+        elif pool_type is PoolType.REDIS and pool is not None:
+            redis_pool = getattr(pool, "connection_pool", pool)
+            idle = len(getattr(redis_pool, "_available_connections", ()))
+            size = idle + len(getattr(redis_pool, "_in_use_connections", ()))
+            max_size = getattr(redis_pool, "max_connections", max_size)
+        elif metrics is not None:
+            # pymongo reports connections through its pool listener
+            size = max(0, metrics.created - metrics.closed)
+            active = metrics.in_use
+            idle = max(0, size - active)
+        
+        if metrics is None:
+            size = size or 0
+            idle = idle or 0
             return PoolStats(
-                pool_type="postgres",
-                current_size=pool.get_size(),
-                idle_count=pool.get_idle_size(),
-                active_count=pool.get_size() - pool.get_idle_size(),
-                waiting_count=0,  # asyncpg doesn't expose this
+                pool_type=pool_type.value if pool_type else "unknown",
+                current_size=size,
+                idle_count=idle,
+                active_count=size - idle,
+                waiting_count=0,
                 total_connections_created=0,
-                total_connections_closed=0
+                total_connections_closed=0,
+                max_size=max_size,
             )
         
-        # Return generic stats
+        if active is None:
+            active = size - idle
+        if pool_type is PoolType.MONGODB:
+            closed = metrics.closed
+        else:
+            closed = max(0, metrics.created - size)
+        limit = metrics.target_size or max_size
+        wait = metrics.acquire_wait
+        checkout = metrics.checkout_time
         return PoolStats(
-            pool_type="unknown",
-            current_size=0,
-            idle_count=0,
-            active_count=0,
-            waiting_count=0,
-            total_connections_created=0,
-            total_connections_closed=0
+            pool_type=pool_type.value,
+            current_size=size,
+            idle_count=idle,
+            active_count=active,
+            waiting_count=max(0, metrics.waiting),
+            total_connections_created=metrics.created,
+            total_connections_closed=closed,
+            max_size=max_size,
+            target_size=metrics.target_size,
+            saturation=round(active / limit, 4) if limit else 0.0,
+            acquire_count=metrics.acquires,
+            timeout_count=metrics.timeouts,
+            wait_p50_ms=wait.quantile(0.50),
+            wait_p95_ms=wait.quantile(0.95),
+            wait_p99_ms=wait.quantile(0.99),
+            avg_checkout_ms=round(checkout.total_ms / checkout.count, 3) if checkout.count else 0.0,
         )
     
     async def get_all_stats(self) -> Dict[str, PoolStats]:
@@ -117,12 +455,94 @@ class ConnectionPoolManager:
             Dict of pool name to stats
         """
         stats = {}
-        for name in self.pools:
+        for name in self._names():
             pool_stats = await self.get_pool_stats(name)
             if pool_stats:
                 stats[name] = pool_stats
         return stats
     
+    def _names(self) -> List[str]:
+        return sorted(set(self.pools) | set(self.metrics))
+    
+    def render_metrics(self) -> str:
+        """
+        Render all pools in Prometheus text exposition format.
+        
+        Returns:
+            Metrics body for a /metrics endpoint
+        """
+        gauges: Dict[str, List[str]] = {
+            "db_pool_connections": [],
+            "db_pool_max_connections": [],
+            "db_pool_target_size": [],
+            "db_pool_waiting": [],
+            "db_pool_saturation": [],
+        }
+        counters: Dict[str, List[str]] = {
+            "db_pool_acquires_total": [],
+            "db_pool_acquire_timeouts_total": [],
+            "db_pool_acquire_failures_total": [],
+            "db_pool_connections_created_total": [],
+            "db_pool_connections_closed_total": [],
+            "db_pool_caller_acquires_total": [],
+            "db_pool_caller_wait_seconds_total": [],
+            "db_pool_caller_hold_seconds_total": [],
+        }
+        histograms: Dict[str, List[str]] = {
+            "db_pool_acquire_wait_seconds": [],
+            "db_pool_checkout_seconds": [],
+        }
+        
+        for name in self._names():
+            stats = self._collect(name)
+            if stats is None:
+                continue
+            pool = f'pool="{name}"'
+            gauges["db_pool_connections"].append(f'{{{pool},state="idle"}} {stats.idle_count}')
+            gauges["db_pool_connections"].append(f'{{{pool},state="active"}} {stats.active_count}')
+            gauges["db_pool_max_connections"].append(f"{{{pool}}} {stats.max_size}")
+            if stats.target_size is not None:
+                gauges["db_pool_target_size"].append(f"{{{pool}}} {stats.target_size}")
+            gauges["db_pool_waiting"].append(f"{{{pool}}} {stats.waiting_count}")
+            gauges["db_pool_saturation"].append(f"{{{pool}}} {stats.saturation}")
+            counters["db_pool_connections_created_total"].append(f"{{{pool}}} {stats.total_connections_created}")
+            counters["db_pool_connections_closed_total"].append(f"{{{pool}}} {stats.total_connections_closed}")
+            
+            metrics = self.metrics.get(name)
+            if metrics is None:
+                continue
+            counters["db_pool_acquires_total"].append(f"{{{pool}}} {metrics.acquires}")
+            counters["db_pool_acquire_timeouts_total"].append(f"{{{pool}}} {metrics.timeouts}")
+            counters["db_pool_acquire_failures_total"].append(f"{{{pool}}} {metrics.failures}")
+            for caller, (count, wait_ms, held_ms) in sorted(metrics.callers.items()):
+                labels = f'{{{pool},caller="{_escape_label(caller)}"}}'
+                counters["db_pool_caller_acquires_total"].append(f"{labels} {int(count)}")
+                counters["db_pool_caller_wait_seconds_total"].append(f"{labels} {wait_ms / 1000:.6f}")
+                counters["db_pool_caller_hold_seconds_total"].append(f"{labels} {held_ms / 1000:.6f}")
+            histograms["db_pool_acquire_wait_seconds"].extend(_histogram_lines(metrics.acquire_wait, pool))
+            histograms["db_pool_checkout_seconds"].extend(_histogram_lines(metrics.checkout_time, pool))
+        
+        lines: List[str] = []
+        for kind, families in (("gauge", gauges), ("counter", counters), ("histogram", histograms)):
+            for family, samples in families.items():
+                if not samples:
+                    continue
+                lines.append(f"# TYPE {family} {kind}")
+                lines.extend(f"{family}{sample}" for sample in samples)
+        return "\n".join(lines) + "\n"
+    
+    def enable_adaptive_sizing(self, **kwargs) -> "AdaptivePoolController":
+        """
+        Start resizing registered pools from their observed wait times.
+        
+        Args:
+            **kwargs: Passed to AdaptivePoolController
+        """
+        if self.controller is None:
+            self.controller = AdaptivePoolController(self, **kwargs)
+            self.controller.start()
+        return self.controller
+    
     async def health_check(self) -> Dict[str, bool]:
         """
         Check health of all pools.
@@ -144,6 +564,9 @@ class ConnectionPoolManager:
     
     async def close_all(self):
         """Close all connection pools."""
+        if self.controller is not None:
+            await self.controller.stop()
+            self.controller = None
         for name, pool in self.pools.items():
             try:
                 if hasattr(pool, 'close'):
@@ -153,6 +576,118 @@ class ConnectionPoolManager:
                 logger.error(f"Error closing pool {name}: {e}")
 
 
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(histogram: Histogram, pool: str) -> List[str]:
+    """Cumulative Prometheus buckets, converted from ms to seconds"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'_bucket{{{pool},le="{bound / 1000:g}"}} {cumulative}')
+    lines.append(f'_bucket{{{pool},le="+Inf"}} {histogram.count}')
+    lines.append(f"_sum{{{pool}}} {histogram.total_ms / 1000:.6f}")
+    lines.append(f"_count{{{pool}}} {histogram.count}")
+    return lines
+
+
+class AdaptivePoolController:
+    """
+    Resizes pools within their PoolConfig bounds from observed acquire waits.
+    
+    Every interval, per pool with a registered resizer:
+    - grow by ``step`` when a checkout timed out or p95 wait reached
+      ``grow_wait_ms``
+    - shrink by ``step`` when p95 wait stayed under ``shrink_wait_ms``
+      and peak usage left at least ``step`` connections unused
+    Pools start at their configured max_size.
+    """
+    
+    def __init__(
+        self,
+        manager: ConnectionPoolManager,
+        interval: float = ADAPTIVE_INTERVAL_SECONDS,
+        grow_wait_ms: float = ADAPTIVE_GROW_WAIT_MS,
+        shrink_wait_ms: float = ADAPTIVE_SHRINK_WAIT_MS,
+        step: Optional[int] = None
+    ):
+        self.manager = manager
+        self.interval = interval
+        self.grow_wait_ms = grow_wait_ms
+        self.shrink_wait_ms = shrink_wait_ms
+        self.step = step
+        self._last: Dict[str, Tuple[List[int], int]] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.adjust()
+            except Exception as e:
+                logger.error(f"Adaptive pool sizing failed: {e}")
+    
+    async def adjust(self) -> Dict[str, int]:
+        """
+        Run one sizing round.
+        
+        Returns:
+            Dict of pool name to new size, for pools that changed
+        """
+        changes = {}
+        for name, resize in list(self.manager.resizers.items()):
+            metrics = self.manager.metrics.get(name)
+            if metrics is None:
+                continue
+            previous = metrics.target_size or metrics.config.max_size
+            target = self.evaluate(metrics)
+            if target is None:
+                continue
+            result = resize(target)
+            if inspect.isawaitable(result):
+                await result
+            metrics.target_size = target
+            changes[name] = target
+            logger.info(f"Resized pool {name}: {previous} -> {target}")
+        return changes
+    
+    def evaluate(self, metrics: PoolMetrics) -> Optional[int]:
+        """New size for a pool from the window since the last call, or None to keep it"""
+        counts = metrics.acquire_wait.snapshot()
+        timeouts = metrics.timeouts
+        since, last_timeouts = self._last.get(metrics.name, (None, 0))
+        self._last[metrics.name] = (counts, timeouts)
+        peak = metrics.take_peak()
+        
+        config = metrics.config
+        current = metrics.target_size or config.max_size
+        step = self.step or max(1, (config.max_size - config.min_size) // 4)
+        p95 = metrics.acquire_wait.quantile(0.95, since=since)
+        
+        if timeouts > last_timeouts or p95 >= self.grow_wait_ms:
+            target = min(config.max_size, current + step)
+        elif p95 <= self.shrink_wait_ms and peak + step <= current:
+            target = max(config.min_size, current - step)
+        else:
+            return None
+        return target if target != current else None
+
+
 # ============================================================================
 # Global Pool Manager
 # ============================================================================
@@ -202,4 +737,10 @@ DEFAULT_REDIS_CONFIG = PoolConfig(
     max_lifetime_seconds=3600,
     connect_timeout_seconds=5,
     command_timeout_seconds=10
-)
\ No newline at end of file
+)
+
+DEFAULT_CONFIGS: Dict[PoolType, PoolConfig] = {
+    PoolType.POSTGRES: DEFAULT_POSTGRES_CONFIG,
+    PoolType.MONGODB: DEFAULT_MONGODB_CONFIG,
+    PoolType.REDIS: DEFAULT_REDIS_CONFIG,
+}
@@ -8,10 +8,13 @@ from .query_optimizer import QueryOptimizer
 from .index_manager import IndexManager
 from .performance_monitor import PerformanceMonitor
 from .query_analyzer import QueryAnalyzer
+from .query_registry import QueryRegistry, get_query_registry
 
 __all__ = [
     'QueryOptimizer',
     'IndexManager',
     'PerformanceMonitor',
-    'QueryAnalyzer'
+    'QueryAnalyzer',
+    'QueryRegistry',
+    'get_query_registry'
 ]
@@ -8,7 +8,9 @@ from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import asyncio
+import re
 
+from core.db.optimization.query_registry import QueryRegistry, get_query_registry
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -60,8 +62,9 @@ class IndexDefinition:
 class IndexManager:
     """Manages database indexes"""
     
-    def __init__(self, postgres_adapter):
+    def __init__(self, postgres_adapter, query_registry: Optional[QueryRegistry] = None):
         self.postgres = postgres_adapter
+        self.query_registry = query_registry or get_query_registry()
         self._index_cache: Dict[str, IndexDefinition] = {}
     
     async def create_index(self, index_def: IndexDefinition, concurrent: bool = True) -> bool:
@@ -144,7 +147,7 @@ class IndexManager:
             ORDER BY indexname
         """
         
-        results = await self.postgres.fetch_all(query, table)
+        results = await self.postgres.fetch_many(query, table)
         
         indexes = []
         for row in results:
@@ -401,7 +404,7 @@ class IndexManager:
         Returns:
             List of index recommendations
         """
-        recommendations = []
+        recommendations = await self._traffic_recommendations()
         
         # Analyze missing indexes
         query = """
@@ -454,3 +457,40 @@ class IndexManager:
                     })
         
         return recommendations
+    
+    async def _traffic_recommendations(self, min_calls: int = 10) -> List[Dict[str, Any]]:
+        """
+        Recommendations from the query registry's observed WHERE columns,
+        skipping column sets an existing index already leads with
+        """
+        recommendations = []
+        existing: Dict[str, List[List[str]]] = {}
+        
+        for candidate in self.query_registry.index_candidates(min_calls=min_calls):
+            if candidate.table not in existing:
+                existing[candidate.table] = [
+                    _index_columns(idx['definition'])
+                    for idx in await self.get_table_indexes(candidate.table)
+                ]
+            if any(cols[:len(candidate.columns)] == candidate.columns for cols in existing[candidate.table]):
+                continue
+            
+            recommendations.append({
+                'table': candidate.table,
+                'columns': candidate.columns,
+                'reason': 'Sequential scan on observed traffic' if candidate.seq_scan else 'Observed query filters',
+                'impact': candidate.impact,
+                'estimated_queries': candidate.calls,
+                'total_ms': round(candidate.total_ms, 3),
+                'queries': candidate.fingerprints[:5]
+            })
+        
+        return recommendations
+
+
+def _index_columns(definition: str) -> List[str]:
+    """Key columns of a CREATE INDEX statement, e.g. ["user_id", "expires_at"]"""
+    match = re.search(r"\((.*?)\)(?:\s+INCLUDE|\s+WHERE|$)", definition)
+    if not match:
+        return []
+    return [col.strip().split()[0].strip('"') for col in match.group(1).split(",")]
@@ -35,6 +35,9 @@ class SlowQuery:
     rows_returned: int
     database: str
     user: str
+    fingerprint: str = ""
+    caller: str = ""
+    plan: Optional[Dict[str, Any]] = None
 
 
 class PerformanceMonitor:
@@ -286,9 +289,17 @@ class PerformanceMonitor:
         Returns:
             List of slow queries
         """
-        # This would require logging configuration
-        # For now, return empty list
-        return []
+        # Filled by PostgresAdapter through the query registry; imported
+        # here because query_registry imports SlowQuery from this module
+        from core.db.optimization.query_registry import get_query_registry
+        
+        cutoff = datetime.utcnow() - timedelta(minutes=duration_minutes)
+        threshold = self.alert_thresholds['slow_query_seconds']
+        self.slow_queries = [
+            q for q in get_query_registry().slow_queries
+            if q.timestamp > cutoff and q.duration >= threshold
+        ]
+        return self.slow_queries
     
     async def get_performance_report(self, hours: int = 24) -> Dict[str, Any]:
         """
@@ -302,6 +313,7 @@ class PerformanceMonitor:
         """
         # Collect current metrics
         current_metrics = await self.collect_metrics()
+        await self.monitor_slow_queries(duration_minutes=hours * 60)
         
         # Get historical metrics
         cutoff = datetime.utcnow() - timedelta(hours=hours)
@@ -330,9 +342,38 @@ class PerformanceMonitor:
             'trends': trends,
             'alerts': alerts,
             'slow_queries': len(self.slow_queries),
+            'top_queries': self.get_top_queries(),
             'recommendations': self._generate_recommendations(current_metrics)
         }
     
+    def get_top_queries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Heaviest query shapes seen by this process, by total time
+        
+        Args:
+            limit: Number of fingerprints to return
+            
+        Returns:
+            Per-fingerprint call counts, latencies and top callers
+        """
+        from core.db.optimization.query_registry import get_query_registry
+        
+        return [
+            {
+                'fingerprint': stats.fingerprint,
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'total_ms': round(stats.total_ms, 3),
+                'mean_ms': round(stats.mean_ms, 3),
+                'p95_ms': stats.p95_ms,
+                'max_ms': round(stats.max_ms, 3),
+                'rows_per_call': round(stats.rows_per_call, 2),
+                'callers': sorted(stats.callers, key=stats.callers.get, reverse=True)[:3],
+                'seq_scans': stats.plan.seq_scans if stats.plan else None,
+            }
+            for stats in get_query_registry().top(limit)
+        ]
+    
     def _generate_alerts(self, metrics: Dict[str, Any]) -> List[Dict[str, str]]:
         """Generate alerts based on metrics"""
         alerts = []
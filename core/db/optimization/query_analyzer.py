@@ -8,6 +8,7 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+from core.db.optimization.query_registry import QueryRegistry, get_query_registry
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -45,8 +46,9 @@ class IndexRecommendation:
 class QueryAnalyzer:
     """Analyzes database queries for performance issues"""
     
-    def __init__(self, postgres_adapter):
+    def __init__(self, postgres_adapter, query_registry: Optional[QueryRegistry] = None):
         self.postgres = postgres_adapter
+        self.query_registry = query_registry or get_query_registry()
         self.slow_query_threshold = 1.0  # seconds
         self.inefficiency_threshold = 0.1  # 10% efficiency threshold
     
@@ -91,6 +93,68 @@ class QueryAnalyzer:
         
         return metrics
     
+    def analyze_recent_queries(self, limit: int = 20, by: str = "total_ms") -> List[QueryMetric]:
+        """
+        Heaviest query shapes recorded by this process's PostgresAdapters
+        
+        Unlike analyze_slow_queries this needs no pg_stat_statements; the
+        index used and rows examined are filled in where a sampled
+        EXPLAIN ANALYZE plan exists.
+        
+        Args:
+            limit: Number of fingerprints to return
+            by: QueryStats attribute to rank on
+            
+        Returns:
+            List of query metrics (execution_time is the mean, in ms)
+        """
+        metrics = []
+        for stats in self.query_registry.top(limit, by=by):
+            plan = stats.plan
+            rows_examined = stats.rows
+            if plan is not None and plan.analyzed:
+                rows_examined = sum(
+                    node.get("Actual Rows", 0) * node.get("Actual Loops", 1)
+                    + node.get("Rows Removed by Filter", 0)
+                    for node in _scan_nodes(plan.plan["Plan"])
+                ) * stats.calls
+            metrics.append(QueryMetric(
+                query=stats.fingerprint,
+                execution_time=stats.mean_ms,
+                rows_examined=rows_examined,
+                rows_returned=stats.rows,
+                index_used=plan.indexes_used[0] if plan and plan.indexes_used else None,
+                timestamp=datetime.utcnow()
+            ))
+        return metrics
+    
+    def get_traffic_index_recommendations(self, min_calls: int = 10) -> List[IndexRecommendation]:
+        """
+        Index recommendations from the WHERE clauses of recorded traffic
+        
+        Args:
+            min_calls: Ignore column sets filtered on fewer times than this,
+                unless a captured plan showed a sequential scan
+            
+        Returns:
+            List of index recommendations, heaviest first
+        """
+        return [
+            IndexRecommendation(
+                table=candidate.table,
+                columns=candidate.columns,
+                index_type='btree',
+                estimated_impact=candidate.impact,
+                query_count=candidate.calls,
+                reason=(
+                    f"Filtered on by {len(candidate.fingerprints)} query shape(s), "
+                    f"{candidate.total_ms:.0f} ms total"
+                    + ("; sequential scan in captured plan" if candidate.seq_scan else "")
+                )
+            )
+            for candidate in self.query_registry.index_candidates(min_calls=min_calls)
+        ]
+    
     async def get_missing_indexes(self) -> List[IndexRecommendation]:
         """
         Identify potential missing indexes based on query patterns
@@ -98,7 +162,7 @@ class QueryAnalyzer:
         Returns:
             List of index recommendations
         """
-        recommendations = []
+        recommendations = self.get_traffic_index_recommendations()
         
         # Get queries that would benefit from indexes
         query = """
@@ -377,3 +441,11 @@ class QueryAnalyzer:
         }
         
         return stats
+
+
+def _scan_nodes(node: Dict[str, Any]):
+    """Plan nodes that read a relation"""
+    if "Relation Name" in node:
+        yield node
+    for child in node.get("Plans", ()):
+        yield from _scan_nodes(child)
@@ -0,0 +1,379 @@
+"""
+Query Registry
+
+Client-side query statistics recorded by PostgresAdapter.
+
+Every statement is reduced to a fingerprint (literals and parameters
+replaced, whitespace collapsed) and counted against it: calls, errors,
+latency histogram, rows and the code paths that issued it. Statements
+slower than DB_SLOW_QUERY_MS are kept in a bounded slow-query log, and a
+sample of slow reads is re-run under EXPLAIN (ANALYZE, BUFFERS) so the
+plan is on hand; reads that call functions, which may write, only get a
+plain EXPLAIN. top() and index_candidates() feed QueryAnalyzer,
+PerformanceMonitor and IndexManager from real traffic rather than
+pg_stat_statements alone.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+from core.db.connection_pool import Histogram
+from core.db.optimization.performance_monitor import SlowQuery
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+QUERY_STATS_ENABLED = os.getenv("DB_QUERY_STATS", "true").lower() in ("1", "true", "yes")
+# Statements at or above this many milliseconds go to the slow-query log
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+# Share of slow reads re-run under EXPLAIN ANALYZE, and the minimum
+# seconds between two plans for the same fingerprint
+EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_EXPLAIN_SAMPLE_RATE", "0.05"))
+EXPLAIN_INTERVAL_SECONDS = float(os.getenv("DB_EXPLAIN_INTERVAL", "300"))
+
+# Distinct fingerprints tracked; later ones are counted under "other"
+MAX_TRACKED_QUERIES = 500
+MAX_CALLERS_PER_QUERY = 20
+SLOW_QUERY_LOG_SIZE = 200
+OTHER_FINGERPRINT = "other"
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"\$\d+")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST = re.compile(r"\bvalues\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_FROM_TABLE = re.compile(r"\b(?:from|update)\s+([a-z_][\w.]*)")
+_JOIN = re.compile(r"\bjoin\b")
+_LOCKING = r"\bfor\s+(?:update|no\s+key\s+update|share|key\s+share)\b"
+_WHERE = re.compile(r"\bwhere\b(.*?)(?:\border\s+by\b|\bgroup\s+by\b|\blimit\b|\boffset\b|\breturning\b|" + _LOCKING + "|$)")
+_EQUALITY = re.compile(r"([a-z_][\w.]*)\s*(?:=(?!\s*any)|\bis\b|\bin\b)")
+_RANGE = re.compile(r"([a-z_][\w.]*)\s*(?:<=|>=|<>|!=|<|>|\blike\b|\bilike\b|=\s*any\b)")
+_NOT_COLUMNS = {"and", "or", "not", "null", "true", "false"}
+
+_CALL = re.compile(r"\b([a-z_][\w.]*)\s*\(")
+# Keywords that take a parenthesised list, and built-in functions without
+# side effects; any other name followed by "(" may write (nextval(), user functions)
+_SAFE_CALLS = frozenset({
+    "select", "from", "join", "on", "using", "where", "and", "or", "not", "as", "with",
+    "in", "any", "all", "exists", "values", "row", "array", "cast", "over", "filter",
+    "by", "when", "then", "else", "lateral", "distinct",
+    "count", "sum", "avg", "min", "max", "array_agg", "string_agg", "json_agg", "jsonb_agg",
+    "bool_and", "bool_or", "coalesce", "nullif", "greatest", "least", "lower", "upper",
+    "length", "abs", "round", "extract", "date_trunc", "to_char", "now", "unnest",
+    "row_number", "rank", "dense_rank", "json_build_object", "jsonb_build_object",
+})
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """
+    Normalize a statement so that calls differing only in literal values
+    share one entry, e.g. "SELECT * FROM users WHERE id = $1" and
+    "select * from users where id = 42" both become
+    "select * from users where id = ?".
+    """
+    text = _COMMENT.sub(" ", query)
+    text = _STRING.sub("?", text)
+    text = _PARAM.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip().lower()
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("in (...)", text)
+    text = _VALUES_LIST.sub(r"values \1, ...", text)
+    return text.rstrip(";").strip()
+
+
+def _is_read(fp: str) -> bool:
+    """Whether the statement only reads: no writes, row locks or SELECT INTO."""
+    if fp.startswith("select"):
+        return not re.search(_LOCKING, fp) and " into " not in fp
+    if fp.startswith("with"):
+        return not re.search(r"\b(insert|update|delete)\b", fp)
+    return False
+
+
+def _can_analyze(fp: str) -> bool:
+    """Whether EXPLAIN ANALYZE, which executes the statement, is safe to run."""
+    return _is_read(fp) and all(name in _SAFE_CALLS for name in _CALL.findall(fp))
+
+
+@lru_cache(maxsize=4096)
+def filter_columns(fp: str) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """
+    Table and WHERE-clause columns of a single-table statement.
+
+    Equality columns come first, then range ones, which is the column
+    order a btree index serving the statement should have. Statements
+    with joins return (None, ()), since which table a column belongs to
+    can't be told from the text.
+    """
+    table = _FROM_TABLE.search(fp)
+    where = _WHERE.search(fp)
+    if not table or not where or _JOIN.search(fp):
+        return None, ()
+    clause = where.group(1)
+    equality = [c for c in _EQUALITY.findall(clause) if c not in _NOT_COLUMNS]
+    ranged = [c for c in _RANGE.findall(clause) if c not in _NOT_COLUMNS]
+    columns: List[str] = []
+    for column in equality + ranged:
+        column = column.rsplit(".", 1)[-1]
+        if column not in columns:
+            columns.append(column)
+    return table.group(1).rsplit(".", 1)[-1], tuple(columns[:3])
+
+
+def _plan_nodes(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+@dataclass
+class QueryPlan:
+    """Summary of one EXPLAIN run; timings and buffers only when ``analyzed``."""
+    captured_at: datetime
+    execution_ms: float
+    seq_scans: List[str]
+    indexes_used: List[str]
+    shared_hit_blocks: int
+    shared_read_blocks: int
+    plan: Dict[str, Any]
+    analyzed: bool = True
+
+    @classmethod
+    def from_explain(cls, explain: Dict[str, Any], analyzed: bool = True) -> "QueryPlan":
+        root = explain["Plan"]
+        nodes = list(_plan_nodes(root))
+        return cls(
+            captured_at=datetime.utcnow(),
+            execution_ms=explain.get("Execution Time", 0.0),
+            seq_scans=[n["Relation Name"] for n in nodes if n.get("Node Type") == "Seq Scan" and "Relation Name" in n],
+            indexes_used=[n["Index Name"] for n in nodes if "Index Name" in n],
+            shared_hit_blocks=root.get("Shared Hit Blocks", 0),
+            shared_read_blocks=root.get("Shared Read Blocks", 0),
+            plan=explain,
+            analyzed=analyzed,
+        )
+
+
+@dataclass
+class QueryStats:
+    """Counters for one query fingerprint."""
+    fingerprint: str
+    sample: str
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    max_ms: float = 0.0
+    latency: Histogram = field(default_factory=Histogram)
+    callers: Dict[str, int] = field(default_factory=dict)
+    plan: Optional[QueryPlan] = None
+    last_explain: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.latency.total_ms
+
+    @property
+    def mean_ms(self) -> float:
+        return self.latency.total_ms / self.latency.count if self.latency.count else 0.0
+
+    @property
+    def p95_ms(self) -> float:
+        return self.latency.quantile(0.95)
+
+    @property
+    def rows_per_call(self) -> float:
+        return self.rows / self.calls if self.calls else 0.0
+
+
+@dataclass
+class IndexCandidate:
+    """Columns that observed traffic filters a table on."""
+    table: str
+    columns: List[str]
+    calls: int
+    total_ms: float
+    seq_scan: bool
+    fingerprints: List[str]
+
+    @property
+    def impact(self) -> str:
+        if self.seq_scan or self.total_ms / max(self.calls, 1) >= SLOW_QUERY_MS:
+            return "High"
+        return "Medium"
+
+
+class QueryRegistry:
+    """In-process per-fingerprint statistics, slow-query log and sampled plans."""
+
+    def __init__(
+        self,
+        slow_query_ms: float = SLOW_QUERY_MS,
+        explain_sample_rate: float = EXPLAIN_SAMPLE_RATE,
+        explain_interval: float = EXPLAIN_INTERVAL_SECONDS,
+        max_queries: int = MAX_TRACKED_QUERIES
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval = explain_interval
+        self.max_queries = max_queries
+        self.queries: Dict[str, QueryStats] = {}
+        self.slow_queries: Deque[SlowQuery] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._explains: Set[asyncio.Task] = set()
+
+    def record(
+        self,
+        query: str,
+        elapsed_ms: float,
+        rows: int,
+        caller: str,
+        error: bool = False,
+        adapter: Any = None,
+        args: Sequence[Any] = ()
+    ):
+        """
+        Count one statement.
+
+        ``adapter`` and ``args`` are only needed to capture a plan: when
+        the statement is a slow read and wins the EXPLAIN sample, it is
+        re-run under EXPLAIN ANALYZE in the background on ``adapter``
+        (plain EXPLAIN if it calls functions that might write).
+        """
+        fp = fingerprint(query)
+        stats = self.queries.get(fp)
+        if stats is None:
+            if len(self.queries) >= self.max_queries:
+                fp = OTHER_FINGERPRINT
+                stats = self.queries.get(fp)
+            if stats is None:
+                stats = self.queries[fp] = QueryStats(fp, query)
+
+        stats.calls += 1
+        stats.rows += rows
+        stats.latency.observe(elapsed_ms)
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if error:
+            stats.errors += 1
+        if caller in stats.callers or len(stats.callers) < MAX_CALLERS_PER_QUERY:
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+
+        if elapsed_ms < self.slow_query_ms or error:
+            return
+
+        dsn = urlparse(getattr(adapter, "connection_string", "") or "")
+        self.slow_queries.append(SlowQuery(
+            query=query,
+            duration=elapsed_ms / 1000,
+            timestamp=datetime.utcnow(),
+            rows_examined=0,
+            rows_returned=rows,
+            database=dsn.path.lstrip("/"),
+            user=dsn.username or "",
+            fingerprint=fp,
+            caller=caller,
+        ))
+
+        if adapter is not None and self._should_explain(stats):
+            stats.last_explain = time.monotonic()
+            task = asyncio.ensure_future(self._capture_plan(adapter, stats, query, args))
+            self._explains.add(task)
+            task.add_done_callback(self._explains.discard)
+
+    def _should_explain(self, stats: QueryStats) -> bool:
+        if self.explain_sample_rate <= 0 or stats.fingerprint == OTHER_FINGERPRINT:
+            return False
+        if not _is_read(stats.fingerprint):
+            return False
+        if stats.last_explain and time.monotonic() - stats.last_explain < self.explain_interval:
+            return False
+        return random.random() < self.explain_sample_rate
+
+    async def _capture_plan(self, adapter: Any, stats: QueryStats, query: str, args: Sequence[Any]):
+        analyze = _can_analyze(stats.fingerprint)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        try:
+            async with adapter.acquire(caller=f"{__name__}:explain") as conn:
+                raw = await conn.fetchval(f"EXPLAIN ({options}) {query}", *args)
+            explain = json.loads(raw) if isinstance(raw, str) else raw
+            stats.plan = QueryPlan.from_explain(explain[0], analyzed=analyze)
+        except Exception as e:
+            logger.warning(f"EXPLAIN failed for {stats.fingerprint[:80]}: {e}")
+            return
+
+        for slow in reversed(self.slow_queries):
+            if slow.fingerprint == stats.fingerprint:
+                slow.plan = stats.plan.plan
+                break
+
+    def top(self, n: int = 10, by: str = "total_ms") -> List[QueryStats]:
+        """
+        Busiest fingerprints.
+
+        Args:
+            n: How many to return
+            by: QueryStats attribute to rank on (total_ms, mean_ms, p95_ms, calls, rows, errors)
+        """
+        return sorted(self.queries.values(), key=lambda s: getattr(s, by), reverse=True)[:n]
+
+    def index_candidates(self, min_calls: int = 10, limit: int = 20) -> List[IndexCandidate]:
+        """
+        Table/column sets that traffic filters on, heaviest first.
+
+        Statements are grouped by (table, WHERE columns); a group is
+        marked seq_scan when a captured plan for any of its statements
+        scanned that table sequentially.
+        """
+        groups: Dict[Tuple[str, Tuple[str, ...]], IndexCandidate] = {}
+        for stats in self.queries.values():
+            table, columns = filter_columns(stats.fingerprint)
+            if not table or not columns:
+                continue
+            candidate = groups.get((table, columns))
+            if candidate is None:
+                candidate = groups[(table, columns)] = IndexCandidate(table, list(columns), 0, 0.0, False, [])
+            candidate.calls += stats.calls
+            candidate.total_ms += stats.total_ms
+            candidate.fingerprints.append(stats.fingerprint)
+            if stats.plan is not None and table in stats.plan.seq_scans:
+                candidate.seq_scan = True
+
+        candidates = [c for c in groups.values() if c.calls >= min_calls or c.seq_scan]
+        candidates.sort(key=lambda c: (c.seq_scan, c.total_ms), reverse=True)
+        return candidates[:limit]
+
+    def reset(self):
+        self.queries.clear()
+        self.slow_queries.clear()
+
+
+# ============================================================================
+# Global Query Registry
+# ============================================================================
+
+_query_registry: Optional[QueryRegistry] = None
+
+
+def get_query_registry() -> QueryRegistry:
+    """
+    Get global query registry.
+
+    Returns:
+        QueryRegistry instance
+    """
+    global _query_registry
+    if _query_registry is None:
+        _query_registry = QueryRegistry()
+    return _query_registry
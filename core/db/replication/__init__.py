@@ -4,12 +4,18 @@ Database Replication
 Provides read replica support for scaling.
 """
 
-from .replication_manager import ReplicationManager
-from .read_replica_router import ReadReplicaRouter
-from .replication_monitor import ReplicationMonitor
+from .read_replica_router import (
+    ReadReplicaRouter,
+    ReplicaInfo,
+    ReplicaType,
+    configure_read_router,
+    get_read_router,
+)
 
 __all__ = [
-    'ReplicationManager',
     'ReadReplicaRouter',
-    'ReplicationMonitor'
+    'ReplicaInfo',
+    'ReplicaType',
+    'configure_read_router',
+    'get_read_router',
 ]
@@ -2,21 +2,65 @@
 Read Replica Router
 
 Routes database operations between primary and read replicas.
+
+Reads go to the healthy replica with the fewest requests in flight
+(scaled by weight), skipping replicas whose replay lag is above
+DB_REPLICA_MAX_LAG seconds and replicas whose circuit is open after
+repeated connection failures. A write through the primary adapter pins
+the writing user's reads to the primary for DB_READ_YOUR_WRITES_MS, so
+they see their own changes before the replicas catch up.
 """
 
+import os
 import random
 import time
-from typing import List, Optional, Dict, Any
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
 import asyncio
 
+import asyncpg
+
 from core.db.adapters.postgres_adapter import PostgresAdapter
 from core.db.config import DatabaseConfig
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+READ_YOUR_WRITES_MS = int(os.getenv("DB_READ_YOUR_WRITES_MS", "1000"))
+FAILURE_THRESHOLD = 3
+CIRCUIT_COOLDOWN_SECONDS = 30.0
+
+# Errors that say the replica itself is unusable (as opposed to a bad query)
+REPLICA_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.CannotConnectNowError,
+)
+
+# Read-your-writes deadline for work without a user (jobs, scripts)
+_write_deadline: ContextVar[float] = ContextVar("replica_write_deadline", default=0.0)
+
+# Lag in seconds; 0 when the replica has replayed everything it received,
+# since replay_timestamp alone keeps growing on an idle primary
+LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM (NOW() - pg_last_xact_replay_timestamp()))
+    END AS lag
+"""
+
+
+def _current_user_id() -> Optional[int]:
+    # Imported lazily: core.services imports core.db
+    from core.services.auth.context import current_user_context
+    context = current_user_context.get()
+    return context.user_id if context else None
+
 
 class ReplicaType(Enum):
     """Replica types"""
@@ -39,17 +83,50 @@ class ReplicaInfo:
     last_check: float = 0
     lag_seconds: float = 0
     connection_pool: Optional[PostgresAdapter] = None
+    # Routing state
+    outstanding: int = 0
+    failures: int = 0
+    circuit_open_until: float = 0
+    
+    @property
+    def dsn(self) -> str:
+        return f"postgresql://{self.username}:{self.password}@{self.host}:{self.port}/{self.database}"
 
 
 class ReadReplicaRouter:
     """Routes queries to appropriate database replicas"""
     
-    def __init__(self, primary_config: DatabaseConfig):
+    def __init__(
+        self,
+        primary_config: DatabaseConfig,
+        primary_adapter: Optional[PostgresAdapter] = None,
+        max_lag_seconds: float = MAX_LAG_SECONDS,
+        read_your_writes_ms: int = READ_YOUR_WRITES_MS,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        circuit_cooldown: float = CIRCUIT_COOLDOWN_SECONDS
+    ):
+        """
+        Initialize router.
+        
+        Args:
+            primary_config: Primary database configuration
+            primary_adapter: Existing primary adapter to share (not closed by close())
+            max_lag_seconds: Replicas lagging more than this are skipped
+            read_your_writes_ms: How long a writer's reads stay on the primary
+            failure_threshold: Consecutive connection failures that open a replica's circuit
+            circuit_cooldown: Seconds before an open circuit lets a trial request through
+        """
         self.primary_config = primary_config
         self.replicas: List[ReplicaInfo] = []
-        self.primary_adapter: Optional[PostgresAdapter] = None
+        self.primary_adapter: Optional[PostgresAdapter] = primary_adapter
+        self._owns_primary = primary_adapter is None
+        self.max_lag_seconds = max_lag_seconds
+        self.read_your_writes = read_your_writes_ms / 1000.0
+        self.failure_threshold = failure_threshold
+        self.circuit_cooldown = circuit_cooldown
         self.health_check_interval = 30  # seconds
         self.health_check_task: Optional[asyncio.Task] = None
+        self._recent_writers: Dict[int, float] = {}
         self._initialized = False
     
     async def initialize(self):
@@ -58,38 +135,39 @@ class ReadReplicaRouter:
             return
         
         # Initialize primary connection
-        self.primary_adapter = PostgresAdapter(self.primary_config)
+        if self.primary_adapter is None:
+            self.primary_adapter = PostgresAdapter(self.primary_config.connection_string)
+        self.primary_adapter.write_listeners.append(self.note_write)
         
         # Initialize replica connections
         for replica in self.replicas:
-            replica_config = DatabaseConfig(
-                host=replica.host,
-                port=replica.port,
-                database=replica.database,
-                username=replica.username,
-                password=replica.password
-            )
-            replica.connection_pool = PostgresAdapter(replica_config)
+            if replica.connection_pool is None:
+                replica.connection_pool = PostgresAdapter(replica.dsn)
+        
+        self._initialized = True
         
         # Start health checks
         self.health_check_task = asyncio.create_task(self._health_check_loop())
         
-        self._initialized = True
         logger.info(f"Read replica router initialized with {len(self.replicas)} replicas")
     
     async def close(self):
         """Close all connections"""
-        if self.primary_adapter:
-            await self.primary_adapter.close()
-        
-        for replica in self.replicas:
-            if replica.connection_pool:
-                await replica.connection_pool.close()
+        self._initialized = False
         
         if self.health_check_task:
             self.health_check_task.cancel()
+            self.health_check_task = None
         
-        self._initialized = False
+        if self.primary_adapter:
+            if self.note_write in self.primary_adapter.write_listeners:
+                self.primary_adapter.write_listeners.remove(self.note_write)
+            if self._owns_primary:
+                await self.primary_adapter.disconnect()
+        
+        for replica in self.replicas:
+            if replica.connection_pool:
+                await replica.connection_pool.disconnect()
     
     def add_replica(self, replica: ReplicaInfo):
         """
@@ -121,9 +199,56 @@ class ReadReplicaRouter:
         
         return self.primary_adapter
     
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    
+    def note_write(self):
+        """
+        Record a write by the current request.
+        
+        Called by the primary adapter after every write. The current
+        user's reads stay on the primary for read_your_writes seconds.
+        """
+        deadline = time.monotonic() + self.read_your_writes
+        _write_deadline.set(deadline)
+        user_id = _current_user_id()
+        if user_id is not None:
+            if len(self._recent_writers) > 10000:
+                now = time.monotonic()
+                self._recent_writers = {u: d for u, d in self._recent_writers.items() if d > now}
+            self._recent_writers[user_id] = deadline
+    
+    def reads_pinned_to_primary(self) -> bool:
+        """Whether the current request wrote recently enough to need the primary."""
+        now = time.monotonic()
+        if _write_deadline.get() > now:
+            return True
+        user_id = _current_user_id()
+        return user_id is not None and self._recent_writers.get(user_id, 0.0) > now
+    
+    def _available(self, replica: ReplicaInfo, now: float) -> bool:
+        return (
+            replica.is_healthy
+            and replica.replica_type == ReplicaType.READ_ONLY
+            and replica.connection_pool is not None
+            and replica.weight > 0
+            and replica.lag_seconds <= self.max_lag_seconds
+            and replica.circuit_open_until <= now
+        )
+    
+    def _select_replica(self) -> Optional[ReplicaInfo]:
+        """Least outstanding requests per unit of weight, ties broken at random."""
+        now = time.monotonic()
+        candidates = [r for r in self.replicas if self._available(r, now)]
+        if not candidates:
+            return None
+        random.shuffle(candidates)
+        return min(candidates, key=lambda r: r.outstanding / r.weight)
+    
     def get_read_replica(self) -> Optional[PostgresAdapter]:
         """
-        Get a healthy read replica using weighted round-robin
+        Get the least loaded healthy read replica
         
         Returns:
             Read replica adapter or None if none available
@@ -131,29 +256,69 @@ class ReadReplicaRouter:
         if not self._initialized:
             return None
         
-        # Get healthy replicas
-        healthy_replicas = [r for r in self.replicas 
-                          if r.is_healthy and r.replica_type == ReplicaType.READ_ONLY]
-        
-        if not healthy_replicas:
-            logger.warning("No healthy read replicas available")
+        replica = self._select_replica()
+        if replica is None:
+            logger.debug("No eligible read replicas available")
             return None
+        return replica.connection_pool
+    
+    def _record_failure(self, replica: ReplicaInfo, error: Exception):
+        replica.failures += 1
+        if replica.failures >= self.failure_threshold:
+            replica.circuit_open_until = time.monotonic() + self.circuit_cooldown
+            logger.warning(
+                f"Replica {replica.id} circuit opened for {self.circuit_cooldown}s "
+                f"after {replica.failures} failures: {error}"
+            )
+    
+    async def _read(self, method: str, *args, **kwargs) -> Any:
+        """Run a read on a replica, falling back to the primary."""
+        replica = None
+        if self._initialized and not self.reads_pinned_to_primary():
+            replica = self._select_replica()
         
-        # Weighted selection
-        total_weight = sum(r.weight for r in healthy_replicas)
-        if total_weight == 0:
-            return None
-        
-        rand = random.uniform(0, total_weight)
-        current_weight = 0
-        
-        for replica in healthy_replicas:
-            current_weight += replica.weight
-            if rand <= current_weight:
-                return replica.connection_pool
+        if replica is not None:
+            replica.outstanding += 1
+            try:
+                result = await getattr(replica.connection_pool, method)(*args, **kwargs)
+            except REPLICA_ERRORS as e:
+                self._record_failure(replica, e)
+                logger.warning(f"Replica {replica.id} read failed, retrying on primary: {e}")
+            else:
+                replica.failures = 0
+                return result
+            finally:
+                replica.outstanding -= 1
         
-        # Fallback to first healthy replica
-        return healthy_replicas[0].connection_pool
+        return await getattr(self.primary_adapter, method)(*args, **kwargs)
+    
+    # Read API, mirroring PostgresAdapter so the router can stand in for it
+    async def fetch_one(self, query: str, *args, **kwargs) -> Optional[Dict]:
+        return await self._read("fetch_one", query, *args, **kwargs)
+    
+    async def fetch_many(self, query: str, *args, **kwargs) -> List[Dict]:
+        return await self._read("fetch_many", query, *args, **kwargs)
+    
+    async def fetch_record(self, query: str, *args, **kwargs) -> Optional[asyncpg.Record]:
+        return await self._read("fetch_record", query, *args, **kwargs)
+    
+    async def fetch_records(self, query: str, *args, **kwargs) -> List[asyncpg.Record]:
+        return await self._read("fetch_records", query, *args, **kwargs)
+    
+    async def stream(self, query: str, *args, **kwargs) -> AsyncIterator[asyncpg.Record]:
+        """Stream from one replica; not retried, since rows may already have been yielded."""
+        replica = None
+        if self._initialized and not self.reads_pinned_to_primary():
+            replica = self._select_replica()
+        adapter = replica.connection_pool if replica else self.primary_adapter
+        if replica:
+            replica.outstanding += 1
+        try:
+            async for record in adapter.stream(query, *args, **kwargs):
+                yield record
+        finally:
+            if replica:
+                replica.outstanding -= 1
     
     def get_all_replicas(self) -> List[PostgresAdapter]:
         """Get all healthy replica adapters"""
@@ -179,13 +344,7 @@ class ReadReplicaRouter:
         Returns:
             Query result
         """
-        adapter = self.get_read_replica()
-        if adapter:
-            return await adapter.execute(query, *args, **kwargs)
-        else:
-            # Fallback to primary
-            logger.warning("Falling back to primary for read query")
-            return await self.primary_adapter.execute(query, *args, **kwargs)
+        return await self._read("execute", query, *args, **kwargs)
     
     async def execute_write(self, query: str, *args, **kwargs) -> Any:
         """
@@ -213,13 +372,7 @@ class ReadReplicaRouter:
         Returns:
             Row data or None
         """
-        adapter = self.get_read_replica()
-        if adapter:
-            return await adapter.fetch_one(query, *args, **kwargs)
-        else:
-            # Fallback to primary
-            logger.warning("Falling back to primary for read query")
-            return await self.primary_adapter.fetch_one(query, *args, **kwargs)
+        return await self.fetch_one(query, *args, **kwargs)
     
     async def fetch_all_read(self, query: str, *args, **kwargs) -> List[Dict]:
         """
@@ -233,13 +386,7 @@ class ReadReplicaRouter:
         Returns:
             List of rows
         """
-        adapter = self.get_read_replica()
-        if adapter:
-            return await adapter.fetch_all(query, *args, **kwargs)
-        else:
-            # Fallback to primary
-            logger.warning("Falling back to primary for read query")
-            return await self.primary_adapter.fetch_all(query, *args, **kwargs)
+        return await self.fetch_many(query, *args, **kwargs)
     
     async def _health_check_loop(self):
         """Run periodic health checks"""
@@ -268,11 +415,11 @@ class ReadReplicaRouter:
                 # Check replication lag
                 lag = await self._get_replication_lag(replica)
                 
-                # Update health status
+                # Update health status; lag is applied at selection time
+                # against max_lag_seconds
                 replica.is_healthy = (
                     result is not None and
-                    response_time < 5.0 and  # 5 second threshold
-                    lag < 60  # 60 second lag threshold
+                    response_time < 5.0  # 5 second threshold
                 )
                 replica.last_check = time.time()
                 replica.lag_seconds = lag
@@ -287,12 +434,9 @@ class ReadReplicaRouter:
     async def _get_replication_lag(self, replica: ReplicaInfo) -> float:
         """Get replication lag in seconds"""
         try:
-            # Query pg_last_xact_replay_timestamp
-            result = await replica.connection_pool.fetch_one(
-                "SELECT EXTRACT(EPOCH FROM (NOW() - pg_last_xact_replay_timestamp())) as lag"
-            )
-            
-            return result.get('lag', 0) if result else 0
+            result = await replica.connection_pool.fetch_one(LAG_QUERY)
+            lag = result.get('lag') if result else None
+            return float(lag) if lag is not None else 0.0
             
         except Exception:
             # If query fails, assume high lag
@@ -316,7 +460,9 @@ class ReadReplicaRouter:
                 'weight': replica.weight,
                 'healthy': replica.is_healthy,
                 'lag_seconds': replica.lag_seconds,
-                'last_check': replica.last_check
+                'last_check': replica.last_check,
+                'outstanding': replica.outstanding,
+                'circuit_open': replica.circuit_open_until > time.monotonic()
             })
         
         return stats
@@ -371,3 +517,21 @@ class ReadReplicaRouter:
         except Exception as e:
             logger.error(f"Failed to promote replica {replica_id}: {e}")
             return False
+
+
+# ============================================================================
+# Global Router
+# ============================================================================
+
+_read_router: Optional[ReadReplicaRouter] = None
+
+
+def configure_read_router(router: Optional[ReadReplicaRouter]) -> None:
+    """Install (or with None, remove) the router used for repository and DBService reads."""
+    global _read_router
+    _read_router = router
+
+
+def get_read_router() -> Optional[ReadReplicaRouter]:
+    """Get the configured read router, if replicas are set up."""
+    return _read_router
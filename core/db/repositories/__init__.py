@@ -3,14 +3,18 @@ Repository Module Exports
 """
 from core.db.repositories.base_repository import (
     BaseRepository,
+    BatchLoader,
     PostgresRepository,
-    MongoRepository
+    MongoRepository,
+    batched_loads
 )
 from core.db.repositories.unit_of_work import UnitOfWork
 from core.db.repositories.user_repository import UserRepository
 
 __all__ = [
     'BaseRepository',
+    'BatchLoader',
+    'batched_loads',
     'PostgresRepository',
     'MongoRepository',
     'UnitOfWork',
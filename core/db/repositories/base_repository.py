@@ -5,13 +5,27 @@ Base Repository - Abstract foundation for all repositories
 Provides common CRUD patterns and transaction support.
 All domain repositories should extend this.
 """
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import time
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, Optional, List, Dict, Any, Type
-from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from typing import TypeVar, Generic, Optional, List, Dict, Any, Callable, Iterable, Iterator, NamedTuple, Set, Tuple, Type
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from uuid import UUID
+from bson import ObjectId
 from core.db.transaction_manager import TransactionManager
-from core.db.adapters.postgres_adapter import PostgresAdapter
+from core.db.adapters.postgres_adapter import PostgresAdapter, select_sql
 from core.db.adapters.mongodb_adapter import MongoDBAdapter
 from core.db.adapters.redis_adapter import RedisAdapter
+from core.db.replication.read_replica_router import get_read_router
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -19,6 +33,170 @@ logger = get_logger(__name__)
 # Generic type for model/entity
 T = TypeVar('T')
 
+# Read-through cache: seconds an entry is fresh, extra seconds it may be
+# served stale while one caller refreshes it, and the XFetch beta
+# (higher refreshes earlier; 0 disables early refresh)
+CACHE_TTL_SECONDS = int(os.getenv("REPO_CACHE_TTL", "300"))
+CACHE_STALE_SECONDS = int(os.getenv("REPO_CACHE_STALE_TTL", "60"))
+CACHE_XFETCH_BETA = float(os.getenv("REPO_CACHE_XFETCH_BETA", "1.0"))
+# Cross-process single-flight: hold a Redis lock while loading a missed key
+CACHE_LOCK = os.getenv("REPO_CACHE_LOCK", "false").lower() == "true"
+CACHE_LOCK_MS = int(os.getenv("REPO_CACHE_LOCK_MS", "3000"))
+CACHE_LOCK_POLL_SECONDS = 0.05
+
+# Loads in flight in this process, keyed by cache key
+_inflight: Dict[str, asyncio.Future] = {}
+# Background refreshes, held so they are not garbage collected mid-flight
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+class CacheEntry(NamedTuple):
+    """A cached row with its freshness deadline and observed load time."""
+    value: Dict[str, Any]
+    fresh_until: float
+    delta: float
+
+
+@dataclass
+class CacheStats:
+    """Read-through cache counters for one entity."""
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    coalesced: int = 0
+    early_refreshes: int = 0
+
+
+_cache_stats: Dict[str, CacheStats] = {}
+
+
+def get_cache_stats() -> Dict[str, CacheStats]:
+    """Read-through cache counters keyed by entity name."""
+    return dict(_cache_stats)
+
+
+def render_cache_metrics() -> str:
+    """Render cache counters in Prometheus text exposition format."""
+    if not _cache_stats:
+        return ""
+    lines = ["# TYPE repository_cache_requests_total counter"]
+    for entity, stats in sorted(_cache_stats.items()):
+        for field in fields(CacheStats):
+            lines.append(
+                f'repository_cache_requests_total{{entity="{entity}",result="{field.name}"}} '
+                f"{getattr(stats, field.name)}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+# Column types beyond plain JSON, cached as {"$t": tag, "$v": text} so a
+# hit hands from_dict the same types as a database read. Order matters:
+# datetime is a date subclass.
+_CACHE_TYPES: Dict[str, Tuple[type, Callable[[Any], str], Callable[[str], Any]]] = {
+    "datetime": (datetime, datetime.isoformat, datetime.fromisoformat),
+    "date": (date, date.isoformat, date.fromisoformat),
+    "time": (dt_time, dt_time.isoformat, dt_time.fromisoformat),
+    "uuid": (UUID, str, UUID),
+    "decimal": (Decimal, str, Decimal),
+    "oid": (ObjectId, str, ObjectId),
+    "bytes": (bytes, lambda b: base64.b64encode(b).decode(), base64.b64decode),
+}
+
+
+def _cache_default(obj: Any) -> Any:
+    for tag, (cls, encode, _) in _CACHE_TYPES.items():
+        if isinstance(obj, cls):
+            return {"$t": tag, "$v": encode(obj)}
+    raise TypeError(f"Cannot cache {type(obj).__name__}")
+
+
+def _cache_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 2 and "$t" in obj and "$v" in obj:
+        codec = _CACHE_TYPES.get(obj["$t"])
+        if codec is not None:
+            return codec[2](obj["$v"])
+    return obj
+
+
+def _dump_cache(value: Any) -> str:
+    return json.dumps(value, default=_cache_default)
+
+
+def _decode_cache_entry(raw: Optional[str]) -> Optional[CacheEntry]:
+    if raw is None:
+        return None
+    value = json.loads(raw, object_hook=_cache_object_hook)
+    if isinstance(value, dict) and value.keys() == {"_v", "_t", "_d"}:
+        return CacheEntry(value["_v"], value["_t"], value["_d"])
+    # Plain values written by _set_cache stay fresh until Redis expires them
+    return CacheEntry(value, math.inf, 0.0)
+
+
+# Loaders for the current request, keyed by (repository id, use_cache);
+# None outside a batched_loads() scope
+_request_loaders: ContextVar[Optional[Dict[Tuple[int, bool], "BatchLoader"]]] = ContextVar(
+    "repository_request_loaders", default=None
+)
+
+
+@contextmanager
+def batched_loads() -> Iterator[None]:
+    """
+    Coalesce get_by_id calls made inside this scope.
+    
+    Concurrent lookups against the same repository that land in the same
+    event-loop tick (e.g. under asyncio.gather) are answered by a single
+    get_many_by_ids call. Entered once per request by AuthContextMiddleware.
+    """
+    token = _request_loaders.set({})
+    try:
+        yield
+    finally:
+        _request_loaders.reset(token)
+
+
+class BatchLoader:
+    """
+    DataLoader-style batcher for one repository.
+    
+    load() queues an id and returns a future; the queue is flushed on the
+    next loop iteration, so every load() issued before control returns to
+    the event loop shares one query. Ids requested twice while a batch is
+    pending share a future. Results are not memoized once the batch
+    resolves, so a later load() sees writes made in between.
+    """
+    
+    def __init__(self, repository: "BaseRepository", use_cache: bool = True):
+        self.repository = repository
+        self.use_cache = use_cache
+        self._pending: Dict[Any, asyncio.Future] = {}
+    
+    def load(self, entity_id: Any) -> "asyncio.Future":
+        future = self._pending.get(entity_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = self._pending[entity_id] = loop.create_future()
+        return future
+    
+    def _dispatch(self):
+        batch, self._pending = self._pending, {}
+        asyncio.ensure_future(self._resolve(batch))
+    
+    async def _resolve(self, batch: Dict[Any, asyncio.Future]):
+        try:
+            results = await self.repository.get_many_by_ids(list(batch), use_cache=self.use_cache)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for future, result in zip(batch.values(), results):
+            if not future.done():
+                future.set_result(result)
+
 
 class BaseRepository(ABC, Generic[T]):
     """
@@ -32,8 +210,19 @@ class BaseRepository(ABC, Generic[T]):
     - get_primary_key_field(): Primary key field name
     - to_dict(): Convert entity to dict
     - from_dict(): Convert dict to entity
+    
+    get_by_id/get_many_by_ids read through Redis: entries are fresh for
+    cache_ttl seconds, then served stale for up to cache_stale_ttl more
+    while a background task reloads them. Fresh entries may also be
+    refreshed early (XFetch), and concurrent misses for one key share a
+    single load.
     """
     
+    cache_ttl: int = CACHE_TTL_SECONDS
+    cache_stale_ttl: int = CACHE_STALE_SECONDS
+    cache_xfetch_beta: float = CACHE_XFETCH_BETA
+    cache_lock: bool = CACHE_LOCK
+    
     def __init__(
         self,
         postgres: Optional[PostgresAdapter] = None,
@@ -127,13 +316,37 @@ class BaseRepository(ABC, Generic[T]):
         prefix = prefix or self.get_primary_key_field()
         return f"{entity_name}:{prefix}:{identifier}"
     
+    @staticmethod
+    def _encode_cache_value(value: Any) -> str:
+        """Serialize a row (dict or Record) for the cache."""
+        if isinstance(value, str):
+            return value
+        if not isinstance(value, dict):
+            value = dict(value)
+        return _dump_cache(value)
+    
+    @staticmethod
+    def _decode_cache_value(value: Optional[str]) -> Optional[Dict]:
+        """Deserialize a cached row; None for misses."""
+        entry = _decode_cache_entry(value)
+        return entry.value if entry else None
+    
+    @property
+    def cache_stats(self) -> CacheStats:
+        """Read-through cache counters for this repository's entity."""
+        entity_name = self.get_entity_name()
+        stats = _cache_stats.get(entity_name)
+        if stats is None:
+            stats = _cache_stats[entity_name] = CacheStats()
+        return stats
+    
     async def _get_from_cache(self, key: str) -> Optional[Dict]:
         """Get from cache if Redis is available."""
         if not self.redis:
             return None
         
         try:
-            return await self.redis.get(key)
+            return self._decode_cache_value(await self.redis.get(key))
         except Exception as e:
             logger.warning(f"Cache read error for {key}: {e}")
             return None
@@ -142,39 +355,81 @@ class BaseRepository(ABC, Generic[T]):
         self,
         key: str,
         value: Dict,
-        ttl_seconds: int = 300
+        ttl_seconds: int = CACHE_TTL_SECONDS
     ):
         """Set cache if Redis is available."""
         if not self.redis:
             return
         
         try:
-            import json
-            value_str = json.dumps(value) if not isinstance(value, str) else value
-            await self.redis.set(key, value_str, ex=ttl_seconds)
+            await self.redis.set(key, self._encode_cache_value(value), ex=ttl_seconds)
         except Exception as e:
             logger.warning(f"Cache write error for {key}: {e}")
     
+    async def _get_cache_entries(self, keys: List[str]) -> List[Optional[CacheEntry]]:
+        """Get several read-through entries in one MGET; all misses if Redis is unavailable."""
+        if not self.redis or not keys:
+            return [None] * len(keys)
+        
+        try:
+            values = await self.redis.mget(*keys)
+        except Exception as e:
+            logger.warning(f"Cache multi-read error: {e}")
+            return [None] * len(keys)
+        
+        entries = []
+        for key, value in zip(keys, values):
+            try:
+                entries.append(_decode_cache_entry(value))
+            except ValueError as e:
+                logger.warning(f"Cache read error for {key}: {e}")
+                entries.append(None)
+        return entries
+    
+    async def _set_cache_entries(self, items: Dict[str, Any], delta: float):
+        """
+        Write read-through entries in one pipelined round trip.
+        
+        Each entry is fresh for cache_ttl seconds and kept cache_stale_ttl
+        seconds longer so it can be served while being refreshed. delta is
+        how long the load took, which scales XFetch early refresh.
+        """
+        if not self.redis or not items:
+            return
+        
+        fresh_until = time.time() + self.cache_ttl
+        encoded = {}
+        for key, value in items.items():
+            try:
+                if not isinstance(value, dict):
+                    value = dict(value)
+                encoded[key] = _dump_cache({"_v": value, "_t": fresh_until, "_d": delta})
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Cache write error for {key}: {e}")
+        
+        try:
+            await self.redis.mset_with_ttl(encoded, ttl_seconds=self.cache_ttl + self.cache_stale_ttl)
+        except Exception as e:
+            logger.warning(f"Cache multi-write error: {e}")
+    
     async def _invalidate_cache(self, *keys: str):
         """Invalidate multiple cache keys."""
         if not self.redis:
             return
         
         try:
-            for key in keys:
-                await self.redis.delete(key)
+            if keys:
+                await self.redis.unlink(*keys)
         except Exception as e:
             logger.warning(f"Cache invalidation error: {e}")
     
     async def _invalidate_pattern(self, pattern: str):
-        """Invalidate all keys matching pattern."""
+        """Invalidate all keys matching pattern (SCAN-based; never blocks Redis)."""
         if not self.redis:
             return
         
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                await self.redis.delete(*keys)
+            await self.redis.delete_pattern(pattern)
         except Exception as e:
             logger.warning(f"Cache pattern invalidation error: {e}")
     
@@ -197,29 +452,15 @@ class BaseRepository(ABC, Generic[T]):
         Returns:
             Entity instance or None
         """
-        entity_name = self.get_entity_name()
-        pk_field = self.get_primary_key_field()
-        
-        # Check cache
-        if use_cache:
-            cache_key = self._get_cache_key(entity_id)
-            cached = await self._get_from_cache(cache_key)
-            if cached:
-                logger.debug(f"Cache hit for {entity_name} {entity_id}")
-                return self.from_dict(cached)
-        
-        # Not in cache, fetch from database
-        data = await self._fetch_by_id(entity_id)
-        
-        if not data:
-            return None
-        
-        # Cache result
-        if use_cache:
-            cache_key = self._get_cache_key(entity_id)
-            await self._set_cache(cache_key, data)
+        loaders = _request_loaders.get()
+        if loaders is not None:
+            loader = loaders.get((id(self), use_cache))
+            if loader is None:
+                loader = loaders[(id(self), use_cache)] = BatchLoader(self, use_cache)
+            return await loader.load(entity_id)
         
-        return self.from_dict(data)
+        data = (await self._load_rows([entity_id], use_cache)).get(entity_id)
+        return self.from_dict(data) if data else None
     
     @abstractmethod
     async def _fetch_by_id(self, entity_id: Any) -> Optional[Dict]:
@@ -236,6 +477,249 @@ class BaseRepository(ABC, Generic[T]):
         """
         pass
     
+    async def get_many_by_ids(
+        self,
+        entity_ids: Iterable[Any],
+        use_cache: bool = True
+    ) -> List[Optional[T]]:
+        """
+        Get several entities by primary key.
+        
+        Reads the cache with one MGET, fetches the misses in one query
+        and writes them back in one pipeline, so N ids cost three round
+        trips rather than 2N.
+        
+        Args:
+            entity_ids: Entity IDs (duplicates allowed)
+            use_cache: Whether to use cache
+            
+        Returns:
+            Entities in the order of entity_ids, None where not found
+        """
+        requested = list(entity_ids)
+        ids = list(dict.fromkeys(requested))
+        if not ids:
+            return []
+        
+        rows = await self._load_rows(ids, use_cache)
+        entities = {entity_id: self.from_dict(data) for entity_id, data in rows.items()}
+        return [entities.get(entity_id) for entity_id in requested]
+    
+    async def _load_rows(self, entity_ids: List[Any], use_cache: bool) -> Dict[Any, Any]:
+        """
+        Read-through load of distinct ids; rows keyed by id, missing ids omitted.
+        
+        Fresh entries are returned as is. Stale ones, and fresh ones that
+        win the XFetch draw, are returned too but reloaded in the
+        background. Misses are loaded now, sharing any load already in
+        flight for the same key.
+        """
+        if not use_cache or not self.redis:
+            return await self._fetch_rows(entity_ids)
+        
+        stats = self.cache_stats
+        keys = [self._get_cache_key(entity_id) for entity_id in entity_ids]
+        entries = await self._get_cache_entries(keys)
+        
+        rows: Dict[Any, Any] = {}
+        misses: List[Any] = []
+        refresh: List[Any] = []
+        now = time.time()
+        for entity_id, entry in zip(entity_ids, entries):
+            if entry is None:
+                misses.append(entity_id)
+                continue
+            rows[entity_id] = entry.value
+            if now >= entry.fresh_until:
+                stats.stale += 1
+                refresh.append(entity_id)
+            else:
+                stats.hits += 1
+                if self._should_refresh_early(entry, now):
+                    stats.early_refreshes += 1
+                    refresh.append(entity_id)
+        
+        if refresh:
+            self._schedule_refresh(refresh)
+        if misses:
+            stats.misses += len(misses)
+            rows.update(await self._load_misses(misses, wait_for_lock=True))
+        return rows
+    
+    def _should_refresh_early(self, entry: CacheEntry, now: float) -> bool:
+        """
+        XFetch: refresh with a probability that rises as expiry nears,
+        scaled by how long the entry took to load.
+        """
+        if entry.delta <= 0 or self.cache_xfetch_beta <= 0:
+            return False
+        return now - entry.delta * self.cache_xfetch_beta * math.log(1.0 - random.random()) >= entry.fresh_until
+    
+    async def _fetch_rows(self, entity_ids: List[Any]) -> Dict[Any, Any]:
+        if len(entity_ids) == 1:
+            data = await self._fetch_by_id(entity_ids[0])
+            return {entity_ids[0]: data} if data else {}
+        return await self._fetch_many_by_ids(entity_ids)
+    
+    async def _load_misses(self, entity_ids: List[Any], wait_for_lock: bool) -> Dict[Any, Any]:
+        """
+        Load ids from the database and cache them, one load per key.
+        
+        Ids another task in this process is already loading wait for that
+        load instead. With cache_lock set, a Redis lock extends this across
+        processes: ids locked elsewhere are polled from the cache (or, for
+        background refreshes, skipped) until the lock expires.
+        """
+        loop = asyncio.get_running_loop()
+        keys = {entity_id: self._get_cache_key(entity_id) for entity_id in entity_ids}
+        owned: Dict[Any, asyncio.Future] = {}
+        waiting: Dict[Any, asyncio.Future] = {}
+        for entity_id, key in keys.items():
+            future = _inflight.get(key)
+            if future is None:
+                owned[entity_id] = _inflight[key] = loop.create_future()
+            else:
+                waiting[entity_id] = future
+        self.cache_stats.coalesced += len(waiting)
+        
+        rows: Dict[Any, Any] = {}
+        if owned:
+            try:
+                rows.update(await self._load_owned(list(owned), keys, wait_for_lock))
+            except Exception as e:
+                for future in owned.values():
+                    future.set_exception(e)
+                    # Waiters re-raise it; don't warn when there are none
+                    future.exception()
+                raise
+            else:
+                for entity_id, future in owned.items():
+                    future.set_result(rows.get(entity_id))
+            finally:
+                for entity_id, future in owned.items():
+                    if _inflight.get(keys[entity_id]) is future:
+                        del _inflight[keys[entity_id]]
+        
+        for entity_id, future in waiting.items():
+            data = await future
+            if data:
+                rows[entity_id] = data
+        return rows
+    
+    async def _load_owned(
+        self,
+        entity_ids: List[Any],
+        keys: Dict[Any, str],
+        wait_for_lock: bool
+    ) -> Dict[Any, Any]:
+        locked = await self._acquire_load_locks([keys[entity_id] for entity_id in entity_ids])
+        mine = [entity_id for entity_id in entity_ids if keys[entity_id] in locked]
+        elsewhere = [entity_id for entity_id in entity_ids if keys[entity_id] not in locked]
+        
+        rows: Dict[Any, Any] = {}
+        try:
+            if mine:
+                started = time.monotonic()
+                fetched = await self._fetch_rows(mine)
+                await self._set_cache_entries(
+                    {keys[entity_id]: data for entity_id, data in fetched.items()},
+                    delta=time.monotonic() - started
+                )
+                rows.update(fetched)
+        finally:
+            if self.cache_lock and mine:
+                await self._release_load_locks([keys[entity_id] for entity_id in mine])
+        
+        if elsewhere and wait_for_lock:
+            rows.update(await self._wait_for_locked(elsewhere, keys))
+        return rows
+    
+    async def _acquire_load_locks(self, keys: List[str]) -> Set[str]:
+        """Keys this process may load; all of them unless cache_lock is set."""
+        if not self.cache_lock:
+            return set(keys)
+        try:
+            async with self.redis.pipeline() as pipe:
+                for key in keys:
+                    pipe.set(f"lock:{key}", "1", nx=True, px=CACHE_LOCK_MS)
+                results = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache lock error: {e}")
+            return set(keys)
+        return {key for key, acquired in zip(keys, results) if acquired}
+    
+    async def _release_load_locks(self, keys: List[str]):
+        try:
+            await self.redis.unlink(*(f"lock:{key}" for key in keys))
+        except Exception as e:
+            logger.warning(f"Cache unlock error: {e}")
+    
+    async def _wait_for_locked(self, entity_ids: List[Any], keys: Dict[Any, str]) -> Dict[Any, Any]:
+        """Poll the cache for ids another process is loading; load any still missing at lock expiry."""
+        rows: Dict[Any, Any] = {}
+        pending = list(entity_ids)
+        deadline = time.monotonic() + CACHE_LOCK_MS / 1000
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_LOCK_POLL_SECONDS)
+            entries = await self._get_cache_entries([keys[entity_id] for entity_id in pending])
+            for entity_id, entry in zip(list(pending), entries):
+                if entry is not None:
+                    rows[entity_id] = entry.value
+                    pending.remove(entity_id)
+        if pending:
+            rows.update(await self._fetch_rows(pending))
+        return rows
+    
+    def _schedule_refresh(self, entity_ids: List[Any]):
+        """Reload ids in the background unless a load is already in flight."""
+        entity_ids = [
+            entity_id for entity_id in entity_ids
+            if self._get_cache_key(entity_id) not in _inflight
+        ]
+        if not entity_ids:
+            return
+        task = asyncio.ensure_future(self._refresh(entity_ids))
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+    
+    async def _refresh(self, entity_ids: List[Any]):
+        try:
+            await self._load_misses(entity_ids, wait_for_lock=False)
+        except Exception as e:
+            logger.warning(f"Cache refresh error for {self.get_entity_name()} {entity_ids}: {e}")
+    
+    async def _fetch_many_by_ids(self, entity_ids: List[Any]) -> Dict[Any, Dict]:
+        """
+        Fetch entity data for several IDs from database.
+        
+        Defaults to one _fetch_by_id per id; subclasses override this
+        with a single query.
+        
+        Args:
+            entity_ids: Distinct entity IDs
+            
+        Returns:
+            Entity data keyed by the requested ID; missing ids omitted
+        """
+        results = await asyncio.gather(*(self._fetch_by_id(entity_id) for entity_id in entity_ids))
+        return {entity_id: data for entity_id, data in zip(entity_ids, results) if data}
+    
+    def _key_by_requested_ids(self, entity_ids: List[Any], rows: Iterable[Any]) -> Dict[Any, Any]:
+        """
+        Key fetched rows by the ids they were requested with.
+        
+        The database may return a key of another type than the caller
+        passed (UUID or int for a str, ObjectId for a str), so ids are
+        matched by their string form.
+        """
+        pk_field = self.get_primary_key_field()
+        found = {str(row[pk_field]): row for row in rows}
+        return {
+            entity_id: found[str(entity_id)]
+            for entity_id in entity_ids
+            if str(entity_id) in found
+        }
+    
     async def exists(self, entity_id: Any) -> bool:
         """
         Check if entity exists.
@@ -468,13 +952,28 @@ class PostgresRepository(BaseRepository[T]):
         """Get Postgres table name."""
         pass
     
+    @property
+    def reader(self):
+        """
+        Adapter for reads: the read replica router when one is configured
+        for this repository's primary, otherwise the primary itself.
+        """
+        router = get_read_router()
+        if router is not None and router.primary_adapter is self.postgres:
+            return router
+        return self.postgres
+    
     async def _fetch_by_id(self, entity_id: Any) -> Optional[Dict]:
-        """Fetch from Postgres by ID."""
-        table = self.get_table_name()
+        """Fetch from Postgres by ID (as a Record; from_dict only reads fields)."""
+        query = select_sql(self.get_table_name(), (self.get_primary_key_field(),))
+        return await self.reader.fetch_record(query, entity_id)
+    
+    async def _fetch_many_by_ids(self, entity_ids: List[Any]) -> Dict[Any, Dict]:
+        """Fetch several rows from Postgres in one ANY($1) query."""
         pk_field = self.get_primary_key_field()
-        
-        query = f"SELECT * FROM {table} WHERE {pk_field} = $1"
-        return await self.postgres.fetch_one(query, entity_id)
+        query = f"SELECT * FROM {self.get_table_name()} WHERE {pk_field} = ANY($1)"
+        rows = await self.reader.fetch_records(query, entity_ids)
+        return self._key_by_requested_ids(entity_ids, rows)
     
     async def _fetch_list(
         self,
@@ -508,7 +1007,7 @@ class PostgresRepository(BaseRepository[T]):
         query += f" LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
         params.extend([limit, offset])
         
-        return await self.postgres.fetch_many(query, *params)
+        return await self.reader.fetch_many(query, *params)
     
     async def _count(self, filters: Optional[Dict[str, Any]]) -> int:
         """Count in Postgres."""
@@ -524,7 +1023,7 @@ class PostgresRepository(BaseRepository[T]):
                 params.append(value)
             query += f" WHERE {' AND '.join(where_clauses)}"
         
-        result = await self.postgres.fetch_one(query, *params)
+        result = await self.reader.fetch_one(query, *params)
         return result['count'] if result else 0
 
 
@@ -561,6 +1060,16 @@ class MongoRepository(BaseRepository[T]):
             {pk_field: entity_id}
         )
     
+    async def _fetch_many_by_ids(self, entity_ids: List[Any]) -> Dict[Any, Dict]:
+        """Fetch several documents from MongoDB in one $in query."""
+        pk_field = self.get_primary_key_field()
+        docs = await self.mongodb.find_many(
+            self.get_collection_name(),
+            {pk_field: {"$in": entity_ids}},
+            limit=len(entity_ids)
+        )
+        return self._key_by_requested_ids(entity_ids, docs)
+    
     async def _fetch_list(
         self,
         limit: int,
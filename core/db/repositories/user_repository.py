@@ -477,9 +477,10 @@ class UserRepository(PostgresRepository[User]):
         session = await self.get_session(session_token)
         if session:
             user_id = session.get('user_id')
-            await self.redis.delete(f"session:{session_token}")
-            if user_id:
-                await self.redis.srem(f"user_sessions:{user_id}", session_token)
+            async with self.redis.pipeline() as pipe:
+                pipe.delete(f"session:{session_token}")
+                if user_id:
+                    pipe.srem(f"user_sessions:{user_id}", session_token)
     
     async def revoke_all_sessions(self, user_id: int):
         """Revoke all user sessions."""
@@ -487,6 +488,4 @@ class UserRepository(PostgresRepository[User]):
             return
         
         sessions = await self.redis.smembers(f"user_sessions:{user_id}")
-        for token in sessions:
-            await self.redis.delete(f"session:{token}")
-        await self.redis.delete(f"user_sessions:{user_id}")
\ No newline at end of file
+        await self.redis.unlink(*(f"session:{token}" for token in sessions), f"user_sessions:{user_id}")
\ No newline at end of file
@@ -2,7 +2,8 @@
 Multi-Database Transaction Coordinator
 
 Handles ACID transactions across PostgreSQL, MongoDB, and other databases.
-Uses Two-Phase Commit (2PC) pattern for distributed transactions.
+Uses Two-Phase Commit (2PC) pattern for distributed transactions, and a
+plain one-phase commit when only one durable store takes part.
 """
 from typing import Dict, List, Callable, Any, Optional
 from contextlib import asynccontextmanager
@@ -10,6 +11,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 import uuid
 import asyncio
+import inspect
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -18,6 +20,7 @@ logger = get_logger(__name__)
 class TransactionState(Enum):
     """Transaction states in 2PC protocol."""
     PENDING = "pending"
+    ACTIVE = "active"
     PREPARED = "prepared"
     COMMITTED = "committed"
     ABORTED = "aborted"
@@ -46,6 +49,19 @@ class TransactionManager:
     1. Prepare phase: All participants prepare to commit
     2. Commit phase: All participants commit if prepare succeeded
     
+    Adapters with ``begin_transaction`` (PostgreSQL, MongoDB) are pinned on
+    first use: one connection or session holds the open transaction and
+    every later ``execute`` against that adapter runs in it. Only
+    participants that declare ``supports_two_phase = True`` are durable and
+    vote in the prepare phase; when at most one is enrolled the prepare
+    phase is skipped and it commits directly (1PC). Other participants
+    (Redis, MongoDB) commit after the durable ones, so a cache write never
+    forces PREPARE TRANSACTION. They roll back with the transaction, but if
+    one fails to commit after the durable stores have, its writes are lost
+    and it is listed in ``log.metadata["failed_after_commit"]``. Operations
+    on the same adapter must be awaited one at a time, since they share a
+    connection.
+    
     Usage:
         async with TransactionManager() as tm:
             # Postgres operations
@@ -75,6 +91,7 @@ class TransactionManager:
         )
         self.adapters: Dict[str, Any] = {}
         self.operations: List[Dict] = []
+        self._pinned: set = set()
         self._committed = False
         self._aborted = False
         
@@ -137,10 +154,18 @@ class TransactionManager:
             self.adapters[adapter_name] = adapter
             self.log.participants.append(adapter_name)
             logger.debug(f"Registered participant: {adapter_name}")
+            if hasattr(adapter, 'begin_transaction'):
+                await adapter.begin_transaction(self.transaction_id)
+                self._pinned.add(adapter_name)
+                self.log.state = TransactionState.ACTIVE
             
         # Execute operation
+        method = getattr(adapter, operation)
+        call_kwargs = kwargs
+        if adapter_name in self._pinned and 'transaction_id' not in kwargs and _accepts_transaction_id(method):
+            call_kwargs = {**kwargs, 'transaction_id': self.transaction_id}
         try:
-            result = await getattr(adapter, operation)(*args, **kwargs)
+            result = await method(*args, **call_kwargs)
         except Exception as e:
             logger.error(
                 f"Operation failed in transaction {self.transaction_id}: "
@@ -167,6 +192,18 @@ class TransactionManager:
             
         return result
         
+    def _durable_participants(self) -> List[str]:
+        """Participants that can vote in a prepare phase."""
+        return [
+            name for name, adapter in self.adapters.items()
+            if getattr(adapter, 'supports_two_phase', False)
+        ]
+        
+    @property
+    def one_phase(self) -> bool:
+        """True when commit can skip the prepare phase."""
+        return len(self._durable_participants()) <= 1
+        
     async def prepare(self):
         """
         Phase 1: Prepare all participants.
@@ -176,11 +213,10 @@ class TransactionManager:
         self.log.state = TransactionState.PREPARED
         
         prepare_tasks = []
-        for name, adapter in self.adapters.items():
-            if hasattr(adapter, 'prepare_transaction'):
-                task = adapter.prepare_transaction(self.transaction_id)
-                prepare_tasks.append(task)
-                logger.debug(f"Preparing {name} for transaction {self.transaction_id}")
+        for name in self._durable_participants():
+            task = self.adapters[name].prepare_transaction(self.transaction_id)
+            prepare_tasks.append(task)
+            logger.debug(f"Preparing {name} for transaction {self.transaction_id}")
         
         if prepare_tasks:
             try:
@@ -209,19 +245,19 @@ class TransactionManager:
         if self._aborted:
             raise RuntimeError("Cannot commit aborted transaction")
         
-        # Prepare phase
-        await self.prepare()
+        # Prepare phase, only needed when more than one store must agree
+        if self.one_phase:
+            self.log.metadata["protocol"] = "1pc"
+        else:
+            self.log.metadata["protocol"] = "2pc"
+            await self.prepare()
         
-        # Commit phase
+        # Commit phase: durable participants decide the outcome
+        durable = self._durable_participants()
         commit_tasks = []
-        for name, adapter in self.adapters.items():
-            if hasattr(adapter, 'commit_transaction'):
-                task = adapter.commit_transaction(self.transaction_id)
-                commit_tasks.append(task)
-                logger.debug(f"Committing {name} for transaction {self.transaction_id}")
-            elif hasattr(adapter, 'commit'):
-                task = adapter.commit()
-                commit_tasks.append(task)
+        for name in durable:
+            commit_tasks.append(self._commit_participant(name))
+            logger.debug(f"Committing {name} for transaction {self.transaction_id}")
         
         if commit_tasks:
             try:
@@ -237,6 +273,26 @@ class TransactionManager:
         self.log.state = TransactionState.COMMITTED
         self._committed = True
         
+        # The rest follow once the outcome is durable; their failures can't undo it
+        for name in self.adapters:
+            if name in durable:
+                continue
+            try:
+                await asyncio.wait_for(self._commit_participant(name), timeout=self.timeout)
+            except Exception as e:
+                self.log.metadata.setdefault("failed_after_commit", []).append(name)
+                logger.error(
+                    f"{name} failed to commit after transaction "
+                    f"{self.transaction_id} committed: {e}"
+                )
+        
+    async def _commit_participant(self, name: str):
+        adapter = self.adapters[name]
+        if hasattr(adapter, 'commit_transaction'):
+            await adapter.commit_transaction(self.transaction_id)
+        elif hasattr(adapter, 'commit'):
+            await adapter.commit()
+        
     async def rollback(self):
         """
         Rollback all operations.
@@ -293,12 +349,29 @@ class TransactionManager:
             "transaction_id": self.transaction_id,
             "state": self.log.state.value,
             "participants": self.log.participants,
+            "protocol": self.log.metadata.get("protocol"),
             "operations_count": len(self.operations),
             "committed": self._committed,
             "aborted": self._aborted
         }
 
 
+_TRANSACTION_ID_PARAMS: Dict[Any, bool] = {}
+
+
+def _accepts_transaction_id(method) -> bool:
+    """Whether an adapter method takes a ``transaction_id`` keyword (cached)."""
+    func = getattr(method, '__func__', method)
+    accepts = _TRANSACTION_ID_PARAMS.get(func)
+    if accepts is None:
+        try:
+            accepts = 'transaction_id' in inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            accepts = False
+        _TRANSACTION_ID_PARAMS[func] = accepts
+    return accepts
+
+
 # ============================================================================
 # Convenience Decorator
 # ============================================================================
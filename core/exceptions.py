@@ -212,6 +212,17 @@ class FileSizeLimitError(StorageError):
         )
 
 
+class RangeNotSatisfiableError(StorageError):
+    """Raised when a requested byte range lies outside the file"""
+    def __init__(self, filename: str, size: Optional[int] = None):
+        message = f"Requested range not satisfiable for '{filename}'"
+        super().__init__(
+            message,
+            status_code=416,
+            details={"filename": filename, "size": size}
+        )
+
+
 class InvalidFileTypeError(StorageError):
     """Raised when file type is not allowed"""
     def __init__(self, filename: str, file_type: str, allowed_types: list):
@@ -4,10 +4,13 @@ Data Subject Rights
 Implements GDPR data subject access rights (DSAR).
 """
 
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from enum import Enum
+import csv
+import io
 import json
+import os
 import uuid
 
 from core.utils.logger import get_logger
@@ -16,6 +19,30 @@ from .consent_manager import ConsentManager
 
 logger = get_logger(__name__)
 
+EXPORT_DIR = os.getenv("GDPR_EXPORT_DIR", "/tmp/exports")
+
+# Per-user tables included in an export, each queried by user id
+EXPORT_SECTIONS = [
+    ("devices", """
+        SELECT device_id, device_name, device_type, platform, browser,
+               ip_address, first_seen_at, last_seen_at, is_active, is_trusted
+        FROM devices WHERE user_id = $1
+    """),
+    ("sessions", """
+        SELECT session_token, expires_at, created_at, last_accessed
+        FROM user_sessions WHERE user_id = $1
+    """),
+    ("refresh_tokens", """
+        SELECT token_id, device_id, device_name, device_type,
+               created_at, expires_at, last_used_at
+        FROM refresh_tokens WHERE user_id = $1
+    """),
+    ("owned_sites", """
+        SELECT id, name, domain, description, created_at, updated_at
+        FROM sites WHERE owner_id = $1
+    """),
+]
+
 
 class DSARType(Enum):
     """Types of Data Subject Access Requests"""
@@ -145,16 +172,8 @@ class DataSubjectRights:
         logger.info(f"Created DSAR request: {request.request_id} for user {user_id}")
         return request
     
-    async def get_user_data(self, user_id: int) -> Dict[str, Any]:
-        """
-        Get all personal data for a user (Right to Access)
-        
-        Args:
-            user_id: User ID
-            
-        Returns:
-            Dictionary containing all user data
-        """
+    async def _profile_data(self, user_id: int) -> Dict[str, Any]:
+        """Personal data and consents - the small, single-row part of an export"""
         data = {
             "user_id": user_id,
             "export_date": datetime.utcnow().isoformat(),
@@ -185,43 +204,84 @@ class DataSubjectRights:
                 "updated_at": consent.updated_at.isoformat()
             })
         
-        # Get device information
-        devices = await self.postgres.fetch_all("""
-            SELECT device_id, device_name, device_type, platform, browser,
-                   ip_address, first_seen_at, last_seen_at, is_active, is_trusted
-            FROM devices WHERE user_id = $1
-        """, user_id)
-        
-        data["devices"] = [dict(d) for d in devices]
-        
-        # Get session information
-        sessions = await self.postgres.fetch_all("""
-            SELECT session_token, expires_at, created_at, last_accessed
-            FROM user_sessions WHERE user_id = $1
-        """, user_id)
-        
-        data["sessions"] = [dict(s) for s in sessions]
-        
-        # Get refresh tokens
-        tokens = await self.postgres.fetch_all("""
-            SELECT token_id, device_id, device_name, device_type,
-                   created_at, expires_at, last_used_at
-            FROM refresh_tokens WHERE user_id = $1
-        """, user_id)
-        
-        data["refresh_tokens"] = [dict(t) for t in tokens]
+        return data
+    
+    async def _section_rows(self, query: str, user_id: int):
+        """Rows of one export section, read through a server-side cursor"""
+        async for row in self.postgres.stream(query, user_id):
+            yield dict(row)
+    
+    async def get_user_data(self, user_id: int) -> Dict[str, Any]:
+        """
+        Get all personal data for a user (Right to Access)
         
-        # Get site associations
-        sites = await self.postgres.fetch_all("""
-            SELECT id, name, domain, description, created_at, updated_at
-            FROM sites WHERE owner_id = $1
-        """, user_id)
+        Loads everything into one dict; use iter_user_data_json /
+        export_user_data for users with large histories.
         
-        data["owned_sites"] = [dict(s) for s in sites]
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Dictionary containing all user data
+        """
+        data = await self._profile_data(user_id)
+        for section, query in EXPORT_SECTIONS:
+            data[section] = [row async for row in self._section_rows(query, user_id)]
         
         logger.info(f"Exported data for user {user_id}")
         return data
     
+    async def iter_user_data_json(self, user_id: int) -> AsyncIterator[str]:
+        """
+        Stream a user's data as one JSON document, in text chunks.
+        
+        Table sections are written row by row as the cursor delivers them,
+        so memory stays bounded by the cursor prefetch. Suitable as the
+        body of a streaming HTTP response.
+        """
+        head = await self._profile_data(user_id)
+        yield "{\n"
+        for key, value in head.items():
+            yield f"  {json.dumps(key)}: {json.dumps(value, default=str)},\n"
+        for i, (section, query) in enumerate(EXPORT_SECTIONS):
+            yield f"  {json.dumps(section)}: ["
+            sep = "\n    "
+            async for row in self._section_rows(query, user_id):
+                yield sep + json.dumps(row, default=str)
+                sep = ",\n    "
+            yield ("]" if sep == "\n    " else "\n  ]") + (",\n" if i < len(EXPORT_SECTIONS) - 1 else "\n")
+        yield "}\n"
+    
+    async def iter_user_data_csv(self, user_id: int) -> AsyncIterator[str]:
+        """
+        Stream a user's data as CSV lines of (section, row, field, value).
+        
+        Nested values are flattened into the field name.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        def line(*values) -> str:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(values)
+            return buffer.getvalue()
+        
+        yield line("section", "row", "field", "value")
+        head = await self._profile_data(user_id)
+        for key, value in head.items():
+            rows = value if isinstance(value, list) else [value]
+            for index, row in enumerate(rows):
+                fields = self._flatten_dict(row) if isinstance(row, dict) else {key: row}
+                for field, field_value in fields.items():
+                    yield line(key, index, field, field_value)
+        for section, query in EXPORT_SECTIONS:
+            index = 0
+            async for row in self._section_rows(query, user_id):
+                for field, value in self._flatten_dict(row).items():
+                    yield line(section, index, field, value)
+                index += 1
+    
     async def rectify_data(self, user_id: int, corrections: Dict[str, Any],
                           reason: str = None) -> bool:
         """
@@ -318,37 +378,27 @@ class DataSubjectRights:
         
         Args:
             user_id: User ID
-            format: Export format (json, csv, xml)
+            format: Export format (json or csv)
             
         Returns:
             Path to exported file
         """
-        # Get user data
-        data = await self.get_user_data(user_id)
-        
         # Create export file
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         filename = f"user_data_{user_id}_{timestamp}.{format}"
-        export_path = f"/tmp/exports/{filename}"
+        export_path = os.path.join(EXPORT_DIR, filename)
         
         # Ensure directory exists
-        import os
-        os.makedirs("/tmp/exports", exist_ok=True)
-        
-        # Export based on format
-        if format == "json":
-            import json
-            with open(export_path, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
-        
-        elif format == "csv":
-            import csv
-            with open(export_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                # Flatten data for CSV
-                flattened = self._flatten_dict(data)
-                writer.writerow(flattened.keys())
-                writer.writerow(flattened.values())
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        
+        # Stream the export to disk
+        if format == "csv":
+            chunks = self.iter_user_data_csv(user_id)
+        else:
+            chunks = self.iter_user_data_json(user_id)
+        with open(export_path, 'w', newline='') as f:
+            async for chunk in chunks:
+                f.write(chunk)
         
         # Record export
         export_id = str(uuid.uuid4())
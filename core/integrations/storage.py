@@ -5,17 +5,26 @@ Flattened module containing S3 client and models for file storage operations.
 """
 
 import os
+import asyncio
+import base64
 import boto3
 import gzip
+import inspect
 import io
 import logging
 import time
 import hashlib
+import zlib
+from dataclasses import dataclass, field
 from enum import Enum
 from botocore.client import Config
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Union, List
+from typing import Optional, Dict, Union, List, Tuple, Any, AsyncIterator, AsyncIterable, Iterable, BinaryIO
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from pydantic import BaseModel, Field, validator
 
 from core.services.base.storage import BaseStorageService
@@ -24,6 +33,8 @@ from core.exceptions import (
     FileNotFoundError as AppFileNotFoundError,
     FileUploadError,
     FileDownloadError,
+    FileSizeLimitError,
+    RangeNotSatisfiableError,
     StorageError
 )
 
@@ -178,6 +189,418 @@ class StoragePath(BaseModel):
         )
 
 
+# ===== STREAMING =====
+
+# S3 requires every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_READ_SIZE = 256 * 1024
+ENCRYPTION_CHUNK_SIZE = 64 * 1024
+ENCRYPTION_VERSION_CHUNKED = '2.0'
+
+_GCM_TAG_SIZE = 16
+_NONCE_PREFIX_SIZE = 8
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+ByteSource = Union[bytes, bytearray, memoryview, io.IOBase, BinaryIO, AsyncIterable[bytes], Iterable[bytes]]
+
+
+def derive_stream_key(fernet_key: str) -> bytes:
+    """Derive the AES-256-GCM key used for chunked encryption from the Fernet key"""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"fastapp-storage-stream-v2",
+    ).derive(base64.urlsafe_b64decode(fernet_key))
+
+
+def _chunk_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(12 - len(prefix), 'big')
+
+
+def _chunk_aad(last: bool) -> bytes:
+    return b"\x01" if last else b"\x00"
+
+
+def encrypted_size_to_plain(size: int, chunk_size: int = ENCRYPTION_CHUNK_SIZE) -> int:
+    """Plaintext length of a chunk-encrypted object of ``size`` bytes"""
+    sealed = chunk_size + _GCM_TAG_SIZE
+    chunks = max(1, -(-size // sealed))
+    return size - chunks * _GCM_TAG_SIZE
+
+
+class ChunkEncryptor:
+    """
+    Chunked AES-256-GCM encryption (encryption_version 2.0).
+
+    Plaintext is cut into fixed ``chunk_size`` chunks, each sealed on its own
+    with nonce = prefix || chunk index. The final chunk is flagged in the
+    associated data, so chunks cannot be reordered, dropped or truncated
+    without failing authentication. Every sealed chunk except the last is
+    exactly ``chunk_size + 16`` bytes, which lets ranged reads map a
+    plaintext offset straight to a ciphertext offset.
+    """
+
+    def __init__(self, key: bytes, nonce_prefix: Optional[bytes] = None, chunk_size: int = ENCRYPTION_CHUNK_SIZE):
+        self._aead = AESGCM(key)
+        self.nonce_prefix = nonce_prefix or os.urandom(_NONCE_PREFIX_SIZE)
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._index = 0
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        # Always hold back the tail so finalize() seals the last chunk
+        full = (len(self._buffer) - 1) // self.chunk_size
+        if full <= 0:
+            return b""
+        view = memoryview(self._buffer)
+        out = [
+            self._seal(view[i * self.chunk_size:(i + 1) * self.chunk_size], last=False)
+            for i in range(full)
+        ]
+        view.release()
+        del self._buffer[:full * self.chunk_size]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        sealed = self._seal(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        return sealed
+
+    def _seal(self, chunk, last: bool) -> bytes:
+        nonce = _chunk_nonce(self.nonce_prefix, self._index)
+        self._index += 1
+        return self._aead.encrypt(nonce, bytes(chunk), _chunk_aad(last))
+
+
+class ChunkDecryptor:
+    """Streaming counterpart of :class:`ChunkEncryptor`.
+
+    ``first_index`` lets a ranged read start decrypting mid-object.
+    """
+
+    def __init__(self, key: bytes, nonce_prefix: bytes, chunk_size: int = ENCRYPTION_CHUNK_SIZE, first_index: int = 0):
+        self._aead = AESGCM(key)
+        self.nonce_prefix = nonce_prefix
+        self.sealed_size = chunk_size + _GCM_TAG_SIZE
+        self._buffer = bytearray()
+        self._index = first_index
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        full = (len(self._buffer) - 1) // self.sealed_size
+        if full <= 0:
+            return b""
+        view = memoryview(self._buffer)
+        out = [
+            self._open(view[i * self.sealed_size:(i + 1) * self.sealed_size], last=False)
+            for i in range(full)
+        ]
+        view.release()
+        del self._buffer[:full * self.sealed_size]
+        return b"".join(out)
+
+    def finalize(self, last: bool = True) -> bytes:
+        """Open the buffered chunk. ``last`` is False when a ranged read stops before the end."""
+        if not self._buffer and not last:
+            return b""
+        plain = self._open(bytes(self._buffer), last=last)
+        self._buffer.clear()
+        return plain
+
+    def _open(self, chunk, last: bool) -> bytes:
+        nonce = _chunk_nonce(self.nonce_prefix, self._index)
+        self._index += 1
+        return self._aead.decrypt(nonce, bytes(chunk), _chunk_aad(last))
+
+
+class _UploadPipeline:
+    """gzip -> chunk encryption, applied incrementally to each source chunk"""
+
+    def __init__(self, compress: bool, encryptor: Optional[ChunkEncryptor]):
+        self._compressor = zlib.compressobj(wbits=_GZIP_WBITS) if compress else None
+        self._encryptor = encryptor
+        self.bytes_in = 0
+
+    def feed(self, data: bytes) -> bytes:
+        self.bytes_in += len(data)
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        if self._encryptor is not None:
+            data = self._encryptor.update(data)
+        return data
+
+    def finish(self) -> bytes:
+        data = self._compressor.flush() if self._compressor is not None else b""
+        if self._encryptor is not None:
+            data = self._encryptor.update(data) + self._encryptor.finalize()
+        return data
+
+
+class _DownloadPipeline:
+    """chunk decryption -> gunzip, the inverse of :class:`_UploadPipeline`"""
+
+    def __init__(self, decryptor: Optional[ChunkDecryptor], decompress: bool, max_output: int):
+        self._decryptor = decryptor
+        self._decompressor = zlib.decompressobj(wbits=_GZIP_WBITS) if decompress else None
+        self._max_output = max_output
+
+    def feed(self, data: bytes) -> List[bytes]:
+        if self._decryptor is not None:
+            data = self._decryptor.update(data)
+        return self._inflate(data)
+
+    def finish(self, last: bool = True) -> List[bytes]:
+        data = self._decryptor.finalize(last) if self._decryptor is not None else b""
+        out = self._inflate(data)
+        if self._decompressor is not None:
+            out.append(self._decompressor.flush())
+        return out
+
+    def _inflate(self, data: bytes) -> List[bytes]:
+        if self._decompressor is None:
+            return [data]
+        # Bound each piece so a highly compressed chunk cannot balloon in memory
+        out = []
+        while data:
+            out.append(self._decompressor.decompress(data, self._max_output))
+            data = self._decompressor.unconsumed_tail
+        return out
+
+
+async def aiter_bytes(source: ByteSource, read_size: int = DEFAULT_READ_SIZE) -> AsyncIterator[bytes]:
+    """
+    Adapt any supported upload source to an async iterator of byte chunks.
+
+    Accepts bytes, sync or async file-like objects (``read(n)``), async
+    iterables and plain iterables of bytes. Blocking reads run in a worker
+    thread.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), read_size):
+            yield bytes(view[offset:offset + read_size])
+        return
+
+    if hasattr(source, '__aiter__'):
+        async for chunk in source:
+            yield chunk
+        return
+
+    read = getattr(source, 'read', None)
+    if read is not None:
+        is_async = inspect.iscoroutinefunction(read)
+        while True:
+            chunk = await read(read_size) if is_async else await asyncio.to_thread(read, read_size)
+            if not chunk:
+                return
+            yield chunk
+
+    for chunk in source:
+        yield chunk
+
+
+class MultipartWriter:
+    """
+    Buffered S3 multipart upload.
+
+    Holds at most one part in its buffer plus ``max_concurrency`` parts in
+    flight, so memory stays at ``part_size * (max_concurrency + 1)`` however
+    large the object. Objects smaller than one part go up as a single
+    ``put_object``.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        key: str,
+        extra_args: Optional[Dict[str, Any]] = None,
+        part_size: int = DEFAULT_PART_SIZE,
+        max_concurrency: int = 4
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.extra_args = extra_args or {}
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.bytes_written = 0
+        self.upload_id: Optional[str] = None
+        self._buffer = bytearray()
+        self._parts: Dict[int, str] = {}
+        self._next_part = 1
+        self._inflight: set = set()
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._error: Optional[BaseException] = None
+
+    async def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._submit(part)
+
+    async def close(self) -> int:
+        """Upload what is buffered and complete the object. Returns bytes written."""
+        if self.upload_id is None:
+            await asyncio.to_thread(
+                self.client.put_object,
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                **self.extra_args
+            )
+            self._buffer.clear()
+            return self.bytes_written
+
+        if self._buffer:
+            part = bytes(self._buffer)
+            self._buffer.clear()
+            await self._submit(part)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._raise_failed()
+
+        await asyncio.to_thread(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': number, 'ETag': etag} for number, etag in sorted(self._parts.items())
+            ]}
+        )
+        return self.bytes_written
+
+    async def abort(self) -> None:
+        """Cancel in-flight parts and discard the multipart upload"""
+        for task in list(self._inflight):
+            task.cancel()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._buffer.clear()
+        if self.upload_id is not None:
+            try:
+                await asyncio.to_thread(
+                    self.client.abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id
+                )
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload {self.upload_id}: {e}")
+
+    async def _submit(self, part: bytes) -> None:
+        if self.upload_id is None:
+            response = await asyncio.to_thread(
+                self.client.create_multipart_upload,
+                Bucket=self.bucket,
+                Key=self.key,
+                **self.extra_args
+            )
+            self.upload_id = response['UploadId']
+
+        await self._slots.acquire()
+        try:
+            self._raise_failed()
+        except BaseException:
+            self._slots.release()
+            raise
+        number = self._next_part
+        self._next_part += 1
+        task = asyncio.get_running_loop().create_task(self._upload_part(number, part))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _upload_part(self, number: int, body: bytes) -> None:
+        try:
+            response = await asyncio.to_thread(
+                self.client.upload_part,
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=number,
+                Body=body
+            )
+            self._parts[number] = response['ETag']
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._slots.release()
+
+    def _raise_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+
+def parse_range_header(range_header: Optional[str], size: Optional[int]) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``Range: bytes=...`` header into an inclusive (start, end).
+
+    Returns None when the whole file should be served: no header, a
+    malformed or multi-range header, or an unknown file size. Raises
+    RangeNotSatisfiableError when the range lies outside the file.
+    """
+    if not range_header or size is None:
+        return None
+    unit, _, spec = range_header.strip().partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec or '-' not in spec:
+        return None
+
+    start_str, end_str = (part.strip() for part in spec.split('-', 1))
+    try:
+        if not start_str:
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise RangeNotSatisfiableError(range_header, size)
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(start_str)
+            end = min(int(end_str), size - 1) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start < 0 or start >= size or end < start:
+        raise RangeNotSatisfiableError(range_header, size)
+    return start, end
+
+
+@dataclass
+class StoredObjectStream:
+    """An open, decoded download. ``chunks`` yields plaintext for [start, end]."""
+    key: str
+    content_type: str
+    size: Optional[int]          # Plaintext size of the whole object, when known
+    start: int
+    end: Optional[int]           # Inclusive; None when streaming to an unknown end
+    chunks: AsyncIterator[bytes]
+    etag: Optional[str] = None
+    partial: bool = False
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def content_length(self) -> Optional[int]:
+        return None if self.end is None else self.end - self.start + 1
+
+    @property
+    def content_range(self) -> Optional[str]:
+        if self.end is None:
+            return None
+        return f"bytes {self.start}-{self.end}/{self.size if self.size is not None else '*'}"
+
+    async def read(self) -> bytes:
+        """Collect the stream into memory - only for callers that need bytes"""
+        return b"".join([chunk async for chunk in self.chunks])
+
+    async def aclose(self) -> None:
+        await self.chunks.aclose()
+
+
 # ===== S3 CLIENT =====
 
 class StorageService(BaseStorageService):
@@ -207,6 +630,12 @@ class StorageService(BaseStorageService):
         )
         
         self.fernet = Fernet(self.encryption_key.encode())
+        self.stream_key = derive_stream_key(self.encryption_key)
+
+        # Streaming settings
+        self.part_size = int(os.getenv("STORAGE_MULTIPART_PART_SIZE", str(DEFAULT_PART_SIZE)))
+        self.max_part_concurrency = int(os.getenv("STORAGE_MULTIPART_CONCURRENCY", "4"))
+        self.read_size = int(os.getenv("STORAGE_STREAM_READ_SIZE", str(DEFAULT_READ_SIZE)))
         logger.info(f"StorageService initialized for bucket: {self.bucket}")
     
     def get_module_prefix(self) -> str:
@@ -238,10 +667,22 @@ class StorageService(BaseStorageService):
         """Encrypt data"""
         return self.fernet.encrypt(data)
 
-    def _decrypt_data(self, encrypted_data: bytes) -> bytes:
-        """Decrypt data"""
+    def _decrypt_data(self, encrypted_data: bytes, metadata: Optional[Dict[str, str]] = None) -> bytes:
+        """Decrypt data written by either encryption version"""
+        metadata = metadata or {}
+        if metadata.get('encryption_version') == ENCRYPTION_VERSION_CHUNKED:
+            decryptor = self._chunk_decryptor(metadata)
+            return decryptor.update(encrypted_data) + decryptor.finalize()
         return self.fernet.decrypt(encrypted_data)
 
+    def _chunk_decryptor(self, metadata: Dict[str, str], first_index: int = 0) -> ChunkDecryptor:
+        return ChunkDecryptor(
+            self.stream_key,
+            bytes.fromhex(metadata['encryption_nonce']),
+            chunk_size=int(metadata.get('chunk_size', ENCRYPTION_CHUNK_SIZE)),
+            first_index=first_index
+        )
+
     def generate_upload_url(self, request: UploadUrlRequest) -> UploadUrlResponse:
         """Generate presigned upload URL"""
         try:
@@ -373,7 +814,7 @@ class StorageService(BaseStorageService):
             # Decrypt if needed
             if metadata.get('encrypted') == 'True':
                 try:
-                    file_data = self._decrypt_data(file_data)
+                    file_data = self._decrypt_data(file_data, metadata)
                     logger.info("Decrypted file data")
                 except Exception as e:
                     logger.error(f"Failed to decrypt file: {e}")
@@ -399,6 +840,243 @@ class StorageService(BaseStorageService):
             logger.error(f"Failed to download file: {e}")
             raise FileDownloadError(f"Failed to download file: {str(e)}")
 
+    async def upload_stream(
+        self,
+        request: FileUploadRequest,
+        source: ByteSource,
+        size: Optional[int] = None,
+        max_size: Optional[int] = None
+    ) -> FileUploadResponse:
+        """
+        Stream a file to storage without holding it in memory.
+
+        The source is compressed and encrypted chunk by chunk and written
+        through a multipart upload, so memory use is bounded by the part
+        buffers rather than the file size.
+
+        Args:
+            request: Upload request (compress/encrypt flags, metadata)
+            source: bytes, file-like object (sync or async read) or (async) iterable of bytes
+            size: Plaintext size if known up front; recorded for ranged reads of compressed files
+            max_size: Abort the upload with FileSizeLimitError once more bytes than this arrive
+
+        Returns:
+            FileUploadResponse with the stored (post-transform) size
+        """
+        key = self._build_storage_path(request.domain, request.level, request.filename, request.user_id)
+        encryptor = ChunkEncryptor(self.stream_key) if request.encrypt else None
+
+        metadata = {
+            **request.metadata,
+            'compressed': str(request.compress),
+            'encrypted': str(request.encrypt)
+        }
+        if size is not None:
+            metadata['original_size'] = str(size)
+        if encryptor is not None:
+            metadata.update({
+                'encryption_version': ENCRYPTION_VERSION_CHUNKED,
+                'encryption_nonce': encryptor.nonce_prefix.hex(),
+                'chunk_size': str(encryptor.chunk_size)
+            })
+
+        writer = MultipartWriter(
+            self.s3_client,
+            self.bucket,
+            key,
+            extra_args={'ContentType': request.content_type, 'Metadata': metadata},
+            part_size=self.part_size,
+            max_concurrency=self.max_part_concurrency
+        )
+        pipeline = _UploadPipeline(request.compress, encryptor)
+        transform = request.compress or request.encrypt
+
+        try:
+            async for chunk in aiter_bytes(source, self.read_size):
+                received = pipeline.bytes_in + len(chunk)
+                if max_size is not None and received > max_size:
+                    raise FileSizeLimitError(request.filename, received, max_size)
+                data = await asyncio.to_thread(pipeline.feed, chunk) if transform else pipeline.feed(chunk)
+                await writer.write(data)
+            await writer.write(pipeline.finish())
+            stored = await writer.close()
+        except BaseException as e:
+            await writer.abort()
+            if isinstance(e, (FileSizeLimitError, asyncio.CancelledError)):
+                raise
+            logger.error(f"Failed to stream upload: {e}")
+            raise FileUploadError(f"Failed to upload file: {str(e)}")
+
+        logger.info(f"Streamed upload: {key} ({pipeline.bytes_in} bytes in, {stored} bytes stored)")
+        return FileUploadResponse(
+            success=True,
+            key=key,
+            size=stored,
+            message="File uploaded successfully"
+        )
+
+    async def open_download_stream(
+        self,
+        request: FileDownloadRequest,
+        range_header: Optional[str] = None
+    ) -> StoredObjectStream:
+        """
+        Open a file for streaming download, optionally limited to one byte range.
+
+        Plain files use an S3 ranged GET. Chunk-encrypted files fetch and
+        decrypt only the chunks covering the range. Compressed and legacy
+        (Fernet) files are decoded from the start and trimmed.
+
+        Args:
+            request: Download request
+            range_header: Raw HTTP ``Range`` header, if any
+
+        Returns:
+            StoredObjectStream whose ``chunks`` yield the decoded bytes
+        """
+        key = self._build_storage_path(request.domain, request.level, request.filename, request.user_id)
+
+        try:
+            byte_range = None
+            if range_header:
+                head = await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket, Key=key)
+                byte_range = parse_range_header(range_header, self._plain_size(head))
+            if byte_range is None:
+                response = await asyncio.to_thread(self.s3_client.get_object, Bucket=self.bucket, Key=key)
+                return self._open_full(key, response)
+            return await self._open_range(key, head, byte_range)
+        except self.s3_client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                raise AppFileNotFoundError(f"File not found: {key}")
+            raise FileDownloadError(f"Failed to download file: {str(e)}")
+
+    def _plain_size(self, response: Dict[str, Any]) -> Optional[int]:
+        """Decoded size of an object from its head/get response, if knowable"""
+        metadata = response.get('Metadata', {})
+        if metadata.get('compressed') == 'True' or (
+            metadata.get('encrypted') == 'True' and metadata.get('encryption_version') != ENCRYPTION_VERSION_CHUNKED
+        ):
+            original = metadata.get('original_size')
+            return int(original) if original is not None else None
+        length = response['ContentLength']
+        if metadata.get('encrypted') == 'True':
+            return encrypted_size_to_plain(length, int(metadata.get('chunk_size', ENCRYPTION_CHUNK_SIZE)))
+        return length
+
+    def _open_full(self, key: str, response: Dict[str, Any]) -> StoredObjectStream:
+        size = self._plain_size(response)
+        metadata = response.get('Metadata', {})
+        return StoredObjectStream(
+            key=key,
+            content_type=response.get('ContentType', 'application/octet-stream'),
+            size=size,
+            start=0,
+            end=size - 1 if size is not None else None,
+            chunks=self._decode_body(response['Body'], metadata),
+            etag=response.get('ETag', '').strip('"') or None,
+            metadata=metadata
+        )
+
+    async def _open_range(self, key: str, head: Dict[str, Any], byte_range: Tuple[int, int]) -> StoredObjectStream:
+        start, end = byte_range
+        metadata = head.get('Metadata', {})
+        encrypted = metadata.get('encrypted') == 'True'
+        chunked = encrypted and metadata.get('encryption_version') == ENCRYPTION_VERSION_CHUNKED
+        compressed = metadata.get('compressed') == 'True'
+
+        if compressed or (encrypted and not chunked):
+            # No random access into the encoded bytes - decode from the start and trim
+            response = await asyncio.to_thread(self.s3_client.get_object, Bucket=self.bucket, Key=key)
+            chunks = self._decode_body(response['Body'], metadata, skip=start, length=end - start + 1)
+        elif chunked:
+            chunk_size = int(metadata.get('chunk_size', ENCRYPTION_CHUNK_SIZE))
+            sealed = chunk_size + _GCM_TAG_SIZE
+            total_chunks = max(1, -(-head['ContentLength'] // sealed))
+            first, last = start // chunk_size, end // chunk_size
+            response = await asyncio.to_thread(
+                self.s3_client.get_object,
+                Bucket=self.bucket,
+                Key=key,
+                Range=f"bytes={first * sealed}-{min((last + 1) * sealed, head['ContentLength']) - 1}"
+            )
+            chunks = self._decode_body(
+                response['Body'],
+                metadata,
+                skip=start - first * chunk_size,
+                length=end - start + 1,
+                first_chunk=first,
+                last_chunk=last == total_chunks - 1
+            )
+        else:
+            response = await asyncio.to_thread(
+                self.s3_client.get_object, Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}"
+            )
+            chunks = self._decode_body(response['Body'], metadata)
+
+        return StoredObjectStream(
+            key=key,
+            content_type=head.get('ContentType', 'application/octet-stream'),
+            size=self._plain_size(head),
+            start=start,
+            end=end,
+            chunks=chunks,
+            etag=head.get('ETag', '').strip('"') or None,
+            partial=True,
+            metadata=metadata
+        )
+
+    async def _decode_body(
+        self,
+        body: Any,
+        metadata: Dict[str, str],
+        skip: int = 0,
+        length: Optional[int] = None,
+        first_chunk: int = 0,
+        last_chunk: bool = True
+    ) -> AsyncIterator[bytes]:
+        """Read an S3 body in ``read_size`` pieces, decode it and yield [skip, skip + length)"""
+        encrypted = metadata.get('encrypted') == 'True'
+        decryptor = None
+        if encrypted and metadata.get('encryption_version') == ENCRYPTION_VERSION_CHUNKED:
+            decryptor = self._chunk_decryptor(metadata, first_index=first_chunk)
+        elif encrypted:
+            # Legacy whole-object Fernet token: can only be decrypted in one piece
+            logger.debug("Buffering legacy encrypted object for decryption")
+            body = io.BytesIO(self._decrypt_data(await asyncio.to_thread(body.read), metadata))
+
+        pipeline = _DownloadPipeline(decryptor, metadata.get('compressed') == 'True', self.read_size)
+
+        def pull() -> Tuple[List[bytes], bool]:
+            data = body.read(self.read_size)
+            if not data:
+                return pipeline.finish(last_chunk), True
+            return pipeline.feed(data), False
+
+        remaining = length
+        try:
+            done = False
+            while not done and remaining != 0:
+                try:
+                    pieces, done = await asyncio.to_thread(pull)
+                except (InvalidTag, zlib.error) as e:
+                    raise FileDownloadError(f"Failed to decode file: {e}")
+                for piece in pieces:
+                    if skip:
+                        dropped = min(skip, len(piece))
+                        piece = piece[dropped:]
+                        skip -= dropped
+                    if remaining is not None:
+                        piece = piece[:remaining]
+                        remaining -= len(piece)
+                    if piece:
+                        yield piece
+                    if remaining == 0:
+                        break
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
+
     def delete_file(self, request: FileDeleteRequest) -> FileDeleteResponse:
         """Delete file from storage"""
         try:
@@ -503,6 +1181,15 @@ __all__ = [
     'FileListRequest',
     'FileListResponse',
     'StoragePath',
+
+    # Streaming
+    'ByteSource',
+    'ChunkEncryptor',
+    'ChunkDecryptor',
+    'MultipartWriter',
+    'StoredObjectStream',
+    'aiter_bytes',
+    'parse_range_header',
     
     # Client
     'StorageService',
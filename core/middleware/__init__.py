@@ -2,6 +2,7 @@ from .redis_session import RedisSessionMiddleware
 from .security import SecurityMiddleware, apply_security
 from .csrf_protection import CSRFProtection
 from .auth_context import AuthContextMiddleware
+from .rate_limit import RateLimit, SmartRateLimiter
 import os
 
 
@@ -18,6 +19,8 @@ __all__ = [
     "SecurityMiddleware",
     "CSRFProtection",
     "AuthContextMiddleware",
+    "RateLimit",
+    "SmartRateLimiter",
     "apply_security",
     "apply_security_legacy",
     "session_middleware",
@@ -0,0 +1,90 @@
+"""
+ASGI helpers for raw middleware
+
+Small building blocks shared by the pure-ASGI middleware in this package:
+- BufferedBody reads a request body ahead of the app and replays it, so a
+  form can be parsed once in middleware and again by the handler without
+  touching the socket twice
+- send_with_headers merges extra headers into ``http.response.start`` in a
+  single step, leaving the response body (and streaming) untouched
+- is_static_path tells the middleware which requests to pass straight through
+"""
+
+from typing import Callable, Iterable, List, Tuple
+
+from starlette.types import Message, Receive, Send
+
+Header = Tuple[bytes, bytes]
+
+STATIC_PREFIXES = ("/static/", "/css/", "/js/")
+STATIC_SUFFIXES = (".css", ".js", ".ico", ".png", ".jpg", ".gif", ".svg", ".woff", ".woff2")
+
+
+def is_static_path(path: str) -> bool:
+    """Static files and assets, which skip security and session processing"""
+    return path.startswith(STATIC_PREFIXES) or path.endswith(STATIC_SUFFIXES)
+
+
+class BufferedBody:
+    """Request body read ahead of the app and replayed to it afterwards"""
+
+    def __init__(self, receive: Receive):
+        self._receive = receive
+        self.messages: List[Message] = []
+        self.size = 0
+        self.complete = False
+
+    async def read(self, limit: int) -> bool:
+        """
+        Buffer body messages until the body ends or exceeds ``limit`` bytes.
+
+        Returns True when the whole body is buffered. Anything not read yet is
+        left on the wire and streamed to the app after the buffered part.
+        """
+        while not self.complete and self.size <= limit:
+            message = await self._receive()
+            self.messages.append(message)
+            if message["type"] != "http.request":
+                break
+            self.size += len(message.get("body", b""))
+            self.complete = not message.get("more_body", False)
+        return self.complete
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(m.get("body", b"") for m in self.messages if m["type"] == "http.request")
+
+    def replay(self) -> Receive:
+        """A receive callable that yields the buffered messages, then the rest of the stream"""
+        pending = list(self.messages)
+
+        async def receive() -> Message:
+            if pending:
+                return pending.pop(0)
+            return await self._receive()
+
+        return receive
+
+
+def send_with_headers(send: Send, extra_headers: Callable[[], Iterable[Header]]) -> Send:
+    """
+    Wrap ``send`` so ``extra_headers()`` is merged into the response start.
+
+    Extra headers replace any the app set with the same name, except
+    ``set-cookie`` which may legitimately repeat.
+    """
+
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            extra = list(extra_headers())
+            if extra:
+                replaced = {name for name, _ in extra if name != b"set-cookie"}
+                headers = [
+                    (name, value) for name, value in message.get("headers", ())
+                    if name.lower() not in replaced
+                ]
+                headers.extend(extra)
+                message["headers"] = headers
+        await send(message)
+
+    return wrapped
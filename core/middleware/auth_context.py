@@ -1,9 +1,14 @@
-from fasthtml.common import *
+from typing import Iterable, List, Optional
 
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from core.db.repositories.base_repository import batched_loads
+from core.middleware.asgi import Header, send_with_headers
 from core.services.auth.auth_service import AnonymousUser
 from core.services.auth.context import (
+    UserContext,
     create_anonymous_context,
     create_user_context,
     current_user_context,
@@ -11,54 +16,84 @@ from core.services.auth.context import (
 from core.services.auth.helpers import get_current_user_from_request
 
 
-def set_response_cookies(request, response):
-    user_context = current_user_context.get(None)
-    if not user_context:
-        return response
+def cookie_headers(user_context: UserContext) -> List[Header]:
+    """Set-Cookie headers for cookies queued on the user context during the request"""
+    cookies = getattr(user_context, "_outgoing_cookies", None)
+    if not cookies:
+        return []
 
-    for key, (value, kwargs) in user_context._outgoing_cookies.items():
+    response = Response()
+    for key, (value, kwargs) in cookies.items():
         response.set_cookie(key, value, **kwargs)
+    return [header for header in response.raw_headers if header[0] == b"set-cookie"]
 
-    return response
-
-
-class AuthContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        token = None
-        user_context = None
-
-        try:
-            auth_service = getattr(request.app.state, "auth_service", None)
-            if auth_service is None:
-                user = AnonymousUser()
-            else:
-                user = await get_current_user_from_request(request, auth_service)
-
-            if isinstance(user, AnonymousUser) or not user:
-                user_context = create_anonymous_context(request)
-            else:
-                user_context = create_user_context(user, request)
-
-            # Set user context for middleware
-            token = current_user_context.set(user_context)
-            
-            # Set user data in request state for backward compatibility with decorators
-            if not isinstance(user, AnonymousUser) and user:
-                request.state.user = {
-                    "id": str(user.id),
-                    "_id": str(user.id),
-                    "email": user.email,
-                    "role": user.role,
-                    "roles": user_context.roles,
-                }
-            else:
-                request.state.user = None
-
-            response = await call_next(request)
-            return set_response_cookies(request, response)
-        finally:
-            if token is not None:
-                current_user_context.reset(token)
+
+async def resolve_user_context(request: Request) -> UserContext:
+    """Authenticate the request and set ``request.state.user`` for the decorators"""
+    auth_service = getattr(getattr(request.scope.get("app"), "state", None), "auth_service", None)
+    if auth_service is None:
+        user = AnonymousUser()
+    else:
+        user = await get_current_user_from_request(request, auth_service)
+
+    if isinstance(user, AnonymousUser) or not user:
+        user_context = create_anonymous_context(request)
+        request.state.user = None
+    else:
+        user_context = create_user_context(user, request)
+        # Set user data in request state for backward compatibility with decorators
+        request.state.user = {
+            "id": str(user.id),
+            "_id": str(user.id),
+            "email": user.email,
+            "role": user.role,
+            "roles": user_context.roles,
+        }
+    return user_context
+
+
+async def call_with_user_context(
+    app: ASGIApp,
+    scope: Scope,
+    receive: Receive,
+    send: Send,
+    headers: Iterable[Header] = (),
+    user_context: Optional[UserContext] = None,
+) -> None:
+    """
+    Run ``app`` with the request's user context and a batched_loads scope.
+
+    ``headers`` are merged into the response together with any cookies the
+    request queued, so callers get a single header-injection step. Pass
+    ``user_context`` when the caller already resolved it.
+    """
+    if user_context is None:
+        user_context = await resolve_user_context(Request(scope))
+    headers = list(headers)
+    token = current_user_context.set(user_context)
+    try:
+        with batched_loads():
+            await app(
+                scope,
+                receive,
+                send_with_headers(send, lambda: headers + cookie_headers(user_context)),
+            )
+    finally:
+        current_user_context.reset(token)
+
+
+class AuthContextMiddleware:
+    """Resolve the current user for every HTTP request (raw ASGI)"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        await call_with_user_context(self.app, scope, receive, send)
 
 
 '''
@@ -67,9 +102,9 @@ Use Facade in Services
 class AnalyticsClient:
       def __init__(self, settings_facade: SettingsFacade):
           self.settings = settings_facade
-      
+
       async def track_event(self, event):
           if not self.settings.analytics_tracking_enabled:
               return
           # Track event
-'''
\ No newline at end of file
+'''
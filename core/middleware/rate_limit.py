@@ -0,0 +1,230 @@
+"""
+Rate Limiting
+
+GCRA (generic cell rate algorithm) limits shared by every worker through one
+Redis Lua script, with an in-process token bucket as fallback when Redis is
+not configured or not reachable. Both keep O(1) state per key:
+- Redis stores one "theoretical arrival time" per key, expiring as soon as
+  the key would be back at full burst, so idle keys evict themselves
+- The local buckets live in an LRU ordered by last use; buckets idle for a
+  full window are dropped, and the map is capped at RATE_LIMIT_LOCAL_MAX_KEYS
+
+Limits are configured per route (exact path, or a prefix ending in ``*``)
+with optional per-role overrides, e.g. in RATE_LIMITS:
+
+    {"/api/*": {"requests": 100, "window": 60,
+                "roles": {"admin": {"requests": 1000, "window": 60}, "system": null}}}
+
+A role mapped to null is not limited on that route.
+"""
+
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.db.adapters.redis_adapter import RedisAdapter, RedisScript, get_redis_adapter
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Per-process fallback buckets kept at most (least recently used go first)
+RATE_LIMIT_LOCAL_MAX_KEYS = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "100000"))
+# Seconds to stay on the local fallback after a Redis error before trying Redis again
+RATE_LIMIT_REDIS_RETRY = float(os.getenv("RATE_LIMIT_REDIS_RETRY", "5"))
+
+DEFAULT_LIMITS: Dict[str, Dict[str, Any]] = {
+    "/auth/login": {"requests": 10, "window": 900},
+    "/auth/register": {"requests": 5, "window": 3600},
+    "/auth/password-reset": {"requests": 5, "window": 3600},
+}
+
+# KEYS: arrival-time key. ARGV: emission interval (us), burst window (us).
+# Returns {allowed (0/1), retry after (us)}. Uses the Redis clock so every
+# worker agrees on "now".
+_GCRA_SCRIPT = RedisScript("""
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if now < allow_at then
+    return {0, allow_at - now}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, 0}
+""")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """``requests`` per ``window`` seconds, allowed as a burst and refilled evenly"""
+    requests: int
+    window: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds between requests at the sustained rate"""
+        return self.window / self.requests
+
+
+@dataclass
+class RateLimitRule:
+    """A route's default limit and per-role overrides (None = unlimited)"""
+    route: str
+    limit: Optional[RateLimit]
+    roles: Dict[str, Optional[RateLimit]] = field(default_factory=dict)
+
+    def limit_for(self, roles: Iterable[str]) -> Optional[RateLimit]:
+        """The most generous limit among ``roles`` that have an override, else the default"""
+        overrides = [self.roles[role] for role in roles if role in self.roles]
+        if not overrides:
+            return self.limit
+        if any(limit is None for limit in overrides):
+            return None
+        return min(overrides, key=lambda limit: limit.interval)
+
+
+def _parse_limit(spec: Optional[Dict[str, Any]]) -> Optional[RateLimit]:
+    if spec is None:
+        return None
+    return RateLimit(int(spec["requests"]), float(spec["window"]))
+
+
+def load_rules(config: Optional[Dict[str, Dict[str, Any]]] = None) -> List[RateLimitRule]:
+    """
+    Build rules from DEFAULT_LIMITS overlaid with ``config``.
+
+    ``config`` defaults to the RATE_LIMITS environment variable (JSON).
+    """
+    if config is None:
+        config = json.loads(os.getenv("RATE_LIMITS", "{}"))
+    merged = {**DEFAULT_LIMITS, **config}
+    return [
+        RateLimitRule(
+            route=route,
+            limit=_parse_limit(spec if "requests" in spec else None),
+            roles={role: _parse_limit(limit) for role, limit in spec.get("roles", {}).items()},
+        )
+        for route, spec in merged.items()
+        if spec is not None
+    ]
+
+
+class LocalRateLimiter:
+    """
+    In-process token buckets, one per key.
+
+    Equivalent to the GCRA above for a single process: a bucket holds up to
+    ``requests`` tokens and refills at ``requests / window`` per second.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_LOCAL_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> (tokens, last update, window), least recently used first
+        self.buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+
+    def check(self, key: str, limit: RateLimit, now: Optional[float] = None) -> Tuple[bool, Optional[int]]:
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+
+        tokens, last, _ = self.buckets.pop(key, (limit.requests, now, limit.window))
+        tokens = min(limit.requests, tokens + (now - last) / limit.interval)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now, limit.window)
+            return False, max(1, math.ceil((1 - tokens) * limit.interval))
+
+        self.buckets[key] = (tokens - 1, now, limit.window)
+        return True, None
+
+    def _evict(self, now: float) -> None:
+        """Drop buckets idle long enough to be full again, and the oldest beyond max_keys"""
+        buckets = self.buckets
+        while buckets:
+            key, (_, last, window) = next(iter(buckets.items()))
+            if now - last < window and len(buckets) < self.max_keys:
+                break
+            del buckets[key]
+
+
+class SmartRateLimiter:
+    """
+    Route/role rate limits, shared across workers through Redis.
+
+    Falls back to LocalRateLimiter when there is no Redis, and for
+    RATE_LIMIT_REDIS_RETRY seconds after a Redis error.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[RateLimitRule]] = None,
+        redis: Optional[RedisAdapter] = None,
+        key_prefix: str = "ratelimit",
+    ):
+        if redis is None and os.getenv("REDIS_URL"):
+            redis = get_redis_adapter()
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.local = LocalRateLimiter()
+        self._redis_retry_at = 0.0
+
+        rules = load_rules() if rules is None else rules
+        self.exact = {rule.route: rule for rule in rules if not rule.route.endswith("*")}
+        # Longest prefix wins
+        self.prefixes = sorted(
+            (rule for rule in rules if rule.route.endswith("*")),
+            key=lambda rule: len(rule.route),
+            reverse=True,
+        )
+
+    @property
+    def limits(self) -> Dict[str, Optional[RateLimit]]:
+        """Default limit per route"""
+        return {rule.route: rule.limit for rule in [*self.exact.values(), *self.prefixes]}
+
+    def rule_for(self, path: str) -> Optional[RateLimitRule]:
+        rule = self.exact.get(path)
+        if rule is None:
+            for prefix_rule in self.prefixes:
+                if path.startswith(prefix_rule.route[:-1]):
+                    return prefix_rule
+        return rule
+
+    async def check_rate_limit(
+        self,
+        identifier: str,
+        path: str,
+        roles: Iterable[str] = (),
+    ) -> Tuple[bool, Optional[int]]:
+        """Record a request; returns (allowed, seconds until retry when not allowed)"""
+        rule = self.rule_for(path)
+        if rule is None:
+            return True, None
+        limit = rule.limit_for(roles)
+        if limit is None:
+            return True, None
+
+        key = f"{self.key_prefix}:{rule.route}:{identifier}"
+        if self.redis is not None and time.monotonic() >= self._redis_retry_at:
+            try:
+                allowed, retry_us = await _GCRA_SCRIPT(
+                    self.redis,
+                    keys=[key],
+                    args=[int(limit.interval * 1e6), int(limit.window * 1e6)],
+                )
+                if allowed:
+                    return True, None
+                return False, max(1, math.ceil(retry_us / 1e6))
+            except Exception as e:
+                logger.warning(f"Redis rate limiting unavailable, using local limits: {e}")
+                self._redis_retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY
+
+        return self.local.check(key, limit)
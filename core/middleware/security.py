@@ -9,59 +9,138 @@ Provides input sanitization WITHOUT breaking CSS/MonsterUI by being selective:
 - Maintains security for user-generated content
 """
 
-import time
-from typing import Dict, Optional, Tuple
-from collections import defaultdict
-from datetime import datetime, timezone, timedelta
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
-from starlette.exceptions import HTTPException
+from starlette.datastructures import Headers, QueryParams, State
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from core.middleware.asgi import BufferedBody, Header, is_static_path, send_with_headers
+from core.middleware.auth_context import call_with_user_context, resolve_user_context
+from core.middleware.rate_limit import SmartRateLimiter
 from core.utils.security import sanitize_html, sanitize_sql_input
 from core.utils.logger import get_logger
-from core.services.audit_service import get_audit_service, AuditEventType
+from core.services.audit_service import get_audit_service
 
 logger = get_logger(__name__)
 
+# Largest form body buffered for sanitization; bigger bodies stream through as-is
+FORM_MAX_BYTES = int(os.getenv("SECURITY_FORM_MAX_BYTES", str(1024 * 1024)))
 
-class SmartRateLimiter:
-    """Rate limiting for auth endpoints only"""
-    
-    def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.audit = get_audit_service()
-        
-        self.limits = {
-            "/auth/login": {"requests": 10, "window": 900},
-            "/auth/register": {"requests": 5, "window": 3600},
-            "/auth/password-reset": {"requests": 5, "window": 3600},
-        }
-    
-    def check_rate_limit(self, identifier: str, path: str) -> Tuple[bool, Optional[int]]:
-        if path not in self.limits:
-            return True, None
-        
-        limit = self.limits[path]
-        current_time = time.time()
-        window = limit["window"]
-        max_requests = limit["requests"]
-        
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if current_time - req_time < window
-        ]
-        
-        if len(self.requests[identifier]) >= max_requests:
-            retry_after = int(window - (current_time - self.requests[identifier][0]))
-            return False, retry_after
-        
-        self.requests[identifier].append(current_time)
-        return True, None
-
-
-class SecurityMiddleware(BaseHTTPMiddleware):
+FORM_CONTENT_TYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+
+# Fields that should ALWAYS be sanitized (user input)
+SANITIZE_FIELDS = frozenset({
+    'email', 'username', 'password', 'name', 'subject', 'message', 'comment',
+    'description', 'title', 'search', 'query', 'filter', 'sort', 'first_name',
+    'last_name', 'phone', 'address', 'city', 'country', 'zip', 'bio'
+})
+
+# Field name fragments that look like user-supplied targets
+DANGEROUS_FIELD_PATTERNS = ('url', 'link', 'redirect', 'src', 'href', 'action')
+
+# Fields that should NEVER be sanitized (preserves CSS, HTML, JSON)
+PRESERVE_FIELDS = frozenset({
+    'css', 'styles', 'html', 'javascript', 'json', 'data', 'contenteditable',
+    'editor_content', 'template', 'markup', 'code', 'script', 'theme',
+    'layout', 'design', 'styling', 'custom_css', 'inline_styles', 'component_html'
+})
+
+# Content patterns that indicate CSS/styling (preserve these)
+CSS_PATTERNS = (
+    '<style', '</style>', 'css:', '{', '}', 'font-family', 'color:', 'background:',
+    'margin:', 'padding:', 'border:', 'display:', 'position:', 'width:', 'height:',
+    'class="', 'id="', 'data-', 'onclick', 'onload', 'onerror'
+)
+
+# CSS properties that mark a value as styling even without the patterns above
+CSS_INDICATORS = ('color:', 'background:', 'font-', 'margin:', 'padding:', 'border:')
+
+FIELD_CACHE_SIZE = int(os.getenv("SECURITY_FIELD_CACHE_SIZE", "4096"))
+
+
+def _any_of(patterns) -> "re.Pattern[str]":
+    """
+    One regex matching any of the lowercase ``patterns`` as a substring.
+
+    Patterns are factored into a trie so the regex engine tests each shared
+    prefix once per position instead of once per pattern. Search against
+    lowercased text; IGNORECASE is several times slower.
+    """
+    trie: Dict[str, dict] = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def compile_node(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + compile_node(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A pattern ends here, so the rest is optional (and never needed for a match)
+        return "" if "" in node else body
+
+    return re.compile(compile_node(trie))
+
+
+_PRESERVE_NAME_RE = _any_of(PRESERVE_FIELDS)
+_DANGEROUS_NAME_RE = _any_of(DANGEROUS_FIELD_PATTERNS)
+_CSS_VALUE_RE = _any_of(CSS_PATTERNS + CSS_INDICATORS)
+
+# Characters sanitize_html escapes; values without them pass through it unchanged
+_HTML_SPECIAL_RE = re.compile(r"[&<>\"']")
+
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def classify_field(field_name: str) -> Tuple[bool, bool]:
+    """(preserve, sanitize) for a field name, memoized since forms reuse the same names"""
+    field_lower = field_name.lower()
+    preserve = _PRESERVE_NAME_RE.search(field_lower) is not None
+    sanitize = field_lower in SANITIZE_FIELDS or _DANGEROUS_NAME_RE.search(field_lower) is not None
+    return preserve, sanitize
+
+
+def sanitize_value(value: str) -> str:
+    """``sanitize_sql_input(sanitize_html(value))``, skipping the HTML pass when nothing needs escaping"""
+    if _HTML_SPECIAL_RE.search(value):
+        value = sanitize_html(value)
+    return sanitize_sql_input(value)
+
+
+# Very permissive CSP to avoid breaking CSS/MonsterUI
+# This allows everything while still providing some security benefits
+CONTENT_SECURITY_POLICY = (
+    "default-src 'self' 'unsafe-inline' 'unsafe-eval' "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com https://fonts.gstatic.com "
+    "img-src 'self' data: blob: https: "
+    "font-src 'self' https://fonts.googleapis.com https://fonts.gstatic.com https://cdn.jsdelivr.net "
+    "connect-src 'self' https://cdn.jsdelivr.net "
+    "media-src 'self' blob: https: "
+    "object-src 'none' "
+    "base-uri 'self' "
+    "form-action 'self' "
+    "frame-ancestors 'none' "
+    "upgrade-insecure-requests"
+)
+
+# Encoded once; merged into every response start
+SECURITY_HEADERS: List[Header] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"content-security-policy", CONTENT_SECURITY_POLICY.encode("latin-1")),
+]
+HSTS_HEADER: Header = (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
+
+
+class SecurityMiddleware:
     """
     Smart security middleware that sanitizes input WITHOUT breaking CSS/MonsterUI.
     
@@ -71,166 +150,118 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     - Uses field name patterns to determine what to sanitize
     - Skips static files completely
     - Maintains security for user-generated content
+
+    It is raw ASGI so streaming responses pass straight through. The form
+    body is buffered once and replayed to the handler, and all response
+    headers are added in one step. With ``auth_context=True`` it also does
+    the AuthContextMiddleware work in the same pass.
     """
     
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, auth_context: bool = False):
+        self.app = app
+        self.auth_context = auth_context
         self.rate_limiter = SmartRateLimiter()
         self.audit = get_audit_service()
-        
-        # Fields that should ALWAYS be sanitized (user input)
-        self.SANITIZE_FIELDS = {
-            'email', 'username', 'password', 'name', 'subject', 'message', 'comment',
-            'description', 'title', 'search', 'query', 'filter', 'sort', 'first_name',
-            'last_name', 'phone', 'address', 'city', 'country', 'zip', 'bio'
-        }
-        
-        # Fields that should NEVER be sanitized (preserves CSS, HTML, JSON)
-        self.PRESERVE_FIELDS = {
-            'css', 'styles', 'html', 'javascript', 'json', 'data', 'contenteditable',
-            'editor_content', 'template', 'markup', 'code', 'script', 'theme',
-            'layout', 'design', 'styling', 'custom_css', 'inline_styles', 'component_html'
-        }
-        
-        # Content patterns that indicate CSS/styling (preserve these)
-        self.CSS_PATTERNS = [
-            '<style', '</style>', 'css:', '{', '}', 'font-family', 'color:', 'background:',
-            'margin:', 'padding:', 'border:', 'display:', 'position:', 'width:', 'height:',
-            'class="', 'id="', 'data-', 'onclick', 'onload', 'onerror'
-        ]
-    
+
+    # Rule sets, kept on the class for callers that inspect them
+    SANITIZE_FIELDS = SANITIZE_FIELDS
+    PRESERVE_FIELDS = PRESERVE_FIELDS
+    CSS_PATTERNS = CSS_PATTERNS
+
     def _should_preserve_field(self, field_name: str, value: str) -> bool:
         """Determine if a field should be preserved (not sanitized)"""
-        field_lower = field_name.lower()
-        value_lower = str(value).lower()
-        
-        # Check field name patterns
-        if any(preserve in field_lower for preserve in self.PRESERVE_FIELDS):
-            return True
-        
-        # Check content patterns (likely CSS/HTML)
-        if any(pattern in value_lower for pattern in self.CSS_PATTERNS):
-            return True
-        
-        # Check if it looks like CSS (has CSS properties)
-        css_indicators = ['color:', 'background:', 'font-', 'margin:', 'padding:', 'border:']
-        if any(indicator in value_lower for indicator in css_indicators):
-            return True
-        
-        return False
-    
+        # Field name patterns, then content patterns (likely CSS/HTML)
+        return classify_field(field_name)[0] or _CSS_VALUE_RE.search(str(value).lower()) is not None
+
     def _should_sanitize_field(self, field_name: str) -> bool:
         """Determine if a field should be sanitized"""
-        field_lower = field_name.lower()
-        
-        # Always sanitize known dangerous fields
-        if field_lower in self.SANITIZE_FIELDS:
-            return True
-        
-        # Sanitize fields that look like user input
-        dangerous_patterns = ['url', 'link', 'redirect', 'src', 'href', 'action']
-        if any(pattern in field_lower for pattern in dangerous_patterns):
-            return True
-        
-        return False
-    
-    async def dispatch(self, request: Request, call_next):
+        return classify_field(field_name)[1]
+
+    def _sanitize_items(self, items) -> Tuple[Dict[str, object], int]:
+        """Selectively sanitize name/value pairs, returning the clean dict and the number changed"""
+        clean = {}
+        suspicious = 0
+        css_value = _CSS_VALUE_RE.search
+        for k, v in items:
+            if not isinstance(v, str) or classify_field(k)[0] or css_value(v.lower()):
+                # Uploaded files and CSS/styling content pass through untouched
+                clean[k] = v
+            else:
+                # Dangerous or unknown field
+                safe_v = sanitize_value(v)
+                if v != safe_v:
+                    suspicious += 1
+                clean[k] = safe_v
+        return clean, suspicious
+
+    async def _sanitize_form(self, scope: Scope, body: BufferedBody, state: State) -> int:
+        """Parse the buffered form once and share the sanitized copy via request state"""
+        content_type = Headers(scope=scope).get("content-type", "").lower()
+        if not content_type.startswith(FORM_CONTENT_TYPES):
+            state.sanitized_form = {}
+            return 0
+
+        if not await body.read(FORM_MAX_BYTES):
+            logger.warning(
+                f"Form body for {scope['path']} exceeds {FORM_MAX_BYTES} bytes; not sanitized"
+            )
+            return 0
+
+        try:
+            form = await Request(scope, body.replay()).form()
+            state.sanitized_form, suspicious = self._sanitize_items(form.items())
+        except Exception as e:
+            logger.warning(f"Failed to process form data: {e}")
+            return 0
+        return suspicious
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request with smart security checks"""
-        
-        client_ip = request.client.host if request.client else "unknown"
-        path = request.url.path
-        
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
         # Skip security processing for static files and assets
-        if (path.startswith('/static/') or 
-            path.startswith('/css/') or 
-            path.startswith('/js/') or
-            path.endswith('.css') or 
-            path.endswith('.js') or
-            path.endswith('.ico') or
-            path.endswith('.png') or
-            path.endswith('.jpg') or
-            path.endswith('.gif') or
-            path.endswith('.svg') or
-            path.endswith('.woff') or
-            path.endswith('.woff2')):
-            return await call_next(request)
-        
-        # Rate limiting for auth endpoints
-        if path.startswith('/auth/'):
-            user_id = getattr(request.state, "user_id", None)
+        if is_static_path(path):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        state = State(scope.setdefault("state", {}))
+
+        user_context = await resolve_user_context(Request(scope)) if self.auth_context else None
+
+        # Rate limiting for configured routes, by user (when known) and client IP
+        if self.rate_limiter.rule_for(path) is not None:
+            user = getattr(state, "user", None) or {}
+            user_id = user.get("id") or getattr(state, "user_id", None)
             identifier = f"{user_id or 'anonymous'}:{client_ip}"
-            
-            is_allowed, retry_after = self.rate_limiter.check_rate_limit(identifier, path)
+            roles = user.get("roles") or [user.get("role") or "anonymous"]
+
+            is_allowed, retry_after = await self.rate_limiter.check_rate_limit(identifier, path, roles)
             if not is_allowed:
                 self.audit.log_rate_limit_exceeded(client_ip, path, retry_after)
-                raise HTTPException(
-                    429, 
+                response = PlainTextResponse(
                     f"Too many requests. Try again in {retry_after} seconds.",
-                    headers={"Retry-After": str(retry_after)}
+                    status_code=429,
+                    headers={"Retry-After": str(retry_after)},
                 )
-        
+                await response(scope, receive, send)
+                return
+
         # Smart input sanitization
-        suspicious_inputs = 0
-        sanitized_count = 0
-        
-        # Sanitize query parameters (selectively)
-        clean_query = {}
-        for k, v in request.query_params.items():
-            if self._should_preserve_field(k, v):
-                # Preserve CSS/styling content
-                clean_query[k] = v
-            elif self._should_sanitize_field(k):
-                # Sanitize dangerous fields
-                safe_v = sanitize_sql_input(sanitize_html(v))
-                if v != safe_v:
-                    suspicious_inputs += 1
-                    sanitized_count += 1
-                clean_query[k] = safe_v
-            else:
-                # Unknown field - be conservative but check if it looks like CSS
-                if any(pattern in str(v).lower() for pattern in self.CSS_PATTERNS):
-                    clean_query[k] = v  # Preserve likely CSS content
-                else:
-                    safe_v = sanitize_sql_input(sanitize_html(v))
-                    if v != safe_v:
-                        suspicious_inputs += 1
-                        sanitized_count += 1
-                    clean_query[k] = safe_v
-        
-        request.state.sanitized_query = clean_query
-        
-        # Sanitize form data (selectively)
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                form = await request.form()
-                clean_form = {}
-                for k, v in form.items():
-                    if self._should_preserve_field(k, v):
-                        # Preserve CSS/styling content
-                        clean_form[k] = v
-                    elif self._should_sanitize_field(k):
-                        # Sanitize dangerous fields
-                        safe_v = sanitize_sql_input(sanitize_html(v))
-                        if v != safe_v:
-                            suspicious_inputs += 1
-                            sanitized_count += 1
-                        clean_form[k] = safe_v
-                    else:
-                        # Unknown field - check if it looks like CSS
-                        if any(pattern in str(v).lower() for pattern in self.CSS_PATTERNS):
-                            clean_form[k] = v  # Preserve likely CSS content
-                        else:
-                            safe_v = sanitize_sql_input(sanitize_html(v))
-                            if v != safe_v:
-                                suspicious_inputs += 1
-                                sanitized_count += 1
-                            clean_form[k] = safe_v
-                
-                request.state.sanitized_form = clean_form
-                
-            except Exception as e:
-                logger.warning(f"Failed to process form data: {e}")
-        
+        state.sanitized_query, suspicious_inputs = self._sanitize_items(
+            QueryParams(scope.get("query_string", b"")).items()
+        )
+
+        # Sanitize form data (selectively); the handler reads the same buffered body
+        body = BufferedBody(receive)
+        if scope["method"] in ("POST", "PUT", "PATCH"):
+            suspicious_inputs += await self._sanitize_form(scope, body, state)
+
         # Log security events (but don't be too noisy)
         if suspicious_inputs > 5:  # Only log if many suspicious inputs
             self.audit.log_security_breach_attempt(
@@ -238,51 +269,26 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 ip_address=client_ip,
                 details={
                     "suspicious_inputs": suspicious_inputs,
-                    "sanitized_count": sanitized_count,
+                    "sanitized_count": suspicious_inputs,
                     "path": path
                 }
             )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add security headers (CSS-friendly)
-        self._add_security_headers(response, request)
-        
-        return response
-    
-    def _add_security_headers(self, response: Response, request: Request):
-        """Add security headers that don't break CSS/MonsterUI"""
-        
-        # Basic security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        # Very permissive CSP to avoid breaking CSS/MonsterUI
-        # This allows everything while still providing some security benefits
-        csp = (
-            "default-src 'self' 'unsafe-inline' 'unsafe-eval' "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net "
-            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com https://fonts.gstatic.com "
-            "img-src 'self' data: blob: https: "
-            "font-src 'self' https://fonts.googleapis.com https://fonts.gstatic.com https://cdn.jsdelivr.net "
-            "connect-src 'self' https://cdn.jsdelivr.net "
-            "media-src 'self' blob: https: "
-            "object-src 'none' "
-            "base-uri 'self' "
-            "form-action 'self' "
-            "frame-ancestors 'none' "
-            "upgrade-insecure-requests"
-        )
-        response.headers["Content-Security-Policy"] = csp
-        
-        # Only add HSTS in production HTTPS
-        if request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+
+        headers = self._security_headers(scope)
+        if user_context is not None:
+            await call_with_user_context(self.app, scope, body.replay(), send, headers, user_context)
+        else:
+            await self.app(scope, body.replay(), send_with_headers(send, lambda: headers))
+
+    def _security_headers(self, scope: Scope) -> List[Header]:
+        """Security headers that don't break CSS/MonsterUI"""
+        if scope.get("scheme") == "https":
+            # Only add HSTS in production HTTPS
+            return SECURITY_HEADERS + [HSTS_HEADER]
+        return SECURITY_HEADERS
 
 
-def apply_security(app):
+def apply_security(app, auth_context: bool = False):
     """Apply security middleware to app"""
-    app.add_middleware(SecurityMiddleware)
+    app.add_middleware(SecurityMiddleware, auth_context=auth_context)
     return app
@@ -0,0 +1,415 @@
+"""
+Session Engine
+
+One session implementation behind CookieSessionMiddleware,
+RedisSessionMiddleware and the settings SessionManager:
+- Values are stored per key as msgpack. A key is decoded the first time it
+  is read, and only keys that were set, deleted or mutated in place are
+  encoded again on the way out
+- CookieSessionStore keeps the whole session in one HMAC-signed cookie, and
+  unpacks it only when the request actually touches the session
+- RedisSessionStore keeps only a random id in the cookie and the keys in a
+  Redis hash. Changes go out in one pipeline; sessions that were only read
+  have their TTL refreshed in batches across requests
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import struct
+import time
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+import msgpack
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.db.adapters.redis_adapter import RedisAdapter, get_redis_adapter
+from core.middleware.asgi import is_static_path
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Secret the cookie signing key is derived from; falls back to JWT_SECRET
+SESSION_SECRET = os.getenv("SESSION_SECRET") or os.getenv("JWT_SECRET") or ""
+# Seconds a signed session cookie stays valid after it was last issued
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(14 * 24 * 60 * 60)))
+# Seconds between batched TTL refreshes for Redis sessions that were only read
+SESSION_TTL_FLUSH_INTERVAL = float(os.getenv("SESSION_TTL_FLUSH_INTERVAL", "1"))
+
+REDIS_SESSION_PREFIX = "session:"
+# Shape of ids from secrets.token_urlsafe; anything else in the cookie is ignored
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{16,128}")
+
+_DATETIME_EXT = 1
+_MAC_BYTES = 16
+_ISSUED_AT = struct.Struct(">I")
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, obj.isoformat().encode())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Cannot store {type(obj).__name__} in a session")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == _DATETIME_EXT:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def pack_value(value: Any) -> bytes:
+    """Encode one session value"""
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def unpack_value(raw: bytes) -> Any:
+    """Decode one session value"""
+    return msgpack.unpackb(raw, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+class Session(MutableMapping):
+    """
+    A session whose values are decoded on first access.
+
+    ``load`` returns the encoded values (key -> msgpack bytes) and is only
+    called when the session is first read, so requests that never touch
+    the session never decode it.
+    """
+
+    def __init__(self, load: Callable[[], Dict[str, bytes]] = dict, session_id: Optional[str] = None):
+        self.session_id = session_id
+        self._load = load
+        self._raw: Optional[Dict[str, bytes]] = None
+        self._values: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        # Containers handed to callers, which may be changed in place
+        self._lent: Set[str] = set()
+
+    @property
+    def raw(self) -> Dict[str, bytes]:
+        if self._raw is None:
+            try:
+                self._raw = self._load() or {}
+            except Exception as e:
+                logger.warning(f"Discarding unreadable session: {e}")
+                self._raw = {}
+        return self._raw
+
+    @property
+    def loaded(self) -> bool:
+        return self._raw is not None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._values:
+            value = self._values[key]
+        else:
+            value = self._values[key] = unpack_value(self.raw[key])
+        if isinstance(value, (dict, list)):
+            self._lent.add(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._values[key] = value
+        self._dirty.add(key)
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self.raw.pop(key, None)
+        self._dirty.discard(key)
+        self._lent.discard(key)
+        self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._values or key in self.raw
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.raw.keys() | self._values.keys()))
+
+    def __len__(self) -> int:
+        return len(self.raw.keys() | self._values.keys())
+
+    def __repr__(self) -> str:
+        return f"Session({dict(self)!r})"
+
+    def changes(self) -> Tuple[Dict[str, bytes], Set[str]]:
+        """(encoded values to write, keys to delete) since the session was loaded"""
+        updated = {key: pack_value(self._values[key]) for key in self._dirty}
+        for key in self._lent - self._dirty:
+            encoded = pack_value(self._values[key])
+            if encoded != self.raw.get(key):
+                updated[key] = encoded
+        return updated, set(self._deleted)
+
+    def encoded(self, updated: Dict[str, bytes]) -> Dict[str, bytes]:
+        """Every key's encoded value, with ``updated`` applied"""
+        return {**self.raw, **updated}
+
+
+class SessionSigner:
+    """
+    HMAC-SHA256 (truncated) over an issued-at time and a binary payload,
+    for cookie values.
+
+    The key is derived from the secret rather than being the secret itself,
+    so sharing JWT_SECRET never makes a session MAC usable as a token
+    signature or the other way round.
+    """
+
+    def __init__(self, secret: str = SESSION_SECRET, max_age: int = SESSION_MAX_AGE):
+        if not secret:
+            logger.warning("No SESSION_SECRET or JWT_SECRET set; sessions will not survive a restart")
+            secret = secrets.token_hex(32)
+        self.key = hmac.new(secret.encode(), b"session", hashlib.sha256).digest()
+        self.max_age = max_age
+
+    def _mac(self, signed: bytes) -> bytes:
+        return hmac.new(self.key, signed, hashlib.sha256).digest()[:_MAC_BYTES]
+
+    def sign(self, payload: bytes) -> str:
+        signed = _ISSUED_AT.pack(int(time.time())) + payload
+        return base64.urlsafe_b64encode(signed + self._mac(signed)).rstrip(b"=").decode()
+
+    def issued_at(self, value: str) -> Optional[int]:
+        """When a validly signed value was issued (None if it is not one)"""
+        verified = self._verify(value)
+        return verified[0] if verified else None
+
+    def unsign(self, value: str) -> Optional[bytes]:
+        """The payload, or None if the signature is wrong or older than max_age"""
+        verified = self._verify(value)
+        if verified is None or time.time() - verified[0] > self.max_age:
+            return None
+        return verified[1]
+
+    def _verify(self, value: str) -> Optional[Tuple[int, bytes]]:
+        try:
+            data = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        except (ValueError, TypeError):
+            return None
+        signed, mac = data[:-_MAC_BYTES], data[-_MAC_BYTES:]
+        if len(signed) < _ISSUED_AT.size or not hmac.compare_digest(mac, self._mac(signed)):
+            return None
+        (issued,) = _ISSUED_AT.unpack_from(signed)
+        return issued, signed[_ISSUED_AT.size:]
+
+
+class CookieSessionStore:
+    """The whole session in one signed cookie"""
+
+    def __init__(self, signer: Optional[SessionSigner] = None):
+        self.signer = signer or SessionSigner()
+
+    def _decode(self, cookie: str) -> Dict[str, bytes]:
+        payload = self.signer.unsign(cookie)
+        if payload is None:
+            return {}
+        return msgpack.unpackb(payload, raw=False)
+
+    async def open(self, cookie: Optional[str]) -> Session:
+        if not cookie:
+            return Session()
+        return Session(lambda: self._decode(cookie))
+
+    async def commit(self, session: Session, cookie: Optional[str]) -> Optional[str]:
+        """The new cookie value ("" to clear it), or None to leave the cookie alone"""
+        updated, deleted = session.changes()
+        if not updated and not deleted and not self._stale(cookie):
+            return None
+        values = session.encoded(updated)
+        if not values:
+            return "" if cookie else None
+        return self.signer.sign(msgpack.packb(values, use_bin_type=True))
+
+    def _stale(self, cookie: Optional[str]) -> bool:
+        """A valid cookie past half its max_age, re-issued so active sessions don't expire"""
+        issued = self.signer.issued_at(cookie) if cookie else None
+        return issued is not None and time.time() - issued > self.signer.max_age / 2
+
+
+class RedisSessionStore:
+    """
+    Sessions in Redis hashes (one field per key); the cookie holds only the id.
+
+    Also used directly by the settings SessionManager, so both read and
+    write the same records.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[RedisAdapter] = None,
+        ttl_seconds: int = 60 * 60 * 24,
+        prefix: str = REDIS_SESSION_PREFIX,
+        flush_interval: float = SESSION_TTL_FLUSH_INTERVAL,
+    ):
+        # Values are msgpack, so the client must not decode responses
+        self.redis = redis or get_redis_adapter(decode_responses=False)
+        self.ttl = ttl_seconds
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self._pending_refresh: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    async def read_raw(self, session_id: str) -> Dict[str, bytes]:
+        raw = await self.redis.get_client().hgetall(self.key(session_id))
+        return {(k.decode() if isinstance(k, bytes) else k): v for k, v in raw.items()}
+
+    async def read(self, session_id: str) -> Dict[str, Any]:
+        """Every key of a session, decoded ({} when it does not exist)"""
+        return {key: unpack_value(raw) for key, raw in (await self.read_raw(session_id)).items()}
+
+    async def write(
+        self,
+        session_id: str,
+        updated: Dict[str, bytes],
+        deleted: Iterable[str] = (),
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        """Apply encoded changes and reset the TTL in one round trip"""
+        key = self.key(session_id)
+        deleted = list(deleted)
+        async with self.redis.pipeline() as pipe:
+            if deleted:
+                pipe.hdel(key, *deleted)
+            if updated:
+                pipe.hset(key, mapping=updated)
+            pipe.expire(key, ttl_seconds or self.ttl)
+        self._pending_refresh.pop(key, None)
+
+    async def write_values(self, session_id: str, values: Dict[str, Any], ttl_seconds: Optional[int] = None) -> None:
+        await self.write(session_id, {k: pack_value(v) for k, v in values.items()}, ttl_seconds=ttl_seconds)
+
+    async def delete(self, *session_ids: str) -> int:
+        if not session_ids:
+            return 0
+        keys = [self.key(session_id) for session_id in session_ids]
+        for key in keys:
+            self._pending_refresh.pop(key, None)
+        return await self.redis.unlink(*keys)
+
+    def refresh(self, session_id: str, ttl_seconds: Optional[int] = None) -> None:
+        """Queue a TTL refresh; queued refreshes go out together in one pipeline"""
+        self._pending_refresh[self.key(session_id)] = ttl_seconds or self.ttl
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending_refresh = self._pending_refresh, {}
+        if not pending:
+            return
+        try:
+            async with self.redis.pipeline() as pipe:
+                for key, ttl in pending.items():
+                    pipe.expire(key, ttl)
+        except Exception as e:
+            logger.warning(f"Failed to refresh {len(pending)} session TTLs: {e}")
+
+    async def open(self, session_id: Optional[str]) -> Session:
+        if not session_id or not _SESSION_ID_RE.fullmatch(session_id):
+            return Session()
+        raw = await self.read_raw(session_id)
+        if not raw:
+            # Unknown or expired id: start over with a fresh one rather than adopting it
+            return Session()
+        return Session(lambda: raw, session_id=session_id)
+
+    async def commit(self, session: Session, cookie: Optional[str]) -> Optional[str]:
+        """The new cookie value ("" to clear it), or None to leave the cookie alone"""
+        updated, deleted = session.changes()
+        session_id = session.session_id
+
+        if not updated and not deleted:
+            if session_id:
+                self.refresh(session_id)
+            return None
+
+        if session_id is None:
+            if not updated:
+                return "" if cookie else None
+            session_id = session.session_id = secrets.token_urlsafe(32)
+            await self.write(session_id, updated)
+            return session_id
+
+        if not session.encoded(updated):
+            await self.delete(session_id)
+            return ""
+
+        await self.write(session_id, updated, deleted)
+        return None if cookie == session_id else session_id
+
+
+class SessionMiddleware:
+    """
+    Expose ``scope["session"]`` from a session store (raw ASGI).
+
+    Static assets skip the session entirely, and the cookie is only sent
+    when the session id or (cookie mode) its contents change.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Any,
+        cookie_name: str = "session",
+        max_age: Optional[int] = None,
+        cookie_secure: bool = False,
+        cookie_samesite: str = "lax",
+        cookie_domain: Optional[str] = None,
+        cookie_path: str = "/",
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.cookie_name = cookie_name
+        attributes = f"; Path={cookie_path}; HttpOnly"
+        if cookie_samesite:
+            attributes += f"; SameSite={cookie_samesite}"
+        if cookie_secure:
+            attributes += "; Secure"
+        if cookie_domain:
+            attributes += f"; Domain={cookie_domain}"
+        self._attributes = attributes
+        self._max_age = f"; Max-Age={max_age}" if max_age else ""
+
+    def cookie_header(self, value: str) -> Tuple[bytes, bytes]:
+        if value:
+            cookie = f"{self.cookie_name}={value}{self._attributes}{self._max_age}"
+        else:
+            cookie = f"{self.cookie_name}=; Max-Age=0{self._attributes}"
+        return b"set-cookie", cookie.encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or is_static_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        cookie = HTTPConnection(scope).cookies.get(self.cookie_name)
+        session = await self.store.open(cookie)
+        scope["session"] = session
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                value = await self.store.commit(session, cookie)
+                if value is not None:
+                    message["headers"] = [*message.get("headers", ()), self.cookie_header(value)]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -11,6 +11,7 @@ from core.routes import (
     router_profile,
     router_cart,
     router_device_management,
+    router_metrics,
 )
 
 from core.addon_loader import get_addon_loader, get_enabled_addons, get_addon_route
@@ -32,9 +33,10 @@ def mount_core_routes(app) -> None:
     router_profile.to_app(app)
     router_cart.to_app(app)
     router_device_management.to_app(app)
+    router_metrics.to_app(app)
 
     logger.info(
-        "✓ Core routes mounted (main, auth, oauth, admin_sites, admin_users, admin_roles, settings, profile, cart, device_management)"
+        "✓ Core routes mounted (main, auth, oauth, admin_sites, admin_users, admin_roles, settings, profile, cart, device_management, metrics)"
     )
 
 
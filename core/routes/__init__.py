@@ -11,6 +11,7 @@ from .cart import router_cart
 from .device_management import router as router_device_management
 from .settings import router_settings
 from .oauth import router_oauth
+from .metrics import router_metrics
 
 __all__ = [
     'router_main',
@@ -23,4 +24,5 @@ __all__ = [
     'router_oauth',
     'router_cart',  # cart router
     'router_device_management',  # device management router
+    'router_metrics',  # /metrics scrape endpoint
 ]
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Metrics Routes
+
+Prometheus scrape endpoint for connection pool and repository cache telemetry.
+"""
+
+import hmac
+import os
+
+from fasthtml.common import *
+
+from core.db.connection_pool import get_pool_manager
+from core.db.repositories.base_repository import render_cache_metrics
+
+router_metrics = APIRouter()
+
+
+@router_metrics.get("/metrics")
+def metrics_page(request: Request):
+    """
+    Pool and cache metrics in Prometheus text format.
+    
+    Requires METRICS_TOKEN as a bearer token; the endpoint is disabled
+    while it is unset, since the output names internal call sites and
+    pool sizes.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        return Response("Metrics disabled: set METRICS_TOKEN", status_code=403)
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return Response("Unauthorized", status_code=401)
+    return Response(
+        get_pool_manager().render_metrics() + render_cache_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
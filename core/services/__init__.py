@@ -12,6 +12,7 @@ from .cart_service import CartService, Cart, CartItem, RedisCartService
 from .product_service import ProductService, Product
 from .order_service import OrderService, Order, OrderItem, OrderStatus
 from .db_service import DBService, get_db_service
+from .sequence_service import SequenceService, get_sequence_service
 
 # Import auth from core.services.auth (universal auth service)
 from core.services.auth import AuthService, get_current_user, require_role, require_permission
@@ -78,6 +79,8 @@ from core.services.file_manager import (
     upload_file_with_validation,
     upload_file_with_cache,
     download_file_with_cache,
+    stream_file_download,
+    streaming_file_response,
     get_cached_file_metadata,
     FileValidationConfig,
     FileQuotaManager
@@ -116,6 +119,8 @@ __all__ = [
     'OrderStatus',
     'DBService',
     'get_db_service',
+    'SequenceService',
+    'get_sequence_service',
     'PaymentService',
     'StripeWebhookHandler',
     'AuditService',
@@ -144,6 +149,8 @@ __all__ = [
     'upload_file_with_validation',
     'upload_file_with_cache',
     'download_file_with_cache',
+    'stream_file_download',
+    'streaming_file_response',
     'get_cached_file_metadata',
     'FileValidationConfig',
     'FileQuotaManager',
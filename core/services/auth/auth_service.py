@@ -33,6 +33,7 @@ from core.services.auth.models import (
 )
 from core.services.auth.jwt_blacklist import get_blacklist_service
 from core.services.auth.device_manager import DeviceManager
+from core.services.auth.token_cache import AuthTokenCache, get_token_cache
 
 logger = get_logger(__name__)
 
@@ -55,7 +56,8 @@ class AuthService:
     def __init__(
         self,
         user_repository: Optional[UserRepository] = None,
-        jwt_provider: Optional[JWTProvider] = None
+        jwt_provider: Optional[JWTProvider] = None,
+        token_cache: Optional[AuthTokenCache] = None
     ):
         """
         Initialize auth service.
@@ -63,9 +65,11 @@ class AuthService:
         Args:
             user_repository: User repository for data access (optional for demo mode)
             jwt_provider: JWT provider (creates one if not provided)
+            token_cache: Verified-token cache (uses the global one if not provided)
         """
         self.user_repo = user_repository
         self.jwt = jwt_provider or JWTProvider()
+        self.token_cache = token_cache if token_cache is not None else get_token_cache()
         self._user_cache = {}
         self._role_cache = {}
         
@@ -158,6 +162,7 @@ class AuthService:
         Args:
             token: JWT token to revoke
         """
+        self.token_cache.invalidate_token(token)
         try:
             # Add token to blacklist
             from core.services.auth.jwt_blacklist import get_blacklist_service
@@ -183,6 +188,7 @@ class AuthService:
         Args:
             user_id: User ID
         """
+        self.token_cache.invalidate_user(user_id)
         try:
             # Blacklist all tokens for user
             from core.services.auth.jwt_blacklist import get_blacklist_service
@@ -265,18 +271,7 @@ class AuthService:
         Raises:
             InvalidTokenError: If token is invalid or expired
         """
-        # Verify JWT signature and expiration
-        payload = self.jwt.verify(token)
-        
-        if not payload:
-            raise InvalidTokenError()
-        
-        # Check if session exists in Redis (if using sessions)
-        session = await self.user_repo.get_session(token)
-        if session is None:
-            # Token is valid but session doesn't exist
-            # This is OK if not using Redis sessions
-            logger.debug(f"Token valid but no Redis session found")
+        payload = await self._verify_raw(token)
         
         # Convert to TokenPayload model
         return TokenPayload(
@@ -287,27 +282,49 @@ class AuthService:
             email=payload.get("email")
         )
     
+    async def _verify_raw(self, token: str) -> Dict[str, Any]:
+        """Verify token signature, expiry and blacklist; return the raw JWT payload."""
+        # Verify JWT signature and expiration
+        payload = await self.jwt.verify(token)
+        
+        if not payload:
+            raise InvalidTokenError()
+        
+        # Check if session exists in Redis (if using sessions)
+        if self.user_repo:
+            session = await self.user_repo.get_session(token)
+            if session is None:
+                # Token is valid but session doesn't exist
+                # This is OK if not using Redis sessions
+                logger.debug(f"Token valid but no Redis session found")
+        
+        return payload
+    
     async def get_current_user(self, token: str):
         """
         Get user from token.
         
+        Warm tokens are served from the in-process token cache without
+        touching Redis or Postgres. Cold tokens go through full verification
+        and the result is cached until the cache TTL or token ``exp``.
+        
         Args:
             token: JWT token
             
         Returns:
             User entity or None
         """
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            return cached.user
+        
         try:
-            payload = await self.verify_token(token)
+            payload = await self._verify_raw(token)
         except Exception as e:
             logger.warning(f"Token verification failed: {e}")
             return None
         
-        if not payload:
-            return None
-        
-        # TokenPayload uses 'sub' for user_id
-        user_id = getattr(payload, 'sub', None)
+        user_id = payload.get("user_id")
         if not user_id:
             return None
         
@@ -319,7 +336,10 @@ class AuthService:
             return None
         
         if self.user_repo:
-            return await self.user_repo.get_user_by_id(user_id)
+            user = await self.user_repo.get_user_by_id(user_id)
+            if user:
+                self.token_cache.set(token, payload, user)
+            return user
         else:
             user = self._user_cache.get(user_id)
             if user and isinstance(user, dict):
@@ -702,6 +722,7 @@ class AuthService:
                     user["roles"] = roles
             
             self._role_cache[user_id] = {"roles": roles}
+            await get_blacklist_service().broadcast_user_invalidation(user_id)
             
             logger.info(f"Updated roles for user {user_id}: {roles}")
             return True
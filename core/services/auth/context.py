@@ -13,7 +13,7 @@ from typing import List, Optional, Dict, TYPE_CHECKING
 from starlette.requests import Request
 
 if TYPE_CHECKING:
-    from core.services.auth.permissions import Permission
+    from core.services.auth.permissions import CompiledPermissions, Permission
 
 
 _ROLE_PRIORITY: dict[str, int] = {
@@ -74,6 +74,9 @@ class UserContext:
     # Resource ownership context (merged from PermissionContext)
     resource_owner_id: Optional[int] = None
     resource_type: Optional[str] = None
+    
+    # Decision table for `roles` (set by create_user_context); O(1) checks
+    compiled_permissions: Optional['CompiledPermissions'] = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
         if not self.roles and self.role:
@@ -100,6 +103,9 @@ class UserContext:
         if self.resource_owner_id is not None:
             ctx["owner_id"] = self.resource_owner_id
         
+        if self.compiled_permissions is not None:
+            return self.compiled_permissions.allows(resource, action, ctx)
+        
         # Check if any permission matches
         return any(p.matches(resource, action, ctx) for p in self.permissions)
     
@@ -182,8 +188,9 @@ def create_user_context(
     roles = [r for r in roles if r]
     primary_role = _select_primary_role(roles)
 
-    # Resolve permissions from role(s)
-    permissions = permission_registry.resolve_permissions(roles)
+    # Resolve permissions from role(s) - compiled table is memoized per role set
+    compiled = permission_registry.compile(roles)
+    permissions = list(compiled.permissions)
     
     # Get client IP
     ip_address = request.client.host if request.client else "unknown"
@@ -197,7 +204,8 @@ def create_user_context(
         request_cookies=dict(request.cookies),
         ip_address=ip_address,
         resource_owner_id=resource_owner_id,
-        resource_type=resource_type
+        resource_type=resource_type,
+        compiled_permissions=compiled
     )
     
     logger.debug(
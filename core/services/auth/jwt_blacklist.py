@@ -2,15 +2,27 @@
 
 Manages blacklisted JWT tokens to ensure logout security.
 Tokens are added to blacklist on logout and checked during verification.
+
+Redis is the source of truth. Each process also keeps a RevocationFilter
+(counting Bloom filter) of revoked JTIs so the common case - a token that
+was never revoked - is answered locally. The filter is kept in sync across
+workers via Redis pub/sub and rebuilt from a key scan whenever the
+subscription (re)connects.
 """
 
+import asyncio
+import hashlib
 import os
+import time
 from typing import Optional, Set
 from datetime import datetime, timedelta
 import json
 import redis.asyncio as redis
+from core.db.adapters.redis_adapter import get_redis_adapter
 from core.utils.logger import get_logger
 from core.services.auth.providers.jwt import JWTProvider
+from core.services.auth.revocation_filter import RevocationFilter
+from core.services.auth.token_cache import get_token_cache
 
 logger = get_logger(__name__)
 
@@ -30,14 +42,24 @@ class JWTBlacklistService:
         
         # Blacklist key prefix
         self.BLACKLIST_PREFIX = "jwt:blacklist:"
+        # Pub/sub channel for cross-worker revocation events
+        self.EVENTS_CHANNEL = "jwt:blacklist-events"
         # Token expiration buffer (in seconds)
         self.EXPIRATION_BUFFER = 300  # 5 minutes
         
+        # Local revocation filter; only trusted for negatives once synced
+        self.filter_capacity = int(os.getenv("JWT_BLACKLIST_FILTER_CAPACITY", "100000"))
+        self.filter_error_rate = float(os.getenv("JWT_BLACKLIST_FILTER_ERROR_RATE", "0.01"))
+        self._filter = RevocationFilter(self.filter_capacity, self.filter_error_rate)
+        self.filter_ready = False
+        self._sync_task: Optional[asyncio.Task] = None
+        self.stats = {"filter_negative": 0, "redis_checks": 0, "resyncs": 0}
+        
     async def _get_redis(self) -> redis.Redis:
-        """Get Redis connection"""
+        """Get Redis connection (the process-wide pooled client for redis_url)"""
         if self.redis_client is None:
             try:
-                self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+                self.redis_client = get_redis_adapter(self.redis_url).get_client()
                 # Test connection
                 await self.redis_client.ping()
                 logger.info("Connected to Redis for JWT blacklist")
@@ -58,17 +80,13 @@ class JWTBlacklistService:
         """
         try:
             # Decode token to get expiration
-            payload = self.jwt_provider.verify(token, allow_expired=True)
+            payload = self.jwt_provider.verify_sync(token, allow_expired=True)
             if not payload:
                 logger.warning("Cannot blacklist invalid token")
                 return False
             
             # Get token JTI (JWT ID) or create one from token hash
-            jti = payload.get("jti")
-            if not jti:
-                # Create JTI from token hash if not present
-                import hashlib
-                jti = hashlib.sha256(token.encode()).hexdigest()
+            jti = payload.get("jti") or self._token_hash(token)
             
             # Calculate blacklist expiration
             exp = payload.get("exp")
@@ -97,6 +115,10 @@ class JWTBlacklistService:
             ttl = int((blacklist_until - datetime.utcnow()).total_seconds())
             if ttl > 0:
                 await redis.setex(key, ttl, json.dumps(blacklist_data))
+                
+                token_exp = float(exp) if exp else time.time() + ttl
+                self._apply_revocation(jti, token_exp)
+                await self._publish({"type": "jti", "jti": jti, "exp": token_exp})
                 logger.info(f"Token {jti} blacklisted until {blacklist_until}")
                 return True
             else:
@@ -118,22 +140,38 @@ class JWTBlacklistService:
         """
         try:
             # Decode token to get JTI
-            payload = self.jwt_provider.verify(token, allow_expired=True)
+            payload = self.jwt_provider.verify_sync(token, allow_expired=True)
             if not payload:
                 return False
             
-            # Get token JTI
-            jti = payload.get("jti")
-            if not jti:
-                # Create JTI from token hash if not present
-                import hashlib
-                jti = hashlib.sha256(token.encode()).hexdigest()
+            jti = payload.get("jti") or self._token_hash(token)
+            return await self.is_jti_blacklisted(jti)
             
-            # Check Redis
-            redis = await self._get_redis()
-            key = f"{self.BLACKLIST_PREFIX}{jti}"
-            result = await redis.get(key)
+        except Exception as e:
+            logger.error(f"Failed to check blacklist: {e}")
+            # On error, assume not blacklisted (fail open)
+            return False
+    
+    async def is_jti_blacklisted(self, jti: str) -> bool:
+        """Check if a JWT ID is blacklisted
+        
+        Consults the local revocation filter first; only filter hits (or an
+        unsynced filter) cost a Redis GET.
+        
+        Args:
+            jti: JWT ID (or token hash for tokens without one)
             
+        Returns:
+            True if blacklisted, False otherwise
+        """
+        if self.filter_ready and not self._filter.might_contain(jti):
+            self.stats["filter_negative"] += 1
+            return False
+        
+        try:
+            self.stats["redis_checks"] += 1
+            redis = await self._get_redis()
+            result = await redis.get(f"{self.BLACKLIST_PREFIX}{jti}")
             return result is not None
             
         except Exception as e:
@@ -210,17 +248,142 @@ class JWTBlacklistService:
         Returns:
             True if successful, False otherwise
         """
+        # Drop verified-token cache entries here and on every other worker
+        await self.broadcast_user_invalidation(user_id)
+        
         # This would require tracking active tokens per user
         # For now, we'll log the action
         logger.info(f"Would blacklist all tokens for user {user_id} (reason: {reason})")
         # TODO: Implement token tracking per user
         return True
     
+    async def broadcast_user_invalidation(self, user_id: int) -> None:
+        """Drop cached auth state for a user in every worker
+        
+        Used when a user's tokens are revoked or their roles change.
+        
+        Args:
+            user_id: User ID
+        """
+        get_token_cache().invalidate_user(user_id)
+        await self._publish({"type": "user", "user_id": user_id})
+    
+    # ========================================================================
+    # Local filter sync
+    # ========================================================================
+    
+    async def start_sync(self):
+        """Start the background pub/sub listener that keeps the filter in sync"""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+    
+    async def resync(self) -> int:
+        """Rebuild the local filter from the keys currently in Redis
+        
+        Returns:
+            Number of revoked tokens loaded
+        """
+        redis = await self._get_redis()
+        fresh = RevocationFilter(self.filter_capacity, self.filter_error_rate)
+        
+        keys = [key async for key in redis.scan_iter(match=f"{self.BLACKLIST_PREFIX}*", count=1000)]
+        
+        now = time.time()
+        loaded = 0
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            pipe = redis.pipeline(transaction=False)
+            for key in batch:
+                pipe.pttl(key)
+            ttls = await pipe.execute()
+            
+            for key, pttl in zip(batch, ttls):
+                if pttl is None or pttl <= 0:
+                    continue
+                # Redis TTL runs EXPIRATION_BUFFER past the token's exp
+                token_exp = now + pttl / 1000.0 - self.EXPIRATION_BUFFER
+                fresh.add(key[len(self.BLACKLIST_PREFIX):], max(token_exp, now + 1))
+                loaded += 1
+        
+        self._filter = fresh
+        self.stats["resyncs"] += 1
+        logger.info(f"JWT blacklist filter resynced ({loaded} revoked tokens)")
+        return loaded
+    
+    async def _sync_loop(self):
+        """Subscribe to revocation events; resync on every (re)connect"""
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                await self._get_redis()
+                # Listeners hold their connection for good; keep them off the request-path pool
+                pubsub = get_redis_adapter(self.redis_url).blocking().get_client().pubsub()
+                # Subscribe before scanning so nothing published in between is lost
+                await pubsub.subscribe(self.EVENTS_CHANNEL)
+                await self.resync()
+                self.filter_ready = True
+                backoff = 1
+                
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle_event(message.get("data"))
+                        
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"JWT blacklist sync lost, falling back to Redis checks: {e}")
+            finally:
+                self.filter_ready = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+            
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+    
+    def _handle_event(self, raw) -> None:
+        try:
+            event = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed blacklist event: {raw!r}")
+            return
+        
+        if event.get("type") == "jti" and event.get("jti"):
+            self._apply_revocation(event["jti"], event.get("exp"))
+        elif event.get("type") == "user" and event.get("user_id") is not None:
+            get_token_cache().invalidate_user(event["user_id"])
+    
+    def _apply_revocation(self, jti: str, exp: Optional[float]) -> None:
+        self._filter.add(jti, exp)
+        get_token_cache().invalidate_jti(jti)
+    
+    async def _publish(self, event: dict) -> None:
+        try:
+            redis = await self._get_redis()
+            await redis.publish(self.EVENTS_CHANNEL, json.dumps(event))
+        except Exception as e:
+            # Other workers pick the change up on their next resync
+            logger.warning(f"Failed to publish blacklist event: {e}")
+    
+    @staticmethod
+    def _token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
     async def close(self):
-        """Close Redis connection"""
-        if self.redis_client:
-            await self.redis_client.close()
-            self.redis_client = None
+        """Stop the sync listener and close Redis connection"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sync_task = None
+            self.filter_ready = False
+        # The client is shared; its pool is closed with the other adapters
+        self.redis_client = None
 
 
 # Global blacklist service instance
@@ -1,7 +1,7 @@
 # app/core/services/auth/permissions.py
 
 from dataclasses import dataclass
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Set, Optional, FrozenSet, Iterable, Tuple
 from enum import Enum
 
 from .context import UserContext
@@ -72,12 +72,93 @@ class Role:
         return any(p.matches(resource, action, context) for p in self.permissions)
 
 
+@dataclass(frozen=True)
+class ScopeRule:
+    """Merged scopes granted for one (resource, action) pair"""
+    any_scope: bool = False  # "*" - unconditional
+    own: bool = False        # "own" - owner_id must equal user_id
+    orgs: FrozenSet[str] = frozenset()  # "org:<id>"
+    
+    def allows(self, context: Dict) -> bool:
+        if self.any_scope:
+            return True
+        if self.own and context.get("owner_id") == context.get("user_id"):
+            return True
+        if self.orgs:
+            user_orgs = context.get("user_orgs", [])
+            return any(org in user_orgs for org in self.orgs)
+        return False
+    
+    def merge(self, other: "ScopeRule") -> "ScopeRule":
+        return ScopeRule(
+            any_scope=self.any_scope or other.any_scope,
+            own=self.own or other.own,
+            orgs=self.orgs | other.orgs,
+        )
+
+
+_DENY = ScopeRule()
+
+
+class CompiledPermissions:
+    """
+    Decision table for a fixed set of roles.
+    
+    Permissions are folded into a dict of (resource, action) -> ScopeRule
+    with wildcards kept as "*" keys. A check looks up the exact pair once,
+    merges the wildcard rows, and memoizes the result, so repeated checks
+    are a single dict lookup plus the scope test.
+    """
+    
+    def __init__(self, role_ids: FrozenSet[str], permissions: List[Permission]):
+        self.role_ids = role_ids
+        self.permissions: Tuple[Permission, ...] = tuple(permissions)
+        self._rules: Dict[Tuple[str, str], ScopeRule] = {}
+        self._decisions: Dict[Tuple[str, str], ScopeRule] = {}
+        
+        for perm in self.permissions:
+            key = (perm.resource, perm.action)
+            rule = self._rules.get(key, _DENY).merge(self._scope_rule(perm.scope))
+            self._rules[key] = rule
+    
+    @staticmethod
+    def _scope_rule(scope: str) -> ScopeRule:
+        if scope == "*":
+            return ScopeRule(any_scope=True)
+        if scope == "own":
+            return ScopeRule(own=True)
+        if scope.startswith("org:"):
+            return ScopeRule(orgs=frozenset([scope.split(":")[1]]))
+        # Unknown scopes never match (same as Permission.matches)
+        return _DENY
+    
+    def rule_for(self, resource: str, action: str) -> ScopeRule:
+        """Merged scope rule for resource/action (memoized)"""
+        key = (resource, action)
+        rule = self._decisions.get(key)
+        if rule is None:
+            rules = self._rules
+            rule = _DENY
+            for candidate in (key, (resource, "*"), ("*", action), ("*", "*")):
+                found = rules.get(candidate)
+                if found is not None:
+                    rule = rule.merge(found)
+            self._decisions[key] = rule
+        return rule
+    
+    def allows(self, resource: str, action: str, context: Dict) -> bool:
+        """Check resource/action against the table"""
+        return self.rule_for(resource, action).allows(context)
+
+
 class PermissionRegistry:
     """Central registry for roles and permissions"""
     
     def __init__(self):
         self._roles: Dict[str, Role] = {}
         self._resource_types: Set[str] = set()
+        # Compiled decision tables per role set; cleared on register_role
+        self._compiled: Dict[FrozenSet[str], CompiledPermissions] = {}
         self._initialize_core_roles()
     
     def _initialize_core_roles(self):
@@ -264,6 +345,8 @@ class PermissionRegistry:
     def register_role(self, role: Role):
         """Register a role (used by add-ons)"""
         self._roles[role.id] = role
+        # Inheritance means any compiled role set may be affected
+        self.invalidate()
         
         # Extract resource types
         for perm in role.permissions:
@@ -278,8 +361,26 @@ class PermissionRegistry:
         """Get all roles for a domain"""
         return [r for r in self._roles.values() if r.domain == domain]
     
+    def invalidate(self):
+        """Drop compiled decision tables (call after mutating a registered Role)"""
+        self._compiled.clear()
+    
+    def compile(self, role_ids: Iterable[str]) -> CompiledPermissions:
+        """Get the compiled decision table for a role set (memoized)"""
+        if not isinstance(role_ids, (list, tuple, frozenset)):
+            role_ids = list(role_ids)
+        key = role_ids if isinstance(role_ids, frozenset) else frozenset(role_ids)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledPermissions(key, self._collect_permissions(role_ids))
+            self._compiled[key] = compiled
+        return compiled
+    
     def resolve_permissions(self, role_ids: List[str]) -> List[Permission]:
         """Resolve all permissions from role IDs (handles inheritance)"""
+        return list(self.compile(role_ids).permissions)
+    
+    def _collect_permissions(self, role_ids: Iterable[str]) -> List[Permission]:
         permissions = []
         seen_roles = set()
         
@@ -314,8 +415,7 @@ class PermissionRegistry:
         context: Dict
     ) -> bool:
         """Check if user has permission"""
-        permissions = self.resolve_permissions(role_ids)
-        return any(p.matches(resource, action, context) for p in permissions)
+        return self.compile(role_ids).allows(resource, action, context)
 
 
 # Global registry
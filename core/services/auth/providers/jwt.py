@@ -97,14 +97,6 @@ class JWTProvider:
     async def verify(self, token: str, allow_expired: bool = False) -> Optional[Dict]:
         """Verify and decode JWT token"""
         try:
-            # Check blacklist first (if enabled)
-            if self.use_blacklist and not allow_expired:
-                from core.services.auth.jwt_blacklist import get_blacklist_service
-                blacklist = get_blacklist_service()
-                if await blacklist.is_blacklisted(token):
-                    logger.warning("Token is blacklisted")
-                    return None
-            
             # Verify token
             payload = jwt.decode(
                 token,
@@ -115,6 +107,20 @@ class JWTProvider:
                 issuer="fastapp"
             )
             
+            # Check blacklist by JTI (if enabled); the local revocation filter
+            # answers most of these without a Redis round-trip
+            if self.use_blacklist and not allow_expired:
+                from core.services.auth.jwt_blacklist import get_blacklist_service
+                blacklist = get_blacklist_service()
+                jti = payload.get("jti")
+                revoked = (
+                    await blacklist.is_jti_blacklisted(jti) if jti
+                    else await blacklist.is_blacklisted(token)
+                )
+                if revoked:
+                    logger.warning("Token is blacklisted")
+                    return None
+            
             return payload
             
         except jwt.ExpiredSignatureError:
@@ -0,0 +1,90 @@
+"""
+Revocation Filter
+
+Compact in-process membership filter for revoked JWT IDs.
+
+A counting Bloom filter answers "might this JTI be revoked?" without a
+Redis round-trip. A negative answer is definitive; a positive answer
+(a real revocation or a false positive) falls through to Redis.
+
+Counters (rather than bits) allow removal, so each entry is evicted at
+the token's own ``exp`` - after that the JWT signature check rejects the
+token anyway and the slot is free for new revocations.
+"""
+import hashlib
+import heapq
+import math
+import time
+from typing import List, Optional, Tuple
+
+
+class RevocationFilter:
+    """Counting Bloom filter of revoked JTIs with expiry-driven eviction."""
+
+    _MAX_COUNT = 255  # Saturated counters are sticky (never decremented)
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        """
+        Initialize filter.
+
+        Args:
+            capacity: Expected number of concurrently revoked (unexpired) tokens
+            error_rate: Target false-positive rate at capacity
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._counters = bytearray(self.size)
+        # (exp, positions) - positions rather than the JTI so we don't keep the strings
+        self._expiry: List[Tuple[float, Tuple[int, ...]]] = []
+
+    def _positions(self, jti: str) -> Tuple[int, ...]:
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return tuple((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, jti: str, exp: Optional[float]) -> None:
+        """
+        Record a revoked JTI until ``exp`` (epoch seconds).
+
+        Adding the same JTI twice is harmless: each add is paired with its
+        own expiry entry, so counters stay balanced.
+        """
+        now = time.time()
+        self.evict_expired(now)
+        if exp is not None and exp <= now:
+            return
+
+        positions = self._positions(jti)
+        counters = self._counters
+        for pos in positions:
+            if counters[pos] < self._MAX_COUNT:
+                counters[pos] += 1
+        if exp is not None:
+            heapq.heappush(self._expiry, (exp, positions))
+
+    def might_contain(self, jti: str) -> bool:
+        """False means definitely not revoked; True means check Redis."""
+        self.evict_expired()
+        counters = self._counters
+        return all(counters[pos] for pos in self._positions(jti))
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Drop entries whose token has expired. Returns number evicted."""
+        now = time.time() if now is None else now
+        expiry = self._expiry
+        counters = self._counters
+        evicted = 0
+        while expiry and expiry[0][0] <= now:
+            _, positions = heapq.heappop(expiry)
+            for pos in positions:
+                if 0 < counters[pos] < self._MAX_COUNT:
+                    counters[pos] -= 1
+            evicted += 1
+        return evicted
+
+    @property
+    def entries(self) -> int:
+        """Number of live (unexpired) revocations tracked."""
+        return len(self._expiry)
@@ -225,8 +225,10 @@ class RoleAuditService:
                 HAVING COUNT(*) > 5
             """.format(hours=hours))
             
-            for record in rapid_changes:
-                user = await self.user_repo.get_by_id(record['user_id'])
+            users = await self.user_repo.get_many_by_ids(
+                [record['user_id'] for record in rapid_changes]
+            )
+            for record, user in zip(rapid_changes, users):
                 suspicious.append({
                     "type": "rapid_changes",
                     "user_id": record['user_id'],
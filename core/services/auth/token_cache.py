@@ -0,0 +1,230 @@
+"""
+Auth Token Cache
+
+In-process, TTL-bounded cache of verified tokens for the request auth path.
+
+Each entry is keyed by the SHA-256 digest of the raw token (the token itself
+is never stored) and holds the decoded JWT payload plus a snapshot of the
+user entity it resolved to. A warm lookup costs a hash and a dict access -
+no Redis blacklist check, no session lookup, no user fetch.
+
+Entries are dropped when:
+- their TTL elapses (capped by the token's own ``exp``)
+- the token's JTI is blacklisted (``invalidate_jti``)
+- the user's tokens or roles change (``invalidate_user``)
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CachedAuth:
+    """Verified token payload and the user it resolved to."""
+    payload: Dict[str, Any]
+    user: Any
+    user_id: Optional[int]
+    jti: Optional[str]
+    expires_at: float  # time.monotonic() deadline
+
+
+class AuthTokenCache:
+    """
+    LRU + TTL cache of verified tokens.
+
+    Safe to share across coroutines in one event loop (no awaits inside).
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10_000):
+        """
+        Initialize token cache.
+
+        Args:
+            ttl_seconds: Maximum age of an entry. 0 disables the cache.
+            max_entries: Maximum number of cached tokens (LRU eviction).
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedAuth]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._by_jti: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        """Cache key for a raw token."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    # ========================================================================
+    # Lookup / Store
+    # ========================================================================
+
+    def get(self, token: str) -> Optional[CachedAuth]:
+        """
+        Get cached verification result for token.
+
+        Args:
+            token: Raw JWT
+
+        Returns:
+            CachedAuth or None on miss/expiry
+        """
+        if not self.enabled:
+            return None
+
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, token: str, payload: Dict[str, Any], user: Any) -> None:
+        """
+        Cache a verified token and its user.
+
+        Args:
+            token: Raw JWT
+            payload: Decoded JWT payload
+            user: User entity returned by the repository
+        """
+        if not self.enabled or not payload or not user:
+            return
+
+        ttl = self.ttl_seconds
+        exp = payload.get("exp")
+        if exp:
+            remaining = float(exp) - time.time()
+            if remaining <= 0:
+                return
+            ttl = min(ttl, remaining)
+
+        user_id = getattr(user, "id", None)
+        if user_id is None and isinstance(user, dict):
+            user_id = user.get("id")
+        try:
+            user_id = int(user_id) if user_id is not None else None
+        except (TypeError, ValueError):
+            pass
+
+        key = self.digest(token)
+        if key in self._entries:
+            self._remove(key)
+
+        jti = payload.get("jti")
+        self._entries[key] = CachedAuth(
+            payload=payload,
+            user=user,
+            user_id=user_id,
+            jti=jti,
+            expires_at=time.monotonic() + ttl,
+        )
+        if user_id is not None:
+            self._by_user.setdefault(user_id, set()).add(key)
+        if jti:
+            self._by_jti[jti] = key
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    # ========================================================================
+    # Invalidation
+    # ========================================================================
+
+    def invalidate_token(self, token: str) -> bool:
+        """Drop a single token. Returns True if it was cached."""
+        return self._remove(self.digest(token))
+
+    def invalidate_jti(self, jti: str) -> bool:
+        """Drop the token with this JTI (blacklist event)."""
+        key = self._by_jti.get(jti)
+        if key is None:
+            return False
+        return self._remove(key)
+
+    def invalidate_user(self, user_id: Any) -> int:
+        """
+        Drop every cached token for a user (logout-all, role change).
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return 0
+        keys = self._by_user.pop(user_id, set())
+        for key in list(keys):
+            self._remove(key)
+        if keys:
+            logger.debug(f"Invalidated {len(keys)} cached tokens for user {user_id}")
+        return len(keys)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_jti.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+        }
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        if entry.user_id is not None:
+            keys = self._by_user.get(entry.user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._by_user.pop(entry.user_id, None)
+        if entry.jti and self._by_jti.get(entry.jti) == key:
+            self._by_jti.pop(entry.jti, None)
+        return True
+
+
+# Global token cache instance
+_token_cache: Optional[AuthTokenCache] = None
+
+
+def get_token_cache() -> AuthTokenCache:
+    """Get global token cache instance"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = AuthTokenCache(
+            ttl_seconds=float(os.getenv("AUTH_TOKEN_CACHE_TTL", "30")),
+            max_entries=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+        )
+    return _token_cache
@@ -9,6 +9,7 @@ from typing import Dict, Optional, List, Union
 from datetime import datetime
 from core.db.repositories.user_repository import UserRepository
 from core.services.auth.models import UserRole
+from core.services.auth.jwt_blacklist import get_blacklist_service
 from core.utils.logger import get_logger
 import re
 
@@ -224,7 +225,10 @@ class UserService:
             return True
         
         try:
-            return await self.repo.update_user(user_id, updates)
+            success = await self.repo.update_user(user_id, updates)
+            if success:
+                await get_blacklist_service().broadcast_user_invalidation(user_id)
+            return success
         except Exception as e:
             logger.error(f"Failed to update user {user_id}: {e}")
             return False
@@ -334,6 +338,7 @@ class UserService:
         success = await self.repo.update_user(user_id, {'role': new_role})
         
         if success:
+            await get_blacklist_service().broadcast_user_invalidation(user_id)
             logger.info(f"Role changed to {new_role} for user {user_id}")
         
         return success
@@ -355,6 +360,7 @@ class UserService:
         try:
             success = await self.repo.delete_user(user_id)
             if success:
+                await get_blacklist_service().broadcast_user_invalidation(user_id)
                 logger.info(f"User {user_id} deleted")
             return success
         except Exception as e:
@@ -429,6 +435,7 @@ class UserService:
                 }
             )
             
+            await get_blacklist_service().broadcast_user_invalidation(user_id)
             logger.info(f"Updated roles for user {user_id}: {role_strings}")
             return True
             
@@ -464,6 +471,7 @@ class UserService:
                 }
             )
             
+            await get_blacklist_service().broadcast_user_invalidation(user_id)
             logger.info(f"Incremented role version for user {user_id} to {new_version}")
             return True
             
@@ -366,8 +366,8 @@ class RedisCartService:
         self.redis_available = False
         
         try:
-            import redis
-            self.redis = redis.from_url(self.redis_url, decode_responses=True)
+            from core.db.adapters.redis_adapter import get_sync_redis_client
+            self.redis = get_sync_redis_client(self.redis_url)
             # Test connection
             self.redis.ping()
             self.redis_available = True
@@ -4,8 +4,9 @@ Database Service - Unified multi-database access with state system integration
 Provides simplified access to the multi-transactional database system.
 Integrates with UserContext for user-aware operations and audit logging.
 """
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import os
+import time
 from core.db import (
     TransactionManager,
     transactional,
@@ -14,12 +15,18 @@ from core.db import (
     MongoDBAdapter,
     RedisAdapter
 )
+from core.db.adapters.redis_adapter import get_redis_adapter
 from core.db.session import get_session_manager
+from core.db.replication.read_replica_router import get_read_router
 from core.services.auth.context import current_user_context, UserContext
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Seconds before a failed ensure_index is attempted again; doubles per failure
+INDEX_RETRY_SECONDS = float(os.getenv("DB_INDEX_RETRY_SECONDS", "60"))
+INDEX_RETRY_MAX_SECONDS = float(os.getenv("DB_INDEX_RETRY_MAX_SECONDS", "3600"))
+
 
 class DBService:
     """
@@ -82,12 +89,11 @@ class DBService:
             ),
             database=os.getenv("MONGO_DB", "app_db"),
         )
-        self.redis = redis or RedisAdapter(
-            connection_string=os.getenv(
-                "REDIS_URL",
-                "redis://localhost:6379",
-            )
-        )
+        self.redis = redis or get_redis_adapter(os.getenv("REDIS_URL", "redis://localhost:6379"))
+
+        self._ensured_indexes: set = set()
+        # index -> (monotonic time of the next attempt, current retry delay)
+        self._failed_indexes: Dict[tuple, Tuple[float, float]] = {}
 
         logger.info("DBService initialized with multi-database support")
     
@@ -106,6 +112,14 @@ class DBService:
         if not getattr(self.redis, "client", None):
             await self.redis.connect()
     
+    @property
+    def read_adapter(self):
+        """Read replica router for our primary if configured, else the primary."""
+        router = get_read_router()
+        if router is not None and router.primary_adapter is self.postgres:
+            return router
+        return self.postgres
+    
     def _enrich_with_audit(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Enrich data with audit fields from user context.
@@ -282,6 +296,56 @@ class DBService:
         """
         return await self.postgres.find_many(table, filters, limit, offset)
     
+    async def fetch_one(self, query: str, *args) -> Optional[Dict[str, Any]]:
+        """
+        Run a read query and return the first row.
+        
+        Served by a read replica when one is configured (see read_adapter).
+        
+        Args:
+            query: SQL query
+            *args: Query parameters
+            
+        Returns:
+            Row dict or None
+        """
+        return await self.read_adapter.fetch_one(query, *args)
+    
+    async def fetch_many(self, query: str, *args) -> List[Dict[str, Any]]:
+        """
+        Run a read query and return all rows.
+        
+        Served by a read replica when one is configured (see read_adapter).
+        
+        Args:
+            query: SQL query
+            *args: Query parameters
+            
+        Returns:
+            Row dicts
+        """
+        return await self.read_adapter.fetch_many(query, *args)
+    
+    async def stream_records(
+        self,
+        query: str,
+        *args,
+        prefetch: Optional[int] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Iterate a PostgreSQL query with a server-side cursor.
+        
+        Args:
+            query: SQL query
+            *args: Query parameters
+            prefetch: Rows per round trip (default POSTGRES_CURSOR_PREFETCH)
+            
+        Yields:
+            asyncpg Records
+        """
+        async for record in self.read_adapter.stream(query, *args, prefetch=prefetch):
+            yield record
+    
     # ========================================================================
     # MongoDB Operations (Document Data)
     # ========================================================================
@@ -320,7 +384,38 @@ class DBService:
                 inserted_id = await tm.execute(self.mongodb, "insert_one", collection, document)
 
         return {**document, "_id": inserted_id}
-    
+
+    async def insert_documents(
+        self,
+        collection: str,
+        documents: List[Dict[str, Any]],
+        transaction_manager: Optional[TransactionManager] = None,
+        audit: bool = True
+    ) -> List[str]:
+        """
+        Insert several documents into a MongoDB collection in one round trip.
+
+        Args:
+            collection: Collection name
+            documents: Documents to insert
+            transaction_manager: Optional transaction manager
+            audit: Whether to add audit fields (default True)
+
+        Returns:
+            Inserted ids, in input order
+        """
+        if not documents:
+            return []
+        if audit:
+            documents = [self._enrich_with_audit(d) for d in documents]
+
+        await self._ensure_mongodb_connected()
+
+        if transaction_manager:
+            return await transaction_manager.execute(self.mongodb, "insert_many", collection, documents)
+        async with TransactionManager() as tm:
+            return await tm.execute(self.mongodb, "insert_many", collection, documents)
+
     async def find_document(
         self,
         collection: str,
@@ -368,6 +463,29 @@ class DBService:
             sort=sort,
         )
     
+    async def stream_documents(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[tuple]] = None,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate documents in a MongoDB collection without loading them all.
+        
+        Args:
+            collection: Collection name
+            filters: Filter conditions
+            sort: Sort specification
+            batch_size: Documents per round trip (default MONGO_CURSOR_BATCH_SIZE)
+            
+        Yields:
+            Documents
+        """
+        await self._ensure_mongodb_connected()
+        async for doc in self.mongodb.stream(collection, filters or {}, sort=sort, batch_size=batch_size):
+            yield doc
+    
     async def update_document(
         self,
         collection: str,
@@ -436,6 +554,94 @@ class DBService:
                 deleted_count = await tm.execute(self.mongodb, "delete_one", collection, filters)
 
         return bool(deleted_count)
+
+    async def find_and_modify_document(
+        self,
+        collection: str,
+        filters: Dict[str, Any],
+        update: Dict[str, Any],
+        upsert: bool = False,
+        return_new: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically update one document and return it.
+
+        Args:
+            collection: Collection name
+            filters: Filter conditions
+            update: Update document with operators ($inc, $set, ...)
+            upsert: Insert the document if none matches
+            return_new: Return the document after the update (default True)
+
+        Returns:
+            Document or None
+        """
+        await self._ensure_mongodb_connected()
+        return await self.mongodb.find_one_and_update(
+            collection, filters, update, upsert=upsert, return_new=return_new
+        )
+
+    async def aggregate_documents(
+        self,
+        collection: str,
+        pipeline: List[Dict[str, Any]],
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run an aggregation pipeline on a MongoDB collection.
+
+        Args:
+            collection: Collection name
+            pipeline: Aggregation stages
+            limit: Maximum results to return
+
+        Returns:
+            Pipeline output documents
+        """
+        await self._ensure_mongodb_connected()
+        return await self.mongodb.aggregate(collection, pipeline, limit=limit)
+
+    async def ensure_index(
+        self,
+        collection: str,
+        keys: List[tuple],
+        unique: bool = False
+    ) -> bool:
+        """
+        Create an index once per process.
+
+        Index creation is idempotent in MongoDB, but still a round trip, so
+        repeated calls for the same index are answered from memory. Failures
+        (e.g. existing duplicates blocking a unique index) are logged, not
+        raised, so callers can run this on their first request; they are
+        remembered too, and retried after a delay that doubles per failure
+        (INDEX_RETRY_SECONDS, up to INDEX_RETRY_MAX_SECONDS).
+
+        Args:
+            collection: Collection name
+            keys: Index keys, e.g. [("stream_id", 1), ("user_id", 1)]
+            unique: Whether the index enforces uniqueness
+
+        Returns:
+            True if the index exists
+        """
+        index_key = (collection, tuple(keys), unique)
+        if index_key in self._ensured_indexes:
+            return True
+        failed = self._failed_indexes.get(index_key)
+        if failed is not None and time.monotonic() < failed[0]:
+            return False
+        await self._ensure_mongodb_connected()
+        try:
+            await self.mongodb.create_index(collection, list(keys), unique=unique)
+        except Exception as e:
+            delay = min(failed[1] * 2, INDEX_RETRY_MAX_SECONDS) if failed else INDEX_RETRY_SECONDS
+            self._failed_indexes[index_key] = (time.monotonic() + delay, delay)
+            logger.warning(f"Could not create index {keys} on {collection}, retrying in {delay:.0f}s: {e}")
+            return False
+        self._failed_indexes.pop(index_key, None)
+        self._ensured_indexes.add(index_key)
+        return True
     
     # ========================================================================
     # Redis Operations (Cache)
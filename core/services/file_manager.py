@@ -12,12 +12,17 @@ import json
 import time
 import mimetypes
 import os
-from typing import Optional, Dict, List, Union, BinaryIO, Any, Set
+from typing import Optional, Dict, List, Union, BinaryIO, Any, Set, AsyncIterable
 from datetime import datetime, timedelta
 
+from starlette.responses import Response, StreamingResponse
+
 from core.utils.cache import cache
 from core.integrations.storage import (
     StorageService, 
+    StoredObjectStream,
+    aiter_bytes,
+    parse_range_header,
     StorageLevel, 
     FileMetadata, 
     UploadUrlRequest, 
@@ -32,7 +37,7 @@ from core.integrations.storage import (
     StorageError
 )
 from core.utils.logger import get_logger
-from core.exceptions import ValidationError
+from core.exceptions import ValidationError, FileSizeLimitError, RangeNotSatisfiableError
 
 logger = get_logger(__name__)
 
@@ -189,6 +194,8 @@ class FileManager:
         """Initialize FileManager with optional custom storage service"""
         self.storage = storage_service or StorageService()
         self.cache_ttl = 3600  # 1 hour default cache TTL
+        # Only small files are worth keeping in memory; larger ones stream straight from storage
+        self.cache_max_file_bytes = int(os.getenv('FILE_CACHE_MAX_BYTES', str(1024 * 1024)))
         self.validation_config = FileValidationConfig()
         self.quota_manager = FileQuotaManager()
         
@@ -210,12 +217,14 @@ class FileManager:
         else:
             return f"list:{domain}:user:{user_id}:{prefix}"
     
-    def _validate_file(self, filename: str, file_data: Union[bytes, BinaryIO], content_type: str, 
+    def _validate_file(self, filename: str, file_data: Union[bytes, BinaryIO, AsyncIterable[bytes]], content_type: str, 
                       domain: str, allowed_extensions: Optional[Set[str]] = None) -> Dict[str, Any]:
         """Validate file against security rules and limits"""
-        # Get file size
+        # Get file size (None for streams; the limit is then enforced while uploading)
         if isinstance(file_data, (bytes, bytearray)):
             file_size = len(file_data)
+        elif not (hasattr(file_data, 'seek') and hasattr(file_data, 'tell')):
+            file_size = None
         else:
             # For file-like objects, get size by seeking to end
             current_pos = file_data.tell() if hasattr(file_data, 'tell') else 0
@@ -273,7 +282,7 @@ class FileManager:
                                                                    self.validation_config.DEFAULT_SIZE_LIMITS['default'])
         
         # Check file size
-        if file_size > size_limit:
+        if file_size is not None and file_size > size_limit:
             return {
                 'valid': False,
                 'error': 'FILE_TOO_LARGE',
@@ -283,6 +292,7 @@ class FileManager:
         return {
             'valid': True,
             'file_size': file_size,
+            'size_limit': size_limit,
             'file_category': file_category,
             'file_extension': file_ext
         }
@@ -315,7 +325,7 @@ class FileManager:
         domain: str,
         level: StorageLevel,
         filename: str,
-        file_data: Union[bytes, BinaryIO, io.IOBase],
+        file_data: Union[bytes, BinaryIO, io.IOBase, AsyncIterable[bytes]],
         content_type: str = "application/octet-stream",
         user_id: Optional[str] = None,
         metadata: Optional[Dict[str, str]] = None,
@@ -326,19 +336,23 @@ class FileManager:
         skip_validation: bool = False
     ) -> Dict[str, Any]:
         """
-        Upload file with caching support, validation, and quota checking
+        Upload file with caching support, validation, and quota checking.
+
+        Content is streamed to storage (multipart, chunked compression and
+        encryption), so large files are never held in memory in full.
         
         Args:
             domain: Domain name for isolation
             level: Storage level (APP or USER)
             filename: Name of the file
-            file_data: File content as bytes or file-like object
+            file_data: File content as bytes, a file-like object (sync or async read)
+                or an async iterator of byte chunks
             content_type: MIME type
             user_id: User ID (required for USER level)
             metadata: Additional metadata
             compress: Whether to compress the file
             encrypt: Whether to encrypt the file
-            cache_content: Whether to cache file content in memory
+            cache_content: Whether to cache file content in memory (small bytes uploads only)
             allowed_extensions: Optional set of allowed file extensions
             skip_validation: Skip validation checks (for system uploads)
             
@@ -347,7 +361,7 @@ class FileManager:
         """
         try:
             # Validate file unless explicitly skipped
-            validation_result = {'valid': True, 'file_size': 0}
+            validation_result = {'valid': True, 'file_size': None}
             if not skip_validation:
                 validation_result = self._validate_file(filename, file_data, content_type, domain, allowed_extensions)
                 if not validation_result['valid']:
@@ -358,12 +372,16 @@ class FileManager:
                         'message': validation_result['message']
                     }
             
+            file_size = validation_result.get('file_size')
+            if file_size is None and isinstance(file_data, (bytes, bytearray)):
+                file_size = len(file_data)
+
             # Check quota
             quota_check = await self.quota_manager.check_quota(
                 domain=domain,
                 level=level,
                 user_id=user_id,
-                file_size=validation_result.get('file_size', 0)
+                file_size=file_size or 0
             )
             
             if not quota_check['allowed']:
@@ -395,19 +413,28 @@ class FileManager:
                 encrypt=encrypt
             )
             
-            # Upload to storage
-            response = self.storage.upload_file(request, file_data)
+            # Size limit for streams whose length isn't known up front
+            max_size = None
+            if file_size is None:
+                limits = [self.quota_manager.get_quota(domain, level, user_id)['max_file_size']]
+                if 'size_limit' in validation_result:
+                    limits.append(validation_result['size_limit'])
+                max_size = min(limits)
+
+            # Stream to storage
+            response = await self.storage.upload_stream(request, file_data, size=file_size, max_size=max_size)
             
             if response.success:
                 # Cache file content if requested
-                if cache_content and isinstance(file_data, (bytes, bytearray)):
+                if (cache_content and isinstance(file_data, (bytes, bytearray))
+                        and len(file_data) <= self.cache_max_file_bytes):
                     cache_key = self._generate_cache_key(domain, level, filename, user_id)
                     await cache.set(cache_key, file_data, self.cache_ttl)
                     logger.info(f"Cached file content: {cache_key}")
                 
                 # Invalidate list cache
                 list_cache_key = self._generate_list_cache_key(domain, level, user_id)
-                await cache.set(list_cache_key, None, 1)  # Invalidate immediately
+                await cache.delete(list_cache_key)  # Invalidate immediately
                 
                 # Cache metadata
                 metadata_response = await self.get_file_metadata(domain, level, filename, user_id)
@@ -425,6 +452,13 @@ class FileManager:
                     'message': response.message or 'Upload failed'
                 }
                 
+        except FileSizeLimitError as e:
+            logger.error(f"File upload rejected: {e.message}")
+            return {
+                'success': False,
+                'error': 'FILE_TOO_LARGE',
+                'message': e.message
+            }
         except Exception as e:
             logger.error(f"File upload failed: {e}")
             raise FileUploadError(f"Upload failed: {str(e)}")
@@ -471,7 +505,7 @@ class FileManager:
             file_data = self.storage.download_file(request)
             
             # Cache the downloaded content
-            if use_cache:
+            if use_cache and len(file_data) <= self.cache_max_file_bytes:
                 await cache.set(cache_key, file_data, self.cache_ttl)
                 logger.info(f"Cached downloaded file: {cache_key}")
             
@@ -480,12 +514,73 @@ class FileManager:
         except AppFileNotFoundError:
             # Remove from cache if file doesn't exist
             cache_key = self._generate_cache_key(domain, level, filename, user_id)
-            await cache.set(cache_key, None, 1)
+            await cache.delete(cache_key)
             raise
         except Exception as e:
             logger.error(f"File download failed: {e}")
             raise FileDownloadError(f"Download failed: {str(e)}")
     
+    async def download_stream(
+        self,
+        domain: str,
+        level: StorageLevel,
+        filename: str,
+        user_id: Optional[str] = None,
+        range_header: Optional[str] = None,
+        use_cache: bool = True
+    ) -> StoredObjectStream:
+        """
+        Open a file for streaming download, honouring an HTTP Range header
+        
+        Args:
+            domain: Domain name
+            level: Storage level
+            filename: Name of the file
+            user_id: User ID (required for USER level)
+            range_header: Raw ``Range`` request header, if any
+            use_cache: Whether to serve small cached files from memory
+            
+        Returns:
+            StoredObjectStream yielding the requested bytes
+
+        Raises:
+            RangeNotSatisfiableError: If the range lies outside the file
+        """
+        cache_key = self._generate_cache_key(domain, level, filename, user_id)
+        try:
+            if use_cache:
+                cached_data = await cache.get(cache_key)
+                if isinstance(cached_data, (bytes, bytearray)):
+                    logger.info(f"Cache hit for file stream: {cache_key}")
+                    byte_range = parse_range_header(range_header, len(cached_data))
+                    start, end = byte_range or (0, len(cached_data) - 1)
+                    return StoredObjectStream(
+                        key=self.storage._build_storage_path(domain, level, filename, user_id),
+                        content_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                        size=len(cached_data),
+                        start=start,
+                        end=end,
+                        chunks=aiter_bytes(memoryview(cached_data)[start:end + 1]),
+                        partial=byte_range is not None
+                    )
+
+            request = FileDownloadRequest(
+                domain=domain,
+                level=level,
+                filename=filename,
+                user_id=user_id
+            )
+            return await self.storage.open_download_stream(request, range_header)
+
+        except AppFileNotFoundError:
+            await cache.delete(cache_key)
+            raise
+        except (RangeNotSatisfiableError, FileDownloadError):
+            raise
+        except Exception as e:
+            logger.error(f"File stream failed: {e}")
+            raise FileDownloadError(f"Download failed: {str(e)}")
+    
     async def delete_file(
         self,
         domain: str,
@@ -521,9 +616,9 @@ class FileManager:
             metadata_cache_key = self._generate_metadata_cache_key(domain, level, filename, user_id)
             list_cache_key = self._generate_list_cache_key(domain, level, user_id)
             
-            await cache.set(cache_key, None, 1)  # Invalidate file cache
-            await cache.set(metadata_cache_key, None, 1)  # Invalidate metadata cache
-            await cache.set(list_cache_key, None, 1)  # Invalidate list cache
+            await cache.delete(cache_key)  # Invalidate file cache
+            await cache.delete(metadata_cache_key)  # Invalidate metadata cache
+            await cache.delete(list_cache_key)  # Invalidate list cache
             
             logger.info(f"Deleted file and cleared cache: {filename}")
             
@@ -594,7 +689,7 @@ class FileManager:
         except AppFileNotFoundError:
             # Remove from cache if file doesn't exist
             cache_key = self._generate_metadata_cache_key(domain, level, filename, user_id)
-            await cache.set(cache_key, None, 1)
+            await cache.delete(cache_key)
             return None
         except Exception as e:
             logger.error(f"Failed to get file metadata: {e}")
@@ -787,17 +882,26 @@ class FileManager:
             cache_key = self._generate_cache_key(domain, level, filename, user_id)
             metadata_cache_key = self._generate_metadata_cache_key(domain, level, filename, user_id)
             
-            await cache.set(cache_key, None, 1)
-            await cache.set(metadata_cache_key, None, 1)
+            await cache.delete(cache_key)
+            await cache.delete(metadata_cache_key)
             
             logger.info(f"Invalidated cache for file: {filename}")
         else:
             # Invalidate all files for domain/level/user
             list_cache_key = self._generate_list_cache_key(domain, level, user_id)
-            await cache.set(list_cache_key, None, 1)
+            await cache.delete(list_cache_key)
             
             logger.info(f"Invalidated list cache for domain: {domain}, level: {level}")
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss/eviction counters and size of the shared file cache
+        
+        Returns:
+            Dict with cache statistics
+        """
+        return cache.stats()
+    
     def get_quota_info(self, domain: str, level: StorageLevel, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get quota information for a domain/level/user
@@ -957,6 +1061,45 @@ async def download_file_with_cache(
     )
 
 
+def streaming_file_response(stream: StoredObjectStream) -> StreamingResponse:
+    """Wrap an open download in a 200/206 StreamingResponse with range headers"""
+    headers = {'Accept-Ranges': 'bytes'}
+    if stream.content_length is not None:
+        headers['Content-Length'] = str(stream.content_length)
+    if stream.partial:
+        headers['Content-Range'] = stream.content_range
+    if stream.etag:
+        headers['ETag'] = f'"{stream.etag}"'
+    return StreamingResponse(
+        stream.chunks,
+        status_code=206 if stream.partial else 200,
+        media_type=stream.content_type,
+        headers=headers
+    )
+
+
+async def stream_file_download(
+    domain: str,
+    level: StorageLevel,
+    filename: str,
+    user_id: Optional[str] = None,
+    range_header: Optional[str] = None
+) -> Response:
+    """Convenience function for serving a file download, with HTTP Range support"""
+    try:
+        stream = await file_manager.download_stream(
+            domain=domain,
+            level=level,
+            filename=filename,
+            user_id=user_id,
+            range_header=range_header
+        )
+    except RangeNotSatisfiableError as e:
+        size = e.details.get('size')
+        return Response(status_code=416, headers={'Content-Range': f"bytes */{size if size is not None else '*'}"})
+    return streaming_file_response(stream)
+
+
 async def get_cached_file_metadata(
     domain: str,
     level: StorageLevel,
@@ -978,6 +1121,8 @@ __all__ = [
     'upload_file_with_validation',
     'upload_file_with_cache',
     'download_file_with_cache',
+    'stream_file_download',
+    'streaming_file_response',
     'get_cached_file_metadata',
     'FileValidationConfig',
     'FileQuotaManager'
@@ -0,0 +1,145 @@
+"""
+Sequence Service
+
+Allocates integer ids for documents that carry their own numeric ``id``
+(streams, attendees, purchases, ...). Counters live in the ``counters``
+collection (one ``findAndModify`` $inc per block) or in Redis (INCRBY).
+
+Each process reserves ids in blocks of ``block_size``, so most allocations
+never leave the process. Ids are unique but only roughly ordered across
+processes, and a restart leaves a gap of at most one block per sequence.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+from core.db.adapters.redis_adapter import RedisScript
+from core.services.db_service import DBService, get_db_service
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+COUNTERS_COLLECTION = "counters"
+
+# KEYS: counter. ARGV: floor, block size.
+_REDIS_SEED_AND_RESERVE = RedisScript("""
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+return redis.call('INCRBY', KEYS[1], ARGV[2])
+""")
+
+
+class SequenceService:
+    """
+    Block-allocating id sequences on top of DBService.
+
+    Usage:
+        seq = get_sequence_service()
+        new_id = await seq.next_id("streams", seed_collection="streams")
+    """
+
+    def __init__(
+        self,
+        db: Optional[DBService] = None,
+        backend: Optional[str] = None,
+        block_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            db: Database service (defaults to the global one)
+            backend: "mongo" or "redis" (env ID_SEQUENCE_BACKEND, default mongo)
+            block_size: Ids reserved per round trip (env ID_SEQUENCE_BLOCK, default 20)
+        """
+        self._db = db
+        self.backend = (backend or os.getenv("ID_SEQUENCE_BACKEND", "mongo")).lower()
+        if self.backend not in ("mongo", "redis"):
+            raise ValueError(f"Unknown sequence backend: {self.backend}")
+        self.block_size = max(1, block_size or int(os.getenv("ID_SEQUENCE_BLOCK", "20")))
+        # name -> (next id to hand out, last id in the reserved block)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._seeded: set = set()
+
+    @property
+    def db(self) -> DBService:
+        if self._db is None:
+            self._db = get_db_service()
+        return self._db
+
+    async def next_id(
+        self,
+        name: str,
+        seed_collection: Optional[str] = None,
+        seed_field: str = "id",
+    ) -> int:
+        """
+        Allocate the next id of a sequence.
+
+        Args:
+            name: Sequence name
+            seed_collection: Collection whose existing ids the sequence must
+                stay above. Checked once per process, so a counter introduced
+                on an already populated collection never hands out a taken id.
+            seed_field: Id field in ``seed_collection``
+
+        Returns:
+            A unique id
+        """
+        block = self._blocks.get(name)
+        if block is not None and block[0] <= block[1]:
+            self._blocks[name] = (block[0] + 1, block[1])
+            return block[0]
+
+        lock = self._locks.get(name)
+        if lock is None:
+            lock = self._locks[name] = asyncio.Lock()
+        async with lock:
+            # Another task may have refilled the block while we waited
+            block = self._blocks.get(name)
+            if block is None or block[0] > block[1]:
+                floor = 0
+                if seed_collection and name not in self._seeded:
+                    floor = await self._max_existing(seed_collection, seed_field)
+                last = await self._reserve(name, self.block_size, floor)
+                self._seeded.add(name)
+                block = (last - self.block_size + 1, last)
+            self._blocks[name] = (block[0] + 1, block[1])
+            return block[0]
+
+    async def next_ids(self, name: str, count: int, **seed) -> List[int]:
+        """Allocate ``count`` ids of a sequence"""
+        return [await self.next_id(name, **seed) for _ in range(count)]
+
+    async def _max_existing(self, collection: str, field: str) -> int:
+        await self.db.ensure_index(collection, [(field, 1)])
+        docs = await self.db.find_documents(collection, {field: {"$type": "number"}}, limit=1, sort=[(field, -1)])
+        return int(docs[0][field]) if docs else 0
+
+    async def _reserve(self, name: str, count: int, floor: int) -> int:
+        """Atomically advance the counter by ``count``; returns its new value"""
+        if self.backend == "redis":
+            value = await _REDIS_SEED_AND_RESERVE(self.db.redis, keys=[f"seq:{name}"], args=[floor, count])
+            return int(value)
+
+        if floor:
+            await self.db.find_and_modify_document(
+                COUNTERS_COLLECTION, {"_id": name}, {"$max": {"seq": floor}}, upsert=True
+            )
+        doc = await self.db.find_and_modify_document(
+            COUNTERS_COLLECTION, {"_id": name}, {"$inc": {"seq": count}}, upsert=True
+        )
+        return int(doc["seq"])
+
+
+_sequence_service: Optional[SequenceService] = None
+
+
+def get_sequence_service() -> SequenceService:
+    """Get global sequence service instance"""
+    global _sequence_service
+    if _sequence_service is None:
+        _sequence_service = SequenceService()
+    return _sequence_service
@@ -0,0 +1,262 @@
+"""
+Settings Cache
+
+In-process cache of resolved settings for HybridSettingsManager:
+- Entries are keyed by (setting key, sorted roles, user id, decrypt) tuples,
+  with a reverse index from each setting key to its entries, so a write
+  drops exactly the affected entries
+- Resolutions take a stamp (cache generation, per-setting invalidation
+  count) before they start and are only cached if it is unchanged, so a
+  value resolved while a write or clear was in flight is never cached
+  over the newer one
+- Writes bump the setting's shared version in Redis and publish it on
+  SETTINGS_EVENTS_CHANNEL, keeping every worker's cache in step. Workers
+  remember the newest shared version seen per setting to drop duplicate
+  and out-of-order events; missed events (reconnects) clear the cache
+  instead, without touching those versions
+- Bounded LRU (SETTINGS_CACHE_MAX_ENTRIES); expired entries are swept by
+  the same timing wheel the hybrid file cache uses
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from core.db.adapters.redis_adapter import RedisAdapter, get_redis_adapter
+from core.utils.cache import TTLWheel
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Most resolved settings kept per manager (least recently used go first)
+SETTINGS_CACHE_MAX_ENTRIES = int(os.getenv("SETTINGS_CACHE_MAX_ENTRIES", "10000"))
+
+SETTINGS_EVENTS_CHANNEL = "settings:events"
+SETTINGS_VERSION_PREFIX = "settings:version:"
+
+CacheKey = Tuple[str, Tuple[str, ...], Optional[str], bool]
+# (cache generation, invalidations of the setting) when a resolution started
+Stamp = Tuple[int, int]
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires_at: float
+    stamp: Stamp
+
+
+def cache_key(key: str, user_roles: Iterable[str], context: Optional[Dict[str, Any]], decrypt: bool = False) -> CacheKey:
+    """Cache key for one resolution of a setting"""
+    return (key, tuple(sorted(user_roles)), context.get("user_id") if context else None, decrypt)
+
+
+class SettingsCache:
+    """Versioned LRU of resolved settings, invalidated per setting key"""
+
+    def __init__(self, max_entries: int = SETTINGS_CACHE_MAX_ENTRIES, redis: Optional[RedisAdapter] = None):
+        self.max_entries = max_entries
+        self.redis = redis
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._by_setting: Dict[str, Set[CacheKey]] = {}
+        # Newest shared version seen per setting (remote events only move it)
+        self._versions: Dict[str, int] = {}
+        # Local in-flight guards: invalidations per setting, and clears
+        self._invalidations: Dict[str, int] = {}
+        self._generation = 0
+        self._wheel = TTLWheel()
+        self._sync_task: Optional[asyncio.Task] = None
+        self.synced = False
+        self.stats = {"evictions": 0, "expirations": 0, "invalidations": 0, "resyncs": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, key: str) -> int:
+        """Newest shared version seen for a setting"""
+        return self._versions.get(key, 0)
+
+    def stamp(self, key: str) -> Stamp:
+        """Take before resolving a setting; pass to set() to cache the result"""
+        return (self._generation, self._invalidations.get(key, 0))
+
+    def get(self, ckey: CacheKey) -> Any:
+        """The cached value, or None"""
+        now = time.monotonic()
+        self._sweep(now)
+        entry = self._entries.get(ckey)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(ckey)
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(ckey)
+        return entry.value
+
+    def set(self, ckey: CacheKey, value: Any, ttl: float, stamp: Stamp) -> bool:
+        """
+        Cache ``value``, resolved after ``stamp(setting)`` returned ``stamp``.
+
+        Skipped (returns False) when the setting was invalidated or the
+        cache cleared since then.
+        """
+        setting = ckey[0]
+        if stamp != self.stamp(setting):
+            return False
+        now = time.monotonic()
+        self._sweep(now)
+        self._remove(ckey)
+
+        entry = _Entry(value, now + ttl, stamp)
+        self._entries[ckey] = entry
+        self._by_setting.setdefault(setting, set()).add(ckey)
+        self._wheel.schedule(ckey, entry.expires_at)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+        return True
+
+    def invalidate(self, key: str, version: Optional[int] = None) -> int:
+        """
+        Drop every entry for a setting.
+
+        ``version`` is the shared version from another worker's write;
+        versions no newer than the one already seen are ignored. Returns
+        the number of entries dropped.
+        """
+        if version is not None:
+            if version <= self.version(key):
+                return 0
+            self._versions[key] = version
+        self._invalidations[key] = self._invalidations.get(key, 0) + 1
+
+        dropped = 0
+        for ckey in list(self._by_setting.get(key, ())):
+            dropped += self._remove(ckey)
+        self.stats["invalidations"] += 1
+        return dropped
+
+    def clear(self) -> None:
+        """Drop every entry; resolutions in flight are not cached"""
+        self._generation += 1
+        self._entries.clear()
+        self._by_setting.clear()
+        self._wheel.clear()
+
+    def _remove(self, ckey: CacheKey) -> bool:
+        entry = self._entries.pop(ckey, None)
+        if entry is None:
+            return False
+        self._wheel.cancel(ckey, entry.expires_at)
+        keys = self._by_setting.get(ckey[0])
+        if keys is not None:
+            keys.discard(ckey)
+            if not keys:
+                del self._by_setting[ckey[0]]
+        return True
+
+    def _sweep(self, now: float) -> None:
+        for ckey in self._wheel.expired(now):
+            entry = self._entries.get(ckey)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(ckey)
+                self.stats["expirations"] += 1
+
+    # ========================================================================
+    # Cross-worker invalidation
+    # ========================================================================
+
+    def _redis(self) -> Optional[RedisAdapter]:
+        if self.redis is None and os.getenv("REDIS_URL"):
+            self.redis = get_redis_adapter()
+        return self.redis
+
+    async def publish(self, *keys: str) -> None:
+        """Invalidate settings here, then bump their shared versions and tell the other workers"""
+        for key in keys:
+            self.invalidate(key)
+
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline() as pipe:
+                for key in keys:
+                    pipe.incr(f"{SETTINGS_VERSION_PREFIX}{key}")
+                versions = await pipe.execute()
+            # Our own event comes back too; remember the version so it is ignored
+            for key, version in zip(keys, versions):
+                self._versions[key] = max(self.version(key), version)
+            await redis.publish(
+                SETTINGS_EVENTS_CHANNEL,
+                json.dumps({"versions": dict(zip(keys, versions))}),
+            )
+        except Exception as e:
+            # Other workers see the change once their entries expire
+            logger.warning(f"Failed to publish settings invalidation for {list(keys)}: {e}")
+
+    def handle_event(self, raw: Any) -> None:
+        try:
+            versions = json.loads(raw)["versions"]
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"Ignoring malformed settings event: {raw!r}")
+            return
+        for key, version in versions.items():
+            self.invalidate(key, int(version))
+
+    async def start_sync(self, redis: Optional[RedisAdapter] = None) -> None:
+        """Start the background pub/sub listener that applies other workers' writes"""
+        if redis is not None:
+            self.redis = redis
+        if self._redis() is None:
+            return
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        """Subscribe to settings events; clear the cache on every (re)connect"""
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                # Listeners hold their connection for good; keep them off the request-path pool
+                pubsub = self.redis.blocking().get_client().pubsub()
+                await pubsub.subscribe(SETTINGS_EVENTS_CHANNEL)
+                # Events may have been missed while disconnected
+                self.clear()
+                self.synced = True
+                self.stats["resyncs"] += 1
+                backoff = 1
+
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle_event(message.get("data"))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Settings cache sync lost: {e}")
+            finally:
+                self.synced = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    async def close(self) -> None:
+        """Stop the sync listener"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sync_task = None
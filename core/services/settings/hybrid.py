@@ -33,8 +33,6 @@ Architecture:
 """
 
 import asyncio
-import json
-import hashlib
 from typing import Dict, Any, List, Optional, Union, Callable
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -43,6 +41,7 @@ from pathlib import Path
 
 from core.utils.cache import cache
 from core.utils.logger import get_logger
+from .cache import CacheKey, SettingsCache, cache_key
 from .service import settings_service
 from .registry import settings_registry, SettingDefinition, SettingScope, SettingType, SettingSensitivity
 from ..auth.permissions import permission_registry
@@ -96,18 +95,6 @@ class SettingValue:
         return "***"
 
 
-@dataclass
-class SettingCacheEntry:
-    """Cache entry for settings"""
-    value: SettingValue
-    expires_at: datetime
-    hit_count: int = 0
-    
-    @property
-    def is_expired(self) -> bool:
-        return datetime.utcnow() > self.expires_at
-
-
 # ============================================================================
 # Hybrid Settings Manager
 # ============================================================================
@@ -123,7 +110,7 @@ class HybridSettingsManager:
     def __init__(self):
         self.static_config = None  # Will be loaded from environment
         self.addon_configs = {}     # Loaded from addon manifests
-        self.cache = {}             # In-memory cache
+        self.cache = SettingsCache()  # In-memory cache, invalidated across workers
         self.cache_ttl = {
             SettingSource.STATIC: timedelta(hours=24),    # Static rarely changes
             SettingSource.DYNAMIC: timedelta(minutes=15),  # Dynamic changes often
@@ -140,6 +127,24 @@ class HybridSettingsManager:
             "static_loads": 0
         }
     
+    # Computed settings and the settings they are derived from
+    computed_dependencies = {
+        "theme.combined": ("theme.colors", "user.theme.override"),
+        "user.preferences.all": (
+            "user.theme",
+            "user.language",
+            "user.timezone",
+            "user.notifications.email",
+            "user.notifications.push",
+        ),
+        "platform.feature_flags": (
+            "platform.enable_beta_features",
+            "platform.enable_new_ui",
+            "platform.enable_analytics",
+            "platform.enable_dark_mode",
+        ),
+    }
+    
     async def initialize(self):
         """Initialize the hybrid settings system"""
         logger.info("Initializing Hybrid Settings Manager...")
@@ -185,23 +190,16 @@ class HybridSettingsManager:
         """
         try:
             # Check cache first
-            cache_key = self._generate_cache_key(key, user_roles, context)
-            if use_cache and cache_key in self.cache:
-                cache_entry = self.cache[cache_key]
-                if not cache_entry.is_expired:
-                    cache_entry.hit_count += 1
+            cache_key = self._generate_cache_key(key, user_roles, context, decrypt)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
                     self.metrics["cache_hits"] += 1
-                    return {
-                        "success": True,
-                        "value": cache_entry.value.value,
-                        "source": cache_entry.value.source.value,
-                        "metadata": cache_entry.value.to_dict()
-                    }
-                else:
-                    # Remove expired entry
-                    del self.cache[cache_key]
+                    return dict(cached)
             
             self.metrics["cache_misses"] += 1
+            # Stamp before resolving, so a write that lands meanwhile isn't overwritten
+            stamp = self.cache.stamp(key)
             
             # Resolve setting from all sources
             setting_value = await self._resolve_setting(key, user_roles, context, decrypt)
@@ -213,21 +211,20 @@ class HybridSettingsManager:
                     "key": key
                 }
             
-            # Cache the result
-            if use_cache:
-                ttl = self.cache_ttl[setting_value.source]
-                self.cache[cache_key] = SettingCacheEntry(
-                    value=setting_value,
-                    expires_at=datetime.utcnow() + ttl
-                )
-            
-            return {
+            result = {
                 "success": True,
                 "value": setting_value.value,
                 "source": setting_value.source.value,
                 "metadata": setting_value.to_dict()
             }
             
+            # Cache the result
+            if use_cache:
+                ttl = self.cache_ttl[setting_value.source].total_seconds()
+                self.cache.set(cache_key, result, ttl, stamp)
+            
+            return dict(result)
+            
         except Exception as e:
             logger.error(f"Error getting setting {key}: {e}")
             return {
@@ -594,17 +591,9 @@ class HybridSettingsManager:
         user_roles: List[str],
         context: Optional[Dict[str, Any]],
         decrypt: bool = False
-    ) -> str:
+    ) -> CacheKey:
         """Generate cache key for setting (optimized for single-site)"""
-        # Create a deterministic key from the parameters (no site_id needed)
-        cache_data = {
-            "key": key,
-            "roles": sorted(user_roles),
-            "user_id": context.get("user_id") if context else None,
-            "decrypt": decrypt
-        }
-        cache_str = json.dumps(cache_data, sort_keys=True)
-        return f"setting:{hashlib.md5(cache_str.encode()).hexdigest()}"
+        return cache_key(key, user_roles, context, decrypt)
     
     def _map_key_to_env(self, key: str) -> str:
         """Map setting key to environment variable name"""
@@ -630,17 +619,13 @@ class HybridSettingsManager:
             return False
     
     async def _invalidate_cache(self, key: str):
-        """Invalidate cache entries for a setting"""
-        # Remove all cache entries that contain this key
-        keys_to_remove = [
-            cache_key for cache_key in self.cache.keys()
-            if key in cache_key
+        """Invalidate cache entries for a setting and the computed settings derived from it, in every worker"""
+        keys = [key] + [
+            computed for computed, sources in self.computed_dependencies.items()
+            if key in sources
         ]
-        
-        for cache_key in keys_to_remove:
-            del self.cache[cache_key]
-        
-        logger.debug(f"Invalidated {len(keys_to_remove)} cache entries for {key}")
+        await self.cache.publish(*keys)
+        logger.debug(f"Invalidated cache entries for {', '.join(keys)}")
     
     # ========================================================================
     # Computed Settings
@@ -655,8 +640,8 @@ class HybridSettingsManager:
         platform_theme = await self.get_setting("theme.colors", user_roles, context)
         user_theme = await self.get_setting("user.theme.override", user_roles, context)
         
-        # Merge user preferences with platform theme
-        combined = platform_theme.get("value", {})
+        # Merge user preferences with platform theme (copied; the platform value is cached)
+        combined = dict(platform_theme.get("value") or {})
         if user_theme.get("success"):
             combined.update(user_theme.get("value", {}))
         
@@ -718,6 +703,8 @@ class HybridSettingsManager:
             "cache_hit_rate": round(cache_hit_rate, 2),
             "total_requests": total_requests,
             "cache_size": len(self.cache),
+            "cache_evictions": self.cache.stats["evictions"],
+            "cache_expirations": self.cache.stats["expirations"],
             "db_queries": self.metrics["db_queries"],
             "static_loads": self.metrics["static_loads"],
             **self.metrics
@@ -727,6 +714,14 @@ class HybridSettingsManager:
         """Clear all cached settings"""
         self.cache.clear()
         logger.info("Settings cache cleared")
+    
+    async def start_sync(self, redis=None):
+        """Apply other workers' setting changes to this cache (no-op without Redis)"""
+        await self.cache.start_sync(redis)
+    
+    async def close(self):
+        """Stop the cache sync listener"""
+        await self.cache.close()
 
 
 # ============================================================================
@@ -817,22 +812,12 @@ class OptimizedSettingsManager(HybridSettingsManager):
         user_roles: List[str],
         context: Optional[Dict[str, Any]],
         decrypt: bool = False
-    ) -> str:
+    ) -> CacheKey:
         """Generate optimized cache key for single-site (no site_id complexity)"""
-        # Simplified cache data for single-site
-        cache_data = {
-            "key": key,
-            "roles": sorted(user_roles),
-            "user_id": context.get("user_id") if context else None,
-            "decrypt": decrypt
-        }
-        cache_str = json.dumps(cache_data, sort_keys=True)
-        cache_key = f"ss_setting:{hashlib.md5(cache_str.encode()).hexdigest()}"
-        
         # Track optimization metrics
         self.metrics["cache_key_simplifications"] += 1
         
-        return cache_key
+        return cache_key(key, user_roles, context, decrypt)
     
     async def get_setting(
         self,
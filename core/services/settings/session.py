@@ -5,13 +5,19 @@ Reads configuration from settings and provides:
 - Session creation and validation
 - Cookie configuration based on security settings
 - Session cleanup and expiry
+
+When Redis is configured, sessions live in the same store as the session
+middleware (core.middleware.session.RedisSessionStore) instead of the
+"sessions" collection, and expire through Redis TTLs.
 """
 
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import os
 import secrets
 
+from core.middleware.session import RedisSessionStore, unpack_value
 from core.utils.logger import get_logger
 from .service import settings_service
 
@@ -147,14 +153,19 @@ class SessionManager:
     - Cookie configuration from settings
     """
     
-    def __init__(self, db_service=None):
+    def __init__(self, db_service=None, store: Optional[RedisSessionStore] = None):
         """
         Initialize session manager.
         
         Args:
             db_service: Database service for session storage
+            store: Redis session store (defaults to one on REDIS_URL when set);
+                takes precedence over db_service
         """
+        if store is None and os.getenv("REDIS_URL"):
+            store = RedisSessionStore()
         self.db = db_service
+        self.store = store
         self._session_config: Optional[SessionConfig] = None
         self._cookie_config: Optional[CookieConfig] = None
     
@@ -225,8 +236,18 @@ class SessionManager:
             "user_agent": user_agent
         }
         
+        if self.store:
+            try:
+                ttl = config.timeout_minutes * 60
+                await self.store.write_values(session_id, session_data, ttl_seconds=ttl)
+                await self._index_session(user_id, session_id, ttl)
+                logger.info(f"Created session for user {user_id}")
+            except Exception as e:
+                logger.error(f"Failed to create session: {e}")
+                return {"success": False, "error": "Failed to create session"}
+        
         # Store in database
-        if self.db:
+        elif self.db:
             try:
                 await self.db.insert_one("sessions", session_data)
                 logger.info(f"Created session for user {user_id}")
@@ -247,6 +268,15 @@ class SessionManager:
         
         Returns None if session doesn't exist or is expired.
         """
+        if self.store:
+            try:
+                session = await self.store.read(session_id)
+            except Exception as e:
+                logger.error(f"Error fetching session: {e}")
+                return None
+            # Redis expires sessions itself; keys set by the middleware alone don't make one
+            return session if "user_id" in session else None
+        
         if not self.db:
             logger.warning("No database service configured")
             return None
@@ -274,7 +304,7 @@ class SessionManager:
         
         This can be used to implement sliding window sessions.
         """
-        if not self.db:
+        if not self.db and not self.store:
             return False
         
         try:
@@ -283,6 +313,17 @@ class SessionManager:
             # Update last activity and extend expiry
             new_expiry = datetime.utcnow() + timedelta(minutes=config.timeout_minutes)
             
+            if self.store:
+                if not await self.store.redis.exists(self.store.key(session_id)):
+                    return False
+                # HSET + EXPIRE in one round trip
+                await self.store.write_values(
+                    session_id,
+                    {"last_activity": datetime.utcnow(), "expires_at": new_expiry},
+                    ttl_seconds=config.timeout_minutes * 60
+                )
+                return True
+            
             await self.db.update_one(
                 "sessions",
                 {"session_id": session_id},
@@ -298,11 +339,15 @@ class SessionManager:
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session (logout)"""
-        if not self.db:
+        if not self.db and not self.store:
             return False
         
         try:
-            await self.db.delete_one("sessions", {"session_id": session_id})
+            if self.store:
+                # The user index is pruned lazily by get_active_sessions
+                await self.store.delete(session_id)
+            else:
+                await self.db.delete_one("sessions", {"session_id": session_id})
             logger.info(f"Deleted session {session_id}")
             return True
         except Exception as e:
@@ -318,10 +363,17 @@ class SessionManager:
         Returns:
             Number of sessions deleted
         """
-        if not self.db:
+        if not self.db and not self.store:
             return 0
         
         try:
+            if self.store:
+                session_ids = await self._indexed_sessions(user_id)
+                count = await self.store.delete(*session_ids)
+                await self.store.redis.unlink(self._user_index(user_id))
+                logger.info(f"Deleted {count} sessions for user {user_id}")
+                return count
+            
             result = await self.db.delete_many("sessions", {"user_id": user_id})
             count = result.deleted_count if hasattr(result, 'deleted_count') else 0
             logger.info(f"Deleted {count} sessions for user {user_id}")
@@ -339,7 +391,8 @@ class SessionManager:
         Returns:
             Number of sessions cleaned up
         """
-        if not self.db:
+        # Redis sessions expire on their own
+        if self.store or not self.db:
             return 0
         
         try:
@@ -362,14 +415,17 @@ class SessionManager:
         
         Useful for "active devices" display.
         """
-        if not self.db:
+        if not self.db and not self.store:
             return []
         
         try:
-            sessions = await self.db.find("sessions", {
-                "user_id": user_id,
-                "expires_at": {"$gt": datetime.utcnow()}
-            })
+            if self.store:
+                sessions = await self._read_indexed_sessions(user_id)
+            else:
+                sessions = await self.db.find("sessions", {
+                    "user_id": user_id,
+                    "expires_at": {"$gt": datetime.utcnow()}
+                })
             
             return [
                 {
@@ -385,6 +441,49 @@ class SessionManager:
             logger.error(f"Failed to get active sessions: {e}")
             return []
     
+    # ========================================================================
+    # Redis User Index
+    # ========================================================================
+    
+    def _user_index(self, user_id: str) -> str:
+        return f"{self.store.prefix}user:{user_id}"
+    
+    async def _index_session(self, user_id: str, session_id: str, ttl_seconds: int):
+        """Add a session to the user's index, which lives as long as their newest session"""
+        key = self._user_index(user_id)
+        async with self.store.redis.pipeline() as pipe:
+            pipe.sadd(key, session_id)
+            pipe.expire(key, ttl_seconds)
+    
+    async def _indexed_sessions(self, user_id: str) -> List[str]:
+        members = await self.store.redis.get_client().smembers(self._user_index(user_id))
+        return [m.decode() if isinstance(m, bytes) else m for m in members]
+    
+    async def _read_indexed_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        """Every live session in the user's index, read in one round trip; expired ids are pruned"""
+        session_ids = await self._indexed_sessions(user_id)
+        if not session_ids:
+            return []
+        
+        async with self.store.redis.pipeline() as pipe:
+            for session_id in session_ids:
+                pipe.hgetall(self.store.key(session_id))
+            results = await pipe.execute()
+        
+        sessions, expired = [], []
+        for session_id, raw in zip(session_ids, results):
+            if raw:
+                session = {
+                    (k.decode() if isinstance(k, bytes) else k): unpack_value(v) for k, v in raw.items()
+                }
+                if "user_id" in session:
+                    sessions.append(session)
+            else:
+                expired.append(session_id)
+        if expired:
+            await self.store.redis.srem(self._user_index(user_id), *expired)
+        return sessions
+    
     # ========================================================================
     # Cookie Helpers
     # ========================================================================
@@ -1,54 +1,387 @@
 # Hybrid Cache: In-Memory + S3
+"""
+Two-tier cache used by FileManager and friends.
+
+Memory tier:
+    Byte-size bounded LRU. Expiry is driven by a hashed timing wheel that is
+    swept on access - no task per key. Entries are also checked against their
+    exact deadline on read.
+
+S3 tier (optional):
+    JSON values are written behind in coalesced batches by a single flusher
+    task; all boto3 calls run in a worker thread so the event loop never
+    blocks. Values that don't serialize to JSON (e.g. file bytes) stay in
+    memory only.
+"""
 import asyncio
 import json
 import os
-from typing import Any, Dict, Optional
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 from core.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+_MISSING = object()
+_DELETE = object()  # Pending write-behind marker for deletions
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate memory cost of a cached value in bytes."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class TTLWheel:
+    """
+    Hashed timing wheel: keys bucketed by expiry tick.
+
+    ``expired(now)`` returns the keys whose tick has passed, touching only
+    the buckets between the last sweep and now.
+    """
+
+    def __init__(self, resolution: float = 1.0):
+        self.resolution = resolution
+        self._buckets: Dict[int, Set[str]] = {}
+        self._last_tick = int(time.monotonic() / resolution)
+
+    def _tick(self, at: float) -> int:
+        return int(at / self.resolution)
+
+    def schedule(self, key: str, expires_at: float) -> None:
+        self._buckets.setdefault(self._tick(expires_at), set()).add(key)
+
+    def cancel(self, key: str, expires_at: float) -> None:
+        bucket = self._buckets.get(self._tick(expires_at))
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[self._tick(expires_at)]
+
+    def expired(self, now: float) -> Set[str]:
+        current = self._tick(now)
+        if current <= self._last_tick:
+            return set()
+        # Walk the elapsed ticks, or the populated buckets if that's shorter
+        if current - self._last_tick <= len(self._buckets):
+            ticks = range(self._last_tick, current)
+        else:
+            ticks = [t for t in self._buckets if t < current]
+        self._last_tick = current
+        keys: Set[str] = set()
+        for tick in ticks:
+            bucket = self._buckets.pop(tick, None)
+            if bucket:
+                keys |= bucket
+        return keys
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class MemoryLRU:
+    """Byte-size bounded LRU with TTL wheel expiry."""
+
+    def __init__(self, max_bytes: int, max_entries: int, max_item_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_item_bytes = max_item_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._wheel = TTLWheel()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        now = time.monotonic()
+        self._sweep(now)
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry.expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: float) -> bool:
+        now = time.monotonic()
+        self._sweep(now)
+        self._remove(key)
+
+        size = _sizeof(value)
+        if size > self.max_item_bytes or size > self.max_bytes:
+            return False
+
+        entry = _Entry(value=value, size=size, expires_at=now + ttl)
+        self._entries[key] = entry
+        self._wheel.schedule(key, entry.expires_at)
+        self.bytes += size
+
+        while self._entries and (self.bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        return self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._wheel.clear()
+        self.bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not _MISSING
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._wheel.cancel(key, entry.expires_at)
+        self.bytes -= entry.size
+        return True
+
+    def _sweep(self, now: float) -> None:
+        for key in self._wheel.expired(now):
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+
+
 class HybridCache:
-    def __init__(self):
-        self._cache: Dict[str, Any] = {}
-        self.s3 = boto3.client(
-            's3',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION', 'us-east-1')
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        max_item_bytes: Optional[int] = None,
+        s3_enabled: Optional[bool] = None,
+        flush_interval: Optional[float] = None,
+        flush_batch_size: Optional[int] = None,
+    ):
+        self.memory = MemoryLRU(
+            max_bytes=max_bytes or int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            max_entries=max_entries or int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+            max_item_bytes=max_item_bytes or int(os.getenv('CACHE_MAX_ITEM_BYTES', str(8 * 1024 * 1024))),
         )
+        if s3_enabled is None:
+            s3_enabled = os.getenv('CACHE_S3_ENABLED', 'true').lower() == 'true'
+        self.s3 = None
+        if s3_enabled:
+            self.s3 = boto3.client(
+                's3',
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                region_name=os.getenv('AWS_REGION', 'us-east-1')
+            )
         self.bucket = os.getenv('S3_CACHE_BUCKET', 'fastapp-cache')
 
+        # Write-behind queue: key -> (body, expires_at) or _DELETE; later writes coalesce
+        self.flush_interval = flush_interval or float(os.getenv('CACHE_WRITE_BEHIND_INTERVAL', '0.5'))
+        self.flush_batch_size = flush_batch_size or int(os.getenv('CACHE_WRITE_BEHIND_BATCH', '100'))
+        self._pending: "OrderedDict[str, Any]" = OrderedDict()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_wakeup: Optional[asyncio.Event] = None
+
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            's3_hits': 0,
+            's3_misses': 0,
+            's3_writes': 0,
+            's3_errors': 0,
+        }
+
+    # ========================================================================
+    # Public API
+    # ========================================================================
+
     async def get(self, key: str) -> Optional[Any]:
-        if key in self._cache:
-            return self._cache[key]
-        try:
-            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
-            data = json.loads(obj['Body'].read())
-            self._cache[key] = data
-            logger.info(f"Cache hit from S3: {key}")
-            return data
-        except ClientError:
-            logger.debug(f"Cache miss for key: {key}")
+        value = self.memory.get(key)
+        if value is not _MISSING:
+            self._stats['hits'] += 1
+            return value
+
+        pending = self._pending.get(key, _MISSING)
+        if pending is _DELETE:
+            self._stats['misses'] += 1
+            return None
+        if pending is not _MISSING:
+            body, expires_at = pending
+            if expires_at > time.time():
+                self._stats['hits'] += 1
+                return json.loads(body)
+
+        if self.s3 is None:
+            self._stats['misses'] += 1
             return None
 
+        data = await self._s3_get(key)
+        if data is None:
+            self._stats['misses'] += 1
+            return None
+
+        self._stats['s3_hits'] += 1
+        value, remaining = data
+        self.memory.set(key, value, remaining)
+        logger.info(f"Cache hit from S3: {key}")
+        return value
+
     async def set(self, key: str, value: Any, ttl: int = 300):
-        self._cache[key] = value
-        asyncio.create_task(self._expire_key(key, ttl))
+        # Setting None is how callers invalidate
+        if value is None or ttl <= 0:
+            await self.delete(key)
+            return
+
+        self.memory.set(key, value, ttl)
+
+        if self.s3 is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return
         try:
-            self.s3.put_object(
-                Bucket=self.bucket,
-                Key=key,
-                Body=json.dumps(value).encode('utf-8'),
-                ContentType='application/json'
-            )
-            logger.info(f"Cached to S3: {key}")
-        except ClientError as e:
+            body = json.dumps(value)
+        except (TypeError, ValueError):
+            return  # Memory-only value
+        self._enqueue(key, (body, time.time() + ttl))
+
+    async def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.s3 is not None:
+            self._enqueue(key, _DELETE)
+
+    async def clear(self) -> None:
+        """Clear the memory tier and drop unflushed writes."""
+        self.memory.clear()
+        self._pending.clear()
+
+    async def flush(self) -> int:
+        """Write all pending entries to S3 now. Returns number of operations."""
+        written = 0
+        while self._pending:
+            written += await self._flush_batch()
+        return written
+
+    async def close(self) -> None:
+        """Flush pending writes and stop the flusher task."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'evictions': self.memory.evictions,
+            'expirations': self.memory.expirations,
+            'entries': self.memory.size,
+            'bytes': self.memory.bytes,
+            'max_bytes': self.memory.max_bytes,
+            'pending_writes': len(self._pending),
+        }
+
+    # ========================================================================
+    # S3 tier
+    # ========================================================================
+
+    def _enqueue(self, key: str, op: Any) -> None:
+        self._pending.pop(key, None)
+        self._pending[key] = op
+        self._ensure_flusher()
+        if len(self._pending) >= self.flush_batch_size and self._flush_wakeup is not None:
+            self._flush_wakeup.set()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flush_wakeup = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            if self._pending:
+                await self._flush_batch()
+
+    async def _flush_batch(self) -> int:
+        batch = []
+        while self._pending and len(batch) < self.flush_batch_size:
+            batch.append(self._pending.popitem(last=False))
+        if not batch:
+            return 0
+        await asyncio.gather(*(self._s3_write(key, op) for key, op in batch))
+        return len(batch)
+
+    async def _s3_write(self, key: str, op: Any) -> None:
+        try:
+            if op is _DELETE:
+                await asyncio.to_thread(self.s3.delete_object, Bucket=self.bucket, Key=key)
+            else:
+                body, expires_at = op
+                envelope = json.dumps({'expires_at': expires_at, 'value': json.loads(body)})
+                await asyncio.to_thread(
+                    self.s3.put_object,
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=envelope.encode('utf-8'),
+                    ContentType='application/json'
+                )
+                logger.debug(f"Cached to S3: {key}")
+            self._stats['s3_writes'] += 1
+        except (ClientError, BotoCoreError) as e:
+            self._stats['s3_errors'] += 1
             logger.error(f"Failed to cache to S3: {e}")
 
-    async def _expire_key(self, key: str, ttl: int):
-        await asyncio.sleep(ttl)
-        self._cache.pop(key, None)
+    async def _s3_get(self, key: str) -> Optional[Tuple[Any, float]]:
+        def _read():
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+            return obj['Body'].read()
+
+        try:
+            raw = await asyncio.to_thread(_read)
+        except (ClientError, BotoCoreError):
+            self._stats['s3_misses'] += 1
+            logger.debug(f"Cache miss for key: {key}")
+            return None
+
+        data = json.loads(raw)
+        if isinstance(data, dict) and set(data) == {'expires_at', 'value'}:
+            remaining = data['expires_at'] - time.time()
+            if remaining <= 0:
+                return None
+            return data['value'], remaining
+        # Objects written before the envelope format carry no expiry
+        return data, 300
+
 
-cache = HybridCache()
\ No newline at end of file
+cache = HybridCache()
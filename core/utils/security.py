@@ -269,16 +269,17 @@ def sanitize_css_value(value: str) -> str:
     # Strip all but safe CSS characters
     return re.sub(r'[^a-zA-Z0-9#(),.%\-\s]', '', value)
 
+_SQL_DANGEROUS = re.compile(r"DROP|DELETE|INSERT|UPDATE|ALTER|EXEC|UNION|SELECT")
+
+
 def sanitize_sql_input(value: str) -> str:
     """Basic SQL injection prevention"""
     if not isinstance(value, str):
         return value
     # Remove dangerous SQL patterns
-    dangerous = ['DROP', 'DELETE', 'INSERT', 'UPDATE', 'ALTER', 'EXEC', 'UNION', 'SELECT']
-    value_upper = value.upper()
-    for danger in dangerous:
-        if danger in value_upper:
-            raise ValueError(f"Potentially dangerous SQL pattern detected: {danger}")
+    match = _SQL_DANGEROUS.search(value.upper())
+    if match:
+        raise ValueError(f"Potentially dangerous SQL pattern detected: {match.group()}")
     return value.strip()
 
 def sanitize_filename(filename: str) -> str:
@@ -0,0 +1,65 @@
+"""
+Shared timing helpers for the benchmark scripts in this directory.
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+# Add project root to path so benchmarks can import core/add_ons
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/mean (in microseconds) for samples recorded in seconds."""
+    return {
+        "n": len(samples),
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "mean_us": (statistics.fmean(samples) if samples else 0.0) * 1e6,
+    }
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    """Print one summary row per scenario."""
+    print(f"\n{title}")
+    print(f"{'scenario':<28}{'n':>8}{'p50 (us)':>12}{'p99 (us)':>12}{'mean (us)':>12}")
+    for name, s in rows.items():
+        print(f"{name:<28}{s['n']:>8}{s['p50_us']:>12.1f}{s['p99_us']:>12.1f}{s['mean_us']:>12.1f}")
+
+
+async def time_async(fn: Callable[[], Awaitable], iterations: int, warmup: int = 50) -> List[float]:
+    """Run ``fn`` ``warmup + iterations`` times and return per-call durations."""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_sync(fn: Callable[[], object], iterations: int, warmup: int = 50) -> List[float]:
+    """Synchronous counterpart of ``time_async``."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark ChatHub fan-out: publish-to-delivery latency with thousands of
+subscribers in one room.
+
+Each subscriber records how long after publish it received a message. The
+legacy numbers model the old design, where every viewer polled
+``/stream/chat/{id}`` every 2 seconds: a message waits on average half the
+poll interval and costs one backlog read per viewer per poll.
+
+Usage:
+    python scripts/benchmarks/bench_chat_fanout.py [--viewers 1000 5000] [--messages 50]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from _timing import print_table, summarize
+
+from add_ons.domains.stream.services.chat_service import ChatHub, ChatMessage
+
+POLL_INTERVAL = 2.0
+
+
+async def run_room(viewers: int, messages: int):
+    hub = ChatHub(queue_size=messages + 1)
+    sent_at = {}
+    latencies = []
+
+    async def viewer():
+        received = 0
+        async for msg in hub.subscribe(1):
+            latencies.append(time.perf_counter() - sent_at[msg.id])
+            received += 1
+            if received == messages:
+                return
+
+    tasks = [asyncio.create_task(viewer()) for _ in range(viewers)]
+    await asyncio.sleep(0)
+
+    began = time.perf_counter()
+    for i in range(1, messages + 1):
+        sent_at[i] = time.perf_counter()
+        hub.publish_local(ChatMessage(i, 1, 1, "bench", f"message {i}", datetime.utcnow()))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - began
+    return latencies, viewers * messages / elapsed
+
+
+def run(viewer_counts, messages: int):
+    rows = {}
+    for viewers in viewer_counts:
+        latencies, rate = asyncio.run(run_room(viewers, messages))
+        rows[f"{viewers} viewers (push)"] = summarize(latencies)
+        print(f"{viewers:>6} viewers: {rate:,.0f} deliveries/s, "
+              f"polling would issue {viewers / POLL_INTERVAL:,.0f} backlog reads/s "
+              f"with ~{POLL_INTERVAL / 2 * 1000:.0f} ms mean delay")
+    print_table("Publish-to-delivery latency", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+    run(args.viewers, args.messages)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark SecurityMiddleware form sanitization on admin site-editor payloads.
+
+"before" is the previous per-field logic (lowercase every name and value,
+scan each substring list in turn, always run sanitize_html). "after" is
+SecurityMiddleware._sanitize_items with the compiled rule sets, memoized
+field classification and the special-character pre-check. Payloads mirror
+the forms posted to core/routes/admin_sites.py.
+
+Usage:
+    python scripts/benchmarks/bench_form_sanitization.py [--iterations 2000] [--components 100]
+"""
+
+import argparse
+
+from _timing import print_table, summarize, time_sync
+
+from core.middleware.security import (
+    CSS_INDICATORS,
+    CSS_PATTERNS,
+    DANGEROUS_FIELD_PATTERNS,
+    PRESERVE_FIELDS,
+    SANITIZE_FIELDS,
+    SecurityMiddleware,
+)
+from core.utils.security import sanitize_html, sanitize_sql_input
+
+
+def legacy_sanitize_items(items):
+    """The pre-compiled-rules version of SecurityMiddleware._sanitize_items."""
+
+    def should_preserve(field_name, value):
+        field_lower = field_name.lower()
+        value_lower = str(value).lower()
+        if any(preserve in field_lower for preserve in PRESERVE_FIELDS):
+            return True
+        if any(pattern in value_lower for pattern in CSS_PATTERNS):
+            return True
+        return any(indicator in value_lower for indicator in CSS_INDICATORS)
+
+    def should_sanitize(field_name):
+        field_lower = field_name.lower()
+        if field_lower in SANITIZE_FIELDS:
+            return True
+        return any(pattern in field_lower for pattern in DANGEROUS_FIELD_PATTERNS)
+
+    clean, suspicious = {}, 0
+    for k, v in items:
+        if should_preserve(k, v):
+            clean[k] = v
+            continue
+        should_sanitize(k)
+        safe_v = sanitize_sql_input(sanitize_html(v))
+        if v != safe_v:
+            suspicious += 1
+        clean[k] = safe_v
+    return clean, suspicious
+
+
+CUSTOM_CSS = "\n".join(
+    f".section-{i} {{ color: #1f2937; background: #f9fafb; margin: 0 auto; padding: {i}px; }}"
+    for i in range(40)
+)
+
+
+def payloads(components: int):
+    colors = ["primary", "secondary", "accent", "background", "text"]
+    typography = ["heading_size", "body_size", "button_size"]
+    theme_save = (
+        [(f"color_{name}", "#3b82f6") for name in colors]
+        + [(f"typo_{name}", "2xl") for name in typography]
+        + [("custom_css", CUSTOM_CSS)]
+    )
+
+    editor = [("section_id", "hero")]
+    for i in range(components):
+        editor += [
+            (f"component_{i}_title", f"Feature number {i}"),
+            (f"component_{i}_description", "Fast shipping, friendly support & easy returns on every order"),
+            (f"component_{i}_link", f"/products/item-{i}"),
+            (f"component_{i}_button_text", "Shop now"),
+            (f"component_{i}_enabled", "true"),
+        ]
+
+    return {
+        "theme color": [("color", "primary"), ("color_primary", "#3b82f6")],
+        "theme preset": [("preset", "dark")],
+        "custom css": [("custom_css", CUSTOM_CSS)],
+        "theme save": theme_save,
+        f"editor ({len(editor)} fields)": editor,
+    }
+
+
+def run(iterations: int, components: int):
+    middleware = SecurityMiddleware(app=None)
+    for name, items in payloads(components).items():
+        assert legacy_sanitize_items(items) == middleware._sanitize_items(items), name
+        rows = {
+            "before": summarize(time_sync(lambda: legacy_sanitize_items(items), iterations)),
+            "after": summarize(time_sync(lambda: middleware._sanitize_items(items), iterations)),
+        }
+        print_table(f"Form sanitization: {name}", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--components", type=int, default=100)
+    args = parser.parse_args()
+    run(args.iterations, args.components)
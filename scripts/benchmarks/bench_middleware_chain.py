@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark the request middleware chain: BaseHTTPMiddleware vs raw ASGI.
+
+"before" rebuilds the old two-layer stack (SecurityMiddleware and
+AuthContextMiddleware as BaseHTTPMiddleware, the form parsed in middleware
+and again in the handler). "after" is the fused raw ASGI SecurityMiddleware
+with auth_context=True. Each is driven directly over ASGI for a plain GET,
+a form POST and a streaming response, reporting time to first body byte and
+requests per second (sequential and with --concurrency requests in flight).
+
+Usage:
+    python scripts/benchmarks/bench_middleware_chain.py [--iterations 2000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlencode
+
+from _timing import print_table, summarize
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from core.db.repositories.base_repository import batched_loads
+from core.middleware.auth_context import cookie_headers, resolve_user_context
+from core.middleware.security import SecurityMiddleware
+from core.services.auth.context import current_user_context
+
+
+class LegacySecurityMiddleware(BaseHTTPMiddleware):
+    """The pre-ASGI SecurityMiddleware: form parsed in dispatch, headers set on the Response."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.sanitizer = SecurityMiddleware(app)
+
+    async def dispatch(self, request, call_next):
+        request.state.sanitized_query, _ = self.sanitizer._sanitize_items(request.query_params.items())
+        if request.method in ("POST", "PUT", "PATCH"):
+            form = await request.form()
+            request.state.sanitized_form, _ = self.sanitizer._sanitize_items(form.items())
+        response = await call_next(request)
+        for name, value in self.sanitizer._security_headers(request.scope):
+            response.headers[name.decode()] = value.decode()
+        return response
+
+
+class LegacyAuthContextMiddleware(BaseHTTPMiddleware):
+    """The pre-ASGI AuthContextMiddleware."""
+
+    async def dispatch(self, request, call_next):
+        user_context = await resolve_user_context(request)
+        token = current_user_context.set(user_context)
+        try:
+            with batched_loads():
+                response = await call_next(request)
+            for _, value in cookie_headers(user_context):
+                response.headers.append("set-cookie", value.decode())
+            return response
+        finally:
+            current_user_context.reset(token)
+
+
+FORM = urlencode({
+    "name": "Ada Lovelace", "email": "ada@example.com", "title": "Analytical <engine>",
+    "custom_css": ".hero { color: red; }", "message": "x" * 400,
+}).encode()
+
+
+def build_app():
+    async def plain(request):
+        return PlainTextResponse("ok")
+
+    async def form(request):
+        data = getattr(request.state, "sanitized_form", None) or await request.form()
+        return PlainTextResponse(data["name"])
+
+    async def stream(request):
+        async def chunks():
+            for _ in range(8):
+                await asyncio.sleep(0)
+                yield b"x" * 4096
+
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    return Starlette(routes=[
+        Route("/", plain),
+        Route("/form", form, methods=["POST"]),
+        Route("/stream", stream),
+    ])
+
+
+def build_stacks():
+    legacy = build_app()
+    legacy.add_middleware(LegacyAuthContextMiddleware)
+    legacy.add_middleware(LegacySecurityMiddleware)
+
+    fused = build_app()
+    fused.add_middleware(SecurityMiddleware, auth_context=True)
+    return {"before": legacy, "after": fused}
+
+
+def request_for(route):
+    if route == "form":
+        headers = [(b"content-type", b"application/x-www-form-urlencoded")]
+        return "POST", "/form", headers, FORM
+    return "GET", "/" if route == "plain" else "/stream", [], b""
+
+
+async def one_request(app, route):
+    """Run one request; return (time to first body byte, total time)."""
+    method, path, headers, body = request_for(route)
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+        "headers": headers, "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if sent_body:
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+        sent_body = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    first_byte = None
+    start = time.perf_counter()
+
+    async def send(message):
+        nonlocal first_byte
+        if first_byte is None and message["type"] == "http.response.body" and message.get("body"):
+            first_byte = time.perf_counter() - start
+
+    await app(scope, receive, send)
+    return first_byte, time.perf_counter() - start
+
+
+async def run(iterations: int, concurrency: int):
+    stacks = build_stacks()
+    ttfb_rows = {}
+    rps_rows = []
+    for route in ("plain", "form", "stream"):
+        for name, app in stacks.items():
+            for _ in range(50):
+                await one_request(app, route)
+
+            ttfb, total = [], []
+            for _ in range(iterations):
+                first_byte, elapsed = await one_request(app, route)
+                ttfb.append(first_byte)
+                total.append(elapsed)
+            ttfb_rows[f"{route} {name}"] = summarize(ttfb)
+
+            start = time.perf_counter()
+            for _ in range(iterations // concurrency):
+                await asyncio.gather(*(one_request(app, route) for _ in range(concurrency)))
+            concurrent_rps = (iterations // concurrency) * concurrency / (time.perf_counter() - start)
+            rps_rows.append((f"{route} {name}", len(total) / sum(total), concurrent_rps))
+
+    print_table("Time to first body byte", ttfb_rows)
+    print(f"\nRequests per second (concurrency = {concurrency})")
+    print(f"{'scenario':<28}{'sequential':>12}{'concurrent':>12}")
+    for name, sequential, concurrent in rps_rows:
+        print(f"{name:<28}{sequential:>12.0f}{concurrent:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.concurrency))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark permission checks: recursive resolve + linear match vs the
+compiled per-role-set decision table.
+
+Loads the core roles plus every add-on role catalogue that imports cleanly,
+then checks a mix of (resource, action) pairs for each single role and a
+few multi-role combinations.
+
+Usage:
+    python scripts/benchmarks/bench_permissions.py [--iterations 20000]
+"""
+
+import argparse
+import importlib
+import itertools
+
+from _timing import print_table, summarize, time_sync
+
+from core.services.auth.permissions import permission_registry
+
+ADDON_MANIFESTS = {
+    "blog": "BLOG_ROLES",
+    "commerce": "COMMERCE_ROLES",
+    "lms": "LMS_ROLES",
+    "social": "SOCIAL_ROLES",
+    "stream": "STREAM_ROLES",
+}
+
+
+def load_addon_roles():
+    for domain, attr in ADDON_MANIFESTS.items():
+        try:
+            manifest = importlib.import_module(f"add_ons.domains.{domain}.manifest")
+        except Exception as e:
+            print(f"  skipped {domain} roles ({type(e).__name__}: {e})")
+            continue
+        for role in getattr(manifest, attr):
+            permission_registry.register_role(role)
+
+
+def legacy_check(role_ids, resource, action, context):
+    """The pre-compilation path: resolve inheritance, then scan every permission."""
+    permissions = permission_registry._collect_permissions(role_ids)
+    return any(p.matches(resource, action, context) for p in permissions)
+
+
+def run(iterations: int):
+    load_addon_roles()
+    roles = sorted(permission_registry._roles)
+    role_sets = [[r] for r in roles] + [list(c) for c in itertools.islice(itertools.combinations(roles, 3), 20)]
+
+    pairs = sorted({(p.resource, p.action) for r in permission_registry._roles.values() for p in r.permissions})
+    pairs += [("unknown", "read"), ("course", "delete"), ("site", "read")]
+    context = {"user_id": 1, "owner_id": 1, "user_orgs": []}
+
+    checks = list(itertools.islice(itertools.cycle(itertools.product(role_sets, pairs)), iterations))
+    print(f"{len(roles)} roles, {len(role_sets)} role sets, {len(pairs)} resource/action pairs")
+
+    for role_ids, (resource, action) in checks[:2000]:
+        assert legacy_check(role_ids, resource, action, dict(context)) == \
+            permission_registry.check_permission(role_ids, resource, action, dict(context))
+
+    it = iter(checks)
+
+    def legacy():
+        role_ids, (resource, action) = next(it)
+        legacy_check(role_ids, resource, action, context)
+
+    samples_legacy = time_sync(legacy, iterations - 100)
+
+    it = iter(checks)
+
+    def compiled():
+        role_ids, (resource, action) = next(it)
+        permission_registry.check_permission(role_ids, resource, action, context)
+
+    samples_compiled = time_sync(compiled, iterations - 100)
+
+    # UserContext holds its compiled table, so a check skips the role-set lookup
+    tables = [(permission_registry.compile(role_ids), pair) for role_ids, pair in checks]
+    it = iter(tables)
+
+    def context_check():
+        table, (resource, action) = next(it)
+        table.allows(resource, action, context)
+
+    samples_context = time_sync(context_check, iterations - 100)
+
+    print_table("Permission check latency", {
+        "resolve + linear (before)": summarize(samples_legacy),
+        "registry, compiled (after)": summarize(samples_compiled),
+        "UserContext table (after)": summarize(samples_context),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    run(parser.parse_args().iterations)
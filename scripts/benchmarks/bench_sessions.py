@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request session cost and cookie size.
+
+"before" replicates the previous CookieSessionMiddleware: base64 + JSON
+decode of the whole cookie on every request (static assets included) and
+a full re-encode on every write. "after" is CookieSessionMiddleware on the
+session engine (lazy per-key msgpack, dirty tracking, HMAC-signed cookie).
+The session mirrors a signed-in shopper: user fields, roles, a cart and
+recently viewed items.
+
+Usage:
+    python scripts/benchmarks/bench_sessions.py [--iterations 5000] [--cart-items 20]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+
+from _timing import print_table, summarize, time_async
+
+from core.middleware.cookie_session import CookieSessionMiddleware
+
+
+class LegacyCookieSessionMiddleware:
+    """The previous middleware's per-request work (decode always, encode whole session on write)"""
+
+    def __init__(self, app, cookie_name="session"):
+        self.app = app
+        self.cookie_name = cookie_name
+
+    async def __call__(self, scope, receive, send):
+        cookie = dict(scope["headers"]).get(b"cookie", b"").decode()
+        value = cookie.split("=", 1)[1] if cookie else ""
+        session = json.loads(base64.b64decode(value).decode()) if value else {}
+        scope["session"] = session
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and scope.get("_session_modified"):
+                encoded = base64.b64encode(json.dumps(session).encode()).decode()
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"set-cookie", f"{self.cookie_name}={encoded}; Path=/; SameSite=lax".encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def make_session(cart_items: int):
+    return {
+        "user_id": "6650c0ffee0ddba11cafe001",
+        "email": "shopper@example.com",
+        "roles": ["customer"],
+        "csrf_token": "Vq3mXh0m4d9wq9Gk1yX2cQ",
+        "cart": {
+            "items": [
+                {"product_id": f"prod-{i}", "name": f"Product {i}", "quantity": 1 + i % 3, "price": 19.99 + i}
+                for i in range(cart_items)
+            ],
+            "currency": "USD",
+        },
+        "recently_viewed": [f"prod-{i}" for i in range(cart_items, cart_items + 10)],
+    }
+
+
+def route(kind):
+    async def app(scope, receive, send):
+        session = scope.get("session")
+        if kind == "read":
+            session.get("user_id")
+        elif kind == "write":
+            session["last_page"] = "/shop/checkout"
+            scope["_session_modified"] = True
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+async def request(app, path, cookie):
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"",
+             "headers": [(b"cookie", cookie.encode())]}
+    await app(scope, receive, send)
+    return sent
+
+
+async def cookie_for(middleware_cls, session):
+    def fill(scope_session):
+        scope_session.update(session)
+
+    async def app(scope, receive, send):
+        fill(scope["session"])
+        scope["_session_modified"] = True
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = await request(middleware_cls(app), "/", "")
+    (set_cookie,) = [v.decode() for k, v in sent[0]["headers"] if k == b"set-cookie"]
+    return set_cookie.split(";")[0]
+
+
+async def run(iterations: int, cart_items: int):
+    session = make_session(cart_items)
+    cookies = {
+        "before": await cookie_for(LegacyCookieSessionMiddleware, session),
+        "after": await cookie_for(lambda app: CookieSessionMiddleware(app, secret_key="bench"), session),
+    }
+    print("\nCookie header bytes")
+    for name, cookie in cookies.items():
+        print(f"{name:<28}{len(cookie):>8}")
+
+    impls = {
+        "before": LegacyCookieSessionMiddleware,
+        "after": lambda app: CookieSessionMiddleware(app, secret_key="bench"),
+    }
+    for kind, path in [("static", "/static/css/app.css"), ("untouched", "/shop"),
+                       ("read", "/account"), ("write", "/shop/checkout")]:
+        rows = {}
+        for name, impl in impls.items():
+            app = impl(route(kind))
+            rows[name] = summarize(await time_async(lambda: request(app, path, cookies[name]), iterations))
+        print_table(f"Session middleware: {kind} request", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--cart-items", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.cart_items))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark HybridSettingsManager cache hits and invalidation.
+
+"before" replicates the previous cache: an MD5 of a json.dumps dict per
+lookup, and invalidation scanning every cache key. "after" is the
+SettingsCache behind HybridSettingsManager (tuple keys, reverse index).
+Resolution is stubbed so only the cache is measured.
+
+Usage:
+    python scripts/benchmarks/bench_settings_cache.py [--iterations 20000] [--users 2000]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+
+from _timing import print_table, summarize, time_async, time_sync
+
+from core.services.settings.hybrid import HybridSettingsManager, SettingSource, SettingValue
+from core.services.settings.registry import SettingScope, SettingSensitivity
+
+VALUE = SettingValue(
+    key="theme.colors", value={"primary": "#3b82f6"}, source=SettingSource.DYNAMIC,
+    scope=SettingScope.PLATFORM, sensitivity=SettingSensitivity.PUBLIC,
+)
+
+
+def legacy_key(key, user_roles, context, decrypt=False):
+    cache_data = {
+        "key": key,
+        "roles": sorted(user_roles),
+        "user_id": context.get("user_id") if context else None,
+        "decrypt": decrypt,
+    }
+    return f"setting:{hashlib.md5(json.dumps(cache_data, sort_keys=True).encode()).hexdigest()}"
+
+
+def legacy_hit(cache, key, roles, context):
+    entry = cache[legacy_key(key, roles, context)]
+    return {"success": True, "value": entry.value, "source": entry.source.value, "metadata": entry.to_dict()}
+
+
+def legacy_invalidate(cache, key):
+    for cache_key in [k for k in cache if key in k]:
+        del cache[cache_key]
+
+
+async def run(iterations: int, users: int):
+    manager = HybridSettingsManager()
+
+    async def resolve(key, user_roles, context, decrypt):
+        return VALUE
+
+    manager._resolve_setting = resolve
+    contexts = [{"user_id": f"user-{i}"} for i in range(users)]
+    legacy = {legacy_key("theme.colors", ["customer"], c): VALUE for c in contexts}
+    for context in contexts:
+        await manager.get_setting("theme.colors", ["customer"], context)
+
+    context = contexts[0]
+    print_table("Settings cache hit", {
+        "before": summarize(time_sync(lambda: legacy_hit(legacy, "theme.colors", ["customer"], context), iterations)),
+        "after": summarize(await time_async(lambda: manager.get_setting("theme.colors", ["customer"], context), iterations)),
+    })
+
+    # Invalidate one setting while `users` other settings are cached
+    others = [f"setting.{i}" for i in range(users)]
+    legacy_many = {**legacy, **{legacy_key(key, ["customer"], None): VALUE for key in others}}
+    for key in others:
+        await manager.get_setting(key, ["customer"])
+    ckey = manager._generate_cache_key("setting.0", ["customer"], None)
+
+    async def invalidate():
+        manager.cache.set(ckey, {}, 60, manager.cache.stamp("setting.0"))
+        await manager._invalidate_cache("setting.0")
+
+    print_table(f"Invalidate one setting ({users + len(contexts)} cached entries)", {
+        # The hashed keys never contain the setting key, so this scan also removes nothing
+        "before": summarize(time_sync(lambda: legacy_invalidate(legacy_many, "setting.0"), 500)),
+        "after": summarize(await time_async(invalidate, 500)),
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.users))
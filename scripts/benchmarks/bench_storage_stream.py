@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of file uploads: whole-payload upload_file vs the
+streaming multipart upload_stream.
+
+S3 is replaced by a sink that only counts bytes, so the numbers are the
+service's own buffering (source + compression + encryption + parts).
+
+Usage:
+    python scripts/benchmarks/bench_storage_stream.py [--sizes-mb 16 64 256]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+import _timing  # noqa: F401  (puts the project root on sys.path)
+
+from core.services import file_manager  # noqa: F401  (resolves the storage import cycle)
+from core.integrations.storage import FileUploadRequest, StorageLevel, StorageService
+
+SOURCE_CHUNK = 256 * 1024
+
+
+class SinkS3:
+    """Accepts uploads and keeps nothing but a byte count"""
+
+    def __init__(self):
+        self.received = 0
+
+    def put_object(self, Body, **kwargs):
+        self.received += len(Body)
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "bench"}
+
+    def upload_part(self, Body, PartNumber, **kwargs):
+        self.received += len(Body)
+        return {"ETag": str(PartNumber)}
+
+    def complete_multipart_upload(self, **kwargs):
+        pass
+
+    def abort_multipart_upload(self, **kwargs):
+        pass
+
+
+def make_request():
+    return FileUploadRequest(
+        domain="stream", level=StorageLevel.APP, filename="video.mp4",
+        content_type="video/mp4", compress=True, encrypt=True,
+    )
+
+
+async def source(size: int):
+    block = os.urandom(SOURCE_CHUNK // 2) * 2  # half-compressible
+    sent = 0
+    while sent < size:
+        chunk = block[:min(SOURCE_CHUNK, size - sent)]
+        sent += len(chunk)
+        yield chunk
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def run(sizes_mb):
+    storage = StorageService()
+    storage.s3_client = SinkS3()
+
+    print(f"\n{'size':>8}{'path':>12}{'peak MB':>12}{'seconds':>10}")
+    for size_mb in sizes_mb:
+        size = size_mb * 1024 * 1024
+
+        def legacy():
+            # The old path: caller materializes the file, then compress + encrypt whole
+            async def collect():
+                return b"".join([chunk async for chunk in source(size)])
+            storage.upload_file(make_request(), asyncio.run(collect()))
+
+        def streaming():
+            asyncio.run(storage.upload_stream(make_request(), source(size), size=size))
+
+        for name, fn in (("bytes", legacy), ("stream", streaming)):
+            peak, elapsed = measure(fn)
+            print(f"{size_mb:>6}MB{name:>12}{peak / 1e6:>12.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[16, 64, 256])
+    run(parser.parse_args().sizes_mb)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark VideoFileStreamer under many concurrent range readers.
+
+Compares the previous 8 KiB aiofiles loop with the mmap path (adaptive
+chunks) and the zero-copy path, where the fake ASGI server answers
+``http.response.zerocopysend`` with os.sendfile into /dev/null. Each reader
+issues random ranged GETs against one file; the page cache is warmed first
+so the numbers reflect serving overhead, not disk.
+
+Usage:
+    python scripts/benchmarks/bench_video_streaming.py [--file-mb 256] [--readers 64] [--requests 20]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import aiofiles
+from _timing import print_table, summarize
+
+from add_ons.domains.stream.services.video_streaming_service import VideoFileStreamer
+
+MIN_RANGE = 256 * 1024
+MAX_RANGE = 4 * 1024 * 1024
+
+
+async def legacy_stream_range(path: str, start: int, end: int, chunk_size: int = 8192):
+    """The pre-mmap implementation: one executor hop per 8 KiB chunk."""
+    async with aiofiles.open(path, 'rb') as file:
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            yield chunk
+            remaining -= len(chunk)
+
+
+def make_ranges(file_size: int, count: int, seed: int):
+    rng = random.Random(seed)
+    ranges = []
+    for _ in range(count):
+        length = rng.randint(MIN_RANGE, MAX_RANGE)
+        start = rng.randint(0, file_size - length)
+        ranges.append((start, start + length - 1))
+    return ranges
+
+
+class Sink:
+    """Fake ASGI server side: counts body bytes, sendfiles zero-copy sends to /dev/null"""
+
+    def __init__(self):
+        self.devnull = os.open(os.devnull, os.O_WRONLY)
+        self.bytes = 0
+
+    async def send(self, message):
+        if message['type'] == 'http.response.body':
+            self.bytes += len(message['body'])
+        elif message['type'] == 'http.response.zerocopysend':
+            fd = message['file'].fileno()
+            offset, count = message['offset'], message['count']
+            while count:
+                sent = os.sendfile(self.devnull, fd, offset, count)
+                offset += sent
+                count -= sent
+                self.bytes += sent
+
+
+async def run_mode(mode: str, path: str, file_size: int, readers: int, requests: int):
+    sink = Sink()
+    latencies = []
+    scope = {
+        'type': 'http', 'method': 'GET', 'asgi': {'spec_version': '2.4'},
+        'extensions': {'http.response.zerocopysend': {}} if mode == 'sendfile' else {},
+    }
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def reader(seed: int):
+        for start, end in make_ranges(file_size, requests, seed):
+            began = time.perf_counter()
+            if mode == 'aiofiles':
+                async for chunk in legacy_stream_range(path, start, end):
+                    await sink.send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            else:
+                response = VideoFileStreamer(path).response(f'bytes={start}-{end}')
+                await response(scope, receive, sink.send)
+            latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(reader(seed) for seed in range(readers)))
+    elapsed = time.perf_counter() - began
+    os.close(sink.devnull)
+    return latencies, sink.bytes / elapsed / 1e6
+
+
+def run(file_mb: int, readers: int, requests: int):
+    with tempfile.NamedTemporaryFile(suffix='.mp4') as tmp:
+        block = os.urandom(1024 * 1024)
+        for _ in range(file_mb):
+            tmp.write(block)
+        tmp.flush()
+        with open(tmp.name, 'rb') as warm:
+            while warm.read(8 * 1024 * 1024):
+                pass
+
+        file_size = file_mb * 1024 * 1024
+        print(f"{file_mb} MB file, {readers} concurrent readers x {requests} ranged GETs "
+              f"({MIN_RANGE // 1024} KiB - {MAX_RANGE // 1024 // 1024} MiB)")
+
+        rows, throughput = {}, {}
+        for mode, label in (('aiofiles', 'aiofiles 8KiB (before)'),
+                            ('mmap', 'mmap adaptive (after)'),
+                            ('sendfile', 'zero-copy sendfile (after)')):
+            latencies, mb_per_s = asyncio.run(run_mode(mode, tmp.name, file_size, readers, requests))
+            rows[label] = summarize(latencies)
+            throughput[label] = mb_per_s
+
+        print_table("Ranged GET latency", rows)
+        print("\nAggregate throughput")
+        for label, mb_per_s in throughput.items():
+            print(f"{label:<28}{mb_per_s:>10.0f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file-mb", type=int, default=256)
+    parser.add_argument("--readers", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    run(args.file_mb, args.readers, args.requests)
@@ -7,6 +7,7 @@ Provides commands for managing GDPR compliance.
 
 import asyncio
 import argparse
+import os
 import sys
 import json
 from datetime import datetime, timedelta
@@ -46,19 +47,17 @@ class GDPRCLI:
         """Export user data (Right to Access)"""
         print(f"\n📤 Exporting data for user {user_id}...")
         
-        # Get user data
-        data = await self.data_subject_rights.get_user_data(user_id)
-        
-        # Export to file
+        # Export to file (streamed, the data is never held in memory at once)
         export_path = await self.data_subject_rights.export_user_data(user_id, format)
+        size = os.path.getsize(export_path)
         
         print(f"✅ Data exported to: {export_path}")
-        print(f"   Records included: {len(data)}")
+        print(f"   Size: {size} bytes")
         
         # Log the export
         await self.audit_logger.log_data_export(
             user_id, "admin", format, 
-            len(str(data))
+            size
         )
     
     async def anonymize_user(self, user_id: int):
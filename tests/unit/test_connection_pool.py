@@ -0,0 +1,203 @@
+"""Unit tests for pool telemetry, checkout limiting and adaptive sizing"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.db.adapters.mongodb_adapter import PoolMetricsListener
+from core.db.adapters.postgres_adapter import PostgresAdapter
+from core.db.adapters.redis_adapter import RedisAdapter
+from core.db.connection_pool import (
+    AdaptivePoolController,
+    ConnectionPoolManager,
+    PoolConfig,
+    PoolType,
+)
+
+
+class FakeConnection:
+
+    async def execute(self, query, *args):
+        return "SELECT 1"
+
+
+class FakePool:
+
+    def __init__(self, size=4):
+        self.free = asyncio.Queue()
+        self.size = size
+        for _ in range(size):
+            self.free.put_nowait(FakeConnection())
+
+    async def acquire(self, timeout=None):
+        return await asyncio.wait_for(self.free.get(), timeout)
+
+    async def release(self, conn):
+        self.free.put_nowait(conn)
+
+    def get_size(self):
+        return self.size
+
+    def get_idle_size(self):
+        return self.free.qsize()
+
+    def get_max_size(self):
+        return self.size
+
+
+@pytest.fixture
+def manager():
+    return ConnectionPoolManager()
+
+
+@pytest.fixture
+def pg(manager):
+    adapter = PostgresAdapter("postgresql://test/test", min_size=1, max_size=4)
+    adapter.attach_pool_metrics(
+        manager.instrument("postgres", PoolType.POSTGRES, PoolConfig(min_size=1, max_size=4))
+    )
+    adapter.pool = FakePool()
+    manager.register_pool("postgres", adapter.pool, resize=adapter.resize_pool)
+    return adapter
+
+
+async def _use_connection(pg):
+    async with pg.acquire() as conn:
+        await conn.execute("SELECT 1")
+
+
+class TestCheckoutMetrics:
+
+    @pytest.mark.asyncio
+    async def test_acquire_is_timed_and_attributed_to_caller(self, pg, manager):
+        await _use_connection(pg)
+        metrics = manager.metrics["postgres"]
+        assert metrics.acquires == 1
+        assert metrics.in_use == 0 and metrics.waiting == 0
+        assert metrics.checkout_time.count == 1
+        assert list(metrics.callers) == [f"{__name__}:_use_connection"]
+
+    @pytest.mark.asyncio
+    async def test_explicit_caller_label(self, pg, manager):
+        async with pg.acquire(caller="reports"):
+            stats = await manager.get_pool_stats("postgres")
+            assert stats.active_count == 1
+            assert stats.saturation == 0.25
+        assert "reports" in manager.metrics["postgres"].callers
+
+    @pytest.mark.asyncio
+    async def test_transaction_holds_checkout_until_commit(self, pg, manager):
+        await pg.begin_transaction("tx1")
+        assert manager.metrics["postgres"].in_use == 1
+        await pg.commit_transaction("tx1")
+        assert manager.metrics["postgres"].in_use == 0
+
+    @pytest.mark.asyncio
+    async def test_resized_limit_queues_and_times_out(self, pg, manager):
+        pg.resize_pool(1)
+        pg.acquire_timeout = 0.05
+        async with pg.acquire():
+            with pytest.raises(asyncio.TimeoutError):
+                async with pg.acquire():
+                    pass
+        metrics = manager.metrics["postgres"]
+        assert metrics.timeouts == 1
+        assert metrics.waiting == 0
+        assert pg._limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_waiter_is_served_when_limit_grows(self, pg, manager):
+        pg.resize_pool(1)
+        async with pg.acquire():
+            waiter = asyncio.create_task(_use_connection(pg))
+            await asyncio.sleep(0.01)
+            assert manager.metrics["postgres"].waiting == 1
+            pg.resize_pool(2)
+            await asyncio.wait_for(waiter, 1)
+        assert manager.metrics["postgres"].acquires == 2
+
+
+class TestDriverPools:
+
+    def test_mongo_listener_tracks_checkouts(self, manager):
+        metrics = manager.instrument("mongodb", PoolType.MONGODB)
+        listener = PoolMetricsListener(metrics)
+        event = SimpleNamespace(address=("db", 27017), connection_id=1, reason="timeout")
+        listener.connection_created(event)
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+        assert metrics.in_use == 1 and metrics.acquires == 1
+        listener.connection_checked_in(event)
+        listener.connection_check_out_started(event)
+        listener.connection_check_out_failed(event)
+        assert metrics.in_use == 0 and metrics.timeouts == 1 and metrics.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_redis_pool_methods_are_wrapped(self, manager):
+        metrics = manager.instrument("redis", PoolType.REDIS)
+
+        class Pool:
+            async def get_connection(self, *args, **kwargs):
+                return self.make_connection()
+
+            async def release(self, conn):
+                pass
+
+            def make_connection(self):
+                return object()
+
+        pool = Pool()
+        RedisAdapter._instrument_pool(pool, metrics)
+        conn = await pool.get_connection()
+        await pool.release(conn)
+        assert metrics.acquires == 1 and metrics.created == 1 and metrics.in_use == 0
+        assert list(metrics.callers) == [f"{__name__}:test_redis_pool_methods_are_wrapped"]
+
+
+class TestAdaptiveSizing:
+
+    def _record_waits(self, metrics, wait_ms, n=20):
+        for _ in range(n):
+            metrics.acquire_wait.observe(wait_ms)
+
+    @pytest.mark.asyncio
+    async def test_grows_on_waits_and_shrinks_when_idle(self, manager):
+        metrics = manager.instrument("pool", PoolType.POSTGRES, PoolConfig(min_size=2, max_size=10))
+        sizes = []
+        manager.register_pool("pool", None, resize=sizes.append)
+        metrics.target_size = 6
+        controller = AdaptivePoolController(manager, grow_wait_ms=50, shrink_wait_ms=5, step=2)
+
+        self._record_waits(metrics, 200)
+        assert await controller.adjust() == {"pool": 8}
+
+        # Quiet window with low peak usage
+        assert await controller.adjust() == {"pool": 6}
+        await controller.adjust()
+        await controller.adjust()
+        assert await controller.adjust() == {}
+        assert sizes == [8, 6, 4, 2]
+
+    @pytest.mark.asyncio
+    async def test_stays_within_bounds_and_grows_on_timeouts(self, manager):
+        metrics = manager.instrument("pool", PoolType.POSTGRES, PoolConfig(min_size=2, max_size=10))
+        manager.register_pool("pool", None, resize=lambda size: None)
+        controller = AdaptivePoolController(manager, step=4)
+        metrics.target_size = 8
+        metrics.timeouts = 1
+        assert await controller.adjust() == {"pool": 10}
+        metrics.timeouts = 2
+        assert await controller.adjust() == {}
+
+
+class TestExposition:
+
+    @pytest.mark.asyncio
+    async def test_render_metrics(self, pg, manager):
+        await _use_connection(pg)
+        body = manager.render_metrics()
+        assert "# TYPE db_pool_acquire_wait_seconds histogram" in body
+        assert 'db_pool_acquire_wait_seconds_bucket{pool="postgres",le="+Inf"} 1' in body
+        assert 'db_pool_connections{pool="postgres",state="idle"} 4' in body
+        assert f'caller="{__name__}:_use_connection"' in body
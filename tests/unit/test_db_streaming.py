@@ -0,0 +1,146 @@
+"""Unit tests for the streaming cursor APIs"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.db.adapters.mongodb_adapter import MongoDBAdapter
+from core.db.adapters.postgres_adapter import PostgresAdapter
+from core.services.db_service import DBService
+
+
+class FakeCursor:
+    """Async-iterable cursor that remembers its prefetch"""
+
+    def __init__(self, rows, prefetch):
+        self.rows = rows
+        self.prefetch = prefetch
+
+    async def __aiter__(self):
+        for row in self.rows:
+            yield row
+
+
+class FakeConnection:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+        self.in_transaction = False
+
+    @asynccontextmanager
+    async def _tx(self):
+        self.in_transaction = True
+        yield
+        self.in_transaction = False
+
+    def transaction(self):
+        return self._tx()
+
+    def cursor(self, query, *args, prefetch=None):
+        assert self.in_transaction, "server-side cursors need a transaction"
+        cursor = FakeCursor(self.rows, prefetch)
+        self.cursors.append(cursor)
+        return cursor
+
+
+class FakeMongoCursor:
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.batch = None
+        self.sorted_by = None
+        self.closed = False
+
+    def batch_size(self, n):
+        self.batch = n
+        return self
+
+    def sort(self, spec):
+        self.sorted_by = spec
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield dict(doc)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.cursor = None
+
+    def find(self, filter, projection=None):
+        self.cursor = FakeMongoCursor(self.docs)
+        return self.cursor
+
+
+@pytest.fixture
+def pg():
+    adapter = PostgresAdapter("postgresql://test/test")
+    adapter.conn = FakeConnection([{"id": i} for i in range(5)])
+
+    @asynccontextmanager
+    async def acquire():
+        yield adapter.conn
+
+    adapter.acquire = acquire
+    return adapter
+
+
+@pytest.fixture
+def mongo():
+    adapter = MongoDBAdapter("mongodb://test", "test")
+    adapter.coll = FakeCollection([{"_id": 1, "n": "a"}, {"_id": 2, "n": "b"}])
+    adapter.client = object()
+    adapter.db = {"events": adapter.coll}
+    return adapter
+
+
+class TestPostgresStream:
+
+    @pytest.mark.asyncio
+    async def test_iterates_server_side_cursor_with_prefetch(self, pg):
+        rows = [row async for row in pg.stream("SELECT id FROM t", prefetch=2)]
+
+        assert [r["id"] for r in rows] == [0, 1, 2, 3, 4]
+        assert pg.conn.cursors[0].prefetch == 2
+        assert not pg.conn.in_transaction
+
+    @pytest.mark.asyncio
+    async def test_uses_pinned_transaction(self, pg):
+        pinned = FakeConnection([{"id": 9}])
+        pinned.in_transaction = True
+        pg._transaction_sessions["tx"] = pinned
+
+        rows = [row async for row in pg.stream("SELECT 1", transaction_id="tx")]
+
+        assert rows == [{"id": 9}]
+        assert pg.conn.cursors == []
+
+
+class TestMongoStream:
+
+    @pytest.mark.asyncio
+    async def test_streams_in_batches_and_closes(self, mongo):
+        docs = [d async for d in mongo.stream("events", {}, sort=[("n", 1)], batch_size=50)]
+
+        assert docs == [{"_id": "1", "n": "a"}, {"_id": "2", "n": "b"}]
+        assert mongo.coll.cursor.batch == 50
+        assert mongo.coll.cursor.sorted_by == [("n", 1)]
+        assert mongo.coll.cursor.closed
+
+
+@pytest.mark.asyncio
+async def test_db_service_exposes_streams(pg, mongo):
+    db = DBService(postgres=pg, mongodb=mongo, redis=object())
+
+    records = [r async for r in db.stream_records("SELECT id FROM t", prefetch=3)]
+    docs = [d async for d in db.stream_documents("events")]
+
+    assert len(records) == 5 and pg.conn.cursors[0].prefetch == 3
+    assert [d["n"] for d in docs] == ["a", "b"]
@@ -0,0 +1,110 @@
+"""Unit tests for the tiered HybridCache"""
+
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from core.utils.cache import HybridCache, MemoryLRU, _MISSING
+
+
+@pytest.fixture
+def memory_cache():
+    return HybridCache(max_bytes=1000, max_entries=100, max_item_bytes=500, s3_enabled=False)
+
+
+@pytest.fixture
+def s3_cache():
+    cache = HybridCache(max_bytes=10_000, max_entries=100, max_item_bytes=5000, s3_enabled=False,
+                        flush_interval=60, flush_batch_size=100)
+    cache.s3 = MagicMock()
+    cache.s3.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+    return cache
+
+
+class TestMemoryLRU:
+
+    def test_byte_budget_evicts_least_recent(self):
+        lru = MemoryLRU(max_bytes=250, max_entries=100, max_item_bytes=250)
+        lru.set("a", b"x" * 100, 60)
+        lru.set("b", b"x" * 100, 60)
+        lru.get("a")
+        lru.set("c", b"x" * 100, 60)
+
+        assert lru.get("a") is not _MISSING
+        assert lru.get("b") is _MISSING
+        assert lru.bytes == 200
+        assert lru.evictions == 1
+
+    def test_oversized_item_not_cached(self):
+        lru = MemoryLRU(max_bytes=1000, max_entries=100, max_item_bytes=10)
+        assert lru.set("big", b"x" * 11, 60) is False
+        assert lru.bytes == 0
+
+    def test_wheel_sweeps_expired_entries(self, monkeypatch):
+        now = time.monotonic()
+        monkeypatch.setattr("core.utils.cache.time.monotonic", lambda: now)
+        lru = MemoryLRU(max_bytes=1000, max_entries=100, max_item_bytes=1000)
+        lru.set("short", "v", 1)
+        lru.set("long", "v", 100)
+
+        monkeypatch.setattr("core.utils.cache.time.monotonic", lambda: now + 5)
+        lru.get("long")
+
+        assert lru.size == 1
+        assert lru.expirations == 1
+
+
+class TestHybridCache:
+
+    @pytest.mark.asyncio
+    async def test_hit_and_miss_stats(self, memory_cache):
+        await memory_cache.set("k", {"a": 1})
+
+        assert await memory_cache.get("k") == {"a": 1}
+        assert await memory_cache.get("missing") is None
+
+        stats = memory_cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_set_none_invalidates(self, memory_cache):
+        await memory_cache.set("k", "v")
+        await memory_cache.set("k", None, 1)
+        assert await memory_cache.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_write_behind_coalesces(self, s3_cache):
+        await s3_cache.set("k", {"v": 1})
+        await s3_cache.set("k", {"v": 2})
+        assert s3_cache.s3.put_object.call_count == 0
+
+        assert await s3_cache.flush() == 1
+        await s3_cache.close()
+
+        body = json.loads(s3_cache.s3.put_object.call_args.kwargs["Body"])
+        assert body["value"] == {"v": 2}
+
+    @pytest.mark.asyncio
+    async def test_bytes_stay_in_memory(self, s3_cache):
+        await s3_cache.set("file", b"\x00\x01")
+        await s3_cache.flush()
+        await s3_cache.close()
+
+        assert await s3_cache.get("file") == b"\x00\x01"
+        s3_cache.s3.put_object.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_s3_read_through(self, s3_cache):
+        envelope = json.dumps({"expires_at": time.time() + 60, "value": {"v": 1}}).encode()
+        s3_cache.s3.get_object.side_effect = None
+        s3_cache.s3.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=envelope))}
+
+        assert await s3_cache.get("remote") == {"v": 1}
+        assert s3_cache.stats()["s3_hits"] == 1
+        # Second read is served from memory
+        assert await s3_cache.get("remote") == {"v": 1}
+        assert s3_cache.s3.get_object.call_count == 1
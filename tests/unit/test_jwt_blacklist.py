@@ -2,6 +2,8 @@
 
 import pytest
 import asyncio
+import json
+import time
 from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime, timedelta
 
@@ -274,3 +276,101 @@ class TestJWTProviderWithBlacklist:
         
         assert payload is not None
         assert payload["user_id"] == 123
+
+
+class TestRevocationFilter:
+    """Test the local counting Bloom filter of revoked JTIs"""
+    
+    def test_added_jti_is_reported(self):
+        from core.services.auth.revocation_filter import RevocationFilter
+        
+        revoked = RevocationFilter(capacity=1000)
+        revoked.add("jti-1", time.time() + 60)
+        
+        assert revoked.might_contain("jti-1") is True
+        assert revoked.might_contain("jti-2") is False
+    
+    def test_entry_evicted_at_token_exp(self):
+        from core.services.auth.revocation_filter import RevocationFilter
+        
+        revoked = RevocationFilter(capacity=1000)
+        revoked.add("jti-1", time.time() + 60)
+        
+        assert revoked.evict_expired(time.time() + 61) == 1
+        assert revoked.might_contain("jti-1") is False
+    
+    def test_duplicate_adds_stay_balanced(self):
+        from core.services.auth.revocation_filter import RevocationFilter
+        
+        revoked = RevocationFilter(capacity=1000)
+        exp = time.time() + 60
+        revoked.add("jti-1", exp)
+        revoked.add("jti-1", exp + 30)
+        
+        revoked.evict_expired(exp + 1)
+        assert revoked.might_contain("jti-1") is True
+        revoked.evict_expired(exp + 31)
+        assert revoked.might_contain("jti-1") is False
+
+
+class TestBlacklistFilterSync:
+    """Test filter-first blacklist checks and pub/sub event handling"""
+    
+    @pytest.fixture
+    def service(self):
+        service = JWTBlacklistService(redis_url="redis://test:6379")
+        service.redis_client = AsyncMock()
+        return service
+    
+    @pytest.mark.asyncio
+    async def test_filter_negative_skips_redis(self, service):
+        service.filter_ready = True
+        
+        assert await service.is_jti_blacklisted("never-revoked") is False
+        service.redis_client.get.assert_not_called()
+        assert service.stats["filter_negative"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_unsynced_filter_falls_through_to_redis(self, service):
+        service.redis_client.get.return_value = '{"jti": "x"}'
+        
+        assert await service.is_jti_blacklisted("x") is True
+        service.redis_client.get.assert_called_once_with("jwt:blacklist:x")
+    
+    @pytest.mark.asyncio
+    async def test_revocation_event_populates_filter(self, service):
+        service.filter_ready = True
+        service.redis_client.get.return_value = '{"jti": "remote"}'
+        
+        service._handle_event(json.dumps({"type": "jti", "jti": "remote", "exp": time.time() + 60}))
+        
+        assert await service.is_jti_blacklisted("remote") is True
+    
+    @pytest.mark.asyncio
+    async def test_add_to_blacklist_publishes_event(self, service, jwt_provider):
+        token = jwt_provider.create({"user_id": 123, "role": "user"})
+        service.jwt_provider = jwt_provider
+        
+        assert await service.add_to_blacklist(token) is True
+        
+        channel, message = service.redis_client.publish.call_args[0]
+        assert channel == service.EVENTS_CHANNEL
+        assert json.loads(message)["type"] == "jti"
+    
+    @pytest.mark.asyncio
+    async def test_user_changes_invalidate_every_worker(self, service):
+        from core.services.auth import user_service
+        from core.services.auth.user_service import UserService
+        
+        repo = Mock()
+        repo.update_user = AsyncMock(return_value=True)
+        repo.delete_user = AsyncMock(return_value=True)
+        users = UserService(repo)
+        
+        with patch.object(user_service, "get_blacklist_service", return_value=service):
+            await users.update_user(7, {"email": "a@b.c"})
+            await users.change_role(7, "admin")
+            await users.delete_user(7)
+        
+        events = [json.loads(call.args[1]) for call in service.redis_client.publish.call_args_list]
+        assert events == [{"type": "user", "user_id": 7}] * 3
@@ -0,0 +1,73 @@
+"""Unit tests for the compiled permission decision table"""
+
+import itertools
+
+import pytest
+
+from core.services.auth.permissions import Permission, PermissionRegistry, Role
+
+
+@pytest.fixture
+def registry():
+    return PermissionRegistry()
+
+
+def _legacy_check(registry, role_ids, resource, action, context):
+    permissions = registry._collect_permissions(role_ids)
+    return any(p.matches(resource, action, context) for p in permissions)
+
+
+class TestCompiledPermissions:
+
+    def test_matches_linear_scan_for_core_roles(self, registry):
+        roles = sorted(registry._roles)
+        pairs = {(p.resource, p.action) for r in registry._roles.values() for p in r.permissions}
+        pairs |= {("unknown", "read"), ("courses", "view"), ("user", "delete")}
+        contexts = [
+            {"user_id": 1, "owner_id": 1},
+            {"user_id": 1, "owner_id": 2},
+        ]
+
+        for role_ids in [[r] for r in roles] + [list(c) for c in itertools.combinations(roles, 2)]:
+            for resource, action in pairs:
+                for context in contexts:
+                    assert registry.check_permission(role_ids, resource, action, dict(context)) == \
+                        _legacy_check(registry, role_ids, resource, action, dict(context))
+
+    def test_wildcard_role(self, registry):
+        assert registry.check_permission(["super_admin"], "anything", "delete", {}) is True
+
+    def test_org_scope(self, registry):
+        registry.register_role(Role(
+            id="org_viewer", name="Org Viewer", description="",
+            permissions=[Permission("report", "read", "org:42")],
+        ))
+
+        assert registry.check_permission(["org_viewer"], "report", "read", {"user_orgs": ["42"]}) is True
+        assert registry.check_permission(["org_viewer"], "report", "read", {"user_orgs": ["7"]}) is False
+
+    def test_compile_is_memoized_per_role_set(self, registry):
+        assert registry.compile(["user", "student"]) is registry.compile(["student", "user"])
+
+    def test_register_role_invalidates_tables(self, registry):
+        registry.register_role(Role(
+            id="reviewer", name="Reviewer", description="",
+            permissions=[Permission("review", "read", "*")],
+        ))
+        registry.register_role(Role(
+            id="lead_reviewer", name="Lead Reviewer", description="",
+            permissions=[Permission("review", "approve", "*")],
+            inherits_from=["reviewer"],
+        ))
+        before = registry.compile(["lead_reviewer"])
+        assert before.allows("review", "read", {}) is True
+
+        registry.register_role(Role(
+            id="reviewer", name="Reviewer", description="",
+            permissions=[Permission("review", "comment", "*")],
+        ))
+
+        after = registry.compile(["lead_reviewer"])
+        assert after is not before
+        assert after.allows("review", "read", {}) is False
+        assert after.allows("review", "comment", {}) is True
@@ -0,0 +1,118 @@
+"""Unit tests for the PostgresAdapter bulk APIs"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.db.adapters.postgres_adapter import PostgresAdapter
+
+
+class FakeConnection:
+    """Records statements; one per round trip"""
+
+    def __init__(self):
+        self.calls = []
+        self.transactions = 0
+
+    @asynccontextmanager
+    async def _tx(self):
+        self.transactions += 1
+        self.calls.append(("BEGIN",))
+        yield
+        self.calls.append(("COMMIT",))
+
+    def transaction(self):
+        return self._tx()
+
+    async def copy_records_to_table(self, table, records, columns, schema_name=None):
+        self.calls.append(("COPY", schema_name, table, tuple(columns), list(records)))
+
+    async def executemany(self, query, records):
+        self.calls.append(("EXECUTEMANY", query, list(records)))
+
+    async def execute(self, query, *args):
+        self.calls.append(("EXECUTE", query, args))
+        return f"{query.split()[0]} {len(args[-1])}"
+
+    async def fetch(self, query, *args):
+        return [{"attname": "id", "type": "integer"}, {"attname": "price", "type": "numeric(10,2)"}]
+
+
+@pytest.fixture
+def pg():
+    adapter = PostgresAdapter("postgresql://test/test")
+    adapter.conn = FakeConnection()
+
+    @asynccontextmanager
+    async def acquire():
+        yield adapter.conn
+
+    adapter.acquire = acquire
+    return adapter
+
+
+def _round_trips(conn, kind):
+    return [c for c in conn.calls if c[0] == kind]
+
+
+class TestBulk:
+
+    @pytest.mark.asyncio
+    async def test_insert_many_copies_in_batches_in_one_transaction(self, pg):
+        rows = [{"id": i, "name": f"n{i}"} for i in range(5)]
+
+        assert await pg.insert_many("app.items", rows, batch_size=2) == 5
+
+        copies = _round_trips(pg.conn, "COPY")
+        assert [len(c[4]) for c in copies] == [2, 2, 1]
+        assert copies[0][1:4] == ("app", "items", ("id", "name"))
+        assert pg.conn.transactions == 1
+
+    @pytest.mark.asyncio
+    async def test_upsert_many_builds_on_conflict(self, pg):
+        await pg.upsert_many("items", [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}])
+        await pg.upsert_many("items", [{"id": 1, "name": "a"}], update_columns=[])
+
+        first, second = _round_trips(pg.conn, "EXECUTEMANY")
+        assert first[1].endswith("ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name")
+        assert first[2] == [(1, "a"), (2, "b")]
+        assert second[1].endswith("DO NOTHING")
+
+    @pytest.mark.asyncio
+    async def test_update_many_sends_typed_arrays(self, pg):
+        rows = [{"price": 5, "id": 1}, {"price": 7, "id": 2}, {"price": 9, "id": 3}]
+
+        assert await pg.update_many("items", rows, batch_size=2) == 3
+
+        updates = _round_trips(pg.conn, "EXECUTE")
+        assert "unnest($1::integer[], $2::numeric(10,2)[]) AS v(id, price)" in updates[0][1]
+        assert updates[0][2] == ([1, 2], [5, 7])
+        assert updates[1][2] == ([3], [9])
+
+    @pytest.mark.asyncio
+    async def test_update_many_rejects_unknown_columns(self, pg):
+        with pytest.raises(ValueError):
+            await pg.update_many("items", [{"id": 1, "colour": "red"}])
+
+    @pytest.mark.asyncio
+    async def test_delete_where_in_batches_any(self, pg):
+        assert await pg.delete_where_in("items", "id", range(5), batch_size=3) == 5
+
+        deletes = _round_trips(pg.conn, "EXECUTE")
+        assert deletes[0][1] == "DELETE FROM items WHERE id = ANY($1)"
+        assert [d[2][0] for d in deletes] == [[0, 1, 2], [3, 4]]
+
+    @pytest.mark.asyncio
+    async def test_joins_pinned_transaction(self, pg):
+        pg._transaction_sessions["tx"] = pg.conn
+
+        await pg.insert_many("items", [{"id": 1}], transaction_id="tx")
+
+        assert pg.conn.transactions == 0
+        assert _round_trips(pg.conn, "COPY")
+
+    @pytest.mark.asyncio
+    async def test_empty_input_is_a_no_op(self, pg):
+        assert await pg.insert_many("items", []) == 0
+        assert await pg.delete_where_in("items", "id", []) == 0
+        assert pg.conn.calls == []
@@ -0,0 +1,101 @@
+"""Unit tests for PostgresAdapter SQL memoization and record fetches"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.db.adapters import postgres_adapter
+from core.db.adapters.postgres_adapter import PostgresAdapter
+from core.db.config import DatabaseConfig
+from core.db.repositories.user_repository import UserRepository
+
+
+class Record(tuple):
+    """Stands in for asyncpg.Record: tuple storage with mapping lookups"""
+
+    def __new__(cls, mapping):
+        obj = super().__new__(cls, mapping.values())
+        obj._keys = list(mapping)
+        return obj
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._keys.index(key))
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self._keys else default
+
+    def keys(self):
+        return iter(self._keys)
+
+
+class FakeConnection:
+
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    async def fetchrow(self, query, *args):
+        self.queries.append(query)
+        return self.row
+
+    async def fetchval(self, query, *args):
+        self.queries.append(query)
+        return 1
+
+
+@pytest.fixture
+def pg():
+    adapter = PostgresAdapter("postgresql://test/test")
+    adapter.conn = FakeConnection(Record({
+        "id": 7, "email": "a@b.c", "role": "user", "created_at": None, "updated_at": None,
+    }))
+
+    @asynccontextmanager
+    async def acquire(caller=None):
+        yield adapter.conn
+
+    adapter.acquire = acquire
+    return adapter
+
+
+def test_generated_sql_is_memoized():
+    postgres_adapter.insert_sql.cache_clear()
+
+    first = postgres_adapter.insert_sql("users", ("email", "role"))
+    again = postgres_adapter.insert_sql("users", ("email", "role"))
+
+    assert first == "INSERT INTO users (email, role) VALUES ($1, $2) RETURNING id"
+    assert again is first
+    assert postgres_adapter.insert_sql.cache_info().hits == 1
+    assert postgres_adapter.update_sql("users", ("role",), ("id",)) == "UPDATE users SET role = $1 WHERE id = $2"
+    assert postgres_adapter.delete_sql("users", ("id", "org")) == "DELETE FROM users WHERE id = $1 AND org = $2"
+
+
+def test_pool_config_carries_statement_cache(monkeypatch):
+    monkeypatch.setenv("DB_HOST", "localhost")
+    monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "64")
+
+    pool_config = DatabaseConfig().get_pool_config()
+
+    assert pool_config["statement_cache_size"] == 64
+    assert "max_cached_statement_lifetime" in pool_config
+
+
+@pytest.mark.asyncio
+async def test_insert_reuses_identical_sql(pg):
+    await pg.insert("users", {"email": "x", "role": "user"})
+    await pg.insert("users", {"email": "y", "role": "admin"})
+
+    assert pg.conn.queries[0] is pg.conn.queries[1]
+
+
+@pytest.mark.asyncio
+async def test_repository_reads_record_without_dict_copy(pg):
+    repo = UserRepository(pg)
+
+    user = await repo.get_user_by_id(7)
+
+    assert user.id == 7 and user.email == "a@b.c"
+    assert pg.conn.queries == ["SELECT * FROM users WHERE id = $1"]
@@ -0,0 +1,227 @@
+"""Unit tests for query fingerprinting, slow-query capture and traffic-based index advice"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.db.adapters.postgres_adapter import PostgresAdapter
+from core.db.optimization import query_registry as registry_module
+from core.db.optimization.index_manager import IndexManager
+from core.db.optimization.performance_monitor import PerformanceMonitor
+from core.db.optimization.query_analyzer import QueryAnalyzer
+from core.db.optimization.query_registry import QueryRegistry, filter_columns, fingerprint
+
+PLAN = [{
+    "Plan": {
+        "Node Type": "Seq Scan",
+        "Relation Name": "orders",
+        "Actual Rows": 3,
+        "Actual Loops": 1,
+        "Rows Removed by Filter": 997,
+        "Shared Hit Blocks": 10,
+        "Shared Read Blocks": 2,
+    },
+    "Execution Time": 12.5,
+}]
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        self.queries.append(query)
+        return [{"id": 1}, {"id": 2}]
+
+    async def execute(self, query, *args):
+        self.queries.append(query)
+        if "broken" in query:
+            raise RuntimeError("syntax error")
+        return "UPDATE 3"
+
+    async def fetchval(self, query, *args):
+        self.queries.append(query)
+        return json.dumps(PLAN)
+
+
+@pytest.fixture
+def registry():
+    return QueryRegistry(slow_query_ms=float("inf"), explain_sample_rate=0)
+
+
+@pytest.fixture
+def pg(registry):
+    adapter = PostgresAdapter("postgresql://app@db/shop")
+    adapter.query_registry = registry
+    adapter.conn = FakeConnection()
+
+    @asynccontextmanager
+    async def acquire(caller=None):
+        yield adapter.conn
+
+    adapter.acquire = acquire
+    return adapter
+
+
+async def _list_orders(pg, customer_id):
+    return await pg.fetch_many("SELECT * FROM orders WHERE customer_id = $1", customer_id)
+
+
+class TestFingerprint:
+
+    def test_literals_and_params_collapse(self):
+        assert fingerprint("SELECT * FROM users WHERE id = $1") == "select * from users where id = ?"
+        assert fingerprint("select *\n  from users where id = 42;") == "select * from users where id = ?"
+        assert fingerprint("SELECT * FROM t WHERE name = 'O''Brien' -- note") == "select * from t where name = ?"
+        assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3)") == "select * from t where id in (...)"
+        assert fingerprint("INSERT INTO t (a) VALUES ($1), ($2), ($3)") == "insert into t (a) values (?), ..."
+        assert fingerprint("SELECT col2 FROM t1") == "select col2 from t1"
+
+    def test_filter_columns_orders_equality_before_range(self):
+        fp = fingerprint("SELECT * FROM public.orders WHERE created_at > $2 AND customer_id = $1 ORDER BY id")
+        assert filter_columns(fp) == ("orders", ("customer_id", "created_at"))
+        assert filter_columns(fingerprint("SELECT * FROM a JOIN b ON a.id = b.a_id WHERE b.x = 1")) == (None, ())
+        assert filter_columns(fingerprint("SELECT count(*) FROM orders")) == (None, ())
+
+
+class TestAdapterInstrumentation:
+
+    @pytest.mark.asyncio
+    async def test_calls_rows_and_callers_are_recorded(self, pg, registry):
+        await _list_orders(pg, 1)
+        await _list_orders(pg, 2)
+        assert await pg.update("orders", {"status": "paid"}, {"id": 5}) == 3
+
+        stats = registry.queries["select * from orders where customer_id = ?"]
+        assert stats.calls == 2 and stats.rows == 4
+        assert stats.callers == {f"{__name__}:_list_orders": 2}
+        assert stats.latency.count == 2
+        assert registry.queries["update orders set status = ? where id = ?"].rows == 3
+        assert registry.top(1, by="calls") == [stats]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_counted_and_reraised(self, pg, registry):
+        with pytest.raises(RuntimeError):
+            await pg.execute("UPDATE broken SET x = 1")
+        assert registry.queries["update broken set x = ?"].errors == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_registry_skips_recording(self, pg, registry):
+        pg.query_registry = None
+        await _list_orders(pg, 1)
+        assert registry.queries == {}
+
+    @pytest.mark.asyncio
+    async def test_slow_reads_are_logged_and_explained(self, pg, registry):
+        registry.slow_query_ms = 0
+        registry.explain_sample_rate = 1.0
+        await _list_orders(pg, 1)
+        await asyncio.gather(*registry._explains)
+
+        stats = registry.queries["select * from orders where customer_id = ?"]
+        assert stats.plan.seq_scans == ["orders"]
+        assert stats.plan.execution_ms == 12.5
+        assert pg.conn.queries[-1].startswith("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT")
+
+        slow = registry.slow_queries[-1]
+        assert (slow.database, slow.user) == ("shop", "app")
+        assert slow.caller == f"{__name__}:_list_orders"
+        assert slow.plan == PLAN[0]
+
+        # Within the interval, and never for writes
+        await _list_orders(pg, 2)
+        await pg.execute("DELETE FROM orders WHERE id = $1", 1)
+        assert not registry._explains
+        assert len(registry.slow_queries) == 3
+
+    @pytest.mark.asyncio
+    async def test_locking_reads_are_not_explained(self, pg, registry):
+        registry.slow_query_ms = 0
+        registry.explain_sample_rate = 1.0
+        for lock in ("FOR SHARE", "FOR NO KEY UPDATE", "FOR KEY SHARE", "FOR UPDATE"):
+            await pg.fetch_many(f"SELECT * FROM orders WHERE id = $1 {lock}", 1)
+        assert not registry._explains
+
+    @pytest.mark.asyncio
+    async def test_function_calls_get_plain_explain(self, pg, registry):
+        registry.slow_query_ms = 0
+        registry.explain_sample_rate = 1.0
+        await pg.fetch_many("SELECT nextval('order_ids')")
+        await asyncio.gather(*registry._explains)
+
+        assert pg.conn.queries[-1] == "EXPLAIN (FORMAT JSON) SELECT nextval('order_ids')"
+        assert registry.queries["select nextval(?)"].plan.analyzed is False
+
+        await pg.fetch_many("SELECT count(*) FROM orders WHERE id IN ($1, $2)", 1, 2)
+        await asyncio.gather(*registry._explains)
+        assert pg.conn.queries[-1].startswith("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT count(*)")
+
+    def test_fingerprints_beyond_cap_share_other(self):
+        registry = QueryRegistry(slow_query_ms=float("inf"), max_queries=2)
+        for table in ("a", "b", "c", "d"):
+            registry.record(f"SELECT * FROM {table}", 1.0, 0, "test")
+        assert list(registry.queries) == ["select * from a", "select * from b", "other"]
+        assert registry.queries["other"].calls == 2
+
+
+class TestTrafficAdvice:
+
+    def _traffic(self, registry):
+        for _ in range(12):
+            registry.record("SELECT * FROM orders WHERE customer_id = $1", 5.0, 2, "test")
+            registry.record("SELECT * FROM users WHERE id = $1", 1.0, 1, "test")
+        registry.record("SELECT * FROM audit WHERE actor = $1", 900.0, 1, "test")
+
+    def test_index_candidates(self, registry):
+        self._traffic(registry)
+        candidates = registry.index_candidates(min_calls=10)
+        assert [(c.table, c.columns, c.calls) for c in candidates] == [
+            ("orders", ["customer_id"], 12),
+            ("users", ["id"], 12),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_index_manager_skips_covered_columns(self, registry):
+        self._traffic(registry)
+
+        class Postgres:
+            async def fetch_many(self, query, table):
+                if table == "users":
+                    return [{"name": "users_pkey", "definition": "CREATE UNIQUE INDEX users_pkey ON public.users USING btree (id)"}]
+                return []
+
+        recommendations = await IndexManager(Postgres(), registry)._traffic_recommendations()
+        assert [(r["table"], r["columns"]) for r in recommendations] == [("orders", ["customer_id"])]
+        assert recommendations[0]["estimated_queries"] == 12
+
+    def test_query_analyzer_reads_registry(self, registry):
+        self._traffic(registry)
+        registry.queries["select * from orders where customer_id = ?"].plan = (
+            registry_module.QueryPlan.from_explain(PLAN[0])
+        )
+        analyzer = QueryAnalyzer(None, registry)
+
+        metrics = analyzer.analyze_recent_queries(limit=1)
+        assert metrics[0].query == "select * from audit where actor = ?"
+        orders = analyzer.analyze_recent_queries(limit=2)[1]
+        assert orders.execution_time == 5.0
+        assert orders.rows_examined == 1000 * 12
+
+        recommendations = analyzer.get_traffic_index_recommendations()
+        assert recommendations[0].table == "orders"
+        assert recommendations[0].estimated_impact == "High"
+
+    @pytest.mark.asyncio
+    async def test_performance_monitor_reads_slow_log(self, monkeypatch):
+        registry = QueryRegistry(slow_query_ms=500, explain_sample_rate=0)
+        monkeypatch.setattr(registry_module, "_query_registry", registry)
+        registry.record("SELECT * FROM audit WHERE actor = $1", 1500.0, 1, "test")
+        registry.record("SELECT * FROM audit WHERE actor = $1", 600.0, 1, "test")
+
+        monitor = PerformanceMonitor(None)
+        slow = await monitor.monitor_slow_queries(duration_minutes=5)
+        assert [q.duration for q in slow] == [1.5]
+        assert monitor.get_top_queries()[0]["calls"] == 2
@@ -0,0 +1,109 @@
+"""Unit tests for GCRA rate limiting with Redis and the local token-bucket fallback"""
+
+import pytest
+
+from core.db.adapters.redis_adapter import RedisAdapter
+from core.middleware.rate_limit import (
+    LocalRateLimiter,
+    RateLimit,
+    SmartRateLimiter,
+    load_rules,
+)
+
+RULES = {
+    "/auth/login": {"requests": 3, "window": 60},
+    "/api/*": {"requests": 2, "window": 10, "roles": {"admin": {"requests": 100, "window": 10}, "system": None}},
+    "/api/reports/*": {"requests": 1, "window": 10},
+    "/auth/register": None,
+}
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    adapter = RedisAdapter("redis://test")
+    adapter.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return adapter
+
+
+class TestLocalRateLimiter:
+
+    def test_burst_then_refill(self):
+        local = LocalRateLimiter()
+        limit = RateLimit(3, 30)
+        assert [local.check("k", limit, now=0)[0] for _ in range(3)] == [True] * 3
+        assert local.check("k", limit, now=0) == (False, 10)
+        assert local.check("k", limit, now=5) == (False, 5)
+        assert local.check("k", limit, now=10) == (True, None)
+
+    def test_idle_keys_are_evicted_and_size_is_capped(self):
+        local = LocalRateLimiter(max_keys=2)
+        limit = RateLimit(1, 10)
+        local.check("a", limit, now=0)
+        local.check("b", limit, now=5)
+        local.check("c", limit, now=6)
+        assert list(local.buckets) == ["b", "c"]
+        local.check("d", limit, now=20)
+        assert list(local.buckets) == ["d"]
+
+
+class TestRules:
+
+    def test_defaults_merge_with_config_and_prefixes(self):
+        limiter = SmartRateLimiter(rules=load_rules(RULES))
+        assert limiter.rule_for("/auth/login").limit == RateLimit(3, 60)
+        assert limiter.rule_for("/auth/password-reset").limit == RateLimit(5, 3600)
+        assert limiter.rule_for("/auth/register") is None
+        assert limiter.rule_for("/api/reports/monthly").route == "/api/reports/*"
+        assert limiter.rule_for("/api/orders").route == "/api/*"
+        assert limiter.rule_for("/shop") is None
+
+    def test_role_overrides(self):
+        rule = SmartRateLimiter(rules=load_rules(RULES)).rule_for("/api/orders")
+        assert rule.limit_for(["customer"]) == RateLimit(2, 10)
+        assert rule.limit_for(["customer", "admin"]) == RateLimit(100, 10)
+        assert rule.limit_for(["admin", "system"]) is None
+
+    def test_rules_from_environment(self, monkeypatch):
+        monkeypatch.setenv("RATE_LIMITS", '{"/auth/login": {"requests": 50, "window": 60}}')
+        assert SmartRateLimiter().rule_for("/auth/login").limit == RateLimit(50, 60)
+
+
+class TestSmartRateLimiter:
+
+    @pytest.mark.asyncio
+    async def test_local_fallback_without_redis(self, monkeypatch):
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        limiter = SmartRateLimiter(rules=load_rules(RULES))
+        assert limiter.redis is None
+        results = [await limiter.check_rate_limit("ip", "/auth/login") for _ in range(4)]
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert results[-1][1] == 20
+        assert await limiter.check_rate_limit("ip", "/api/x", ["system"]) == (True, None)
+        assert await limiter.check_rate_limit("ip", "/shop") == (True, None)
+
+    @pytest.mark.asyncio
+    async def test_workers_share_limits_through_redis(self, fake_redis):
+        workers = [SmartRateLimiter(rules=load_rules(RULES), redis=fake_redis) for _ in range(2)]
+        results = [await workers[i % 2].check_rate_limit("ip", "/auth/login") for i in range(4)]
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert 19 <= results[-1][1] <= 20
+        assert workers[0].local.buckets == {}
+
+        # One arrival time per key, expiring once the key is back at full burst
+        ttl = await fake_redis.get_client().pttl("ratelimit:/auth/login:ip")
+        assert 0 < ttl <= 60_000
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_to_local(self):
+        class Broken:
+            async def evalsha(self, *args):
+                raise ConnectionError("redis down")
+
+        redis = RedisAdapter("redis://test")
+        redis.client = Broken()
+        limiter = SmartRateLimiter(rules=load_rules(RULES), redis=redis)
+        assert await limiter.check_rate_limit("ip", "/auth/login") == (True, None)
+        assert limiter._redis_retry_at > 0
+        assert list(limiter.local.buckets) == ["ratelimit:/auth/login:ip"]
@@ -0,0 +1,115 @@
+"""Unit tests for ReadReplicaRouter routing, lag cutoff, circuit breaking and read-your-writes"""
+
+import asyncio
+
+import pytest
+
+from core.db.config import DatabaseConfig
+from core.db.replication import read_replica_router
+from core.db.replication.read_replica_router import ReadReplicaRouter, ReplicaInfo, ReplicaType
+from core.services.auth.context import UserContext, current_user_context
+
+
+class FakeAdapter:
+
+    def __init__(self, name, fail=False, delay=0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+        self.write_listeners = []
+
+    async def fetch_one(self, query, *args):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionRefusedError("replica down")
+        return {"served_by": self.name}
+
+    async def disconnect(self):
+        pass
+
+
+def _replica(name, **kwargs):
+    return ReplicaInfo(
+        id=name, host=name, port=5432, database="db", username="u", password="p",
+        replica_type=ReplicaType.READ_ONLY, connection_pool=FakeAdapter(name, **kwargs),
+    )
+
+
+@pytest.fixture
+def router(monkeypatch):
+    primary = FakeAdapter("primary")
+    r = ReadReplicaRouter(DatabaseConfig(host="localhost"), primary_adapter=primary,
+                          read_your_writes_ms=200, failure_threshold=2, circuit_cooldown=60)
+    monkeypatch.setattr(r, "_health_check_loop", lambda: asyncio.sleep(0))
+    return r
+
+
+async def _served_by(router):
+    return (await router.fetch_one("SELECT 1"))["served_by"]
+
+
+class TestSelection:
+
+    @pytest.mark.asyncio
+    async def test_least_outstanding_spreads_concurrent_reads(self, router):
+        router.add_replica(_replica("a", delay=0.02))
+        router.add_replica(_replica("b", delay=0.02))
+        await router.initialize()
+
+        served = await asyncio.gather(*(_served_by(router) for _ in range(10)))
+
+        assert sorted(served) == ["a"] * 5 + ["b"] * 5
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_is_skipped(self, router):
+        lagging, fresh = _replica("lagging"), _replica("fresh")
+        lagging.lag_seconds = router.max_lag_seconds + 1
+        router.add_replica(lagging)
+        router.add_replica(fresh)
+        await router.initialize()
+
+        assert {await _served_by(router) for _ in range(5)} == {"fresh"}
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_after_failures_and_reads_fall_back(self, router):
+        down = _replica("down", fail=True)
+        router.add_replica(down)
+        await router.initialize()
+
+        served = [await _served_by(router) for _ in range(4)]
+
+        assert served == ["primary"] * 4
+        assert down.connection_pool.calls == 2
+        assert router.get_replica_stats()["replicas"][0]["circuit_open"]
+
+
+class TestReadYourWrites:
+
+    @pytest.mark.asyncio
+    async def test_writer_reads_from_primary_until_window_passes(self, router):
+        router.add_replica(_replica("a"))
+        await router.initialize()
+
+        async def request(user_id, write=False):
+            token = current_user_context.set(UserContext(user_id, "user", [], {}, "127.0.0.1"))
+            try:
+                if write:
+                    for listener in router.primary_adapter.write_listeners:
+                        listener()
+                return await _served_by(router)
+            finally:
+                current_user_context.reset(token)
+
+        # Separate tasks: like separate HTTP requests from the same user
+        assert await asyncio.create_task(request(1, write=True)) == "primary"
+        assert await asyncio.create_task(request(1)) == "primary"
+        assert await asyncio.create_task(request(2)) == "a"
+
+        await asyncio.sleep(0.25)
+        assert await asyncio.create_task(request(1)) == "a"
+
+
+def test_router_is_a_global_opt_in():
+    assert read_replica_router.get_read_router() is None
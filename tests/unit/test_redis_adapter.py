@@ -0,0 +1,109 @@
+"""Unit tests for RedisAdapter batching, pattern/tag invalidation, scripts and the shared pool"""
+
+import pytest
+
+from core.db.adapters import redis_adapter
+from core.db.adapters.redis_adapter import RedisAdapter, RedisScript, get_redis_adapter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def adapter():
+    adapter = RedisAdapter("redis://test")
+    adapter.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return adapter
+
+
+class TestBatching:
+
+    @pytest.mark.asyncio
+    async def test_mset_with_ttl_and_mget(self, adapter):
+        await adapter.mset_with_ttl({"a": "1", "b": "2"}, ttl_seconds=60)
+        assert await adapter.mget("a", "missing", "b") == ["1", None, "2"]
+        assert 0 < await adapter.ttl("a") <= 60
+        assert await adapter.mget() == []
+
+    @pytest.mark.asyncio
+    async def test_pipeline_flushes_queued_commands_on_exit(self, adapter):
+        async with adapter.pipeline() as pipe:
+            pipe.set("x", "1")
+            pipe.incr("counter")
+        assert await adapter.get("x") == "1"
+
+        async with adapter.transaction() as tx:
+            tx.incr("counter")
+            tx.incr("counter")
+            assert await tx.execute() == [2, 3]
+
+
+class TestInvalidation:
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern_scans_in_batches(self, adapter):
+        await adapter.mset_with_ttl({f"user:{i}": i for i in range(25)}, ttl_seconds=60)
+        await adapter.set("order:1", "keep")
+        assert await adapter.delete_pattern("user:*", batch_size=10) == 25
+        assert await adapter.exists("user:3") == 0
+        assert await adapter.get("order:1") == "keep"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags(self, adapter):
+        pytest.importorskip("lupa")
+        await adapter.mset_with_ttl({"p:1": "a", "p:2": "b", "other": "c"}, ttl_seconds=60)
+        await adapter.tag("products", "p:1", "p:2", ttl_seconds=60)
+        assert await adapter.invalidate_tags("products") == 2
+        assert await adapter.mget("p:1", "p:2", "other") == [None, None, "c"]
+        assert await adapter.exists("tag:products") == 0
+
+
+class TestScripts:
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_eval_then_uses_sha(self):
+        from redis.exceptions import NoScriptError
+
+        class Client:
+            def __init__(self):
+                self.loaded = set()
+                self.calls = []
+
+            async def evalsha(self, sha, numkeys, *keys_and_args):
+                self.calls.append("evalsha")
+                if sha not in self.loaded:
+                    raise NoScriptError("NOSCRIPT")
+                return list(keys_and_args)
+
+            async def eval(self, source, numkeys, *keys_and_args):
+                self.calls.append("eval")
+                self.loaded.add(script.sha)
+                return list(keys_and_args)
+
+        script = RedisScript("return {KEYS[1], ARGV[1]}")
+        client = Client()
+        assert await script(client, keys=["k"], args=[1]) == ["k", 1]
+        assert await script(client, keys=["k"], args=[2]) == ["k", 2]
+        assert client.calls == ["evalsha", "eval", "evalsha"]
+
+
+class TestSharedAdapter:
+
+    def test_one_adapter_and_pool_per_url(self, monkeypatch):
+        monkeypatch.setattr(redis_adapter, "_shared", {})
+        a = get_redis_adapter("redis://shared:6379")
+        assert get_redis_adapter("redis://shared:6379") is a
+        assert get_redis_adapter("redis://other:6379") is not a
+        assert a.get_client() is a.get_client()
+        assert a.pool_is_resizable
+        a.resize_pool(7)
+        assert a.client.connection_pool.max_connections == 7
+
+    def test_blocking_commands_get_their_own_pool(self, monkeypatch):
+        monkeypatch.setattr(redis_adapter, "_shared", {})
+        a = get_redis_adapter("redis://shared:6379")
+        blocking = a.blocking()
+        assert blocking is get_redis_adapter("redis://shared:6379", purpose="blocking")
+        assert blocking.blocking() is blocking
+        assert blocking.get_client().connection_pool is not a.get_client().connection_pool
+        assert blocking.max_connections == redis_adapter.REDIS_BLOCKING_POOL_MAX
+        assert blocking.pool_timeout == redis_adapter.REDIS_BLOCKING_POOL_TIMEOUT
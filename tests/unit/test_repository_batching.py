@@ -0,0 +1,358 @@
+"""Unit tests for repository multi-get, request coalescing and read-through caching"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from core.db.repositories import base_repository
+from core.db.repositories.base_repository import (
+    BaseRepository,
+    MongoRepository,
+    PostgresRepository,
+    batched_loads,
+    render_cache_metrics,
+)
+from core.db.adapters.redis_adapter import RedisAdapter
+
+
+class FakeRedis:
+
+    def __init__(self):
+        self.data = {}
+        self.mget_calls = 0
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def mget(self, *keys):
+        self.mget_calls += 1
+        return [self.data.get(key) for key in keys]
+
+    async def mset_with_ttl(self, mapping, ttl_seconds):
+        self.data.update(mapping)
+
+
+class ItemRepository(BaseRepository):
+
+    def __init__(self, rows, redis=None):
+        super().__init__(postgres=object(), redis=redis)
+        self.rows = rows
+        self.batches = []
+
+    def get_entity_name(self):
+        return "item"
+
+    def get_primary_key_field(self):
+        return "id"
+
+    def to_dict(self, entity):
+        return dict(entity)
+
+    def from_dict(self, data):
+        return dict(data)
+
+    async def _fetch_by_id(self, entity_id):
+        self.batches.append([entity_id])
+        return self.rows.get(entity_id)
+
+    async def _fetch_many_by_ids(self, entity_ids):
+        self.batches.append(list(entity_ids))
+        return {i: self.rows[i] for i in entity_ids if i in self.rows}
+
+    async def _fetch_list(self, limit, offset, filters, sort_by, sort_desc):
+        return []
+
+    async def _count(self, filters):
+        return 0
+
+
+ROWS = {i: {"id": i, "name": f"item-{i}"} for i in range(1, 6)}
+
+
+@pytest.fixture(autouse=True)
+def cache_state(monkeypatch):
+    monkeypatch.setattr(base_repository, "_cache_stats", {})
+    monkeypatch.setattr(base_repository, "_inflight", {})
+
+
+async def _drain_refreshes():
+    while base_repository._refresh_tasks:
+        await asyncio.gather(*base_repository._refresh_tasks)
+
+
+def _entry(value, fresh_for, delta=0.0):
+    return json.dumps({"_v": value, "_t": time.time() + fresh_for, "_d": delta})
+
+
+class TestGetManyByIds:
+
+    @pytest.mark.asyncio
+    async def test_fetches_misses_in_one_query_and_fills_cache(self):
+        redis = FakeRedis()
+        repo = ItemRepository(ROWS, redis=redis)
+
+        items = await repo.get_many_by_ids([3, 1, 99, 3])
+        assert [item and item["id"] for item in items] == [3, 1, None, 3]
+        assert repo.batches == [[3, 1, 99]]
+        assert set(redis.data) == {"item:id:3", "item:id:1"}
+        assert json.loads(redis.data["item:id:3"])["_v"] == ROWS[3]
+
+        items = await repo.get_many_by_ids([1, 2, 3])
+        assert [item["id"] for item in items] == [1, 2, 3]
+        assert repo.batches == [[3, 1, 99], [2]]
+        assert redis.mget_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_rows_are_decoded_for_get_by_id(self):
+        repo = ItemRepository(ROWS, redis=FakeRedis())
+        await repo.get_many_by_ids([1])
+        assert await repo.get_by_id(1) == ROWS[1]
+        assert repo.batches == [[1]]
+
+    @pytest.mark.asyncio
+    async def test_without_cache(self):
+        repo = ItemRepository(ROWS)
+        assert await repo.get_many_by_ids([]) == []
+        assert await repo.get_many_by_ids([2, 4], use_cache=False) == [ROWS[2], ROWS[4]]
+
+    @pytest.mark.asyncio
+    async def test_real_redis_adapter_round_trip(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = RedisAdapter("redis://test")
+        redis.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        repo = ItemRepository(ROWS, redis=redis)
+        await repo.get_many_by_ids([1, 2])
+        assert await repo.get_many_by_ids([2, 1]) == [ROWS[2], ROWS[1]]
+        assert repo.batches == [[1, 2]]
+
+
+class TestBatchedLoads:
+
+    @pytest.mark.asyncio
+    async def test_same_tick_lookups_share_one_query(self):
+        repo = ItemRepository(ROWS)
+        with batched_loads():
+            items = await asyncio.gather(
+                repo.get_by_id(1), repo.get_by_id(2), repo.get_by_id(1), repo.get_by_id(42)
+            )
+            assert [item and item["id"] for item in items] == [1, 2, 1, None]
+            assert repo.batches == [[1, 2, 42]]
+
+            # Later ticks get a fresh batch, not a memoized result
+            await repo.get_by_id(1)
+            assert repo.batches == [[1, 2, 42], [1]]
+
+    @pytest.mark.asyncio
+    async def test_outside_scope_uses_single_fetch(self):
+        repo = ItemRepository(ROWS)
+        await asyncio.gather(repo.get_by_id(1), repo.get_by_id(2))
+        assert repo.batches == [[1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        repo = ItemRepository(ROWS)
+
+        async def fail(entity_ids):
+            raise RuntimeError("db down")
+
+        repo._fetch_many_by_ids = fail
+        with batched_loads():
+            results = await asyncio.gather(
+                repo.get_by_id(1), repo.get_by_id(2), return_exceptions=True
+            )
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+
+class TestAdapterQueries:
+
+    @pytest.mark.asyncio
+    async def test_postgres_uses_any(self):
+        class Adapter:
+            async def fetch_records(self, query, *args):
+                self.call = (query, args)
+                return [{"id": i} for i in args[0] if i in ROWS]
+
+        class Repo(PostgresRepository):
+            get_entity_name = lambda self: "item"
+            get_primary_key_field = lambda self: "id"
+            get_table_name = lambda self: "items"
+            to_dict = from_dict = lambda self, data: dict(data)
+
+        adapter = Adapter()
+        rows = await Repo(adapter)._fetch_many_by_ids([1, 7])
+        assert adapter.call == ("SELECT * FROM items WHERE id = ANY($1)", ([1, 7],))
+        assert rows == {1: {"id": 1}}
+
+    @pytest.mark.asyncio
+    async def test_mongo_uses_in(self):
+        class Adapter:
+            async def find_many(self, collection, filter, limit=100):
+                self.call = (collection, filter, limit)
+                return [{"slug": "a"}]
+
+        class Repo(MongoRepository):
+            get_entity_name = lambda self: "page"
+            get_primary_key_field = lambda self: "slug"
+            get_collection_name = lambda self: "pages"
+            to_dict = from_dict = lambda self, data: dict(data)
+
+        adapter = Adapter()
+        rows = await Repo(adapter)._fetch_many_by_ids(["a", "b"])
+        assert adapter.call == ("pages", {"slug": {"$in": ["a", "b"]}}, 2)
+        assert rows == {"a": {"slug": "a"}}
+
+
+    @pytest.mark.asyncio
+    async def test_rows_are_keyed_by_the_requested_ids(self):
+        owner = UUID("12345678-1234-5678-1234-567812345678")
+        created = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+        class Adapter:
+            async def fetch_records(self, query, *args):
+                # asyncpg hands back UUID keys for str parameters
+                return [{"id": owner, "created_at": created}]
+
+            async def fetch_record(self, query, *args):
+                return None
+
+        class Repo(PostgresRepository):
+            get_entity_name = lambda self: "owner"
+            get_primary_key_field = lambda self: "id"
+            get_table_name = lambda self: "owners"
+            to_dict = from_dict = lambda self, data: dict(data)
+
+        redis = FakeRedis()
+        repo = Repo(Adapter(), redis=redis)
+        expected = {"id": owner, "created_at": created}
+        assert await repo.get_many_by_ids([str(owner), "missing"]) == [expected, None]
+        assert f"owner:id:{owner}" in redis.data
+        assert await repo.get_many_by_ids([str(owner), "missing"]) == [expected, None]
+        assert repo.cache_stats.hits == 1
+
+
+class TestReadThroughCache:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        repo = ItemRepository(ROWS, redis=FakeRedis())
+        fetch = repo._fetch_by_id
+
+        async def slow_fetch(entity_id):
+            await asyncio.sleep(0.01)
+            return await fetch(entity_id)
+
+        repo._fetch_by_id = slow_fetch
+        items = await asyncio.gather(*(repo.get_by_id(1) for _ in range(5)))
+        assert items == [ROWS[1]] * 5
+        assert repo.batches == [[1]]
+        assert repo.cache_stats.misses == 5
+        assert repo.cache_stats.coalesced == 4
+        assert base_repository._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_load_reaches_waiters_and_is_not_cached(self):
+        repo = ItemRepository(ROWS, redis=FakeRedis())
+
+        async def fail(entity_id):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("db down")
+
+        repo._fetch_by_id = fail
+        results = await asyncio.gather(repo.get_by_id(1), repo.get_by_id(1), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert repo.redis.data == {}
+        assert base_repository._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_and_refreshed_in_background(self):
+        redis = FakeRedis()
+        redis.data["item:id:1"] = _entry({"id": 1, "name": "old"}, fresh_for=-1)
+        repo = ItemRepository(ROWS, redis=redis)
+
+        assert (await repo.get_by_id(1))["name"] == "old"
+        assert repo.cache_stats.stale == 1
+        await _drain_refreshes()
+        assert repo.batches == [[1]]
+        assert json.loads(redis.data["item:id:1"])["_v"] == ROWS[1]
+        assert await repo.get_by_id(1) == ROWS[1]
+        assert repo.cache_stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_xfetch_refreshes_before_expiry(self, monkeypatch):
+        redis = FakeRedis()
+        redis.data["item:id:1"] = _entry(ROWS[1], fresh_for=1, delta=0.5)
+        redis.data["item:id:2"] = _entry(ROWS[2], fresh_for=1, delta=0.0)
+        repo = ItemRepository(ROWS, redis=redis)
+
+        monkeypatch.setattr(base_repository.random, "random", lambda: 0.999)
+        assert await repo.get_many_by_ids([1, 2]) == [ROWS[1], ROWS[2]]
+        assert repo.cache_stats.hits == 2
+        assert repo.cache_stats.early_refreshes == 1
+        await _drain_refreshes()
+        assert repo.batches == [[1]]
+
+    @pytest.mark.asyncio
+    async def test_hits_return_the_same_types_as_the_database(self):
+        row = {
+            "id": 1,
+            "created_at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "owner": UUID("12345678-1234-5678-1234-567812345678"),
+            "price": Decimal("19.99"),
+            "meta": {"tags": ["a"]},
+        }
+        redis = FakeRedis()
+        repo = ItemRepository({1: row}, redis=redis)
+
+        assert await repo.get_many_by_ids([1]) == [row]
+        assert "item:id:1" in redis.data
+        assert await repo.get_by_id(1) == row
+        assert repo.batches == [[1]]
+        assert repo.cache_stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_plain_values_from_set_cache_stay_readable(self):
+        repo = ItemRepository(ROWS, redis=FakeRedis())
+        await repo._set_cache("item:id:4", ROWS[4])
+        assert await repo.get_by_id(4) == ROWS[4]
+        assert repo.batches == []
+
+    @pytest.mark.asyncio
+    async def test_redis_lock_defers_to_other_process(self, monkeypatch):
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(base_repository, "CACHE_LOCK_MS", 200)
+        redis = RedisAdapter("redis://test")
+        redis.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        repo = ItemRepository(ROWS, redis=redis)
+        repo.cache_lock = True
+
+        # Another process holds the lock on item 1 and fills it shortly
+        await redis.set("lock:item:id:1", "1", px=200)
+
+        async def other_process():
+            await asyncio.sleep(0.06)
+            await redis.set("item:id:1", _entry({"id": 1, "name": "theirs"}, fresh_for=60))
+
+        filler = asyncio.ensure_future(other_process())
+        items = await repo.get_many_by_ids([1, 2])
+        await filler
+        assert [item["name"] for item in items] == ["theirs", "item-2"]
+        assert repo.batches == [[2]]
+        assert await redis.exists("lock:item:id:2") == 0
+
+    @pytest.mark.asyncio
+    async def test_render_cache_metrics(self):
+        repo = ItemRepository(ROWS, redis=FakeRedis())
+        await repo.get_by_id(1)
+        await repo.get_by_id(1)
+        body = render_cache_metrics()
+        assert "# TYPE repository_cache_requests_total counter" in body
+        assert 'repository_cache_requests_total{entity="item",result="hits"} 1' in body
+        assert 'repository_cache_requests_total{entity="item",result="misses"} 1' in body
@@ -0,0 +1,237 @@
+"""Unit tests for the raw ASGI security/auth middleware pass"""
+
+import json
+from urllib.parse import urlencode
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from core.middleware import security
+from core.middleware.asgi import BufferedBody, send_with_headers
+from core.middleware.auth_context import AuthContextMiddleware
+from core.middleware.security import SecurityMiddleware, classify_field, sanitize_value
+from core.services.auth.context import current_user_context
+
+
+async def echo_form(request):
+    form = await request.form()
+    return JSONResponse({
+        "sanitized": getattr(request.state, "sanitized_form", None),
+        "raw": dict(form),
+        "query": request.state.sanitized_query,
+    })
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(3):
+            yield f"chunk-{i};".encode()
+
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+async def whoami(request):
+    context = current_user_context.get()
+    context.set_cookie("seen", "1", httponly=True)
+    return PlainTextResponse(str(request.state.user))
+
+
+def build_app(**kwargs):
+    app = Starlette(routes=[
+        Route("/form", echo_form, methods=["POST"]),
+        Route("/stream", stream),
+        Route("/whoami", whoami),
+        Route("/auth/login", lambda request: PlainTextResponse("ok"), methods=["POST"]),
+    ])
+    return SecurityMiddleware(app, **kwargs)
+
+
+async def call(app, method, path, body=b"", headers=(), chunk_size=None, query=b"", scheme="http"):
+    chunk_size = chunk_size or max(len(body), 1)
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    incoming = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    reads = []
+
+    async def receive():
+        reads.append(1)
+        return incoming.pop(0) if incoming else {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(),
+        "query_string": query, "root_path": "", "scheme": scheme, "http_version": "1.1",
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return sent, len(reads)
+
+
+def _headers(sent):
+    return [(k.decode(), v.decode()) for k, v in sent[0]["headers"]]
+
+
+def _body(sent):
+    return b"".join(m.get("body", b"") for m in sent[1:])
+
+
+FORM_HEADERS = [("content-type", "application/x-www-form-urlencoded")]
+
+
+class TestAsgiHelpers:
+
+    @pytest.mark.asyncio
+    async def test_buffered_body_replays_and_continues_stream(self):
+        incoming = [
+            {"type": "http.request", "body": b"ab", "more_body": True},
+            {"type": "http.request", "body": b"cd", "more_body": True},
+            {"type": "http.request", "body": b"ef", "more_body": False},
+        ]
+
+        async def receive():
+            return incoming.pop(0)
+
+        body = BufferedBody(receive)
+        assert not await body.read(limit=3)
+        assert body.body == b"abcd"
+
+        replay = body.replay()
+        assert [(await replay())["body"] for _ in range(3)] == [b"ab", b"cd", b"ef"]
+
+    @pytest.mark.asyncio
+    async def test_send_with_headers_replaces_once(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        wrapped = send_with_headers(send, lambda: [(b"x-frame-options", b"DENY"), (b"set-cookie", b"b=2")])
+        await wrapped({
+            "type": "http.response.start", "status": 200,
+            "headers": [(b"X-Frame-Options", b"SAMEORIGIN"), (b"set-cookie", b"a=1")],
+        })
+        await wrapped({"type": "http.response.body", "body": b"x"})
+        assert sent[0]["headers"] == [
+            (b"set-cookie", b"a=1"), (b"x-frame-options", b"DENY"), (b"set-cookie", b"b=2"),
+        ]
+        assert sent[1] == {"type": "http.response.body", "body": b"x"}
+
+
+class TestSecurityMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_form_is_read_once_and_shared_with_handler(self):
+        body = urlencode({"name": "<b>bob</b>", "custom_css": "color: red", "title": "hi"}).encode()
+        sent, reads = await call(
+            build_app(), "POST", "/form", body, FORM_HEADERS, chunk_size=8, query=b"search=%3Cx%3E",
+        )
+        payload = json.loads(_body(sent))
+        assert payload["sanitized"] == {"name": "&lt;b&gt;bob&lt;/b&gt;", "custom_css": "color: red", "title": "hi"}
+        assert payload["raw"]["name"] == "<b>bob</b>"
+        assert payload["query"] == {"search": "&lt;x&gt;"}
+        assert reads == -(-len(body) // 8)
+
+        headers = _headers(sent)
+        assert ("x-frame-options", "DENY") in headers
+        assert not any(name == "strict-transport-security" for name, _ in headers)
+
+    @pytest.mark.asyncio
+    async def test_oversized_form_streams_through_unsanitized(self, monkeypatch):
+        monkeypatch.setattr(security, "FORM_MAX_BYTES", 10)
+        body = urlencode({"name": "x" * 64}).encode()
+        sent, _ = await call(build_app(), "POST", "/form", body, FORM_HEADERS, chunk_size=16)
+        payload = json.loads(_body(sent))
+        assert payload["sanitized"] is None
+        assert payload["raw"] == {"name": "x" * 64}
+
+    @pytest.mark.asyncio
+    async def test_non_form_bodies_are_not_buffered(self):
+        sent, reads = await call(build_app(), "POST", "/form", b'{"a": 1}', [("content-type", "application/json")])
+        payload = json.loads(_body(sent))
+        assert payload["sanitized"] == {}
+        assert reads == 0
+
+    @pytest.mark.asyncio
+    async def test_streaming_response_passes_through(self):
+        sent, _ = await call(build_app(), "GET", "/stream", scheme="https")
+        assert [m["type"] for m in sent] == ["http.response.start"] + ["http.response.body"] * 4
+        assert [m["body"] for m in sent[1:4]] == [b"chunk-0;", b"chunk-1;", b"chunk-2;"]
+        assert ("strict-transport-security", "max-age=31536000; includeSubDomains") in _headers(sent)
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_auth_path_gets_429(self):
+        app = build_app()
+        for _ in range(10):
+            sent, _ = await call(app, "POST", "/auth/login", b"", FORM_HEADERS)
+            assert sent[0]["status"] == 200
+        sent, _ = await call(app, "POST", "/auth/login", b"", FORM_HEADERS)
+        assert sent[0]["status"] == 429
+        assert any(name == "retry-after" for name, _ in _headers(sent))
+
+    @pytest.mark.asyncio
+    async def test_static_paths_are_skipped(self):
+        async def app(scope, receive, send):
+            await PlainTextResponse("static")(scope, receive, send)
+
+        sent, _ = await call(SecurityMiddleware(app), "GET", "/static/app.css")
+        assert not any(name == "x-frame-options" for name, _ in _headers(sent))
+
+
+class TestFieldRules:
+
+    def test_field_classification_is_memoized(self):
+        classify_field.cache_clear()
+        assert classify_field("Custom_CSS") == (True, False)
+        assert classify_field("email") == (False, True)
+        assert classify_field("return_url") == (False, True)
+        assert classify_field("nickname") == (False, False)
+        classify_field("email")
+        assert classify_field.cache_info().hits == 1
+
+    def test_preserve_by_value(self):
+        middleware = build_app()
+        assert middleware._should_preserve_field("note", "FONT-size: 2px")
+        assert middleware._should_preserve_field("note", "<div class=\"x\">")
+        assert not middleware._should_preserve_field("note", "plain words")
+
+    def test_sanitize_value_matches_full_pipeline(self):
+        assert sanitize_value("  plain  ") == "plain"
+        assert sanitize_value("Tom & <Jerry>") == "Tom &amp; &lt;Jerry&gt;"
+        with pytest.raises(ValueError, match="UPDATE"):
+            sanitize_value("please Update me")
+
+    @pytest.mark.asyncio
+    async def test_rejected_form_is_not_shared(self):
+        body = urlencode({"message": "drop table users"}).encode()
+        sent, _ = await call(build_app(), "POST", "/form", body, FORM_HEADERS)
+        assert sent[0]["status"] == 200
+        assert json.loads(_body(sent))["sanitized"] is None
+
+
+class TestAuthContext:
+
+    @pytest.mark.asyncio
+    async def test_fused_pass_sets_context_and_cookies(self):
+        sent, _ = await call(build_app(auth_context=True), "GET", "/whoami")
+        headers = _headers(sent)
+        assert _body(sent) == b"None"
+        assert ("x-content-type-options", "nosniff") in headers
+        assert any(name == "set-cookie" and value.startswith("seen=1;") for name, value in headers)
+        assert current_user_context.get(None) is None
+
+    @pytest.mark.asyncio
+    async def test_standalone_middleware(self):
+        app = Starlette(routes=[Route("/whoami", whoami)])
+        sent, _ = await call(AuthContextMiddleware(app), "GET", "/whoami")
+        headers = _headers(sent)
+        assert any(name == "set-cookie" for name, _ in headers)
+        assert not any(name == "x-frame-options" for name, _ in headers)
@@ -0,0 +1,139 @@
+"""Unit tests for SequenceService id allocation and AttendanceService membership"""
+
+import asyncio
+
+import pytest
+
+from add_ons.domains.stream.services import attendance_service
+from add_ons.domains.stream.services.attendance_service import AttendanceService
+from core.services.sequence_service import SequenceService
+
+
+class FakeDB:
+    """Counters collection plus one data collection, enough for SequenceService"""
+
+    def __init__(self, existing_ids=()):
+        self.counters = {}
+        self.round_trips = 0
+        self.docs = [{"id": i} for i in existing_ids]
+
+    async def find_and_modify_document(self, collection, filters, update, upsert=False, return_new=True):
+        self.round_trips += 1
+        await asyncio.sleep(0)
+        seq = self.counters.get(filters["_id"], 0)
+        if "$max" in update:
+            seq = max(seq, update["$max"]["seq"])
+        if "$inc" in update:
+            seq += update["$inc"]["seq"]
+        self.counters[filters["_id"]] = seq
+        return {"_id": filters["_id"], "seq": seq}
+
+    async def ensure_index(self, collection, keys, unique=False):
+        return True
+
+    async def find_documents(self, collection, filters=None, limit=100, skip=0, sort=None):
+        return sorted(self.docs, key=lambda d: -d["id"])[:limit]
+
+
+class TestSequenceService:
+
+    @pytest.mark.asyncio
+    async def test_allocates_in_blocks(self):
+        db = FakeDB()
+        seq = SequenceService(db=db, backend="mongo", block_size=10)
+
+        ids = [await seq.next_id("streams") for _ in range(25)]
+
+        assert ids == list(range(1, 26))
+        assert db.round_trips == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_reservation(self):
+        db = FakeDB()
+        seq = SequenceService(db=db, backend="mongo", block_size=50)
+
+        ids = await asyncio.gather(*(seq.next_id("streams") for _ in range(50)))
+
+        assert sorted(ids) == list(range(1, 51))
+        assert db.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_processes_get_disjoint_blocks(self):
+        db = FakeDB()
+        a = SequenceService(db=db, backend="mongo", block_size=5)
+        b = SequenceService(db=db, backend="mongo", block_size=5)
+
+        ids = [await a.next_id("x"), await b.next_id("x"), await a.next_id("x")]
+
+        assert ids == [1, 6, 2]
+
+    @pytest.mark.asyncio
+    async def test_seeds_above_existing_ids(self):
+        db = FakeDB(existing_ids=[3, 41, 7])
+        seq = SequenceService(db=db, backend="mongo", block_size=1)
+
+        assert await seq.next_id("streams", seed_collection="streams") == 42
+        assert await seq.next_id("streams", seed_collection="streams") == 43
+
+    def test_rejects_unknown_backend(self):
+        with pytest.raises(ValueError):
+            SequenceService(db=FakeDB(), backend="etcd")
+
+
+class TestEnsureIndex:
+
+    @pytest.mark.asyncio
+    async def test_failed_index_is_retried_after_backoff(self, monkeypatch):
+        from core.services import db_service
+        from core.services.db_service import DBService
+
+        class Mongo:
+            client = object()
+            attempts = 0
+
+            async def create_index(self, collection, keys, unique=False):
+                self.attempts += 1
+                if self.attempts < 3:
+                    raise RuntimeError("duplicate key")
+
+        now = [1000.0]
+        monkeypatch.setattr(db_service.time, "monotonic", lambda: now[0])
+        mongo = Mongo()
+        db = DBService(postgres=object(), mongodb=mongo, redis=object())
+
+        assert await db.ensure_index("streams", [("id", 1)]) is False
+        assert await db.ensure_index("streams", [("id", 1)]) is False
+        assert mongo.attempts == 1
+
+        now[0] += db_service.INDEX_RETRY_SECONDS
+        assert await db.ensure_index("streams", [("id", 1)]) is False
+        # The delay doubled
+        now[0] += db_service.INDEX_RETRY_SECONDS
+        assert await db.ensure_index("streams", [("id", 1)]) is False
+        assert mongo.attempts == 2
+
+        now[0] += db_service.INDEX_RETRY_SECONDS
+        assert await db.ensure_index("streams", [("id", 1)]) is True
+        assert await db.ensure_index("streams", [("id", 1)]) is True
+        assert mongo.attempts == 3
+
+
+class TestAttendanceMemory:
+
+    @pytest.fixture(autouse=True)
+    def clean_store(self, monkeypatch):
+        monkeypatch.setattr(attendance_service, "_MEM", {})
+
+    @pytest.mark.asyncio
+    async def test_add_is_idempotent_and_shared_across_instances(self):
+        first = await AttendanceService().add_attendee(1, 10)
+        again = await AttendanceService().add_attendee(1, 10)
+        await AttendanceService().add_attendee(1, 11)
+        await AttendanceService().add_attendee(2, 10)
+
+        service = AttendanceService()
+        assert again is first
+        assert await service.is_attending(1, 11)
+        assert not await service.is_attending(2, 11)
+        assert await service.counts_for_stream_ids([1, 2, 3]) == {1: 2, 2: 1, 3: 0}
+        assert {a.stream_id for a in await service.list_user_attendances(10)} == {1, 2}
@@ -0,0 +1,248 @@
+"""Unit tests for the session engine: lazy decoding, dirty tracking, cookie and Redis stores"""
+
+import hashlib
+import hmac
+from datetime import datetime
+
+import pytest
+
+from core.db.adapters.redis_adapter import RedisAdapter
+from core.middleware import session as session_module
+from core.middleware.session import (
+    CookieSessionStore,
+    RedisSessionStore,
+    Session,
+    SessionMiddleware,
+    SessionSigner,
+    pack_value,
+)
+from core.services.settings.session import SessionConfig, SessionManager
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    adapter = RedisAdapter("redis://test", decode_responses=False)
+    adapter.client = fakeredis.FakeAsyncRedis()
+    return adapter
+
+
+def session_app(handler):
+    """ASGI app that calls handler(session) and responds 200"""
+
+    async def app(scope, receive, send):
+        handler(scope.get("session"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+async def call(app, path="/", cookie=None):
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers, "query_string": b""}
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return [v.decode() for k, v in sent[0]["headers"] if k == b"set-cookie"]
+
+
+def cookie_value(set_cookie):
+    return set_cookie.split(";")[0].split("=", 1)[1]
+
+
+class TestSession:
+
+    def test_load_is_lazy_and_values_decode_per_key(self):
+        loads = []
+
+        def load():
+            loads.append(1)
+            return {"a": pack_value({"x": 1}), "b": b"\xc1"}  # b is not valid msgpack
+
+        session = Session(load)
+        assert loads == []
+        assert session["a"] == {"x": 1}
+        assert session.get("c") is None
+        assert loads == [1]
+
+    def test_changes_cover_only_touched_keys(self):
+        session = Session(lambda: {"a": pack_value(1), "b": pack_value([1]), "c": pack_value("c")})
+        assert session.changes() == ({}, set())
+
+        session["a"] = 2
+        session["b"].append(2)
+        del session["c"]
+        updated, deleted = session.changes()
+        assert updated == {"a": pack_value(2), "b": pack_value([1, 2])}
+        assert deleted == {"c"}
+        assert dict(session) == {"a": 2, "b": [1, 2]}
+
+    def test_reading_containers_without_changing_them_is_clean(self):
+        session = Session(lambda: {"cart": pack_value({"items": [1]})})
+        assert session["cart"]["items"] == [1]
+        assert session.changes() == ({}, set())
+
+    def test_datetimes_round_trip(self):
+        now = datetime(2026, 1, 2, 3, 4, 5)
+        assert Session(lambda: {"t": pack_value(now)})["t"] == now
+
+
+class TestCookieSessions:
+
+    def test_signature_is_checked(self):
+        signer = SessionSigner("secret")
+        signed = signer.sign(b"payload")
+        assert signer.unsign(signed) == b"payload"
+        assert signer.unsign(signed[:-2] + "AA") is None
+        assert SessionSigner("other").unsign(signed) is None
+        assert signer.unsign("!!") is None
+
+    def test_key_is_derived_from_the_secret(self):
+        signer = SessionSigner("secret")
+        assert signer.key != b"secret"
+        # A MAC made with the raw secret (e.g. a JWT_SECRET signature) doesn't verify
+        forged = SessionSigner("secret")
+        forged.key = b"secret"
+        assert signer.unsign(forged.sign(b"payload")) is None
+        assert signer.key == hmac.new(b"secret", b"session", hashlib.sha256).digest()
+
+    def test_cookies_expire_after_max_age(self, monkeypatch):
+        signer = SessionSigner("secret", max_age=100)
+        signed = signer.sign(b"payload")
+        now = session_module.time.time()
+        monkeypatch.setattr(session_module.time, "time", lambda: now + 101)
+        assert signer.unsign(signed) is None
+
+    @pytest.mark.asyncio
+    async def test_old_cookies_are_reissued_and_expired_ones_cleared(self, monkeypatch):
+        store = CookieSessionStore(SessionSigner("secret", max_age=100))
+        (set_cookie,) = await call(SessionMiddleware(session_app(lambda s: s.update(user="u1")), store))
+        cookie = f"session={cookie_value(set_cookie)}"
+        reader = SessionMiddleware(session_app(lambda s: s.get("user")), store)
+        assert await call(reader, cookie=cookie) == []
+
+        now = session_module.time.time()
+        monkeypatch.setattr(session_module.time, "time", lambda: now + 60)
+        (reissued,) = await call(reader, cookie=cookie)
+        assert store.signer.unsign(cookie_value(reissued)) is not None
+
+        monkeypatch.setattr(session_module.time, "time", lambda: now + 200)
+        (cleared,) = await call(reader, cookie=cookie)
+        assert cleared.startswith("session=;")
+
+    @pytest.mark.asyncio
+    async def test_cookie_only_set_when_session_changes(self):
+        store = CookieSessionStore(SessionSigner("secret"))
+        app = SessionMiddleware(session_app(lambda s: s.update(user="u1", roles=["admin"])), store)
+        (set_cookie,) = await call(app)
+        assert set_cookie.startswith("session=") and "HttpOnly" in set_cookie
+        cookie = f"session={cookie_value(set_cookie)}"
+
+        seen = {}
+        reader = SessionMiddleware(session_app(lambda s: seen.update(s)), store)
+        assert await call(reader, cookie=cookie) == []
+        assert seen == {"user": "u1", "roles": ["admin"]}
+
+        clearer = SessionMiddleware(session_app(lambda s: s.clear()), store)
+        (cleared,) = await call(clearer, cookie=cookie)
+        assert cleared.startswith("session=;") and "Max-Age=0" in cleared
+
+    @pytest.mark.asyncio
+    async def test_static_paths_and_forged_cookies_skip_the_session(self):
+        seen = []
+        app = SessionMiddleware(session_app(seen.append), CookieSessionStore(SessionSigner("secret")))
+        await call(app, path="/static/app.js", cookie="session=anything")
+        assert seen == [None]
+
+        await call(app, cookie="session=Zm9yZ2VkLWNvb2tpZS12YWx1ZQ")
+        assert dict(seen[1]) == {}
+
+
+class TestRedisSessions:
+
+    @pytest.mark.asyncio
+    async def test_id_issued_on_first_write_and_only_changes_sent(self, fake_redis):
+        store = RedisSessionStore(fake_redis, ttl_seconds=100, flush_interval=0)
+        client = fake_redis.get_client()
+
+        # Reading an empty session creates nothing
+        assert await call(SessionMiddleware(session_app(lambda s: s.get("x")), store)) == []
+        assert await client.keys("*") == []
+
+        writer = SessionMiddleware(session_app(lambda s: s.update(a=1, b=[1])), store, max_age=100)
+        (set_cookie,) = await call(writer)
+        sid = cookie_value(set_cookie)
+        assert "Max-Age=100" in set_cookie
+        assert await store.read(sid) == {"a": 1, "b": [1]}
+
+        def change(session):
+            session["a"] = 2
+            del session["b"]
+
+        assert await call(SessionMiddleware(session_app(change), store), cookie=f"session={sid}") == []
+        assert await store.read(sid) == {"a": 2}
+        assert 0 < await client.ttl(store.key(sid)) <= 100
+
+    @pytest.mark.asyncio
+    async def test_read_only_sessions_refresh_ttl_in_batches(self, fake_redis):
+        store = RedisSessionStore(fake_redis, ttl_seconds=100, flush_interval=60)
+        await store.write_values("s" * 20, {"a": 1}, ttl_seconds=5)
+        await store.write_values("t" * 20, {"a": 1}, ttl_seconds=5)
+
+        reader = SessionMiddleware(session_app(lambda s: s["a"]), store)
+        for sid in ("s" * 20, "t" * 20):
+            assert await call(reader, cookie=f"session={sid}") == []
+        assert set(store._pending_refresh) == {store.key("s" * 20), store.key("t" * 20)}
+
+        store._flush_task.cancel()
+        await store.flush()
+        assert await fake_redis.get_client().ttl(store.key("s" * 20)) > 5
+        assert store._pending_refresh == {}
+
+    @pytest.mark.asyncio
+    async def test_unknown_ids_are_not_adopted_and_emptied_sessions_are_deleted(self, fake_redis):
+        store = RedisSessionStore(fake_redis, flush_interval=0)
+        (set_cookie,) = await call(
+            SessionMiddleware(session_app(lambda s: s.update(a=1)), store), cookie="session=" + "a" * 40,
+        )
+        sid = cookie_value(set_cookie)
+        assert sid != "a" * 40
+
+        (cleared,) = await call(SessionMiddleware(session_app(lambda s: s.clear()), store), cookie=f"session={sid}")
+        assert "Max-Age=0" in cleared
+        assert await fake_redis.get_client().exists(store.key(sid)) == 0
+
+
+class TestSessionManagerStore:
+
+    @pytest.mark.asyncio
+    async def test_manager_sessions_live_in_the_shared_store(self, fake_redis):
+        store = RedisSessionStore(fake_redis)
+        manager = SessionManager(store=store)
+        manager._session_config = SessionConfig(timeout_minutes=10)
+
+        created = await manager.create_session("u1", {"email": "a@b.c"}, ip_address="1.2.3.4")
+        sid = created["session_id"]
+        other = (await manager.create_session("u1", {}))["session_id"]
+
+        session = await manager.validate_session(sid)
+        assert session["user_data"] == {"email": "a@b.c"}
+        assert isinstance(session["expires_at"], datetime)
+        assert 0 < await fake_redis.get_client().ttl(store.key(sid)) <= 600
+
+        # The middleware sees the same record
+        assert (await store.open(sid))["user_id"] == "u1"
+
+        await manager.delete_session(other)
+        assert [s["session_id"] for s in await manager.get_active_sessions("u1")] == [sid]
+        assert await manager.update_activity(other) is False
+
+        assert await manager.delete_user_sessions("u1") == 1
+        assert await manager.get_session(sid) is None
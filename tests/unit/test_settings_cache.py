@@ -0,0 +1,187 @@
+"""Unit tests for the versioned settings cache behind HybridSettingsManager"""
+
+import asyncio
+import time
+
+import pytest
+
+from core.db.adapters.redis_adapter import RedisAdapter
+from core.services.settings.cache import SettingsCache, cache_key
+from core.services.settings.hybrid import HybridSettingsManager, SettingSource, SettingValue
+from core.services.settings.registry import SettingScope, SettingSensitivity
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+
+    def adapter():
+        redis = RedisAdapter("redis://test")
+        redis.client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        # One fake client stands in for both pools
+        redis._blocking = redis
+        return redis
+
+    return adapter
+
+
+async def _until(condition):
+    for _ in range(50):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+def manager_with(values):
+    """A HybridSettingsManager resolving from ``values``, counting resolutions"""
+    manager = HybridSettingsManager()
+    manager.resolutions = []
+
+    async def resolve(key, user_roles, context, decrypt):
+        manager.resolutions.append(key)
+        return SettingValue(
+            key=key, value=values[key], source=SettingSource.DYNAMIC,
+            scope=SettingScope.PLATFORM, sensitivity=SettingSensitivity.PUBLIC,
+        )
+
+    manager._resolve_setting = resolve
+    return manager
+
+
+class TestSettingsCache:
+
+    def test_tuple_keys_ignore_role_order(self):
+        assert cache_key("a", ["editor", "admin"], {"user_id": "u"}) == cache_key("a", ["admin", "editor"], {"user_id": "u"})
+        assert cache_key("a", ["admin"], None, True) != cache_key("a", ["admin"], None, False)
+
+    def test_invalidation_drops_only_that_setting(self):
+        cache = SettingsCache()
+        for roles in (["admin"], ["editor"]):
+            cache.set(cache_key("theme.colors", roles, None), "c", 60, cache.stamp("theme.colors"))
+        cache.set(cache_key("auth.jwt_expiry", ["admin"], None), 24, 60, cache.stamp("auth.jwt_expiry"))
+
+        assert cache.invalidate("theme.colors") == 2
+        assert cache.get(cache_key("theme.colors", ["admin"], None)) is None
+        assert cache.get(cache_key("auth.jwt_expiry", ["admin"], None)) == 24
+        assert len(cache) == 1 and cache.stamp("theme.colors") == (0, 1)
+
+    def test_stale_resolutions_and_versions_are_ignored(self):
+        cache = SettingsCache()
+        stamp = cache.stamp("k")
+        cache.invalidate("k")
+        assert cache.set(cache_key("k", [], None), "old", 60, stamp) is False
+
+        stamp = cache.stamp("k")
+        cache.clear()
+        assert cache.set(cache_key("k", [], None), "old", 60, stamp) is False
+
+        cache.invalidate("k", 5)
+        assert cache.invalidate("k", 3) == 0
+        assert cache.version("k") == 5
+
+    def test_clear_leaves_seen_versions_alone(self):
+        cache = SettingsCache()
+        cache.invalidate("k", 1)
+        cache.clear()
+        assert cache.version("k") == 1
+        # The next write from another worker still gets through
+        assert cache.set(cache_key("k", [], None), "old", 60, cache.stamp("k"))
+        assert cache.invalidate("k", 2) == 1
+
+    def test_lru_bound_and_ttl_sweep(self, monkeypatch):
+        now = time.monotonic()
+        monkeypatch.setattr("core.services.settings.cache.time.monotonic", lambda: now)
+        cache = SettingsCache(max_entries=2)
+        cache.set(cache_key("a", [], None), 1, 1, cache.stamp("a"))
+        cache.set(cache_key("b", [], None), 2, 100, cache.stamp("b"))
+        cache.get(cache_key("a", [], None))
+        cache.set(cache_key("c", [], None), 3, 100, cache.stamp("c"))
+        assert cache.get(cache_key("b", [], None)) is None
+        assert cache.stats["evictions"] == 1
+
+        monkeypatch.setattr("core.services.settings.cache.time.monotonic", lambda: now + 5)
+        cache.get(cache_key("c", [], None))
+        assert len(cache) == 1 and cache.stats["expirations"] == 1
+
+
+class TestHybridSettingsCaching:
+
+    @pytest.mark.asyncio
+    async def test_hits_skip_resolution_and_writes_invalidate(self):
+        values = {"theme.colors": {"primary": "#000"}}
+        manager = manager_with(values)
+
+        first = await manager.get_setting("theme.colors", ["admin"])
+        first["value"] = "mutated by caller"
+        again = await manager.get_setting("theme.colors", ["admin"])
+        assert again["value"] == {"primary": "#000"}
+        assert manager.resolutions == ["theme.colors"]
+        assert manager.get_metrics()["cache_hits"] == 1
+
+        # Decrypted and plain reads are cached separately
+        await manager.get_setting("theme.colors", ["admin"], decrypt=True)
+        assert len(manager.resolutions) == 2
+
+        values["theme.colors"] = {"primary": "#fff"}
+        await manager._invalidate_cache("theme.colors")
+        assert (await manager.get_setting("theme.colors", ["admin"]))["value"] == {"primary": "#fff"}
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_dependent_computed_settings(self):
+        manager = manager_with({"theme.combined": {"primary": "#000"}})
+        await manager.get_setting("theme.combined", ["admin"])
+        await manager._invalidate_cache("theme.colors")
+        await manager.get_setting("theme.combined", ["admin"])
+        assert manager.resolutions == ["theme.combined", "theme.combined"]
+
+    @pytest.mark.asyncio
+    async def test_writes_reach_other_workers(self, fake_redis):
+        values = {"auth.jwt_expiry": 24}
+        writer, reader = manager_with(values), manager_with(values)
+        writer.cache.redis = fake_redis()
+        await reader.start_sync(fake_redis())
+        try:
+            for _ in range(50):
+                if reader.cache.synced:
+                    break
+                await asyncio.sleep(0.01)
+            await reader.get_setting("auth.jwt_expiry", ["admin"])
+
+            values["auth.jwt_expiry"] = 48
+            await writer._invalidate_cache("auth.jwt_expiry")
+            for _ in range(50):
+                if reader.cache.version("auth.jwt_expiry"):
+                    break
+                await asyncio.sleep(0.01)
+
+            assert reader.cache.version("auth.jwt_expiry") == writer.cache.version("auth.jwt_expiry") == 1
+            assert (await reader.get_setting("auth.jwt_expiry", ["admin"]))["value"] == 48
+        finally:
+            await reader.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_after_a_reconnect_reach_other_workers(self, fake_redis):
+        values = {"auth.jwt_expiry": 24}
+        writer, reader = manager_with(values), manager_with(values)
+        writer.cache.redis = fake_redis()
+        await reader.start_sync(fake_redis())
+        try:
+            await _until(lambda: reader.cache.synced)
+            await writer._invalidate_cache("auth.jwt_expiry")
+            await _until(lambda: reader.cache.version("auth.jwt_expiry"))
+
+            # Reconnect: the listener clears the cache on subscribe
+            await reader.close()
+            await reader.start_sync()
+            await _until(lambda: reader.cache.synced)
+            assert reader.cache.stats["resyncs"] == 2
+            await reader.get_setting("auth.jwt_expiry", ["admin"])
+
+            values["auth.jwt_expiry"] = 48
+            await writer._invalidate_cache("auth.jwt_expiry")
+            await _until(lambda: reader.cache.version("auth.jwt_expiry") == 2)
+
+            assert (await reader.get_setting("auth.jwt_expiry", ["admin"]))["value"] == 48
+        finally:
+            await reader.close()
@@ -0,0 +1,150 @@
+"""Unit tests for WebRTC signaling long-poll (in-memory and Redis)"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from add_ons.domains.stream.services import signaling_service
+from add_ons.domains.stream.services.signaling_service import SignalingService, SignalingUnavailable
+from core.db.adapters.redis_adapter import RedisAdapter
+
+
+@pytest.fixture
+def svc(monkeypatch):
+    monkeypatch.setattr(signaling_service, "get_db_service", lambda: SimpleNamespace(redis=None))
+    monkeypatch.setattr(signaling_service, "_MEM", signaling_service._MemoryStore())
+    return SignalingService()
+
+
+@pytest.fixture
+def redis_svc(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    adapter = RedisAdapter("redis://test")
+    adapter.client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    adapter._blocking = RedisAdapter("redis://test", purpose="blocking")
+    adapter._blocking.client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(signaling_service, "get_db_service", lambda: SimpleNamespace(redis=adapter))
+    monkeypatch.setattr(signaling_service, "_MEM", signaling_service._MemoryStore())
+    return SignalingService()
+
+
+def _exhausted_pool():
+    """What BlockingConnectionPool raises when no connection frees up in time"""
+    try:
+        raise asyncio.TimeoutError()
+    except asyncio.TimeoutError as timeout:
+        error = RedisConnectionError("No connection available.")
+        error.__cause__ = timeout
+        return error
+
+
+async def _later(delay, coro):
+    await asyncio.sleep(delay)
+    await coro
+
+
+class TestSignalingMemory:
+
+    @pytest.mark.asyncio
+    async def test_offers_dequeue_once_in_order(self, svc):
+        await svc.set_viewer_offer("r", "a", {"sdp": "a"})
+        await svc.set_viewer_offer("r", "a", {"sdp": "a2"})
+        await svc.set_viewer_offer("r", "b", {"sdp": "b"})
+
+        assert await svc.pop_next_offer("r") == {"viewer_id": "a", "offer": {"sdp": "a2"}}
+        assert (await svc.pop_next_offer("r"))["viewer_id"] == "b"
+        assert await svc.pop_next_offer("r") is None
+
+    @pytest.mark.asyncio
+    async def test_state_is_shared_between_instances(self, svc):
+        await svc.set_viewer_answer("r", "a", {"type": "answer"})
+
+        assert await SignalingService().get_viewer_answer("r", "a") == {"type": "answer"}
+
+    @pytest.mark.asyncio
+    async def test_pop_offer_waits_for_viewer(self, svc):
+        task = asyncio.create_task(_later(0.05, svc.set_viewer_offer("r", "a", {"sdp": "a"})))
+        started = time.monotonic()
+
+        offer = await svc.pop_next_offer("r", wait=2)
+
+        assert offer["viewer_id"] == "a"
+        assert time.monotonic() - started < 1
+        await task
+
+    @pytest.mark.asyncio
+    async def test_answer_and_candidates_wake_waiters(self, svc):
+        async def broadcaster():
+            await asyncio.sleep(0.05)
+            await svc.set_viewer_answer("r", "a", {"type": "answer"})
+            await svc.push_broadcaster_candidate("r", "a", {"c": 1})
+            await svc.push_broadcaster_candidate("r", "a", {"c": 2})
+
+        task = asyncio.create_task(broadcaster())
+        answer = await svc.get_viewer_answer("r", "a", wait=2)
+        await task
+
+        assert answer == {"type": "answer"}
+        assert await svc.pop_broadcaster_candidates("r", "a", wait=2) == [{"c": 1}, {"c": 2}]
+
+    @pytest.mark.asyncio
+    async def test_wait_times_out_empty(self, svc):
+        started = time.monotonic()
+
+        assert await svc.pop_viewer_candidates("r", "a", wait=0.05) == []
+        assert await svc.get_viewer_answer("r", "a", wait=0.05) is None
+        assert time.monotonic() - started < 1
+
+    @pytest.mark.asyncio
+    async def test_cleanup_drops_pending_viewer(self, svc):
+        await svc.set_viewer_offer("r", "a", {"sdp": "a"})
+        await svc.cleanup_viewer("r", "a")
+
+        assert await svc.pop_next_offer("r") is None
+
+
+class TestSignalingRedis:
+
+    @pytest.mark.asyncio
+    async def test_long_polls_wait_on_the_blocking_pool(self, redis_svc):
+        blocking = redis_svc._db.redis._blocking.client
+        calls = []
+        blpop = blocking.blpop
+
+        async def counting_blpop(*args, **kwargs):
+            calls.append(args[0])
+            return await blpop(*args, **kwargs)
+
+        blocking.blpop = counting_blpop
+        task = asyncio.create_task(_later(0.05, redis_svc.set_viewer_offer("r", "a", {"sdp": "a"})))
+        offer = await redis_svc.pop_next_offer("r", wait=2)
+        await task
+
+        assert offer == {"viewer_id": "a", "offer": {"sdp": "a"}}
+        assert calls == [["webrtc:r:pending_queue"]]
+
+        task = asyncio.create_task(_later(0.05, redis_svc.set_viewer_answer("r", "a", {"type": "answer"})))
+        assert await redis_svc.get_viewer_answer("r", "a", wait=2) == {"type": "answer"}
+        await task
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_raises_instead_of_using_memory(self, redis_svc):
+        async def blpop(*args, **kwargs):
+            raise _exhausted_pool()
+
+        def pipeline(**kwargs):
+            raise _exhausted_pool()
+
+        redis_svc._db.redis._blocking.client.blpop = blpop
+        with pytest.raises(SignalingUnavailable, match="pool exhausted"):
+            await redis_svc.pop_viewer_candidates("r", "a", wait=1)
+
+        redis_svc._db.redis.client.pipeline = pipeline
+        with pytest.raises(SignalingUnavailable):
+            await redis_svc.set_viewer_answer("r", "a", {"type": "answer"})
+        assert signaling_service._MEM.values == {}
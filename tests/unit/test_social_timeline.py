@@ -0,0 +1,185 @@
+"""Unit tests for the fan-out-on-write social timeline"""
+
+import pytest
+
+from add_ons.domains.social.services.timeline_service import (
+    PUBLIC_KEY,
+    TimelineService,
+    author_key,
+    order_by_ids,
+    timeline_key,
+)
+
+
+def _bound(raw):
+    raw = str(raw)
+    if raw in ("+inf", "inf"):
+        return float("inf"), False
+    if raw.startswith("("):
+        return float(raw[1:]), True
+    return float(raw), False
+
+
+class FakeRedis:
+    """The sorted-set and set commands TimelineService uses"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.sets = {}
+
+    async def exists(self, key):
+        return int(key in self.zsets or key in self.sets)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.zsets.pop(key, None)
+            self.sets.pop(key, None)
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update({str(m): float(s) for m, s in mapping.items()})
+
+    async def zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        for member in members:
+            zset.pop(str(member), None)
+        if key in self.zsets and not zset:
+            del self.zsets[key]
+
+    async def zremrangebyrank(self, key, start, end):
+        ranked = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])
+        end = len(ranked) + end if end < 0 else end
+        await self.zrem(key, *[m for m, _ in ranked[start:end + 1]])
+
+    async def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(str(member))
+
+    async def zrevrangebyscore(self, key, max, min, start=None, num=None):
+        hi, hi_open = _bound(max)
+        lo, lo_open = _bound(min)
+        members = [
+            m for m, s in sorted(self.zsets.get(key, {}).items(), key=lambda kv: -kv[1])
+            if (s < hi if hi_open else s <= hi) and (s > lo if lo_open else s >= lo)
+        ]
+        if num is not None:
+            members = members[start:start + num]
+        return members
+
+    async def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(str(v) for v in values)
+
+    async def srem(self, key, *values):
+        self.sets.get(key, set()).difference_update(str(v) for v in values)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.redis, name), args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await fn(*args, **kwargs) for fn, args, kwargs in self.calls]
+
+
+def _loader(ids):
+    async def load():
+        return sorted(ids, reverse=True)
+    return load
+
+
+async def _batches(*batches):
+    for batch in batches:
+        yield list(batch)
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+class TestFanOut:
+
+    @pytest.mark.asyncio
+    async def test_pushes_only_to_materialized_timelines(self, redis):
+        tl = TimelineService(redis, fanout_limit=10)
+        await tl.ensure(timeline_key(2), _loader([]))
+
+        written = await tl.add_post(5, 1, False, 2, lambda: _batches([2, 3]))
+
+        assert written == 1
+        assert await redis.zscore(timeline_key(2), "5") == 5
+        assert not await redis.exists(timeline_key(3))
+
+    @pytest.mark.asyncio
+    async def test_heavy_author_is_pulled_at_read_time(self, redis):
+        tl = TimelineService(redis, fanout_limit=1)
+        await tl.ensure(author_key(1), _loader([]))
+        await tl.ensure(timeline_key(2), _loader([]))
+
+        await tl.add_post(7, 1, False, 2, lambda: _batches([2, 3]))
+        page = await tl.page(2, {PUBLIC_KEY: _loader([])}, heavy_followees=await tl.heavy_users())
+
+        assert not await redis.zscore(timeline_key(2), "7")
+        assert page.ids == [7]
+        assert 7 in page.personal
+
+
+class TestPage:
+
+    @pytest.mark.asyncio
+    async def test_merges_sources_with_keyset_cursor(self, redis):
+        tl = TimelineService(redis)
+        loaders = {timeline_key(1): _loader([9, 6, 4, 1]), PUBLIC_KEY: _loader([8, 6, 3])}
+
+        first = await tl.page(1, loaders, limit=3)
+        second = await tl.page(1, loaders, cursor=first.next_cursor, limit=3)
+        last = await tl.page(1, loaders, cursor=second.next_cursor, limit=3)
+
+        assert first.ids == [9, 8, 6]
+        assert second.ids == [4, 3, 1]
+        assert last.ids == [] and last.complete
+        assert 8 not in first.personal
+
+    @pytest.mark.asyncio
+    async def test_trimmed_source_stops_page_at_its_oldest_entry(self, redis):
+        tl = TimelineService(redis, max_length=2)
+        loaders = {timeline_key(1): _loader([10, 8, 6, 4]), PUBLIC_KEY: _loader([9])}
+
+        page = await tl.page(1, loaders, limit=3, cursor=10)
+
+        # The timeline only cached 10 and 8; 6 and 4 must come from the database
+        assert page.ids == [9, 8]
+        assert not page.complete
+
+    @pytest.mark.asyncio
+    async def test_unfollow_and_follow_patch_timeline(self, redis):
+        tl = TimelineService(redis)
+        await tl.ensure(author_key(5), _loader([3, 2]))
+        await tl.ensure(timeline_key(1), _loader([3, 2, 1]))
+
+        await tl.unfollow(1, 5)
+        assert await redis.zrevrangebyscore(timeline_key(1), "+inf", "(0") == ["1"]
+
+        await tl.follow(1, 5)
+        assert await redis.zrevrangebyscore(timeline_key(1), "+inf", "(0") == ["3", "2", "1"]
+
+        # Followee with no complete cached history: rebuild instead of patching
+        await tl.follow(1, 6)
+        assert not await redis.exists(timeline_key(1))
+
+
+def test_order_by_ids_drops_missing():
+    rows = [type("Row", (), {"id": i})() for i in (1, 2, 3)]
+
+    assert [r.id for r in order_by_ids(rows, [3, 9, 1])] == [3, 1]
@@ -0,0 +1,260 @@
+"""Unit tests for streaming uploads and ranged downloads in StorageService"""
+
+import io
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+from core.services.file_manager import FileManager
+from core.integrations.storage import (
+    ENCRYPTION_CHUNK_SIZE,
+    MIN_PART_SIZE,
+    ChunkDecryptor,
+    ChunkEncryptor,
+    FileDownloadRequest,
+    FileUploadRequest,
+    StorageLevel,
+    StorageService,
+    parse_range_header,
+)
+from core.exceptions import FileSizeLimitError, RangeNotSatisfiableError
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 calls StorageService makes"""
+
+    exceptions = type("exceptions", (), {"ClientError": ClientError})
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.part_sizes = []
+        self.ranges = []
+        self.aborted = 0
+
+    def put_object(self, Bucket, Key, Body, ContentType="application/octet-stream", Metadata=None):
+        self.objects[Key] = (bytes(Body), ContentType, dict(Metadata or {}))
+
+    def create_multipart_upload(self, Bucket, Key, ContentType="application/octet-stream", Metadata=None):
+        upload_id = f"up-{len(self.uploads)}"
+        self.uploads[upload_id] = {"parts": {}, "ContentType": ContentType, "Metadata": dict(Metadata or {})}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId]["parts"][PartNumber] = Body
+        self.part_sizes.append(len(Body))
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        upload = self.uploads.pop(UploadId)
+        body = b"".join(upload["parts"][p["PartNumber"]] for p in MultipartUpload["Parts"])
+        self.objects[Key] = (body, upload["ContentType"], upload["Metadata"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted += 1
+
+    def _lookup(self, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return self.objects[Key]
+
+    def head_object(self, Bucket, Key):
+        body, content_type, metadata = self._lookup(Key)
+        return {"ContentLength": len(body), "ContentType": content_type, "Metadata": metadata, "ETag": '"abc"'}
+
+    def get_object(self, Bucket, Key, Range=None):
+        body, content_type, metadata = self._lookup(Key)
+        if Range:
+            self.ranges.append(Range)
+            start, end = Range.split("=")[1].split("-")
+            body = body[int(start):int(end) + 1]
+        return {"Body": io.BytesIO(body), "ContentLength": len(body), "ContentType": content_type,
+                "Metadata": metadata, "ETag": '"abc"'}
+
+
+@pytest.fixture
+def storage():
+    service = StorageService()
+    service.s3_client = FakeS3()
+    service.part_size = MIN_PART_SIZE
+    service.read_size = 64 * 1024
+    return service
+
+
+def _upload_request(**kwargs):
+    defaults = dict(domain="stream", level=StorageLevel.APP, filename="video.mp4", content_type="video/mp4")
+    return FileUploadRequest(**{**defaults, **kwargs})
+
+
+def _download_request():
+    return FileDownloadRequest(domain="stream", level=StorageLevel.APP, filename="video.mp4")
+
+
+async def _chunks(data, size=100_000):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+PAYLOAD = os.urandom(3 * MIN_PART_SIZE // 2) + b"x" * (MIN_PART_SIZE // 2)
+
+
+class TestChunkEncryption:
+
+    @pytest.mark.parametrize("size", [0, 1, ENCRYPTION_CHUNK_SIZE, ENCRYPTION_CHUNK_SIZE * 3 + 7])
+    def test_round_trip(self, size):
+        key = os.urandom(32)
+        data = os.urandom(size)
+        encryptor = ChunkEncryptor(key)
+        sealed = encryptor.update(data[:size // 2]) + encryptor.update(data[size // 2:]) + encryptor.finalize()
+
+        decryptor = ChunkDecryptor(key, encryptor.nonce_prefix)
+        assert decryptor.update(sealed) + decryptor.finalize() == data
+
+    def test_truncation_is_detected(self):
+        key = os.urandom(32)
+        encryptor = ChunkEncryptor(key)
+        sealed = encryptor.update(os.urandom(ENCRYPTION_CHUNK_SIZE * 3)) + encryptor.finalize()
+
+        decryptor = ChunkDecryptor(key, encryptor.nonce_prefix)
+        truncated = sealed[:2 * (ENCRYPTION_CHUNK_SIZE + 16)]
+        with pytest.raises(Exception):
+            decryptor.update(truncated) + decryptor.finalize()
+
+
+class TestParseRangeHeader:
+
+    def test_forms(self):
+        assert parse_range_header("bytes=0-99", 1000) == (0, 99)
+        assert parse_range_header("bytes=900-", 1000) == (900, 999)
+        assert parse_range_header("bytes=-100", 1000) == (900, 999)
+        assert parse_range_header("bytes=990-5000", 1000) == (990, 999)
+
+    def test_ignored_headers(self):
+        assert parse_range_header(None, 1000) is None
+        assert parse_range_header("bytes=0-1,5-6", 1000) is None
+        assert parse_range_header("items=0-1", 1000) is None
+        assert parse_range_header("bytes=0-99", None) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range_header("bytes=1000-", 1000)
+
+
+class TestStreamingUpload:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("compress,encrypt", [(False, False), (False, True), (True, False), (True, True)])
+    async def test_round_trip(self, storage, compress, encrypt):
+        response = await storage.upload_stream(
+            _upload_request(compress=compress, encrypt=encrypt), _chunks(PAYLOAD), size=len(PAYLOAD)
+        )
+        assert response.success
+
+        stream = await storage.open_download_stream(_download_request())
+        assert stream.size == len(PAYLOAD)
+        assert await stream.read() == PAYLOAD
+        # The sync API reads streamed objects too
+        assert storage.download_file(_download_request()) == PAYLOAD
+
+    @pytest.mark.asyncio
+    async def test_parts_are_bounded(self, storage):
+        await storage.upload_stream(_upload_request(encrypt=False), _chunks(PAYLOAD))
+
+        assert len(storage.s3_client.part_sizes) == 2
+        assert max(storage.s3_client.part_sizes) == MIN_PART_SIZE
+
+    @pytest.mark.asyncio
+    async def test_small_file_uses_single_put(self, storage):
+        await storage.upload_stream(_upload_request(), b"hello")
+
+        assert storage.s3_client.part_sizes == []
+        assert storage.download_file(_download_request()) == b"hello"
+
+    @pytest.mark.asyncio
+    async def test_size_limit_aborts_upload(self, storage):
+        with pytest.raises(FileSizeLimitError):
+            await storage.upload_stream(_upload_request(), _chunks(PAYLOAD), max_size=MIN_PART_SIZE * 3 // 2)
+
+        assert storage.s3_client.aborted == 1
+        assert storage.s3_client.objects == {}
+
+
+class TestRangedDownload:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("compress,encrypt", [(False, False), (False, True), (True, True)])
+    @pytest.mark.parametrize("header,expected", [
+        ("bytes=0-0", slice(0, 1)),
+        ("bytes=100000-300000", slice(100000, 300001)),
+        ("bytes=-70000", slice(len(PAYLOAD) - 70000, len(PAYLOAD))),
+    ])
+    async def test_range(self, storage, compress, encrypt, header, expected):
+        await storage.upload_stream(
+            _upload_request(compress=compress, encrypt=encrypt), _chunks(PAYLOAD), size=len(PAYLOAD)
+        )
+
+        stream = await storage.open_download_stream(_download_request(), header)
+
+        assert stream.partial
+        assert stream.content_range == f"bytes {expected.start}-{expected.stop - 1}/{len(PAYLOAD)}"
+        assert await stream.read() == PAYLOAD[expected]
+
+    @pytest.mark.asyncio
+    async def test_encrypted_range_fetches_only_covering_chunks(self, storage):
+        await storage.upload_stream(_upload_request(encrypt=True), _chunks(PAYLOAD))
+
+        start = ENCRYPTION_CHUNK_SIZE * 5 + 10
+        stream = await storage.open_download_stream(_download_request(), f"bytes={start}-{start + 99}")
+
+        assert await stream.read() == PAYLOAD[start:start + 100]
+        sealed = ENCRYPTION_CHUNK_SIZE + 16
+        assert storage.s3_client.ranges == [f"bytes={5 * sealed}-{6 * sealed - 1}"]
+
+    @pytest.mark.asyncio
+    async def test_legacy_fernet_object(self, storage):
+        storage.upload_file(_upload_request(encrypt=True), b"legacy payload")
+
+        stream = await storage.open_download_stream(_download_request(), "bytes=7-13")
+        assert await stream.read() == b"payload"
+
+
+class TestFileManagerStreaming:
+
+    @pytest.mark.asyncio
+    async def test_upload_stream_and_range(self, storage, monkeypatch):
+        manager = FileManager(storage_service=storage)
+
+        async def no_metadata(*args, **kwargs):
+            return None
+        monkeypatch.setattr(manager, "get_file_metadata", no_metadata)
+
+        result = await manager.upload_file(
+            domain="stream", level=StorageLevel.APP, filename="video.mp4",
+            file_data=_chunks(PAYLOAD), content_type="video/mp4",
+        )
+        assert result["success"]
+
+        stream = await manager.download_stream("stream", StorageLevel.APP, "video.mp4",
+                                               range_header="bytes=10-19", use_cache=False)
+        assert await stream.read() == PAYLOAD[10:20]
+
+    @pytest.mark.asyncio
+    async def test_unvalidated_compressed_upload_keeps_its_size(self, storage, monkeypatch):
+        manager = FileManager(storage_service=storage)
+
+        async def no_metadata(*args, **kwargs):
+            return None
+        monkeypatch.setattr(manager, "get_file_metadata", no_metadata)
+
+        result = await manager.upload_file(
+            domain="stream", level=StorageLevel.APP, filename="video.mp4",
+            file_data=PAYLOAD, content_type="video/mp4",
+            compress=True, skip_validation=True,
+        )
+        assert result["success"]
+
+        stream = await manager.download_stream("stream", StorageLevel.APP, "video.mp4",
+                                               range_header="bytes=10-19", use_cache=False)
+        assert await stream.read() == PAYLOAD[10:20]
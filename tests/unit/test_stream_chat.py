@@ -0,0 +1,195 @@
+"""Unit tests for live stream chat fan-out and persistence"""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from add_ons.domains.stream.services import chat_service
+from add_ons.domains.stream.services.chat_service import ChatHub, ChatMessage, ChatService
+
+
+def _msg(msg_id, stream_id=1, content="hi"):
+    return ChatMessage(
+        id=msg_id, stream_id=stream_id, user_id=7, username="ann",
+        content=content, created_at=datetime(2024, 1, 1, 12, 0),
+    )
+
+
+async def _collect(hub, stream_id, n, out):
+    async for msg in hub.subscribe(stream_id):
+        out.append(msg)
+        if len(out) == n:
+            return
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the chat Lua script and backlog reads"""
+
+    def __init__(self):
+        self.seq = {}
+        self.streams = {}
+
+    async def eval(self, script, numkeys, seq_key, room_key, maxlen, *fields):
+        self.seq[seq_key] = self.seq.get(seq_key, 0) + 1
+        names = ("stream_id", "user_id", "username", "content", "created_at")
+        entry = {"id": str(self.seq[seq_key]), **{k: str(v) for k, v in zip(names, fields)}}
+        entries = self.streams.setdefault(room_key, [])
+        entries.append((f"{len(entries) + 1}-0", entry))
+        return self.seq[seq_key]
+
+    evalsha = eval
+
+    async def xrevrange(self, key, count=None):
+        return list(reversed(self.streams.get(key, [])))[:count]
+
+    async def xread(self, streams, count=None, block=None):
+        (key, last_id), = streams.items()
+        after = int(last_id.split("-")[0])
+        entries = [e for e in self.streams.get(key, []) if int(e[0].split("-")[0]) > after][:count]
+        if not entries:
+            await asyncio.sleep(0.01)
+            return []
+        return [(key, entries)]
+
+
+class TestChatHub:
+
+    @pytest.mark.asyncio
+    async def test_fans_out_to_every_subscriber(self):
+        hub = ChatHub()
+        received = [[] for _ in range(3)]
+        tasks = [asyncio.create_task(_collect(hub, 1, 2, out)) for out in received]
+        await asyncio.sleep(0)
+
+        hub.publish_local(_msg(1))
+        hub.publish_local(_msg(2))
+        hub.publish_local(_msg(3, stream_id=2))
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+
+        assert [[m.id for m in out] for out in received] == [[1, 2]] * 3
+        assert hub.subscriber_count(1) == 0
+        # Rooms go away with their last subscriber
+        assert hub._rooms == {}
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_dropped(self):
+        hub = ChatHub(queue_size=2)
+        received = []
+        subscription = hub.subscribe(1)
+        first = asyncio.create_task(subscription.__anext__())
+        await asyncio.sleep(0)
+
+        hub.publish_local(_msg(1))
+        received.append(await first)
+        for i in range(2, 5):
+            hub.publish_local(_msg(i))
+        async for msg in subscription:
+            received.append(msg)
+
+        assert [m.id for m in received] == [1]
+        assert hub.stats["dropped_subscribers"] == 1
+        assert hub.subscriber_count(1) == 0
+        assert hub._rooms == {}
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_yields_none_when_idle(self):
+        hub = ChatHub()
+        subscription = hub.subscribe(1, heartbeat=0.01)
+
+        assert await subscription.__anext__() is None
+        await subscription.aclose()
+
+    @pytest.mark.asyncio
+    async def test_persists_in_batches(self, monkeypatch):
+        db = MagicMock()
+        db.insert_documents = AsyncMock()
+        monkeypatch.setattr(chat_service, "get_db_service", lambda: db)
+        hub = ChatHub(flush_batch_size=2)
+
+        for i in range(5):
+            hub.enqueue_persist(_msg(i).to_doc())
+        await hub.close()
+
+        sizes = [len(call.args[1]) for call in db.insert_documents.await_args_list]
+        assert sizes == [2, 2, 1]
+        assert hub.stats["persisted"] == 5
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_messages(self, monkeypatch):
+        db = MagicMock()
+        db.insert_documents = AsyncMock(side_effect=[RuntimeError("down"), None])
+        monkeypatch.setattr(chat_service, "get_db_service", lambda: db)
+        hub = ChatHub()
+        hub._pending = [_msg(1).to_doc()]
+
+        assert await hub.flush() == 0
+        assert await hub.flush() == 1
+        assert hub.stats["persist_errors"] == 1
+
+
+class TestChatService:
+
+    @pytest.mark.asyncio
+    async def test_memory_mode_ids_history_and_delivery(self):
+        service = ChatService(use_db=False, hub=ChatHub())
+        received = []
+        task = asyncio.create_task(_collect(service.hub, 4, 1, received))
+        await asyncio.sleep(0)
+
+        first = await service.add_message(4, 7, "ann", "one")
+        second = await service.add_message(4, 7, "ann", "two")
+        await asyncio.wait_for(task, 1)
+
+        assert (first.id, second.id) == (1, 2)
+        assert [m.content for m in await service.list_messages(4, limit=1)] == ["two"]
+        assert received[0].content == "one"
+
+    @pytest.mark.asyncio
+    async def test_redis_allocates_ids_and_writes_behind(self):
+        redis = FakeRedis()
+        hub = ChatHub()
+        hub.enqueue_persist = MagicMock()
+        service = ChatService(use_db=False, hub=hub)
+        service._get_redis = AsyncMock(return_value=redis)
+
+        ids = [(await service.add_message(9, 7, "ann", f"m{i}")).id for i in range(3)]
+        backlog = await service.list_messages(9, limit=2)
+
+        assert ids == [1, 2, 3]
+        assert [m.content for m in backlog] == ["m1", "m2"]
+        assert hub.enqueue_persist.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_subscriber_resumes_after_its_last_message(self):
+        redis = FakeRedis()
+        hub = ChatHub(block_ms=10)
+        hub.enqueue_persist = MagicMock()
+        service = ChatService(use_db=False, hub=hub)
+        service._get_redis = AsyncMock(return_value=redis)
+        for i in range(3):
+            await service.add_message(9, 7, "ann", f"m{i}")
+
+        # The client had message 1 (its backlog or Last-Event-ID); 2 and 3 came before it subscribed
+        subscription = service.subscribe(9, after=1)
+        received = [await subscription.__anext__(), await subscription.__anext__()]
+        await service.add_message(9, 7, "ann", "live")
+        received.append(await asyncio.wait_for(subscription.__anext__(), 1))
+        await subscription.aclose()
+
+        assert [m.id for m in received] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_memory_mode_resumes_from_history(self):
+        service = ChatService(use_db=False, hub=ChatHub())
+        for i in range(3):
+            await service.add_message(4, 7, "ann", f"m{i}")
+
+        subscription = service.subscribe(4, after=2)
+        first = await subscription.__anext__()
+        await service.add_message(4, 7, "ann", "live")
+        second = await asyncio.wait_for(subscription.__anext__(), 1)
+        await subscription.aclose()
+
+        assert (first.id, second.id) == (3, 4)
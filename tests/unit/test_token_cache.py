@@ -0,0 +1,117 @@
+"""Unit tests for the verified-token cache used by AuthService"""
+
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from core.services.auth.auth_service import AuthService
+from core.services.auth.token_cache import AuthTokenCache
+
+
+def _user(user_id=1):
+    user = Mock()
+    user.id = user_id
+    user.email = f"user{user_id}@example.com"
+    user.role = "user"
+    return user
+
+
+def _payload(jti="jti-1", user_id=1, exp_in=3600):
+    return {"user_id": user_id, "jti": jti, "exp": int(time.time()) + exp_in}
+
+
+class TestAuthTokenCache:
+
+    def test_hit_after_set(self):
+        cache = AuthTokenCache(ttl_seconds=60)
+        user = _user()
+        cache.set("tok", _payload(), user)
+
+        entry = cache.get("tok")
+        assert entry is not None
+        assert entry.user is user
+        assert cache.stats()["hits"] == 1
+
+    def test_disabled_with_zero_ttl(self):
+        cache = AuthTokenCache(ttl_seconds=0)
+        cache.set("tok", _payload(), _user())
+        assert cache.get("tok") is None
+
+    def test_ttl_capped_by_token_exp(self):
+        cache = AuthTokenCache(ttl_seconds=60)
+        cache.set("tok", _payload(exp_in=-1), _user())
+        assert cache.get("tok") is None
+
+    def test_entry_expires(self, monkeypatch):
+        cache = AuthTokenCache(ttl_seconds=5)
+        cache.set("tok", _payload(), _user())
+        now = time.monotonic()
+        monkeypatch.setattr("core.services.auth.token_cache.time.monotonic", lambda: now + 10)
+        assert cache.get("tok") is None
+
+    def test_lru_eviction(self):
+        cache = AuthTokenCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", _payload("a"), _user())
+        cache.set("b", _payload("b"), _user())
+        cache.get("a")
+        cache.set("c", _payload("c"), _user())
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_invalidate_jti(self):
+        cache = AuthTokenCache(ttl_seconds=60)
+        cache.set("tok", _payload("jti-x"), _user())
+        assert cache.invalidate_jti("jti-x") is True
+        assert cache.get("tok") is None
+
+    def test_invalidate_user(self):
+        cache = AuthTokenCache(ttl_seconds=60)
+        cache.set("t1", _payload("j1", 7), _user(7))
+        cache.set("t2", _payload("j2", 7), _user(7))
+        cache.set("t3", _payload("j3", 8), _user(8))
+
+        assert cache.invalidate_user("7") == 2
+        assert cache.get("t1") is None
+        assert cache.get("t2") is None
+        assert cache.get("t3") is not None
+
+
+class TestAuthServiceTokenCache:
+
+    @pytest.mark.asyncio
+    async def test_warm_request_skips_io(self):
+        jwt = Mock()
+        jwt.verify = AsyncMock(return_value=_payload())
+        repo = Mock()
+        repo.get_session = AsyncMock(return_value=None)
+        repo.get_user_by_id = AsyncMock(return_value=_user())
+
+        service = AuthService(user_repository=repo, jwt_provider=jwt, token_cache=AuthTokenCache(ttl_seconds=60))
+
+        first = await service.get_current_user("tok")
+        second = await service.get_current_user("tok")
+
+        assert first is second
+        assert jwt.verify.await_count == 1
+        assert repo.get_session.await_count == 1
+        assert repo.get_user_by_id.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_logout_all_drops_cached_tokens(self):
+        jwt = Mock()
+        jwt.verify = AsyncMock(return_value=_payload())
+        repo = Mock()
+        repo.get_session = AsyncMock(return_value=None)
+        repo.get_user_by_id = AsyncMock(return_value=_user())
+        repo.revoke_all_sessions = AsyncMock()
+
+        cache = AuthTokenCache(ttl_seconds=60)
+        service = AuthService(user_repository=repo, jwt_provider=jwt, token_cache=cache)
+        await service.get_current_user("tok")
+
+        await service.logout_all(1)
+
+        assert cache.get("tok") is None
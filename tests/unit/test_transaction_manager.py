@@ -0,0 +1,253 @@
+"""Unit tests for TransactionManager commit protocols and connection pinning"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from core.db.adapters.postgres_adapter import PostgresAdapter
+from core.db.adapters.redis_adapter import RedisAdapter
+from core.db.transaction_manager import TransactionManager
+
+
+class FakeConnection:
+
+    def __init__(self, pool, n):
+        self.pool = pool
+        self.n = n
+
+    async def execute(self, query, *args):
+        self.pool.log.append((self.n, query))
+        return "UPDATE 1"
+
+    async def fetchval(self, query, *args):
+        self.pool.log.append((self.n, query))
+        return 42
+
+
+class _Acquire:
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __await__(self):
+        return self.pool._take().__await__()
+
+    async def __aenter__(self):
+        self.conn = await self.pool._take()
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        await self.pool.release(self.conn)
+
+
+class FakePool:
+    """Counts acquisitions and records which connection ran which statement"""
+
+    def __init__(self):
+        self.log = []
+        self.acquired = 0
+        self.out = 0
+
+    async def _take(self):
+        self.acquired += 1
+        self.out += 1
+        return FakeConnection(self, self.acquired)
+
+    def acquire(self, timeout=None):
+        return _Acquire(self)
+
+    async def release(self, conn):
+        self.out -= 1
+
+
+class FakeMongo:
+
+    def __init__(self):
+        self.calls = []
+
+    async def insert_one(self, collection, document, transaction_id=None):
+        self.calls.append("insert_one")
+        return "oid"
+
+    async def prepare_transaction(self, transaction_id):
+        self.calls.append("prepare")
+
+    async def commit_transaction(self, transaction_id):
+        self.calls.append("commit")
+
+    async def rollback_transaction(self, transaction_id):
+        self.calls.append("rollback")
+
+
+class FakeTwoPhaseStore(FakeMongo):
+    supports_two_phase = True
+
+
+class FakeSession:
+
+    def __init__(self, log):
+        self.log = log
+
+    def start_transaction(self, **kwargs):
+        self.log.append("start")
+
+    async def commit_transaction(self):
+        self.log.append("commit")
+
+    async def abort_transaction(self):
+        self.log.append("abort")
+
+    async def end_session(self):
+        self.log.append("end")
+
+
+class FakeCollection:
+
+    def __init__(self, log):
+        self.log = log
+
+    async def insert_one(self, document, session=None):
+        self.log.append(("insert_one", session is not None))
+        return SimpleNamespace(inserted_id="oid")
+
+
+def _mongo():
+    from core.db.adapters.mongodb_adapter import MongoDBAdapter
+
+    adapter = MongoDBAdapter("mongodb://test", "test")
+    adapter.log = []
+
+    async def start_session():
+        return FakeSession(adapter.log)
+
+    adapter.client = SimpleNamespace(start_session=start_session)
+    adapter.db = {"media": FakeCollection(adapter.log)}
+    return adapter
+
+
+@pytest.fixture
+def pg():
+    adapter = PostgresAdapter("postgresql://test/test")
+    adapter.pool = FakePool()
+    return adapter
+
+
+class TestOnePhase:
+
+    @pytest.mark.asyncio
+    async def test_single_store_commits_on_one_pinned_connection(self, pg):
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "orders", {"total": 10})
+            await tm.execute(pg, "update", "stock", {"qty": 1}, {"sku": "a"})
+
+        assert pg.pool.acquired == 1
+        assert pg.pool.out == 0
+        assert {n for n, _ in pg.pool.log} == {1}
+        statements = [q for _, q in pg.pool.log]
+        assert statements[0] == "BEGIN" and statements[-1] == "COMMIT"
+        assert not any("PREPARE" in q for q in statements)
+        assert tm.get_status()["protocol"] == "1pc"
+
+    @pytest.mark.asyncio
+    async def test_error_rolls_back_and_releases(self, pg):
+        with pytest.raises(ValueError):
+            async with TransactionManager() as tm:
+                await tm.execute(pg, "insert", "orders", {"total": 10})
+                raise ValueError("boom")
+
+        assert pg.pool.log[-1] == (1, "ROLLBACK")
+        assert pg.pool.out == 0
+        assert tm.get_status()["aborted"]
+
+    @pytest.mark.asyncio
+    async def test_non_durable_participant_keeps_one_phase(self, pg):
+        class Cache:
+            async def delete(self, key):
+                return 1
+
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "orders", {"total": 10})
+            await tm.execute(Cache(), "delete", "orders:1")
+
+        assert tm.one_phase
+        assert pg.pool.log[-1] == (1, "COMMIT")
+
+    @pytest.mark.asyncio
+    async def test_redis_adapter_keeps_one_phase(self, pg):
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = RedisAdapter("redis://test")
+        redis.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await redis.set("orders:1", "cached")
+
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "orders", {"total": 10})
+            await tm.execute(redis, "delete", "orders:1")
+
+        assert tm.one_phase
+        assert not any("PREPARE" in q for _, q in pg.pool.log)
+        assert pg.pool.log[-1] == (1, "COMMIT")
+        assert await redis.get("orders:1") is None
+
+    @pytest.mark.asyncio
+    async def test_write_listeners_fire_once_on_commit(self, pg):
+        writes = []
+        pg.write_listeners.append(lambda: writes.append(1))
+
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "orders", {"total": 10})
+            await tm.execute(pg, "insert", "orders", {"total": 11})
+            assert writes == []
+
+        assert writes == [1]
+
+
+class TestTwoPhase:
+
+    @pytest.mark.asyncio
+    async def test_cross_store_write_prepares_pinned_connection(self, pg):
+        other = FakeTwoPhaseStore()
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "products", {"name": "x"})
+            await tm.execute(other, "insert_one", "media", {"p": 42})
+
+        statements = [q for _, q in pg.pool.log]
+        assert statements[-2] == f"PREPARE TRANSACTION '{tm.transaction_id}'"
+        assert statements[-1] == f"COMMIT PREPARED '{tm.transaction_id}'"
+        assert pg.pool.acquired == 1 and pg.pool.out == 0
+        assert other.calls == ["insert_one", "prepare", "commit"]
+        assert tm.get_status()["protocol"] == "2pc"
+
+    @pytest.mark.asyncio
+    async def test_stores_without_two_phase_commit_after_postgres(self, pg):
+        mongo = FakeMongo()
+        pg.write_listeners.append(lambda: mongo.calls.append("postgres committed"))
+
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "products", {"name": "x"})
+            await tm.execute(mongo, "insert_one", "media", {"p": 42})
+
+        assert not any("PREPARE" in q for _, q in pg.pool.log)
+        assert mongo.calls == ["insert_one", "postgres committed", "commit"]
+        assert tm.get_status()["protocol"] == "1pc"
+
+    @pytest.mark.asyncio
+    async def test_mongo_writes_join_the_transaction(self, pg):
+        mongo = _mongo()
+        async with TransactionManager() as tm:
+            await tm.execute(pg, "insert", "products", {"name": "x"})
+            await tm.execute(mongo, "insert_one", "media", {"p": 42})
+
+        assert mongo.log == ["start", ("insert_one", True), "commit", "end"]
+        assert mongo._sessions == {}
+
+    @pytest.mark.asyncio
+    async def test_mongo_writes_abort_with_postgres(self, pg):
+        mongo = _mongo()
+        with pytest.raises(RuntimeError):
+            async with TransactionManager() as tm:
+                await tm.execute(pg, "insert", "products", {"name": "x"})
+                await tm.execute(mongo, "insert_one", "media", {"p": 42})
+                raise RuntimeError("boom")
+
+        assert mongo.log == ["start", ("insert_one", True), "abort", "end"]
+        assert pg.pool.log[-1][1] == "ROLLBACK"
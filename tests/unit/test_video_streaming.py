@@ -0,0 +1,128 @@
+"""Unit tests for VideoFileStreamer range / multi-range serving"""
+
+import os
+
+import pytest
+
+from add_ons.domains.stream.services.video_streaming_service import (
+    RangeHeaderParser,
+    VideoFileStreamer,
+)
+from core.exceptions import RangeNotSatisfiableError
+
+DATA = os.urandom(300_000)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+async def _serve(response, extensions=None, method="GET"):
+    scope = {"type": "http", "method": method, "asgi": {"spec_version": "2.4"}, "extensions": extensions or {}}
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    await response(scope, receive, send)
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], headers, messages[1:]
+
+
+def _body(messages):
+    return b"".join(m["body"] for m in messages if m["type"] == "http.response.body")
+
+
+class TestParseRanges:
+
+    def test_coalesces_and_sorts(self):
+        assert RangeHeaderParser.parse_ranges("bytes=500-599, 0-99, 50-149, 150-199", 1000) == [(0, 199), (500, 599)]
+
+    def test_suffix_and_open_ended(self):
+        assert RangeHeaderParser.parse_ranges("bytes=-10,990-", 1000) == [(990, 999)]
+
+    def test_ignored(self):
+        assert RangeHeaderParser.parse_ranges(None, 1000) is None
+        assert RangeHeaderParser.parse_ranges("bytes=abc-", 1000) is None
+        assert RangeHeaderParser.parse_ranges("bytes=0-1,3-4,6-7", 1000, max_ranges=2) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiableError):
+            RangeHeaderParser.parse_ranges("bytes=1000-2000", 1000)
+
+
+class TestVideoFileResponse:
+
+    @pytest.mark.asyncio
+    async def test_full_file(self, video):
+        status, headers, messages = await _serve(VideoFileStreamer(video).response())
+
+        assert status == 200
+        assert headers["content-length"] == str(len(DATA))
+        assert _body(messages) == DATA
+
+    @pytest.mark.asyncio
+    async def test_chunks_grow_to_max(self, video):
+        streamer = VideoFileStreamer(video, chunk_size=16 * 1024, max_chunk_size=64 * 1024)
+        chunks = [chunk async for chunk in streamer.stream_range(0, len(DATA) - 1)]
+
+        assert [len(c) for c in chunks[:4]] == [16 * 1024, 32 * 1024, 64 * 1024, 64 * 1024]
+        assert b"".join(chunks) == DATA
+
+    @pytest.mark.asyncio
+    async def test_single_range(self, video):
+        status, headers, messages = await _serve(VideoFileStreamer(video).response("bytes=1000-1999"))
+
+        assert status == 206
+        assert headers["content-range"] == f"bytes 1000-1999/{len(DATA)}"
+        assert headers["content-length"] == "1000"
+        assert _body(messages) == DATA[1000:2000]
+
+    @pytest.mark.asyncio
+    async def test_multipart_byteranges(self, video):
+        response = VideoFileStreamer(video).response("bytes=0-9,-5")
+        status, headers, messages = await _serve(response)
+        body = _body(messages)
+
+        assert status == 206
+        assert headers["content-type"] == f"multipart/byteranges; boundary={response.boundary}"
+        assert int(headers["content-length"]) == len(body)
+        parts = body.split(f"--{response.boundary}".encode())
+        assert parts[0] == b""
+        assert parts[1].endswith(b"\r\n\r\n" + DATA[:10] + b"\r\n")
+        assert f"Content-Range: bytes {len(DATA) - 5}-{len(DATA) - 1}/{len(DATA)}".encode() in parts[2]
+        assert parts[2].endswith(DATA[-5:] + b"\r\n")
+        assert parts[3] == b"--\r\n"
+
+    @pytest.mark.asyncio
+    async def test_if_range_mismatch_serves_full_file(self, video):
+        streamer = VideoFileStreamer(video)
+
+        status, _, _ = await _serve(streamer.response("bytes=0-9", if_range=streamer.etag))
+        assert status == 206
+
+        status, _, messages = await _serve(streamer.response("bytes=0-9", if_range='"stale"'))
+        assert status == 200
+        assert _body(messages) == DATA
+
+    @pytest.mark.asyncio
+    async def test_unsatisfiable_range(self, video):
+        status, headers, _ = await _serve(VideoFileStreamer(video).response(f"bytes={len(DATA)}-"))
+
+        assert status == 416
+        assert headers["content-range"] == f"bytes */{len(DATA)}"
+
+    @pytest.mark.asyncio
+    async def test_zerocopy_extension(self, video):
+        response = VideoFileStreamer(video).response("bytes=10-19")
+        _, _, messages = await _serve(response, extensions={"http.response.zerocopysend": {}})
+
+        sends = [m for m in messages if m["type"] == "http.response.zerocopysend"]
+        assert [(m["offset"], m["count"]) for m in sends] == [(10, 10)]